@@ -0,0 +1,18 @@
+"""
+Shared-secret checks for the admin features.
+
+Profiling (PROFILING_TOKEN) and snapshots (SNAPSHOT_TOKEN) each accept a
+token from a header or query value. Values are compared as UTF-8 bytes in
+constant time, so any presented string - non-ASCII included - is simply a
+match or not.
+"""
+
+import hmac
+from typing import Optional
+
+
+def token_matches(candidate: Optional[str], token: Optional[str]) -> bool:
+    """True when a token is configured and candidate equals it"""
+    if not (token and candidate):
+        return False
+    return hmac.compare_digest(candidate.encode("utf-8"), token.encode("utf-8"))
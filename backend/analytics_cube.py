@@ -0,0 +1,249 @@
+"""
+Pre-aggregated analytics cube for the executive and regional dashboards.
+
+analytics_cube holds the measures at the finest grain the dashboards ask
+for: metro x industry x risk_level x month. Every query rolls up from that
+table only, so its cost depends on the number of cells, not the size of the
+book.
+
+Each client's share of the cube is kept in cube_contributions. When
+change_log reports writes to clients, risk_flags or opportunities, sync()
+subtracts the old contributions of those clients from the cube and adds
+the new ones; rebuild() recomputes everything in one pass.
+
+Client count, portfolio value and revenue are stock measures: each month
+keeps the snapshot taken while it was the current month, and a roll-up
+across months reports the latest month instead of summing. Risk flags and
+opportunities are flows counted in the month they were raised.
+"""
+
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import pipeline
+
+PIPELINE_NAME = "analytics_cube"
+
+DIMENSIONS = ("metro", "industry", "risk_level", "month")
+STOCK_MEASURES = ("clients", "portfolio_value", "annual_revenue")
+FLOW_MEASURES = ("risk_flags", "opportunities", "opportunity_value")
+MEASURES = STOCK_MEASURES + FLOW_MEASURES
+
+# change_log tables that feed the cube
+SOURCE_TABLES = ("clients", "risk_flags", "opportunities")
+
+UNKNOWN = "(none)"
+CHUNK_SIZE = 500  # Client ids per IN (...) list
+
+# clients.risk_score (0-10) bands
+RISK_LEVEL_SQL = """
+    CASE WHEN c.risk_score >= 7 THEN 'High'
+         WHEN c.risk_score >= 4 THEN 'Medium'
+         ELSE 'Low' END
+"""
+
+
+def current_month() -> str:
+    return datetime.now().strftime("%Y-%m")
+
+
+def _chunks(values: Sequence[str]):
+    for start in range(0, len(values), CHUNK_SIZE):
+        yield values[start:start + CHUNK_SIZE]
+
+
+def _placeholders(values: Sequence) -> str:
+    return ", ".join("?" for _ in values)
+
+
+def _current_dims(conn: sqlite3.Connection, client_ids: Sequence[str]) -> Dict[str, tuple]:
+    """client_id -> (metro, industry, risk_level, portfolio_value, annual_revenue)"""
+    rows = conn.execute(f"""
+        SELECT c.id, COALESCE(mk.metro_id, '{UNKNOWN}'), COALESCE(c.industry, '{UNKNOWN}'), {RISK_LEVEL_SQL},
+               COALESCE(c.portfolio_value, 0), COALESCE(c.annual_revenue, 0)
+        FROM clients c
+        LEFT JOIN relationships r ON r.id = c.relationship_id
+        LEFT JOIN relationship_managers rm ON rm.id = r.rm_id
+        LEFT JOIN regions g ON g.id = rm.region_id
+        LEFT JOIN markets mk ON mk.id = g.market_id
+        WHERE c.id IN ({_placeholders(client_ids)})
+    """, client_ids).fetchall()
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def _flows(conn: sqlite3.Connection, client_ids: Sequence[str]) -> Dict[tuple, List[float]]:
+    """(client_id, month) -> [risk_flags, opportunities, opportunity_value]"""
+    flows: Dict[tuple, List[float]] = {}
+    placeholders = _placeholders(client_ids)
+    for client_id, month, count in conn.execute(f"""
+        SELECT client_id, substr(flagged_date, 1, 7), COUNT(*) FROM risk_flags
+        WHERE client_id IN ({placeholders}) GROUP BY 1, 2
+    """, client_ids):
+        flows.setdefault((client_id, month), [0, 0, 0.0])[0] = count
+    for client_id, month, count, value in conn.execute(f"""
+        SELECT client_id, substr(created_at, 1, 7), COUNT(*), COALESCE(SUM(value), 0) FROM opportunities
+        WHERE client_id IN ({placeholders}) GROUP BY 1, 2
+    """, client_ids):
+        entry = flows.setdefault((client_id, month), [0, 0, 0.0])
+        entry[1], entry[2] = count, value
+    return flows
+
+
+def _apply_delta(conn: sqlite3.Connection, rows: Iterable[tuple], sign: int):
+    """Add (sign=1) or subtract (sign=-1) contribution rows to the cube"""
+    conn.executemany(f"""
+        INSERT INTO analytics_cube ({', '.join(DIMENSIONS + MEASURES)})
+        VALUES ({_placeholders(DIMENSIONS + MEASURES)})
+        ON CONFLICT(metro, industry, risk_level, month) DO UPDATE SET
+            {', '.join(f'{m} = {m} + excluded.{m}' for m in MEASURES)}
+    """, [(metro, industry, risk_level, month, *(sign * value for value in measures))
+          for metro, industry, risk_level, month, *measures in rows])
+
+
+def refresh_clients(conn: sqlite3.Connection, client_ids: Sequence[str], month: Optional[str] = None):
+    """Replace the contributions of these clients (inside the caller's transaction)"""
+    month = month or current_month()
+    columns = ", ".join(("client_id",) + DIMENSIONS + MEASURES)
+    for chunk in _chunks(list(client_ids)):
+        old = conn.execute(
+            f"SELECT {columns} FROM cube_contributions WHERE client_id IN ({_placeholders(chunk)})", chunk
+        ).fetchall()
+        dims = _current_dims(conn, chunk)
+        flows = _flows(conn, chunk)
+
+        new: Dict[tuple, list] = {}
+        for client_id, row_month, metro, industry, risk_level, *measures in (
+                (r[0], r[4], r[1], r[2], r[3], *r[5:]) for r in old):
+            if row_month < month:
+                # Past snapshots keep their dimensions and stock values; flows are recounted below
+                new[(client_id, row_month)] = [metro, industry, risk_level, *measures[:3], 0, 0, 0.0]
+        for client_id, (metro, industry, risk_level, portfolio_value, annual_revenue) in dims.items():
+            new[(client_id, month)] = [metro, industry, risk_level, 1, portfolio_value, annual_revenue, 0, 0, 0.0]
+        for (client_id, flow_month), values in flows.items():
+            if client_id not in dims or not flow_month:
+                continue
+            metro, industry, risk_level = dims[client_id][:3]
+            row = new.setdefault((client_id, flow_month), [metro, industry, risk_level, 0, 0.0, 0.0, 0, 0, 0.0])
+            row[6:9] = values
+
+        _apply_delta(conn, [(r[1], r[2], r[3], r[4], *r[5:]) for r in old], -1)
+        _apply_delta(conn, [(*row[:3], key[1], *row[3:]) for key, row in new.items()], 1)
+        conn.execute(f"DELETE FROM cube_contributions WHERE client_id IN ({_placeholders(chunk)})", chunk)
+        conn.executemany(
+            f"INSERT INTO cube_contributions ({columns}) VALUES ({_placeholders(('client_id',) + DIMENSIONS + MEASURES)})",
+            [(key[0], *row[:3], key[1], *row[3:]) for key, row in new.items()]
+        )
+    # Cells everyone has moved out of (allowing for float residue from the deltas)
+    conn.execute(f"DELETE FROM analytics_cube WHERE {' AND '.join(f'ABS({m}) < 0.005' for m in MEASURES)}")
+
+
+def _snapshot_taken(conn: sqlite3.Connection, month: str) -> bool:
+    return conn.execute("SELECT 1 FROM cube_contributions WHERE month >= ? LIMIT 1", (month,)).fetchone() is not None
+
+
+def _rebuild(conn: sqlite3.Connection, max_seq: int) -> int:
+    conn.execute("DELETE FROM cube_contributions")
+    conn.execute("DELETE FROM analytics_cube")
+    refresh_clients(conn, [row[0] for row in conn.execute("SELECT id FROM clients")])
+    return conn.execute("SELECT COUNT(*) FROM analytics_cube").fetchone()[0]
+
+
+def rebuild(db_path) -> int:
+    """Recompute the whole cube in one pass; returns the number of cells"""
+    return pipeline.rebuild(db_path, PIPELINE_NAME, pipeline.CHANGE_LOG, _rebuild)
+
+
+def sync(db_path) -> int:
+    """Apply logged changes since the last sync; returns clients refreshed"""
+    month = current_month()
+
+    def snapshot_due(conn: sqlite3.Connection) -> bool:
+        # A month without its snapshot runs even when nothing was logged
+        return not _snapshot_taken(conn, month) and conn.execute("SELECT 1 FROM clients LIMIT 1").fetchone() is not None
+
+    def apply(conn: sqlite3.Connection, last_seq: int, max_seq: int) -> int:
+        if not _snapshot_taken(conn, month):
+            # First sync of a new month: snapshot every client's stock measures
+            client_ids = [row[0] for row in conn.execute("SELECT id FROM clients")]
+        else:
+            client_ids = [row[0] for row in conn.execute(f"""
+                SELECT DISTINCT client_id FROM change_log
+                WHERE seq > ? AND seq <= ? AND table_name IN ({_placeholders(SOURCE_TABLES)})
+            """, (last_seq, max_seq, *SOURCE_TABLES))]
+        refresh_clients(conn, client_ids, month)
+        return len(client_ids)
+
+    return pipeline.sync(db_path, PIPELINE_NAME, pipeline.CHANGE_LOG, apply, due=snapshot_due)
+
+
+def parse_list(value: Optional[str], allowed: Sequence[str], name: str) -> List[str]:
+    items = [item.strip() for item in (value or "").split(",") if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {name}: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return list(dict.fromkeys(items))
+
+
+def parse_filter(value: Optional[str]) -> Dict[str, List[str]]:
+    """'metro:ny-metro|boston-metro,month:2024-01..2024-06' -> {dimension: values}"""
+    filters: Dict[str, List[str]] = {}
+    for clause in (value or "").split(","):
+        if not clause.strip():
+            continue
+        dimension, sep, values = clause.partition(":")
+        dimension = dimension.strip()
+        if not sep or dimension not in DIMENSIONS or not values:
+            raise ValueError(f"Invalid filter clause '{clause}' (expected dimension:value|value)")
+        filters[dimension] = [v.strip() for v in values.split("|") if v.strip()]
+    return filters
+
+
+def query(conn: sqlite3.Connection, dims: Sequence[str], measures: Sequence[str],
+          filters: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Roll the cube up to dims, aggregating measures over the filtered cells"""
+    where, params = [], {}
+    for dimension, values in filters.items():
+        terms = []
+        for value in values:
+            name = f"p{len(params)}"
+            if ".." in value:
+                # Inclusive range, either end may be open: "2024-01..2024-06", "2024-01.."
+                low, _, high = value.partition("..")
+                bounds = []
+                if low:
+                    params[name + "lo"] = low
+                    bounds.append(f"{dimension} >= :{name}lo")
+                if high:
+                    params[name + "hi"] = high
+                    bounds.append(f"{dimension} <= :{name}hi")
+                terms.append(" AND ".join(bounds) or "1")
+            else:
+                params[name] = value
+                terms.append(f"{dimension} = :{name}")
+        where.append("(" + " OR ".join(terms) + ")")
+    where_sql = " WHERE " + " AND ".join(where) if where else ""
+
+    # Stock measures are not summed across months: without a month dimension they report the latest one
+    as_of = None
+    if "month" not in dims and any(measure in STOCK_MEASURES for measure in measures):
+        as_of = conn.execute(f"SELECT MAX(month) FROM analytics_cube{where_sql}", params).fetchone()[0]
+    params["as_of"] = as_of
+
+    select = list(dims) + [
+        f"SUM(CASE WHEN month = :as_of THEN {measure} ELSE 0 END) AS {measure}"
+        if as_of is not None and measure in STOCK_MEASURES else f"SUM({measure}) AS {measure}"
+        for measure in measures
+    ]
+    sql = f"SELECT {', '.join(select)} FROM analytics_cube{where_sql}"
+    if dims:
+        sql += f" GROUP BY {', '.join(dims)} ORDER BY {', '.join(dims)}"
+    cursor = conn.execute(sql, params)
+    columns = [description[0] for description in cursor.description]
+    return {"rows": [dict(zip(columns, row)) for row in cursor.fetchall()], "as_of": as_of}
+
+
+if __name__ == "__main__":
+    from db import DB_PATH
+
+    print(f"Built analytics cube with {rebuild(DB_PATH)} cells")
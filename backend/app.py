@@ -1,14 +1,53 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional, List, Dict, Any
-import sqlite3
-import json
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+from functools import partial
 import random
-from pathlib import Path
+from db import DB_PATH, get_db_connection, dict_from_row
+from loaders import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, client_to_api, load_breadcrumb, load_client,
+                     load_relationship_clients, load_relationship_manager, load_rm_relationships,
+                     relationship_client_columns, resolve_client_columns)
+from response_cache import ResponseCache, compressed_json_response
+from change_feed import ChangeNotifier, HEARTBEAT_INTERVAL, LogVersion, format_sse
+from ingest import IngestWriter
+from hot_window import HotWindowCache, load_rows
+from profiling import PROFILING_TOKEN, ProfilingMiddleware
+from pipeline import PipelineSyncer, prune_change_log
+import analytics_cube
+import cash_windows
+import client_history
+import counterparty_graph
+import ownership_graph
+import review_worklist
+import transaction_monitor
+from warmup import AccessCounter, Warmup, save_hot_set
+from models import to_camel_case
+from schemas import TransactionItem
+from routes import analytics, batch, cash, counterparties, ingest, ownership, peers, profiles, snapshots, worklist
 
-app = FastAPI(title="Client 360 API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the background workers with the app; on shutdown save the hot set and stop them"""
+    await change_notifier.start()
+    app.state.ingest_writer.start()
+    pipeline_syncer.start()
+    warmup.start()
+    try:
+        yield
+    finally:
+        counts = access_counter.snapshot()
+        if any(counts.values()):
+            save_hot_set(counts)
+        await change_notifier.stop()
+        # Drains the queue first, so every accepted batch is committed and acknowledged
+        app.state.ingest_writer.stop()
+        pipeline_syncer.stop()
+
+app = FastAPI(title="Client 360 API", version="1.0.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -19,101 +58,282 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database path
-DB_PATH = Path(__file__).parent / "database.db"
+# Per-request profiling, installed only when a token is configured
+if PROFILING_TOKEN:
+    app.add_middleware(ProfilingMiddleware, store=profiles.profile_store)
 
-def get_db_connection():
-    """Create a database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# One change_log watcher shared by every event-stream subscriber
+change_notifier = ChangeNotifier(DB_PATH)
 
-def dict_from_row(row):
-    """Convert sqlite3.Row to dictionary"""
-    if row is None:
-        return None
-    return dict(zip(row.keys(), row))
+# Serialized + compressed bodies for the read-mostly routes, each served only at the
+# data version (the newest change_log entry) it was built at; concurrent misses
+# coalesce per data version
+response_cache = ResponseCache(data_version=LogVersion(DB_PATH))
+
+# Recent transactions per client as NumPy columns for the transaction list view
+hot_windows = HotWindowCache()
+
+# Derived tables (graphs, cube, worklist, cash windows, detector hits, history checkpoints) are
+# brought up to date on one background thread; reads serve whatever has been materialized.
+# The monitor goes first: the risk_flags it writes reach the cube and worklist in the same round
+pipeline_syncer = PipelineSyncer()
+for pipeline_module in (transaction_monitor, ownership_graph, analytics_cube, client_history, review_worklist,
+                        counterparty_graph, cash_windows):
+    pipeline_syncer.add(pipeline_module.PIPELINE_NAME, partial(pipeline_module.sync, DB_PATH))
+# The in-memory peer index follows change_log too
+pipeline_syncer.add("peer_index", peers.peer_index.refresh)
+# Last step of each round: drop the change_log rows the pipelines, the peer index and the
+# change feed have read
+CHANGE_LOG_PIPELINES = (ownership_graph.PIPELINE_NAME, analytics_cube.PIPELINE_NAME, review_worklist.PIPELINE_NAME)
+pipeline_syncer.add("change_log_prune", lambda: prune_change_log(
+    DB_PATH, CHANGE_LOG_PIPELINES, min(change_notifier.last_seq, peers.peer_index.last_seq)))
+
+# The only connection that writes; ingest requests queue their batches for it
+app.state.ingest_writer = IngestWriter(DB_PATH)
+app.state.ingest_writer.before_ack.append(hot_windows.invalidate_accounts)
+# Cash buckets, candidate UTR events, detector hits and the counterparty graph follow every commit
+app.state.ingest_writer.on_commit.append(pipeline_syncer.signal)
+
+# Client and RM page requests, saved as the next startup's hot set
+access_counter = AccessCounter()
+
+# Bounded startup warm-up; /api/ready reports 503 until it has run
+warmup = Warmup(DB_PATH)
+
+app.include_router(analytics.router)
+app.include_router(batch.router)
+app.include_router(cash.router)
+app.include_router(counterparties.router)
+app.include_router(ingest.router)
+app.include_router(ownership.router)
+app.include_router(peers.router)
+app.include_router(profiles.router)
+app.include_router(snapshots.router)
+app.include_router(worklist.router)
 
 @app.get("/api/health")
 def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
-@app.get("/api/clients/{client_id}")
-def get_client(client_id: str):
-    """Get complete client details"""
+@app.get("/api/ready")
+def readiness_check():
+    """Readiness: 503 until the startup warm-up has finished or used up its budget"""
+    if not warmup.ready:
+        return JSONResponse(warmup.report, status_code=503, headers={"Retry-After": "1"})
+    return warmup.report
+
+@app.get("/api/metrics")
+def get_metrics():
+    """Cache, coalescing, ingest and pipeline counters"""
+    return {
+        "responseCache": response_cache.metrics(),
+        "hotWindows": {**hot_windows.stats, "windows": len(hot_windows), "bytes": hot_windows.nbytes},
+        "ingest": {**app.state.ingest_writer.stats, "pending": app.state.ingest_writer.pending},
+        "changeFeed": {"lastSeq": change_notifier.last_seq, "subscribers": change_notifier.subscriber_count},
+        "pipelines": pipeline_syncer.stats
+    }
+
+def resolve_as_of(as_of: Optional[str]) -> Optional[str]:
+    """Validate ?as_of= (date or ISO datetime, UTC)"""
+    if as_of is None:
+        return None
+    try:
+        as_of = client_history.parse_as_of(as_of)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="as_of must be YYYY-MM-DD or an ISO datetime")
+    return as_of
+
+def client_state_as_of(client_id: str, as_of: str):
+    """A client's rows (clients, accounts, risk_flags) rebuilt from its history"""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get basic client info
-    cursor.execute("SELECT * FROM clients WHERE id = ?", (client_id,))
-    client = dict_from_row(cursor.fetchone())
-    
+    try:
+        return client_history.state_as_of(conn, client_id, as_of)
+    finally:
+        conn.close()
+
+@app.get("/api/clients")
+def get_clients_batch(
+    request: Request,
+    ids: str,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    as_of: Optional[str] = None
+):
+    """Get the same projection for many clients (?ids=a,b&fields=name,riskScore)"""
+    client_ids = [client_id for client_id in ids.split(",") if client_id]
+    if not client_ids:
+        raise HTTPException(status_code=400, detail="No client ids given")
+    if len(client_ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PAGE_SIZE} ids per request")
+    columns = resolve_client_columns(fields, exclude)
+    as_of = resolve_as_of(as_of)
+    
+    def build():
+        if as_of is not None:
+            found = {}
+            for client_id in client_ids:
+                client = client_state_as_of(client_id, as_of)["clients"].get(client_id)
+                if client:
+                    found[client_id] = client_to_api({column: client.get(column) for column in columns})
+            return {
+                "items": [found[client_id] for client_id in client_ids if client_id in found],
+                "missing": [client_id for client_id in client_ids if client_id not in found]
+            }
+        conn = get_db_connection()
+        try:
+            placeholders = ", ".join("?" for _ in client_ids)
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(columns)} FROM clients WHERE id IN ({placeholders})",
+                client_ids
+            )
+            found = {row["id"]: client_to_api(dict_from_row(row)) for row in cursor.fetchall()}
+        finally:
+            conn.close()
+        return {
+            "items": [found[client_id] for client_id in client_ids if client_id in found],
+            "missing": [client_id for client_id in client_ids if client_id not in found]
+        }
+    return response_cache.respond(request, build)
+
+@app.get("/api/clients/{client_id}")
+def get_client(
+    client_id: str,
+    request: Request,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    as_of: Optional[str] = None
+):
+    """Get client details, optionally narrowed with ?fields= or ?exclude= or as they were at ?as_of="""
+    columns = resolve_client_columns(fields, exclude)
+    as_of = resolve_as_of(as_of)
+    access_counter.record("clients", client_id)
+    if as_of is not None:
+        return response_cache.respond(request, lambda: load_client_as_of(client_id, columns, as_of))
+    return response_cache.respond(request, lambda: load_client(client_id, columns))
+
+def load_client_as_of(client_id: str, columns, as_of: str):
+    """Rebuild the requested client columns as of a past time"""
+    client = client_state_as_of(client_id, as_of)["clients"].get(client_id)
     if not client:
+        raise HTTPException(status_code=404, detail="Client not found at as_of")
+    return client_to_api({column: client.get(column) for column in columns})
+
+@app.get("/api/clients/{client_id}/history")
+def get_client_history(
+    client_id: str,
+    as_of: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Client, accounts and risk flags as of ?as_of= (default now) plus the changes made since"""
+    as_of = resolve_as_of(as_of) or client_history.parse_as_of(datetime.utcnow().isoformat())
+    state = client_state_as_of(client_id, as_of)
+    client = state["clients"].get(client_id)
+    conn = get_db_connection()
+    try:
+        changes = client_history.changes_after(conn, client_id, as_of, limit + 1)
+    finally:
+        conn.close()
+    if not client and not changes:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    # Parse JSON fields
-    if client.get('beneficial_owners'):
-        client['beneficialOwners'] = json.loads(client['beneficial_owners'])
-        del client['beneficial_owners']
-    
-    if client.get('authorized_signers'):
-        client['authorizedSigners'] = json.loads(client['authorized_signers'])
-        del client['authorized_signers']
-    
-    if client.get('conductors'):
-        client['conductors'] = json.loads(client['conductors'])
-        del client['conductors']
-    
-    if client.get('related_entities'):
-        client['relatedEntities'] = json.loads(client['related_entities'])
-        del client['related_entities']
-    
-    if client.get('risk_flags'):
-        client['riskFlags'] = json.loads(client['risk_flags'])
-        del client['risk_flags']
-    
-    if client.get('product_summary'):
-        client['productSummary'] = json.loads(client['product_summary'])
-        del client['product_summary']
-    
-    if client.get('product_holdings'):
-        client['productHoldings'] = json.loads(client['product_holdings'])
-        del client['product_holdings']
-    
-    if client.get('rankings'):
-        client['rankings'] = json.loads(client['rankings'])
-        del client['rankings']
-    
-    if client.get('key_insights'):
-        client['keyInsights'] = json.loads(client['key_insights'])
-        del client['key_insights']
-    
-    # Convert snake_case to camelCase for remaining fields
-    camel_case_client = {}
-    for key, value in client.items():
-        # Convert snake_case to camelCase
-        camel_key = ''.join(word.capitalize() if i > 0 else word 
-                           for i, word in enumerate(key.split('_')))
-        camel_case_client[camel_key] = value
+    def rows(table):
+        return [{to_camel_case(k): v for k, v in row.items()}
+                for row in sorted(state[table].values(), key=lambda row: row["id"])]
+    return {
+        "asOf": as_of,
+        "client": client_to_api(client) if client else None,
+        "accounts": rows("accounts"),
+        "riskFlags": rows("risk_flags"),
+        "changes": changes[:limit],
+        "hasMoreChanges": len(changes) > limit
+    }
+
+@app.get("/api/clients/{client_id}/events")
+async def stream_client_events(client_id: str, request: Request):
+    """Server-sent events for account, risk flag, UTR and KRI changes of one client"""
+    def client_exists():
+        conn = get_db_connection()
+        try:
+            return conn.execute("SELECT 1 FROM clients WHERE id = ?", (client_id,)).fetchone() is not None
+        finally:
+            conn.close()
+    
+    if not await asyncio.to_thread(client_exists):
+        raise HTTPException(status_code=404, detail="Client not found")
     
-    conn.close()
-    return camel_case_client
+    last_event_id = request.headers.get("last-event-id", "")
+    last_seq = int(last_event_id) if last_event_id.isdigit() else None
+    # Subscribe before replaying so nothing committed in between is missed
+    queue = change_notifier.subscribe(client_id)
+    
+    async def events():
+        nonlocal last_seq
+        try:
+            yield "retry: 3000\n\n"
+            if last_seq is not None:
+                for event in await change_notifier.replay(client_id, last_seq):
+                    last_seq = event["seq"]
+                    yield format_sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if last_seq is not None and event.get("seq", last_seq + 1) <= last_seq:
+                    continue  # Already sent during replay
+                yield format_sse(event)
+        finally:
+            change_notifier.unsubscribe(client_id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/clients/{client_id}/accounts")
 def get_client_accounts(client_id: str):
-    """Generate client accounts dynamically based on portfolio value"""
+    """Get a client's stored accounts (generated from portfolio value when it has none)"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    # Get client portfolio value
     cursor.execute("SELECT portfolio_value, name FROM clients WHERE id = ?", (client_id,))
     client = dict_from_row(cursor.fetchone())
-    conn.close()
-    
     if not client:
+        conn.close()
         raise HTTPException(status_code=404, detail="Client not found")
     
+    cursor.execute("""
+        SELECT id, account_number, account_type, balance, available_balance, monthly_volume,
+               monthly_inflows, monthly_outflows, inflow_count, outflow_count, last_transaction,
+               risk_level, risk_score, status
+        FROM accounts WHERE client_id = ? ORDER BY account_type, id
+    """, (client_id,))
+    accounts = [account_to_api(dict_from_row(row), client['name']) for row in cursor.fetchall()]
+    conn.close()
+    
+    return accounts or mock_client_accounts(client)
+
+def account_to_api(account, client_name):
+    """Shape a stored account row like the generated accounts"""
+    result = {
+        "id": account.pop("id"),
+        "name": f"{account['account_type']} - {client_name}",
+        "type": account.pop("account_type"),
+        "number": account.pop("account_number"),
+    }
+    result.update((to_camel_case(key), value) for key, value in account.items())
+    result["recentTransactions"] = []
+    result["riskFactors"] = []
+    return result
+
+def mock_client_accounts(client):
+    """Generate accounts based on portfolio value (clients with no stored accounts)"""
     portfolio_value = client['portfolio_value']
     client_name = client['name']
     
@@ -165,16 +385,8 @@ def get_client_accounts(client_id: str):
     
     return accounts
 
-@app.get("/api/clients/{client_id}/transactions")
-def get_client_transactions(
-    client_id: str,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    transaction_type: Optional[str] = None,
-    page: int = 1,
-    per_page: int = 50
-):
-    """Generate mock transactions for a client"""
+def mock_client_transactions():
+    """Generate 300 mock transactions over the last 90 days (clients with no stored transactions)"""
     
     # Transaction types and descriptions
     transaction_types = {
@@ -244,42 +456,116 @@ def get_client_transactions(
     
     # Sort by date descending
     transactions.sort(key=lambda x: x["date"], reverse=True)
+    return transactions
+
+def transaction_to_api(row):
+    """Shape a stored transaction record like the transaction list view expects"""
+    account = row.account_id
+    if row.account_type and row.account_number:
+        account = f"{row.account_type} - ****{row.account_number[-4:]}"
+    return TransactionItem(
+        id=row.id,
+        date=row.transaction_date[:10],
+        type=row.transaction_type,
+        description=row.description,
+        account=account,
+        accountId=row.account_id,
+        amount=row.amount,
+        status=row.status,
+        riskFlag=row.risk_flag
+    )
+
+def _day_start(value: str, param: str) -> int:
+    try:
+        return int(datetime.strptime(value[:10], "%Y-%m-%d").timestamp())
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{param} must be YYYY-MM-DD")
+
+@app.get("/api/clients/{client_id}/transactions")
+def get_client_transactions(
+    client_id: str,
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    account_id: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=500)
+):
+    """Filter and page a client's transactions (recent window served from the columnar cache)
+
+    Without start_date the range is the cached hot window (hot_window.WINDOW_DAYS);
+    windowStart and hasOlder tell the caller whether older history is there to
+    ask for with start_date.
+    """
+    start = _day_start(start_date, "start_date") if start_date else None
+    end = _day_start(end_date, "end_date") + 86400 if end_date else None  # end_date is inclusive
+    
+    window = hot_windows.get(client_id)
+    if start is not None and not window.covers(start):
+        # Older than the hot window: build a one-off window for this range instead of caching it
+        window = hot_windows.build(client_id, start)
+    
+    if not len(window) and not window.has_older:
+        # No stored transactions at all
+        transactions = mock_client_transactions()
+        if start_date:
+            transactions = [t for t in transactions if t["date"] >= start_date]
+        if end_date:
+            transactions = [t for t in transactions if t["date"] <= end_date]
+        if transaction_type:
+            transactions = [t for t in transactions if t["type"].lower() == transaction_type.lower()]
+        total = len(transactions)
+        page_rows = transactions[(page - 1) * per_page:page * per_page]
+    else:
+        positions = window.select(start, end, transaction_type, account_id)
+        total = len(positions)
+        page_positions = positions[(page - 1) * per_page:page * per_page]
+        page_rows = [transaction_to_api(row) for row in load_rows(window.rowids[page_positions])]
     
-    # Apply filters if provided
-    if start_date:
-        transactions = [t for t in transactions if t["date"] >= start_date]
-    if end_date:
-        transactions = [t for t in transactions if t["date"] <= end_date]
-    if transaction_type:
-        transactions = [t for t in transactions if t["type"].lower() == transaction_type.lower()]
-    
-    # Pagination
-    total = len(transactions)
-    start = (page - 1) * per_page
-    end = start + per_page
-    
-    return {
-        "transactions": transactions[start:end],
+    return compressed_json_response(request, {
+        "transactions": page_rows,
         "total": total,
         "page": page,
         "perPage": per_page,
-        "totalPages": (total + per_page - 1) // per_page
-    }
+        "totalPages": (total + per_page - 1) // per_page,
+        "windowStart": datetime.fromtimestamp(window.window_start).strftime("%Y-%m-%d"),
+        "hasOlder": window.has_older
+    })
 
 @app.get("/api/relationship-managers/{rm_id}")
-def get_relationship_manager(rm_id: str):
+def get_relationship_manager(rm_id: str, request: Request):
     """Get relationship manager details"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM relationship_managers WHERE id = ?", (rm_id,))
-    rm = dict_from_row(cursor.fetchone())
-    conn.close()
-    
-    if not rm:
-        raise HTTPException(status_code=404, detail="Relationship Manager not found")
-    
-    return rm
+    access_counter.record("rms", rm_id)
+    return response_cache.respond(request, lambda: load_relationship_manager(rm_id))
+
+@app.get("/api/relationship-managers/{rm_id}/relationships")
+def get_rm_relationships(
+    rm_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """Get one page of an RM's relationships, ordered by name"""
+    return response_cache.respond(request, lambda: load_rm_relationships(rm_id, limit, cursor))
+
+@app.get("/api/relationships/{relationship_id}/clients")
+def get_relationship_clients(
+    relationship_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    """Get one page of a relationship's clients, ordered by name
+
+    Returns summary fields unless ?fields= / ?exclude= choose others.
+    """
+    columns = relationship_client_columns(fields, exclude)
+    return response_cache.respond(
+        request, lambda: load_relationship_clients(relationship_id, columns, limit, cursor)
+    )
 
 @app.get("/api/breadcrumb/{metro_id}/{market_id}/{region_id}/{rm_id}/{relationship_id}")
 def get_breadcrumb_data(
@@ -287,43 +573,43 @@ def get_breadcrumb_data(
     market_id: str, 
     region_id: str,
     rm_id: str,
-    relationship_id: str
+    relationship_id: str,
+    request: Request
 ):
     """Get breadcrumb navigation data"""
+    return response_cache.respond(
+        request,
+        lambda: load_breadcrumb(metro_id, market_id, region_id, rm_id, relationship_id)
+    )
+
+def warm_client(client_id: str):
+    """Cache a hot client's detail and breadcrumb responses and build its transaction window"""
+    response_cache.prefill(f"/api/clients/{client_id}", lambda: load_client(client_id))
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get metro
-    cursor.execute("SELECT name FROM metros WHERE id = ?", (metro_id,))
-    metro = dict_from_row(cursor.fetchone())
-    
-    # Get market
-    cursor.execute("SELECT name FROM markets WHERE id = ?", (market_id,))
-    market = dict_from_row(cursor.fetchone())
-    
-    # Get region
-    cursor.execute("SELECT name FROM regions WHERE id = ?", (region_id,))
-    region = dict_from_row(cursor.fetchone())
-    
-    # Get RM
-    cursor.execute("SELECT name FROM relationship_managers WHERE id = ?", (rm_id,))
-    rm = dict_from_row(cursor.fetchone())
-    
-    # Get relationship
-    cursor.execute("SELECT name FROM relationships WHERE id = ?", (relationship_id,))
-    relationship = dict_from_row(cursor.fetchone())
-    
-    conn.close()
-    
-    breadcrumb = {
-        "metro": metro["name"] if metro else "Metro",
-        "market": market["name"] if market else "Market",
-        "region": region["name"] if region else "Region",
-        "rm": rm["name"] if rm else "RM",
-        "relationship": relationship["name"] if relationship else "Relationship"
-    }
-    
-    return breadcrumb
+    try:
+        path = conn.execute("""
+            SELECT mk.metro_id, g.market_id, rm.region_id, r.rm_id, r.id
+            FROM clients c
+            JOIN relationships r ON r.id = c.relationship_id
+            JOIN relationship_managers rm ON rm.id = r.rm_id
+            JOIN regions g ON g.id = rm.region_id
+            JOIN markets mk ON mk.id = g.market_id
+            WHERE c.id = ?
+        """, (client_id,)).fetchone()
+    finally:
+        conn.close()
+    if path:
+        response_cache.prefill(f"/api/breadcrumb/{'/'.join(path)}", lambda: load_breadcrumb(*path))
+    hot_windows.get(client_id)
+
+def warm_relationship_manager(rm_id: str):
+    """Cache a hot RM's detail and first relationships page"""
+    response_cache.prefill(f"/api/relationship-managers/{rm_id}", lambda: load_relationship_manager(rm_id))
+    response_cache.prefill(f"/api/relationship-managers/{rm_id}/relationships",
+                           lambda: load_rm_relationships(rm_id))
+
+warmup.add_step("clientBundles", "clients", warm_client)
+warmup.add_step("rmPages", "rms", warm_relationship_manager)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,289 @@
+"""
+Rolling cash totals per client and conductor, and candidate UTR events.
+
+utr_events and the UTR / High Cash entries of the clients' risk_flags are
+entered by hand. This folds ingested cash transactions (the definition of
+database/anomaly_detector.py: a cash transaction type or a cash channel)
+into one bucket per client, conductor and day, and each bucket also carries
+the prefix sums of its key up to and including that day:
+
+    cash_days(client_id, conductor, day, amount, txn_count, under_amount,
+              cum_amount, cum_count, cum_under)
+
+The total of any window (day - W, day] is cum(day) - cum(day - W): two
+primary-key seeks, whatever the window length. conductor '' is the client's
+total. Transactions carry no conductor of their own, so a transaction is
+also credited to a conductor when its counterparty matches (normalized like
+ownership_graph) one of the names in the client's conductors list.
+
+under_amount only sums transactions below REPORTING_THRESHOLD: a single
+reportable transaction is reported anyway, structuring is the aggregation of
+smaller ones. When a 1/3/10/30-day window of those reaches the threshold and
+the same window ending the day before had not, sync() writes a 'Candidate'
+utr_event for the smallest window crossing on that day. Event ids are
+derived from client, conductor and day, so folding the same days again
+never duplicates an event; a back-dated transaction that moves a crossing to
+an earlier day adds that day's event and leaves the later one for review.
+
+Transactions are insert-only, so sync() follows their rowid like
+counterparty_graph: buckets of the touched days are added to, and prefix
+sums are rewritten only from the earliest touched day of each key onwards
+(normally just the last bucket). rebuild() (python cash_windows.py) starts
+over; events already written are kept.
+"""
+
+import hashlib
+import json
+import sqlite3
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import pipeline
+from ownership_graph import normalize_name
+
+PIPELINE_NAME = "cash_windows"
+
+ROWS_PER_STEP = 50_000
+
+WINDOWS = (1, 3, 10, 30)  # Days, smallest first
+
+REPORTING_THRESHOLD = 10000.00
+
+# Same cash definition as database/anomaly_detector.py
+CASH_TRANSACTION_TYPES = ("Deposit", "Cash Deposit", "Withdrawal", "Cash Withdrawal")
+CASH_CHANNELS = ("Branch", "ATM", "Cash")
+
+CLIENT_TOTAL = ""  # conductor key of the client-wide buckets
+
+CANDIDATE_STATUS = "Candidate"
+
+
+def _connect(db_path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.create_function("normalize_name", 1, lru_cache(maxsize=65536)(normalize_name), deterministic=True)
+    return conn
+
+
+def _in_list(values) -> str:
+    return ", ".join(f"'{value}'" for value in values)
+
+
+def _apply_range(conn: sqlite3.Connection, after: int, up_to: int) -> int:
+    """Add cash transactions with after < rowid <= up_to onto the buckets; returns events written"""
+    conn.execute("DROP TABLE IF EXISTS temp.cash_batch")
+    conn.execute(f"""
+        CREATE TEMP TABLE cash_batch AS
+        SELECT a.client_id, normalize_name(COALESCE(t.counterparty, '')) AS norm_name,
+               date(t.transaction_date) AS day, ABS(t.amount) AS amount
+        FROM transactions t JOIN accounts a ON a.id = t.account_id
+        WHERE t.rowid > ? AND t.rowid <= ? AND date(t.transaction_date) IS NOT NULL
+          AND (t.transaction_type IN ({_in_list(CASH_TRANSACTION_TYPES)})
+               OR t.channel IN ({_in_list(CASH_CHANNELS)}))
+    """, (after, up_to))
+    conn.execute("DROP TABLE IF EXISTS temp.cash_conductors")
+    conn.execute("""
+        CREATE TEMP TABLE cash_conductors AS
+        SELECT c.id AS client_id, normalize_name(json_extract(j.value, '$.name')) AS norm_name,
+               MIN(json_extract(j.value, '$.name')) AS display_name
+        FROM clients c, json_each(CASE WHEN json_valid(c.conductors) THEN c.conductors ELSE '[]' END) j
+        WHERE c.id IN (SELECT client_id FROM cash_batch) AND TRIM(COALESCE(json_extract(j.value, '$.name'), '')) != ''
+        GROUP BY 1, 2
+    """)
+    conn.execute("DROP TABLE IF EXISTS temp.cash_delta")
+    conn.execute("""
+        CREATE TEMP TABLE cash_delta AS
+        SELECT client_id, '' AS conductor, day, SUM(amount) AS amount, COUNT(*) AS txn_count,
+               TOTAL(CASE WHEN amount < :threshold THEN amount END) AS under_amount
+        FROM cash_batch GROUP BY client_id, day
+        UNION ALL
+        SELECT b.client_id, b.norm_name, b.day, SUM(b.amount), COUNT(*),
+               TOTAL(CASE WHEN b.amount < :threshold THEN b.amount END)
+        FROM cash_batch b JOIN cash_conductors k ON k.client_id = b.client_id AND k.norm_name = b.norm_name
+        GROUP BY b.client_id, b.norm_name, b.day
+    """, {"threshold": REPORTING_THRESHOLD})
+    conn.execute("""
+        INSERT INTO cash_days (client_id, conductor, day, amount, txn_count, under_amount)
+        SELECT client_id, conductor, day, amount, txn_count, under_amount FROM cash_delta
+        WHERE true
+        ON CONFLICT(client_id, conductor, day) DO UPDATE SET
+            amount = cash_days.amount + excluded.amount,
+            txn_count = cash_days.txn_count + excluded.txn_count,
+            under_amount = cash_days.under_amount + excluded.under_amount
+    """)
+    conn.execute("DROP TABLE IF EXISTS temp.cash_keys")
+    conn.execute("""
+        CREATE TEMP TABLE cash_keys AS
+        SELECT client_id, conductor, MIN(day) AS first_day, MAX(day) AS last_day
+        FROM cash_delta GROUP BY client_id, conductor
+    """)
+
+    # Prefix sums from each key's earliest touched day on, continuing from the bucket before it
+    conn.execute("""
+        UPDATE cash_days SET cum_amount = s.cum_amount, cum_count = s.cum_count, cum_under = s.cum_under
+        FROM (
+            SELECT d.client_id, d.conductor, d.day,
+                   COALESCE(p.cum_amount, 0) + SUM(d.amount) OVER w AS cum_amount,
+                   COALESCE(p.cum_count, 0) + SUM(d.txn_count) OVER w AS cum_count,
+                   COALESCE(p.cum_under, 0) + SUM(d.under_amount) OVER w AS cum_under
+            FROM cash_keys k
+            JOIN cash_days d ON d.client_id = k.client_id AND d.conductor = k.conductor AND d.day >= k.first_day
+            LEFT JOIN cash_days p ON p.client_id = k.client_id AND p.conductor = k.conductor AND p.day = (
+                SELECT MAX(day) FROM cash_days b
+                WHERE b.client_id = k.client_id AND b.conductor = k.conductor AND b.day < k.first_day
+            )
+            WINDOW w AS (PARTITION BY d.client_id, d.conductor ORDER BY d.day)
+        ) AS s
+        WHERE cash_days.client_id = s.client_id AND cash_days.conductor = s.conductor AND cash_days.day = s.day
+    """)
+
+    events = _candidate_events(conn)
+    # rowcount, not total_changes: the change_log triggers on utr_events write rows too
+    written = conn.executemany("""
+        INSERT INTO utr_events (id, client_id, event_date, amount, description, officer_name, notes, status)
+        VALUES (?, ?, ?, ?, ?, NULL, ?, ?)
+        ON CONFLICT(id) DO NOTHING
+    """, events).rowcount if events else 0
+    for table in ("cash_batch", "cash_conductors", "cash_delta", "cash_keys"):
+        conn.execute(f"DROP TABLE temp.{table}")
+    return written
+
+
+def _candidate_events(conn: sqlite3.Connection) -> List[tuple]:
+    """utr_events rows for the windows that reached the threshold on or after a touched day"""
+    span = WINDOWS[-1] + 1
+    # Per touched key: the buckets a crossing check can read, and the prefix sums just before them
+    buckets: Dict[tuple, List[tuple]] = {}
+    for client_id, conductor, day, cum_under in conn.execute(f"""
+        SELECT d.client_id, d.conductor, d.day, d.cum_under
+        FROM cash_keys k JOIN cash_days d ON d.client_id = k.client_id AND d.conductor = k.conductor
+             AND d.day >= date(k.first_day, '-{span} days') AND d.day <= date(k.last_day, '+{span - 2} days')
+        ORDER BY d.client_id, d.conductor, d.day
+    """):
+        buckets.setdefault((client_id, conductor), []).append((date.fromisoformat(day).toordinal(), cum_under))
+    keys = conn.execute(f"""
+        SELECT k.client_id, k.conductor, k.first_day, COALESCE((
+            SELECT b.cum_under FROM cash_days b
+            WHERE b.client_id = k.client_id AND b.conductor = k.conductor AND b.day < date(k.first_day, '-{span} days')
+            ORDER BY b.day DESC LIMIT 1
+        ), 0), COALESCE(c.display_name, k.conductor)
+        FROM cash_keys k LEFT JOIN cash_conductors c ON c.client_id = k.client_id AND c.norm_name = k.conductor
+    """).fetchall()
+
+    events = []
+    for client_id, conductor, first_day, base, display_name in keys:
+        rows = buckets.get((client_id, conductor), [])
+        days = [day for day, _ in rows]
+
+        def cum_at(day: int) -> float:
+            i = bisect_right(days, day)
+            return rows[i - 1][1] if i else base
+
+        first = date.fromisoformat(first_day).toordinal()
+        for end, _ in rows:
+            if end < first:
+                continue
+            for window in WINDOWS:
+                total = round(cum_at(end) - cum_at(end - window), 2)
+                previous = round(cum_at(end - 1) - cum_at(end - 1 - window), 2)
+                if total >= REPORTING_THRESHOLD > previous:
+                    events.append(_event(client_id, conductor, display_name, end, window, total))
+                    break
+    return events
+
+
+def _event(client_id: str, conductor: str, display_name: str, end: int, window: int, total: float) -> tuple:
+    day = date.fromordinal(end).isoformat()
+    start = date.fromordinal(end - window + 1).isoformat()
+    event_id = "utr_cw_" + hashlib.sha1(f"{client_id}|{conductor}|{day}".encode()).hexdigest()[:16]
+    who = f" by {display_name}" if conductor != CLIENT_TOTAL else ""
+    description = (f"Cash under ${REPORTING_THRESHOLD:,.0f} per transaction aggregating to ${total:,.2f}{who} "
+                   f"within {window} day{'s' if window > 1 else ''}")
+    notes = f"Candidate from rolling cash windows ({start} to {day}); review before filing"
+    return (event_id, client_id, day, total, description, notes, CANDIDATE_STATUS)
+
+
+def _apply(conn: sqlite3.Connection, last_rowid: int, max_rowid: int) -> int:
+    written = 0
+    for after in range(last_rowid, max_rowid, ROWS_PER_STEP):
+        written += _apply_range(conn, after, min(after + ROWS_PER_STEP, max_rowid))
+    return written
+
+
+def _rebuild(conn: sqlite3.Connection, max_rowid: int) -> int:
+    conn.execute("DELETE FROM cash_days")
+    return _apply(conn, 0, max_rowid)
+
+
+def sync(db_path) -> int:
+    """Fold cash transactions ingested since the last sync into the buckets; returns events written"""
+    return pipeline.sync(db_path, PIPELINE_NAME, pipeline.TRANSACTIONS, _apply, connect=_connect)
+
+
+def rebuild(db_path) -> int:
+    """Drop the buckets and fold in every transaction again; returns events written"""
+    return pipeline.rebuild(db_path, PIPELINE_NAME, pipeline.TRANSACTIONS, _rebuild, connect=_connect)
+
+
+def _cum_at(conn: sqlite3.Connection, client_id: str, conductor: str, day: str) -> tuple:
+    row = conn.execute("""
+        SELECT cum_amount, cum_count, cum_under FROM cash_days
+        WHERE client_id = ? AND conductor = ? AND day <= ?
+        ORDER BY day DESC LIMIT 1
+    """, (client_id, conductor, day)).fetchone()
+    return tuple(row) if row else (0.0, 0, 0.0)
+
+
+def window_totals(conn: sqlite3.Connection, client_id: str, conductor: str, as_of: str) -> List[Dict[str, Any]]:
+    """Cash totals of every window ending on as_of (inclusive), from prefix sums"""
+    end = _cum_at(conn, client_id, conductor, as_of)
+    as_of_date = date.fromisoformat(as_of)
+    totals = []
+    for window in WINDOWS:
+        start = _cum_at(conn, client_id, conductor, (as_of_date - timedelta(days=window)).isoformat())
+        under = round(end[2] - start[2], 2)
+        totals.append({
+            "days": window,
+            "amount": round(end[0] - start[0], 2),
+            "transactions": end[1] - start[1],
+            "underThresholdAmount": under,
+            "thresholdRatio": round(under / REPORTING_THRESHOLD, 4),
+        })
+    return totals
+
+
+def client_windows(conn: sqlite3.Connection, client_id: str, as_of: Optional[str] = None) -> Dict[str, Any]:
+    """Window totals of a client and each of its conductors; as_of defaults to the last cash day"""
+    if as_of is None:
+        as_of = conn.execute(
+            "SELECT MAX(day) FROM cash_days WHERE client_id = ? AND conductor = ?", (client_id, CLIENT_TOTAL)
+        ).fetchone()[0] or date.today().isoformat()
+    row = conn.execute("SELECT conductors FROM clients WHERE id = ?", (client_id,)).fetchone()
+    names = {}
+    try:
+        for conductor in json.loads(row[0] or "[]") if row else []:
+            if conductor.get("name"):
+                names.setdefault(normalize_name(conductor["name"]), conductor["name"])
+    except (TypeError, ValueError, AttributeError):
+        pass
+    conductors = [key for (key,) in conn.execute(
+        "SELECT DISTINCT conductor FROM cash_days WHERE client_id = ? AND conductor != ?", (client_id, CLIENT_TOTAL)
+    )]
+    return {
+        "clientId": client_id,
+        "asOf": as_of,
+        "reportingThreshold": REPORTING_THRESHOLD,
+        "windows": window_totals(conn, client_id, CLIENT_TOTAL, as_of),
+        "conductors": [
+            {"name": names.get(key, key), "windows": window_totals(conn, client_id, key, as_of)}
+            for key in sorted(conductors, key=lambda key: names.get(key, key))
+        ],
+    }
+
+
+if __name__ == "__main__":
+    from db import DB_PATH
+
+    written = rebuild(DB_PATH)
+    print(f"Rebuilt cash windows, {written} candidate UTR events written")
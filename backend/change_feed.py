@@ -0,0 +1,194 @@
+"""
+Client change feed for the Client 360 API.
+
+Triggers append every write to clients, accounts, risk_flags, utr_events
+and kri_metrics to change_log. A single ChangeNotifier per process watches
+that log and fans the account, risk flag, UTR and KRI entries out to the
+subscribers of each client, so an idle
+subscriber costs one queue and no database work. The watcher itself only
+reads change_log after PRAGMA data_version reports a commit from another
+connection.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from models import to_camel_case
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.5          # Seconds between data_version checks
+HEARTBEAT_INTERVAL = 15      # Seconds of silence before a keep-alive comment
+SUBSCRIBER_QUEUE_SIZE = 256  # Pending events per subscriber before it is told to resync
+FETCH_LIMIT = 1000           # change_log rows read per poll
+
+WATCHED_TABLES = ("accounts", "risk_flags", "utr_events", "kri_metrics")
+
+
+def load_events(conn: sqlite3.Connection, changes: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+    """Attach the current row to each change_log entry (None once deleted)"""
+    changes = [change for change in changes if change["table_name"] in WATCHED_TABLES]
+    rows_by_table: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for table in {change["table_name"] for change in changes}:
+        ids = list({change["row_id"] for change in changes if change["table_name"] == table})
+        placeholders = ", ".join("?" for _ in ids)
+        cursor = conn.execute(f"SELECT * FROM {table} WHERE id IN ({placeholders})", ids)
+        rows_by_table[table] = {
+            row["id"]: {to_camel_case(k): row[k] for k in row.keys()} for row in cursor.fetchall()
+        }
+
+    return [{
+        "seq": change["seq"],
+        "clientId": change["client_id"],
+        "table": change["table_name"],
+        "op": change["op"],
+        "id": change["row_id"],
+        "data": rows_by_table.get(change["table_name"], {}).get(change["row_id"]),
+        "changedAt": change["changed_at"]
+    } for change in changes]
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Render an event in text/event-stream framing"""
+    if event.get("type") == "resync":
+        return "event: resync\ndata: {}\n\n"
+    return f"id: {event['seq']}\nevent: change\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+class LogVersion:
+    """The newest change_log seq right now, as a data version for caches
+
+    ChangeNotifier.last_seq trails commits by up to POLL_INTERVAL; this reads
+    the end of the log (one rightmost-page seek) on a connection per thread,
+    so a request made after a write never sees the version from before it.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+
+    def __call__(self) -> int:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+
+class ChangeNotifier:
+    """Shared change_log watcher fanning events out to per-client queues"""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version = None
+        self._last_seq = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    @property
+    def last_seq(self) -> int:
+        """Newest change_log entry seen so far; doubles as the process's data version"""
+        return self._last_seq
+
+    async def start(self):
+        """Open the watcher connection and start polling from the current end of the log"""
+        if self._task is not None:
+            return
+        self._conn = self._connect()
+        self._last_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def subscribe(self, client_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(client_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, client_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(client_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[client_id]
+
+    async def replay(self, client_id: str, after_seq: int) -> List[Dict[str, Any]]:
+        """Events for one client after after_seq, for reconnects sending Last-Event-ID
+
+        Only rows the pipelines have not pruned yet can be replayed.
+        """
+        def read():
+            conn = self._connect()
+            try:
+                changes = conn.execute(
+                    "SELECT * FROM change_log WHERE client_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (client_id, after_seq, FETCH_LIMIT)
+                ).fetchall()
+                return load_events(conn, changes) if changes else []
+            finally:
+                conn.close()
+        return await asyncio.to_thread(read)
+
+    async def _run(self):
+        while True:
+            try:
+                events = await asyncio.to_thread(self._poll)
+            except sqlite3.Error:
+                logger.exception("Change feed poll failed")
+                events = []
+            for event in events:
+                self._publish(event)
+            await asyncio.sleep(0 if self._data_version is None else POLL_INTERVAL)
+
+    def _poll(self) -> List[Dict[str, Any]]:
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return []
+        self._data_version = version
+
+        changes = self._conn.execute(
+            "SELECT * FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+            (self._last_seq, FETCH_LIMIT)
+        ).fetchall()
+        if not changes:
+            return []
+        self._last_seq = changes[-1]["seq"]
+        if len(changes) == FETCH_LIMIT:
+            self._data_version = None  # More rows waiting; read again without sleeping
+
+        # Row payloads are only loaded for clients someone is listening to
+        wanted = [change for change in changes if change["client_id"] in self._subscribers]
+        return load_events(self._conn, wanted) if wanted else []
+
+    def _publish(self, event: Dict[str, Any]):
+        for queue in list(self._subscribers.get(event["clientId"], ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A stalled reader gets one resync marker instead of an unbounded backlog
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
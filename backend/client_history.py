@@ -0,0 +1,152 @@
+"""
+Append-only history of clients, accounts and risk flags.
+
+Triggers on the three tables append one client_history row per write:
+the full row on INSERT, only the columns whose value changed on UPDATE
+(no row at all when nothing changed) and no columns on DELETE. A row that
+moves to another client is logged as a DELETE for the old client and an
+INSERT for the new one, so every client's history replays on its own.
+
+sync() writes a checkpoint - the client's full state as JSON - once a
+client has CHECKPOINT_EVERY new entries, so storage grows with the number
+of writes and state_as_of() never replays more than the entries after the
+latest checkpoint before as_of. Timestamps are UTC.
+"""
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import pipeline
+
+PIPELINE_NAME = "client_history"
+
+# Tracked tables and the column holding the owning client's id
+HISTORY_TABLES = {"clients": "id", "accounts": "client_id", "risk_flags": "client_id"}
+
+CHECKPOINT_EVERY = 64
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def create_triggers(conn: sqlite3.Connection):
+    """Create the history triggers for every tracked table (run by init_database.py)"""
+    for table, client_column in HISTORY_TABLES.items():
+        columns = _columns(conn, table)
+        new_row = "json_object(" + ", ".join(f"'{c}', NEW.{c}" for c in columns) + ")"
+        old_row = "json_object(" + ", ".join(f"'{c}', OLD.{c}" for c in columns) + ")"
+        moved = f"(OLD.{client_column} IS NOT NEW.{client_column} OR OLD.id IS NOT NEW.id)"
+        insert = "INSERT INTO client_history (client_id, table_name, row_id, op, delta)"
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_history
+            AFTER INSERT ON {table}
+            BEGIN
+                {insert} VALUES (NEW.{client_column}, '{table}', NEW.id, 'INSERT', {new_row});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_update_history
+            AFTER UPDATE ON {table}
+            BEGIN
+                {insert} SELECT OLD.{client_column}, '{table}', OLD.id, 'DELETE', NULL WHERE {moved};
+                {insert} SELECT NEW.{client_column}, '{table}', NEW.id, 'INSERT', {new_row} WHERE {moved};
+                {insert} SELECT NEW.{client_column}, '{table}', NEW.id, 'UPDATE', delta FROM (
+                    SELECT json_group_object(n.key, n.value) AS delta
+                    FROM json_each({new_row}) n JOIN json_each({old_row}) o ON o.key = n.key
+                    WHERE n.value IS NOT o.value
+                ) WHERE NOT {moved} AND delta != '{{}}';
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_history
+            AFTER DELETE ON {table}
+            BEGIN
+                {insert} VALUES (OLD.{client_column}, '{table}', OLD.id, 'DELETE', NULL);
+            END
+        """)
+
+
+def parse_as_of(value: str) -> str:
+    """A date (end of that day) or ISO datetime as a client_history timestamp; raises ValueError"""
+    value = value.strip()
+    if len(value) == 10:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d 23:59:59.999")
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S.") + f"{parsed.microsecond // 1000:03d}"
+
+
+def _empty_state() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    return {table: {} for table in HISTORY_TABLES}
+
+
+def _apply(state: Dict[str, Dict[str, Dict[str, Any]]], table: str, row_id: str, op: str, delta: Optional[str]):
+    rows = state[table]
+    if op == "DELETE":
+        rows.pop(row_id, None)
+    elif op == "INSERT":
+        rows[row_id] = json.loads(delta)
+    else:
+        rows.setdefault(row_id, {"id": row_id}).update(json.loads(delta))
+
+
+def state_as_of(conn: sqlite3.Connection, client_id: str, as_of: Optional[str] = None,
+                up_to_seq: Optional[int] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """{table: {row id: row}} for one client as of a timestamp (or history seq)"""
+    if as_of is not None:
+        bound, value = "changed_at", as_of
+    else:
+        bound, value = "seq", up_to_seq if up_to_seq is not None else 2 ** 63 - 1
+    checkpoint = conn.execute(f"""
+        SELECT seq, state FROM client_history_checkpoints
+        WHERE client_id = ? AND {bound} <= ? ORDER BY seq DESC LIMIT 1
+    """, (client_id, value)).fetchone()
+    state, after = (json.loads(checkpoint[1]), checkpoint[0]) if checkpoint else (_empty_state(), 0)
+    for table, row_id, op, delta in conn.execute(f"""
+        SELECT table_name, row_id, op, delta FROM client_history
+        WHERE client_id = ? AND seq > ? AND {bound} <= ? ORDER BY seq
+    """, (client_id, after, value)):
+        _apply(state, table, row_id, op, delta)
+    return state
+
+
+def changes_after(conn: sqlite3.Connection, client_id: str, as_of: str, limit: int) -> List[Dict[str, Any]]:
+    """History entries of one client after as_of, oldest first"""
+    return [{
+        "seq": seq,
+        "table": table,
+        "rowId": row_id,
+        "op": op,
+        "fields": json.loads(delta) if delta else None,
+        "changedAt": changed_at
+    } for seq, table, row_id, op, delta, changed_at in conn.execute("""
+        SELECT seq, table_name, row_id, op, delta, changed_at FROM client_history
+        WHERE client_id = ? AND changed_at > ? ORDER BY seq LIMIT ?
+    """, (client_id, as_of, limit))]
+
+
+def _write_checkpoints(conn: sqlite3.Connection, last_seq: int, max_seq: int) -> int:
+    due = conn.execute("""
+        SELECT h.client_id, MAX(h.seq), MAX(h.changed_at) FROM client_history h
+        WHERE h.client_id IN (SELECT DISTINCT client_id FROM client_history WHERE seq > ? AND seq <= ?)
+          AND h.seq <= ?
+          AND h.seq > COALESCE((SELECT MAX(seq) FROM client_history_checkpoints c
+                                WHERE c.client_id = h.client_id), 0)
+        GROUP BY h.client_id
+        HAVING COUNT(*) >= ?
+    """, (last_seq, max_seq, max_seq, CHECKPOINT_EVERY)).fetchall()
+    for client_id, seq, changed_at in due:
+        state = state_as_of(conn, client_id, up_to_seq=seq)
+        conn.execute(
+            "INSERT INTO client_history_checkpoints (client_id, seq, changed_at, state) VALUES (?, ?, ?, ?)",
+            (client_id, seq, changed_at, json.dumps(state, separators=(",", ":")))
+        )
+    return len(due)
+
+
+def sync(db_path) -> int:
+    """Checkpoint clients with CHECKPOINT_EVERY entries since their last checkpoint; returns checkpoints written"""
+    return pipeline.sync(db_path, PIPELINE_NAME, pipeline.CLIENT_HISTORY, _write_checkpoints)
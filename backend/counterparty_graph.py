@@ -0,0 +1,287 @@
+"""
+Counterparty flow graph for the Client 360 API.
+
+Transactions are folded into a counterparty dimension (one row per
+normalized counterparty name, same normalization as ownership_graph) and
+client -> counterparty edges per direction: money in (positive amounts) and
+money out (negative amounts), each with total amount, transaction count and
+first/last seen. Counterparties carry the totals of their edges, including
+how many of our clients they deal with, so fan-in hubs are an index read.
+
+Transactions are insert-only, so sync() follows their rowid: each run
+aggregates only the rows ingested since the last one and adds them onto the
+edges. Graph queries never touch transactions. Moving an account to another
+client or deleting transactions is not picked up; run rebuild()
+(python counterparty_graph.py) after those.
+"""
+
+import sqlite3
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import pipeline
+from ownership_graph import normalize_name
+
+PIPELINE_NAME = "counterparty_graph"
+
+DIRECTIONS = ("in", "out")
+
+ROWS_PER_STEP = 50_000
+
+# Counterparties dealing with more clients than this (payroll processors,
+# tax authorities, "Branch Deposit") link everyone and are left out of
+# shared-counterparty results
+MAX_SHARED_CLIENT_COUNT = 500
+
+
+def _connect(db_path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    # Counterparty names repeat heavily; normalize each distinct spelling once per sync
+    conn.create_function("normalize_name", 1, lru_cache(maxsize=65536)(normalize_name), deterministic=True)
+    return conn
+
+
+def _apply_range(conn: sqlite3.Connection, after: int, up_to: int) -> int:
+    """Add transactions with after < rowid <= up_to onto the graph; returns edges written"""
+    conn.execute("DROP TABLE IF EXISTS temp.counterparty_batch")
+    conn.execute("""
+        CREATE TEMP TABLE counterparty_batch AS
+        SELECT a.client_id, normalize_name(t.counterparty) AS norm_name, MIN(t.counterparty) AS display_name,
+               CASE WHEN t.amount < 0 THEN 'out' ELSE 'in' END AS direction,
+               SUM(ABS(t.amount)) AS amount, COUNT(*) AS txn_count,
+               MIN(t.transaction_date) AS first_seen, MAX(t.transaction_date) AS last_seen
+        FROM transactions t JOIN accounts a ON a.id = t.account_id
+        WHERE t.rowid > ? AND t.rowid <= ? AND TRIM(COALESCE(t.counterparty, '')) != ''
+        GROUP BY 1, 2, 4
+    """, (after, up_to))
+    conn.execute("""
+        INSERT INTO counterparties (norm_name, display_name)
+        SELECT norm_name, MIN(display_name) FROM counterparty_batch GROUP BY norm_name
+        ON CONFLICT(norm_name) DO NOTHING
+    """)
+
+    # Counterparty totals move by the batch's sums; a client counts once per counterparty,
+    # so only pairs without an edge yet (in either direction) add to client_count
+    conn.execute("""
+        UPDATE counterparties SET
+            client_count = counterparties.client_count + d.new_clients,
+            amount_in = counterparties.amount_in + d.amount_in,
+            amount_out = counterparties.amount_out + d.amount_out,
+            txn_count = counterparties.txn_count + d.txn_count,
+            first_seen = MIN(COALESCE(counterparties.first_seen, d.first_seen), d.first_seen),
+            last_seen = MAX(COALESCE(counterparties.last_seen, d.last_seen), d.last_seen)
+        FROM (
+            SELECT b.norm_name,
+                   COUNT(DISTINCT CASE WHEN NOT EXISTS (
+                       SELECT 1 FROM counterparty_edges e WHERE e.client_id = b.client_id AND e.counterparty_id = cp.id
+                   ) THEN b.client_id END) AS new_clients,
+                   TOTAL(CASE WHEN b.direction = 'in' THEN b.amount END) AS amount_in,
+                   TOTAL(CASE WHEN b.direction = 'out' THEN b.amount END) AS amount_out,
+                   SUM(b.txn_count) AS txn_count, MIN(b.first_seen) AS first_seen, MAX(b.last_seen) AS last_seen
+            FROM counterparty_batch b JOIN counterparties cp ON cp.norm_name = b.norm_name
+            GROUP BY b.norm_name
+        ) AS d
+        WHERE counterparties.norm_name = d.norm_name
+    """)
+    before = conn.total_changes
+    conn.execute("""
+        INSERT INTO counterparty_edges (client_id, counterparty_id, direction, amount, txn_count, first_seen, last_seen)
+        SELECT b.client_id, cp.id, b.direction, b.amount, b.txn_count, b.first_seen, b.last_seen
+        FROM counterparty_batch b JOIN counterparties cp ON cp.norm_name = b.norm_name
+        WHERE true
+        ON CONFLICT(client_id, counterparty_id, direction) DO UPDATE SET
+            amount = counterparty_edges.amount + excluded.amount,
+            txn_count = counterparty_edges.txn_count + excluded.txn_count,
+            first_seen = MIN(counterparty_edges.first_seen, excluded.first_seen),
+            last_seen = MAX(counterparty_edges.last_seen, excluded.last_seen)
+    """)
+    written = conn.total_changes - before
+    conn.execute("DROP TABLE temp.counterparty_batch")
+    return written
+
+
+def _apply(conn: sqlite3.Connection, last_rowid: int, max_rowid: int) -> int:
+    written = 0
+    for after in range(last_rowid, max_rowid, ROWS_PER_STEP):
+        written += _apply_range(conn, after, min(after + ROWS_PER_STEP, max_rowid))
+    return written
+
+
+def _rebuild(conn: sqlite3.Connection, max_rowid: int) -> int:
+    conn.execute("DELETE FROM counterparty_edges")
+    conn.execute("DELETE FROM counterparties")
+    _apply(conn, 0, max_rowid)
+    return conn.execute("SELECT COUNT(*) FROM counterparties").fetchone()[0]
+
+
+def sync(db_path) -> int:
+    """Fold transactions ingested since the last sync into the graph; returns edges written"""
+    return pipeline.sync(db_path, PIPELINE_NAME, pipeline.TRANSACTIONS, _apply, connect=_connect)
+
+
+def rebuild(db_path) -> int:
+    """Drop the graph and fold in every transaction again; returns counterparties"""
+    return pipeline.rebuild(db_path, PIPELINE_NAME, pipeline.TRANSACTIONS, _rebuild, connect=_connect)
+
+
+def _edge(row) -> Dict[str, Any]:
+    return {
+        "counterpartyId": row[0],
+        "name": row[1],
+        "clientId": row[2],
+        "direction": row[3],
+        "amount": round(row[4], 2),
+        "transactionCount": row[5],
+        "firstSeen": row[6],
+        "lastSeen": row[7]
+    }
+
+
+def client_flows(conn: sqlite3.Connection, client_id: str, k: int, direction: Optional[str] = None) -> Dict[str, Any]:
+    """Fan-in/fan-out of a client and its top-k counterparties by amount (one direction or both)"""
+    fan = dict(conn.execute(
+        "SELECT direction, COUNT(*) FROM counterparty_edges WHERE client_id = ? GROUP BY direction", (client_id,)
+    ).fetchall())
+    # parties links a counterparty to one of our own clients with the same normalized name
+    if direction is not None:
+        rows = conn.execute("""
+            SELECT cp.id, cp.display_name, p.client_id, e.direction, e.amount, e.txn_count, e.first_seen, e.last_seen
+            FROM counterparty_edges e
+            JOIN counterparties cp ON cp.id = e.counterparty_id
+            LEFT JOIN parties p ON p.norm_name = cp.norm_name
+            WHERE e.client_id = ? AND e.direction = ?
+            ORDER BY e.amount DESC, cp.id
+            LIMIT ?
+        """, (client_id, direction, k)).fetchall()
+    else:
+        rows = conn.execute("""
+            SELECT cp.id, cp.display_name, p.client_id, 'both', SUM(e.amount), SUM(e.txn_count),
+                   MIN(e.first_seen), MAX(e.last_seen)
+            FROM counterparty_edges e
+            JOIN counterparties cp ON cp.id = e.counterparty_id
+            LEFT JOIN parties p ON p.norm_name = cp.norm_name
+            WHERE e.client_id = ?
+            GROUP BY cp.id
+            ORDER BY SUM(e.amount) DESC, cp.id
+            LIMIT ?
+        """, (client_id, k)).fetchall()
+    return {
+        "clientId": client_id,
+        "fanIn": fan.get("in", 0),
+        "fanOut": fan.get("out", 0),
+        "counterparties": [_edge(row) for row in rows]
+    }
+
+
+def shared_counterparties(conn: sqlite3.Connection, client_id: str, limit: int) -> List[Dict[str, Any]]:
+    """Other clients dealing with this client's counterparties, most counterparties in common first"""
+    # Both sides are folded to one row per (client, counterparty) before the join, so a pair
+    # with edges in both directions is not multiplied by the other side's directions
+    rows = conn.execute("""
+        WITH mine AS (
+            SELECT counterparty_id, GROUP_CONCAT(direction) AS directions
+            FROM counterparty_edges
+            WHERE client_id = ?
+            GROUP BY counterparty_id
+        ), other AS (
+            SELECT e.client_id, e.counterparty_id, GROUP_CONCAT(e.direction) AS directions, SUM(e.amount) AS amount
+            FROM counterparty_edges e JOIN mine ON mine.counterparty_id = e.counterparty_id
+            WHERE e.client_id != ?
+            GROUP BY e.client_id, e.counterparty_id
+        )
+        SELECT other.client_id, c.name, cp.id, cp.display_name, mine.directions, other.directions, other.amount
+        FROM mine
+        JOIN counterparties cp ON cp.id = mine.counterparty_id
+        JOIN other ON other.counterparty_id = mine.counterparty_id
+        JOIN clients c ON c.id = other.client_id
+        WHERE cp.client_count <= ?
+    """, (client_id, client_id, MAX_SHARED_CLIENT_COUNT)).fetchall()
+
+    clients: Dict[str, Dict[str, Any]] = {}
+    for other_id, other_name, counterparty_id, name, my_directions, other_directions, amount in rows:
+        entry = clients.setdefault(other_id, {"clientId": other_id, "clientName": other_name, "amount": 0.0,
+                                              "counterparties": []})
+        entry["counterparties"].append({
+            "counterpartyId": counterparty_id,
+            "name": name,
+            "directions": sorted(my_directions.split(",")),
+            "otherDirections": sorted(other_directions.split(","))
+        })
+        entry["amount"] += amount
+
+    ranked = sorted(clients.values(), key=lambda e: (-len(e["counterparties"]), -e["amount"], e["clientId"]))
+    result = []
+    for entry in ranked[:limit]:
+        counterparties = sorted(entry["counterparties"], key=lambda shared: shared["counterpartyId"])
+        result.append({
+            "clientId": entry["clientId"],
+            "clientName": entry["clientName"],
+            "sharedCount": len(counterparties),
+            "amount": round(entry["amount"], 2),
+            "counterparties": counterparties
+        })
+    return result
+
+
+def _counterparty(row) -> Dict[str, Any]:
+    return {
+        "counterpartyId": row[0],
+        "name": row[1],
+        "clientId": row[2],
+        "clientCount": row[3],
+        "amountIn": round(row[4], 2),
+        "amountOut": round(row[5], 2),
+        "transactionCount": row[6],
+        "firstSeen": row[7],
+        "lastSeen": row[8]
+    }
+
+
+_COUNTERPARTY_SQL = """
+    SELECT cp.id, cp.display_name, p.client_id, cp.client_count, cp.amount_in, cp.amount_out, cp.txn_count,
+           cp.first_seen, cp.last_seen
+    FROM counterparties cp
+    LEFT JOIN parties p ON p.norm_name = cp.norm_name
+"""
+
+
+def fan_in_hubs(conn: sqlite3.Connection, min_clients: int, limit: int) -> List[Dict[str, Any]]:
+    """Counterparties dealing with the most of our clients"""
+    rows = conn.execute(_COUNTERPARTY_SQL + """
+        WHERE cp.client_count >= ?
+        ORDER BY cp.client_count DESC, cp.id
+        LIMIT ?
+    """, (min_clients, limit)).fetchall()
+    return [_counterparty(row) for row in rows]
+
+
+def counterparty_detail(conn: sqlite3.Connection, counterparty_id: int, limit: int) -> Optional[Dict[str, Any]]:
+    """A counterparty's totals and its largest client flows"""
+    row = conn.execute(_COUNTERPARTY_SQL + " WHERE cp.id = ?", (counterparty_id,)).fetchone()
+    if row is None:
+        return None
+    flows = conn.execute("""
+        SELECT e.client_id, c.name, e.direction, e.amount, e.txn_count, e.first_seen, e.last_seen
+        FROM counterparty_edges e JOIN clients c ON c.id = e.client_id
+        WHERE e.counterparty_id = ?
+        ORDER BY e.amount DESC, e.client_id
+        LIMIT ?
+    """, (counterparty_id, limit)).fetchall()
+    return {
+        **_counterparty(row),
+        "clients": [{
+            "clientId": f[0],
+            "clientName": f[1],
+            "direction": f[2],
+            "amount": round(f[3], 2),
+            "transactionCount": f[4],
+            "firstSeen": f[5],
+            "lastSeen": f[6]
+        } for f in flows]
+    }
+
+
+if __name__ == "__main__":
+    from db import DB_PATH
+
+    print(f"Rebuilt counterparty graph: {rebuild(DB_PATH)} counterparties")
@@ -0,0 +1,70 @@
+"""
+Database connections for the Client 360 API.
+
+Route handlers call get_db_connection() and close what they get back. Inside
+snapshot_connection() every such call returns the same connection, already
+inside one read transaction, and close() leaves it open until the block ends.
+During a profiled request connections come from profiling.ProfiledConnection.
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from profiling import ProfiledConnection, current_profile
+
+# Database path
+DB_PATH = Path(os.environ.get("DATABASE_PATH") or Path(__file__).parent / "database.db")
+
+_shared_connection: ContextVar = ContextVar("shared_connection", default=None)
+
+
+class SharedConnection(sqlite3.Connection):
+    """Connection handed to several handlers in turn; only its owner closes it"""
+
+    def close(self):
+        pass
+
+    def really_close(self):
+        super().close()
+
+
+def get_db_connection():
+    """Create a database connection (or reuse the current snapshot connection)"""
+    shared = _shared_connection.get()
+    if shared is not None:
+        return shared
+    profile = current_profile()
+    if profile is not None:
+        profile.track_thread()
+        conn = sqlite3.connect(DB_PATH, factory=ProfiledConnection)
+    else:
+        conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def dict_from_row(row):
+    """Convert sqlite3.Row to dictionary"""
+    if row is None:
+        return None
+    return dict(zip(row.keys(), row))
+
+
+@contextmanager
+def snapshot_connection():
+    """Serve every get_db_connection() in this context from one read transaction"""
+    # Handlers run in worker threads, one at a time, so the connection crosses threads
+    conn = sqlite3.connect(DB_PATH, factory=SharedConnection, check_same_thread=False,
+                           isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("BEGIN")
+    token = _shared_connection.set(conn)
+    try:
+        yield conn
+    finally:
+        _shared_connection.reset(token)
+        conn.execute("ROLLBACK")
+        conn.really_close()
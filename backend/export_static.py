@@ -0,0 +1,230 @@
+"""
+Static snapshot export of the read-only API.
+
+Renders the responses of the read-mostly GET routes into dist/api, one
+directory per URL with an index.json plus precompressed variants
+(index.json.gz, and .br / .zst when brotli / zstandard are installed):
+
+    dist/api/clients/{id}/index.json
+    dist/api/relationship-managers/{id}/index.json
+    dist/api/relationship-managers/{id}/relationships/index.json   (first page)
+    dist/api/relationships/{id}/clients/index.json                  (first page)
+    dist/api/breadcrumb/{metro}/{market}/{region}/{rm}/{relationship}/index.json
+
+Bodies are byte-for-byte what the API returns for the URL without query
+parameters, so a web server can answer those from disk (e.g. nginx
+"gzip_static on; try_files $uri/index.json @api;") and pass everything
+else - later pages, ?fields=, accounts, transactions - to the API.
+
+Each entity's source rows are hashed in one pass over the database and
+compared with dist/api/manifest.json; only entities whose hash changed are
+rendered, in a process pool. Entities that no longer exist are removed.
+
+    python export_static.py [--out ../dist] [--workers N] [--full]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import loaders
+from db import DB_PATH
+
+# Bump when the rendered shape changes so the next export rewrites everything
+EXPORT_VERSION = 1
+
+DEFAULT_OUT_DIR = Path(__file__).parent.parent / "dist"
+MANIFEST_NAME = "manifest.json"
+TASKS_PER_CHUNK = 200
+
+FILE_EXTENSIONS = {"gzip": "gz", "br": "br", "zstd": "zst"}
+
+
+def _digest(*parts) -> str:
+    digest = hashlib.blake2b(repr((EXPORT_VERSION,) + parts).encode("utf-8"), digest_size=16)
+    return digest.hexdigest()
+
+
+def source_hashes(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Entity key -> hash of every row its exported files are rendered from"""
+    hashes: Dict[str, str] = {}
+
+    clients_by_relationship = defaultdict(list)
+    for row in conn.execute("SELECT * FROM clients ORDER BY relationship_id, name, id"):
+        hashes[f"client/{row['id']}"] = _digest(tuple(row))
+        clients_by_relationship[row["relationship_id"]].append(tuple(row))
+
+    relationships_by_rm = defaultdict(list)
+    for row in conn.execute("SELECT * FROM relationships ORDER BY rm_id, name, id"):
+        relationships_by_rm[row["rm_id"]].append(tuple(row))
+    for row in conn.execute("SELECT * FROM relationship_managers"):
+        hashes[f"rm/{row['id']}"] = _digest(tuple(row), relationships_by_rm.get(row["id"], []))
+
+    for row in conn.execute("""
+        SELECT r.id, r.name, rm.id, rm.name, g.id, g.name, mk.id, mk.name, m.id, m.name
+        FROM relationships r
+        JOIN relationship_managers rm ON rm.id = r.rm_id
+        JOIN regions g ON g.id = rm.region_id
+        JOIN markets mk ON mk.id = g.market_id
+        JOIN metros m ON m.id = mk.metro_id
+    """):
+        relationship_id = row[0]
+        hashes[f"relationship/{relationship_id}"] = _digest(clients_by_relationship.get(relationship_id, []))
+        path = "/".join((row[8], row[6], row[4], row[2], relationship_id))
+        hashes[f"breadcrumb/{path}"] = _digest(tuple(row))
+    return hashes
+
+
+def _entity_dirs(key: str) -> List[str]:
+    """URL paths (under api/) of the files one entity owns"""
+    kind, _, ident = key.partition("/")
+    if kind == "client":
+        return [f"clients/{ident}"]
+    if kind == "rm":
+        return [f"relationship-managers/{ident}", f"relationship-managers/{ident}/relationships"]
+    if kind == "relationship":
+        return [f"relationships/{ident}/clients"]
+    return [f"breadcrumb/{ident}"]
+
+
+def _render(key: str) -> List[Tuple[str, object]]:
+    """(URL path, payload) pairs for one entity, built by the API's own loaders"""
+    kind, _, ident = key.partition("/")
+    if kind == "client":
+        return [(f"clients/{ident}", loaders.load_client(ident))]
+    if kind == "rm":
+        return [
+            (f"relationship-managers/{ident}", loaders.load_relationship_manager(ident)),
+            (f"relationship-managers/{ident}/relationships", loaders.load_rm_relationships(ident)),
+        ]
+    if kind == "relationship":
+        # The columns the route selects when no ?fields= is given
+        columns = loaders.relationship_client_columns()
+        return [(f"relationships/{ident}/clients", loaders.load_relationship_clients(ident, columns))]
+    return [(f"breadcrumb/{ident}", loaders.load_breadcrumb(*ident.split("/")))]
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def export_entities(api_dir: str, keys: List[str]) -> Tuple[int, int]:
+    """Render and write a chunk of entities (runs in a worker process); returns (files, bytes)"""
+    from fastapi import HTTPException
+    from response_cache import COMPRESSORS, MIN_COMPRESS_SIZE, serialize
+
+    files = written = 0
+    for key in keys:
+        try:
+            rendered = _render(key)
+        except HTTPException:
+            continue  # Deleted between hashing and rendering; the next export drops it
+        for url_path, payload in rendered:
+            directory = Path(api_dir) / url_path
+            directory.mkdir(parents=True, exist_ok=True)
+            body = serialize(payload)
+            _write_atomic(directory / "index.json", body)
+            files += 1
+            written += len(body)
+            for encoding, compress in COMPRESSORS.items():
+                target = directory / f"index.json.{FILE_EXTENSIONS[encoding]}"
+                if len(body) < MIN_COMPRESS_SIZE:
+                    target.unlink(missing_ok=True)
+                    continue
+                data = compress(body, True)
+                _write_atomic(target, data)
+                files += 1
+                written += len(data)
+    return files, written
+
+
+def _remove_entity(api_dir: Path, key: str):
+    for url_path in _entity_dirs(key):
+        directory = api_dir / url_path
+        for path in directory.glob("index.json*"):
+            path.unlink()
+        # Drop directories left empty, up to api/
+        while directory != api_dir and directory.is_dir() and not any(directory.iterdir()):
+            directory.rmdir()
+            directory = directory.parent
+
+
+def load_manifest(api_dir: Path) -> Dict[str, str]:
+    try:
+        return json.loads((api_dir / MANIFEST_NAME).read_text())["entities"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def export(out_dir: Path = DEFAULT_OUT_DIR, workers: Optional[int] = None, full: bool = False):
+    """Bring out_dir/api up to date with the database; returns counts and timing"""
+    started = time.perf_counter()
+    api_dir = Path(out_dir) / "api"
+    if full and api_dir.exists():
+        shutil.rmtree(api_dir)
+    api_dir.mkdir(parents=True, exist_ok=True)
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        current = source_hashes(conn)
+    finally:
+        conn.close()
+
+    previous = {} if full else load_manifest(api_dir)
+    changed = sorted(key for key, digest in current.items() if previous.get(key) != digest)
+    removed = sorted(key for key in previous if key not in current)
+
+    for key in removed:
+        _remove_entity(api_dir, key)
+
+    files = written = 0
+    if changed:
+        chunks = [changed[i:i + TASKS_PER_CHUNK] for i in range(0, len(changed), TASKS_PER_CHUNK)]
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        if workers == 1:
+            results = [export_entities(str(api_dir), chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(export_entities, [str(api_dir)] * len(chunks), chunks))
+        files = sum(r[0] for r in results)
+        written = sum(r[1] for r in results)
+
+    # Written last: an interrupted export re-renders whatever it didn't record
+    _write_atomic(api_dir / MANIFEST_NAME, json.dumps({
+        "version": EXPORT_VERSION,
+        "exportedAt": datetime.now().isoformat(),
+        "entities": current
+    }, separators=(",", ":")).encode("utf-8"))
+
+    return {
+        "entities": len(current),
+        "changed": len(changed),
+        "removed": len(removed),
+        "files": files,
+        "bytes": written,
+        "seconds": time.perf_counter() - started
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the read-only API as static JSON files")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT_DIR, help="Output directory (default: ../dist)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and re-render everything")
+    args = parser.parse_args()
+
+    stats = export(args.out, args.workers, args.full)
+    print(f"Exported {stats['changed']} of {stats['entities']} entities ({stats['removed']} removed): "
+          f"{stats['files']} files, {stats['bytes'] / 1024:.0f} KiB in {stats['seconds']:.2f}s")
@@ -0,0 +1,216 @@
+"""
+Columnar hot window of recent transactions per client.
+
+The transaction list view filters the same recent window over and over
+(date range, type, account) and pages through the result. Each active
+client's window is kept as a handful of NumPy columns, newest first:
+timestamps as int64 seconds, amounts as float64, and type/account/status
+as small integer codes into per-window vocabularies. A filter is a binary
+search on the timestamps plus boolean masks over the codes; only the rows
+of the requested page are read back from SQLite.
+
+Windows are evicted least recently used once their total size passes the
+memory budget, and dropped when the ingest writer commits transactions for
+one of the client's accounts.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from db import get_db_connection
+from models import record_factory
+
+WINDOW_DAYS = 90
+MEMORY_BUDGET_BYTES = 64 * 1024 * 1024
+MAX_WINDOW_AGE_SECONDS = 3600  # Rebuild at least hourly so the window start keeps moving
+
+
+def _epoch(value: str) -> int:
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def _codes(values: List[str]):
+    """Categorical encoding: (vocabulary, int16 codes)"""
+    vocabulary = sorted(set(values))
+    index = {value: code for code, value in enumerate(vocabulary)}
+    return vocabulary, np.fromiter((index[v] for v in values), dtype=np.int16, count=len(values))
+
+
+class ClientWindow:
+    """One client's recent transactions as parallel arrays, newest first"""
+
+    __slots__ = ("client_id", "window_start", "has_older", "built_at", "rowids", "neg_timestamps", "amounts",
+                 "types", "type_codes", "accounts", "account_codes", "statuses", "status_codes", "nbytes")
+
+    def __init__(self, client_id: str, window_start: int, rows: List[tuple], has_older: bool = False):
+        self.client_id = client_id
+        self.window_start = window_start
+        self.has_older = has_older  # The client has transactions before window_start
+        self.built_at = time.monotonic()
+        rowids, timestamps, amounts, types, accounts, statuses = zip(*rows) if rows else ((),) * 6
+        self.rowids = np.array(rowids, dtype=np.int64)
+        # Negated so the newest-first order is ascending and searchsorted applies
+        self.neg_timestamps = -np.fromiter((_epoch(t) for t in timestamps), dtype=np.int64, count=len(rows))
+        self.amounts = np.array(amounts, dtype=np.float64)
+        self.types, self.type_codes = _codes(list(types))
+        self.accounts, self.account_codes = _codes(list(accounts))
+        self.statuses, self.status_codes = _codes([s or "" for s in statuses])
+        self.nbytes = sum(array.nbytes for array in (
+            self.rowids, self.neg_timestamps, self.amounts, self.type_codes, self.account_codes, self.status_codes
+        )) + sum(len(v) for v in self.types + self.accounts + self.statuses) + 512
+
+    def __len__(self):
+        return len(self.rowids)
+
+    def covers(self, start: Optional[int]) -> bool:
+        return start is not None and start >= self.window_start
+
+    def select(self, start: Optional[int] = None, end: Optional[int] = None,
+               transaction_type: Optional[str] = None, account_id: Optional[str] = None,
+               status: Optional[str] = None) -> np.ndarray:
+        """Positions (newest first) of rows with start <= timestamp < end matching every filter"""
+        lo = 0 if end is None else int(np.searchsorted(self.neg_timestamps, -end, side="right"))
+        hi = len(self) if start is None else int(np.searchsorted(self.neg_timestamps, -start, side="right"))
+        positions = np.arange(lo, hi)
+
+        mask = None
+        for vocabulary, codes, wanted in ((self.types, self.type_codes, transaction_type),
+                                          (self.accounts, self.account_codes, account_id),
+                                          (self.statuses, self.status_codes, status)):
+            if wanted is None:
+                continue
+            matching = [code for code, value in enumerate(vocabulary) if value.lower() == wanted.lower()]
+            if not matching:
+                return positions[:0]
+            selected = np.isin(codes[lo:hi], matching) if len(matching) > 1 else codes[lo:hi] == matching[0]
+            mask = selected if mask is None else mask & selected
+        return positions if mask is None else positions[mask]
+
+
+class HotWindowCache:
+    """LRU of ClientWindows bounded by their total array size"""
+
+    def __init__(self, window_days: int = WINDOW_DAYS, budget_bytes: int = MEMORY_BUDGET_BYTES):
+        self.window_days = window_days
+        self.budget_bytes = budget_bytes
+        self._windows: "OrderedDict[str, ClientWindow]" = OrderedDict()
+        self._bytes = 0
+        self._generation = 0  # Bumped by every invalidation
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def __len__(self):
+        return len(self._windows)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def window_start(self) -> int:
+        return int((datetime.now() - timedelta(days=self.window_days)).timestamp())
+
+    def get(self, client_id: str) -> ClientWindow:
+        with self._lock:
+            window = self._windows.get(client_id)
+            if window is not None and time.monotonic() - window.built_at < MAX_WINDOW_AGE_SECONDS:
+                self._windows.move_to_end(client_id)
+                self.stats["hits"] += 1
+                return window
+        self.stats["misses"] += 1
+        generation = self._generation
+        window = self.build(client_id)
+        with self._lock:
+            if generation != self._generation:
+                return window  # An ingest landed while building; serve it but don't cache it
+            stale = self._windows.pop(client_id, None)
+            if stale is not None:
+                self._bytes -= stale.nbytes
+            self._windows[client_id] = window
+            self._bytes += window.nbytes
+            while self._bytes > self.budget_bytes and len(self._windows) > 1:
+                _, evicted = self._windows.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.stats["evictions"] += 1
+        return window
+
+    def build(self, client_id: str, start: Optional[int] = None) -> ClientWindow:
+        """Read a client's transactions since start (default: the hot window) without caching them"""
+        if start is None:
+            start = self.window_start()
+        since = datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S")
+        conn = get_db_connection()
+        try:
+            rows = conn.execute("""
+                SELECT t.rowid, t.transaction_date, t.amount, t.transaction_type, t.account_id, t.status
+                FROM accounts a
+                JOIN transactions t ON t.account_id = a.id AND t.transaction_date >= ?
+                WHERE a.client_id = ?
+                ORDER BY t.transaction_date DESC, t.id DESC
+            """, (since, client_id)).fetchall()
+            has_older = conn.execute("""
+                SELECT 1 FROM accounts a JOIN transactions t ON t.account_id = a.id AND t.transaction_date < ?
+                WHERE a.client_id = ? LIMIT 1
+            """, (since, client_id)).fetchone() is not None
+        finally:
+            conn.close()
+        return ClientWindow(client_id, start, [tuple(row) for row in rows], has_older)
+
+    def invalidate(self, client_ids: Iterable[str]) -> int:
+        dropped = 0
+        with self._lock:
+            self._generation += 1
+            for client_id in client_ids:
+                window = self._windows.pop(client_id, None)
+                if window is not None:
+                    self._bytes -= window.nbytes
+                    dropped += 1
+        self.stats["invalidations"] += dropped
+        return dropped
+
+    def invalidate_accounts(self, account_ids: Iterable[str]) -> int:
+        """Drop the windows of the clients owning these accounts (called after ingest commits)"""
+        account_ids = set(account_ids)
+        with self._lock:
+            self._generation += 1
+            cached = list(self._windows)
+        if not account_ids or not cached:
+            return 0
+        conn = get_db_connection()
+        try:
+            client_ids = {row[1] for row in conn.execute(
+                f"SELECT id, client_id FROM accounts WHERE client_id IN ({', '.join('?' for _ in cached)})", cached
+            ) if row[0] in account_ids}
+        finally:
+            conn.close()
+        return self.invalidate(client_ids)
+
+
+def load_rows(rowids: np.ndarray) -> List[tuple]:
+    """Full rows (records) for one page of window positions, in the given order
+
+    risk_flag lists the transaction monitor rules the transaction hit (None until
+    the monitor has run over it, or when it hit none).
+    """
+    if not len(rowids):
+        return []
+    ids = rowids.tolist()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = record_factory
+        rows = cursor.execute(f"""
+            SELECT t.rowid AS rid, t.*, a.account_type, a.account_number,
+                   (SELECT GROUP_CONCAT(rt.transaction_type, ', ') FROM risk_transactions rt
+                    WHERE rt.transaction_id = t.id) AS risk_flag
+            FROM transactions t LEFT JOIN accounts a ON a.id = t.account_id
+            WHERE t.rowid IN ({', '.join('?' for _ in ids)})
+        """, ids).fetchall()
+    finally:
+        conn.close()
+    by_rowid = {row.rid: row for row in rows}
+    return [by_rowid[rowid] for rowid in ids if rowid in by_rowid]
@@ -0,0 +1,232 @@
+"""
+Single-writer transaction ingestion for the Client 360 API.
+
+Every ingest request becomes a batch on a bounded queue. One writer thread
+owns the only write connection: it takes whatever batches are waiting,
+writes them in one transaction and commits with synchronous=FULL, then
+resolves each batch's future. Acknowledgements therefore mean "on disk",
+concurrent writers never fight over the lock (no SQLITE_BUSY), and because
+the database runs in WAL mode readers keep reading their snapshot while the
+writer commits. A full queue is reported to the caller instead of buffered.
+"""
+
+import hashlib
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING_BATCHES = 64      # Queued requests before callers are told to back off
+MAX_ROWS_PER_COMMIT = 200_000  # Batches are coalesced into one commit up to this many rows
+ACCOUNT_CHUNK_SIZE = 500       # Account ids per IN (...) list when checking a batch
+
+TRANSACTION_COLUMNS = (
+    "id", "account_id", "transaction_date", "amount", "transaction_type", "description",
+    "counterparty", "channel", "location", "reference_number", "status"
+)
+
+_INSERT_TRANSACTION = (
+    f"INSERT OR IGNORE INTO transactions ({', '.join(TRANSACTION_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in TRANSACTION_COLUMNS)})"
+)
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the writer is too far behind to accept more work"""
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused with a different payload"""
+
+
+def payload_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class IngestBatch:
+    """Validated rows of one request plus the future its caller waits on"""
+
+    __slots__ = ("rows", "idempotency_key", "payload_hash", "future")
+
+    def __init__(self, rows: List[Tuple], idempotency_key: Optional[str], payload_hash: str):
+        self.rows = rows
+        self.idempotency_key = idempotency_key
+        self.payload_hash = payload_hash
+        self.future: Future = Future()
+
+
+class IngestWriter:
+    """Owns the write connection and a thread that drains the batch queue"""
+
+    def __init__(self, db_path, max_pending: int = MAX_PENDING_BATCHES,
+                 max_rows_per_commit: int = MAX_ROWS_PER_COMMIT):
+        self.db_path = str(db_path)
+        self.max_rows_per_commit = max_rows_per_commit
+        self._queue: "queue.Queue[Optional[IngestBatch]]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"batches": 0, "rows": 0, "commits": 0, "rejected": 0}
+        # Called on the writer thread with the account ids of each commit. before_ack runs ahead of
+        # the acknowledgements, so a caller reading its own write never sees a stale cache; keep it
+        # to cheap invalidations. on_commit runs after them but still holds up the next commit, so
+        # anything slow belongs on another thread.
+        self.before_ack: List[Callable[[Set[str]], Any]] = []
+        self.on_commit: List[Callable[[Set[str]], Any]] = []
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Finish the queued batches, then stop the writer thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def lookup(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """The stored ack of an already committed batch, if any (read-only; any thread)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT payload_hash, received, inserted, duplicates FROM ingest_batches WHERE idempotency_key = ?",
+                (idempotency_key,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {"payload_hash": row[0], "received": row[1], "inserted": row[2], "duplicates": row[3]}
+
+    def unknown_accounts(self, account_ids: Set[str]) -> Set[str]:
+        """The ids among account_ids with no row in accounts (read-only; any thread)"""
+        ids = sorted(account_ids)
+        known = set()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for start in range(0, len(ids), ACCOUNT_CHUNK_SIZE):
+                chunk = ids[start:start + ACCOUNT_CHUNK_SIZE]
+                known.update(row[0] for row in conn.execute(
+                    f"SELECT id FROM accounts WHERE id IN ({', '.join('?' for _ in chunk)})", chunk))
+        finally:
+            conn.close()
+        return set(ids) - known
+
+    def submit(self, rows: List[Tuple], idempotency_key: Optional[str], body_hash: str) -> Future:
+        """Queue a batch; the returned future resolves with its ack once committed"""
+        if self._thread is None:
+            raise RuntimeError("Ingest writer is not running")
+        batch = IngestBatch(rows, idempotency_key, body_hash)
+        try:
+            self._queue.put_nowait(batch)
+        except queue.Full:
+            self.stats["rejected"] += 1
+            raise QueueFull()
+        return batch.future
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # FULL makes each commit durable before its batches are acknowledged
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.execute("PRAGMA cache_size = -65536")  # 64 MiB keeps the transaction indexes hot between commits
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                first = self._queue.get()
+                if first is None:
+                    break
+                group, rows = [first], len(first.rows)
+                # Coalesce whatever else is already waiting into the same commit
+                while rows < self.max_rows_per_commit:
+                    try:
+                        batch = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if batch is None:
+                        stopping = True
+                        break
+                    group.append(batch)
+                    rows += len(batch.rows)
+                self._commit_group(conn, group)
+        finally:
+            conn.close()
+
+    def _commit_group(self, conn: sqlite3.Connection, group: List[IngestBatch]):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            results = [self._apply(conn, batch) for batch in group]
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if len(group) > 1:
+                # Retry one by one so a single bad batch doesn't fail its neighbours
+                for batch in group:
+                    self._commit_group(conn, [batch])
+                return
+            logger.exception("Ingest commit failed")
+            group[0].future.set_exception(sqlite3.DatabaseError("Ingest commit failed"))
+            return
+
+        self.stats["commits"] += 1
+        account_ids = {row[1] for batch in group for row in batch.rows}
+        self._notify(self.before_ack, account_ids)
+        for batch, result in zip(group, results):
+            if isinstance(result, Exception):
+                batch.future.set_exception(result)
+            else:
+                self.stats["batches"] += 1
+                self.stats["rows"] += result["inserted"]
+                batch.future.set_result(result)
+
+        self._notify(self.on_commit, account_ids)
+
+    @staticmethod
+    def _notify(listeners: List[Callable[[Set[str]], Any]], account_ids: Set[str]):
+        for listener in listeners:
+            try:
+                listener(account_ids)
+            except Exception:
+                logger.exception("Ingest commit listener failed")
+
+    def _apply(self, conn: sqlite3.Connection, batch: IngestBatch):
+        """Write one batch inside the open transaction; returns its ack or an exception"""
+        if batch.idempotency_key is not None:
+            row = conn.execute(
+                "SELECT payload_hash, received, inserted, duplicates FROM ingest_batches WHERE idempotency_key = ?",
+                (batch.idempotency_key,)
+            ).fetchone()
+            if row is not None:
+                if row[0] != batch.payload_hash:
+                    return IdempotencyConflict(batch.idempotency_key)
+                return {"idempotency_key": batch.idempotency_key, "received": row[1], "inserted": row[2],
+                        "duplicates": row[3], "replayed": True}
+
+        before = conn.total_changes
+        conn.executemany(_INSERT_TRANSACTION, batch.rows)
+        inserted = conn.total_changes - before
+        ack = {"idempotency_key": batch.idempotency_key, "received": len(batch.rows), "inserted": inserted,
+               "duplicates": len(batch.rows) - inserted, "replayed": False}
+        if batch.idempotency_key is not None:
+            conn.execute(
+                "INSERT INTO ingest_batches (idempotency_key, payload_hash, received, inserted, duplicates) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (batch.idempotency_key, batch.payload_hash, ack["received"], inserted, ack["duplicates"])
+            )
+        return ack
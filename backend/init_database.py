@@ -2,19 +2,26 @@ import sqlite3
 import json
 from pathlib import Path
 
+import client_history
+
 # Database path
 DB_PATH = Path(__file__).parent / "database.db"
 
-def init_database():
+def init_database(db_path=DB_PATH):
     """Initialize database with schema and seed data"""
+    db_path = Path(db_path)
     
-    # Remove existing database if it exists
-    if DB_PATH.exists():
-        DB_PATH.unlink()
+    # Remove existing database (and any WAL side files) if it exists
+    for path in (db_path, db_path.with_name(db_path.name + "-wal"), db_path.with_name(db_path.name + "-shm")):
+        if path.exists():
+            path.unlink()
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
+    # WAL lets the ingest writer commit while readers keep reading the last snapshot
+    cursor.execute("PRAGMA journal_mode = WAL")
+    
     # Create tables
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS metros (
@@ -95,6 +102,389 @@ def init_database():
         )
     """)
     
+    # Client risk and account tables (same shape as database/schema.sql)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS accounts (
+            id TEXT PRIMARY KEY,
+            client_id TEXT NOT NULL,
+            account_number TEXT NOT NULL,
+            account_type TEXT NOT NULL,
+            balance REAL DEFAULT 0,
+            available_balance REAL DEFAULT 0,
+            monthly_volume REAL DEFAULT 0,
+            monthly_inflows REAL DEFAULT 0,
+            monthly_outflows REAL DEFAULT 0,
+            inflow_count INTEGER DEFAULT 0,
+            outflow_count INTEGER DEFAULT 0,
+            last_transaction TEXT,
+            risk_level TEXT DEFAULT 'Low',
+            risk_score REAL DEFAULT 0,
+            status TEXT DEFAULT 'Active',
+            FOREIGN KEY (client_id) REFERENCES clients(id)
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS risk_flags (
+            id TEXT PRIMARY KEY,
+            client_id TEXT NOT NULL,
+            category TEXT NOT NULL,
+            subcategory TEXT,
+            severity TEXT NOT NULL,
+            status TEXT DEFAULT 'Active',
+            description TEXT,
+            flagged_date TEXT DEFAULT CURRENT_TIMESTAMP,
+            resolved_date TEXT,
+            created_by TEXT,
+            FOREIGN KEY (client_id) REFERENCES clients(id)
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS utr_events (
+            id TEXT PRIMARY KEY,
+            client_id TEXT NOT NULL,
+            event_date TEXT NOT NULL,
+            amount REAL,
+            description TEXT NOT NULL,
+            officer_name TEXT,
+            notes TEXT,
+            status TEXT DEFAULT 'Filed',
+            FOREIGN KEY (client_id) REFERENCES clients(id)
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kri_metrics (
+            id TEXT PRIMARY KEY,
+            client_id TEXT NOT NULL,
+            metric_name TEXT NOT NULL,
+            metric_value REAL NOT NULL,
+            metric_date TEXT NOT NULL,
+            threshold_value REAL,
+            status TEXT DEFAULT 'Normal',
+            FOREIGN KEY (client_id) REFERENCES clients(id)
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS opportunities (
+            id TEXT PRIMARY KEY,
+            client_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            description TEXT NOT NULL,
+            value REAL DEFAULT 0,
+            probability REAL DEFAULT 0,
+            priority TEXT DEFAULT 'Medium',
+            status TEXT DEFAULT 'Open',
+            target_date TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (client_id) REFERENCES clients(id)
+        )
+    """)
+    
+    # Ingested transactions (ingest.py) and the acks of idempotent ingest batches
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id TEXT PRIMARY KEY,
+            account_id TEXT NOT NULL,
+            transaction_date TEXT NOT NULL,
+            amount REAL NOT NULL,
+            transaction_type TEXT NOT NULL,
+            description TEXT,
+            counterparty TEXT,
+            channel TEXT,
+            location TEXT,
+            reference_number TEXT,
+            status TEXT DEFAULT 'Completed',
+            FOREIGN KEY (account_id) REFERENCES accounts(id)
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_account_id ON transactions(account_id, transaction_date, id)"
+    )
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_batches (
+            idempotency_key TEXT PRIMARY KEY,
+            payload_hash TEXT NOT NULL,
+            received INTEGER NOT NULL,
+            inserted INTEGER NOT NULL,
+            duplicates INTEGER NOT NULL,
+            committed_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Change log written by triggers; feeds the client event stream (change_feed.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            row_id TEXT NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    for table in ("accounts", "risk_flags", "utr_events", "kri_metrics", "opportunities"):
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_client_id ON {table}(client_id)")
+    
+    for table, client_column in (("clients", "id"), ("accounts", "client_id"), ("risk_flags", "client_id"),
+                                 ("utr_events", "client_id"), ("kri_metrics", "client_id"),
+                                 ("opportunities", "client_id")):
+        for op, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_log
+                AFTER {op} ON {table}
+                BEGIN
+                    INSERT INTO change_log (client_id, table_name, row_id, op)
+                    VALUES ({ref}.{client_column}, '{table}', {ref}.id, '{op}');
+                END
+            """)
+    # Reassignments up the hierarchy move whole books: log one row per client underneath
+    for table, column, clients_below in (
+        ("relationships", "rm_id", "FROM clients c WHERE c.relationship_id = NEW.id"),
+        ("relationship_managers", "region_id",
+         "FROM clients c JOIN relationships r ON r.id = c.relationship_id WHERE r.rm_id = NEW.id"),
+        ("regions", "market_id",
+         "FROM clients c JOIN relationships r ON r.id = c.relationship_id "
+         "JOIN relationship_managers rm ON rm.id = r.rm_id WHERE rm.region_id = NEW.id"),
+        ("markets", "metro_id",
+         "FROM clients c JOIN relationships r ON r.id = c.relationship_id "
+         "JOIN relationship_managers rm ON rm.id = r.rm_id "
+         "JOIN regions g ON g.id = rm.region_id WHERE g.market_id = NEW.id"),
+    ):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_reassign_log
+            AFTER UPDATE OF {column} ON {table}
+            WHEN NEW.{column} IS NOT OLD.{column}
+            BEGIN
+                INSERT INTO change_log (client_id, table_name, row_id, op)
+                SELECT c.id, '{table}', NEW.id, 'UPDATE' {clients_below};
+            END
+        """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_client_id ON change_log(client_id, seq)")
+    
+    # Append-only row history with periodic per-client checkpoints (client_history.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS client_history (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            row_id TEXT NOT NULL,
+            op TEXT NOT NULL,
+            delta TEXT,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_client_history_client_id ON client_history(client_id, seq)")
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS client_history_checkpoints (
+            client_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            changed_at TEXT NOT NULL,
+            state TEXT NOT NULL,
+            PRIMARY KEY (client_id, seq)
+        ) WITHOUT ROWID
+    """)
+    client_history.create_triggers(conn)
+    
+    # Consumers of change_log record how far they have applied it
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_offsets (
+            pipeline TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Normalized party/edge index over the clients' JSON party lists (ownership_graph.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parties (
+            id INTEGER PRIMARY KEY,
+            norm_name TEXT NOT NULL UNIQUE,
+            display_name TEXT NOT NULL,
+            client_id TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_parties_client_id ON parties(client_id)")
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS party_edges (
+            client_id TEXT NOT NULL,
+            party_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            relation TEXT,
+            ownership REAL,
+            PRIMARY KEY (client_id, party_id, role),
+            FOREIGN KEY (party_id) REFERENCES parties(id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_party_edges_party_id ON party_edges(party_id, role, client_id)")
+    
+    # Counterparty dimension and client -> counterparty flow edges folded from transactions (counterparty_graph.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS counterparties (
+            id INTEGER PRIMARY KEY,
+            norm_name TEXT NOT NULL UNIQUE,
+            display_name TEXT NOT NULL,
+            client_count INTEGER NOT NULL DEFAULT 0,
+            amount_in REAL NOT NULL DEFAULT 0,
+            amount_out REAL NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            first_seen TEXT,
+            last_seen TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_counterparties_client_count ON counterparties(client_count DESC, id)")
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS counterparty_edges (
+            client_id TEXT NOT NULL,
+            counterparty_id INTEGER NOT NULL,
+            direction TEXT NOT NULL CHECK (direction IN ('in', 'out')),
+            amount REAL NOT NULL,
+            txn_count INTEGER NOT NULL,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            PRIMARY KEY (client_id, counterparty_id, direction),
+            FOREIGN KEY (counterparty_id) REFERENCES counterparties(id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_counterparty_edges_top ON counterparty_edges(client_id, direction, amount DESC)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_counterparty_edges_counterparty "
+        "ON counterparty_edges(counterparty_id, amount DESC, client_id)"
+    )
+    
+    # Daily cash buckets with running prefix sums per client and conductor (cash_windows.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cash_days (
+            client_id TEXT NOT NULL,
+            conductor TEXT NOT NULL,
+            day TEXT NOT NULL,
+            amount REAL NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            under_amount REAL NOT NULL DEFAULT 0,
+            cum_amount REAL NOT NULL DEFAULT 0,
+            cum_count INTEGER NOT NULL DEFAULT 0,
+            cum_under REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (client_id, conductor, day)
+        ) WITHOUT ROWID
+    """)
+
+    # Transaction monitor hits, one per transaction and rule, and its per-account state (transaction_monitor.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS risk_transactions (
+            id TEXT PRIMARY KEY,
+            client_id TEXT NOT NULL,
+            transaction_id TEXT,
+            transaction_date TEXT NOT NULL,
+            amount REAL NOT NULL,
+            transaction_type TEXT NOT NULL,
+            description TEXT,
+            location TEXT,
+            merchant TEXT,
+            category TEXT,
+            bank TEXT,
+            terminal TEXT,
+            status TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (client_id) REFERENCES clients(id)
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_risk_transactions_client_id ON risk_transactions(client_id, transaction_type)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_risk_transactions_transaction_id ON risk_transactions(transaction_id)"
+    )
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS account_detector_state (
+            account_id TEXT PRIMARY KEY,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            ewma_mean REAL NOT NULL DEFAULT 0,
+            ewma_var REAL NOT NULL DEFAULT 0,
+            recent_times TEXT NOT NULL DEFAULT '[]',
+            near_threshold_times TEXT NOT NULL DEFAULT '[]'
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS account_seen_parties (
+            account_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            first_seen TEXT,
+            PRIMARY KEY (account_id, kind, value)
+        ) WITHOUT ROWID
+    """)
+
+    # Analytics cube (analytics_cube.py): per-client contributions and their roll-up at the finest grain
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cube_contributions (
+            client_id TEXT NOT NULL,
+            month TEXT NOT NULL,
+            metro TEXT NOT NULL,
+            industry TEXT NOT NULL,
+            risk_level TEXT NOT NULL,
+            clients INTEGER NOT NULL DEFAULT 0,
+            portfolio_value REAL NOT NULL DEFAULT 0,
+            annual_revenue REAL NOT NULL DEFAULT 0,
+            risk_flags INTEGER NOT NULL DEFAULT 0,
+            opportunities INTEGER NOT NULL DEFAULT 0,
+            opportunity_value REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (client_id, month)
+        ) WITHOUT ROWID
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_cube (
+            metro TEXT NOT NULL,
+            industry TEXT NOT NULL,
+            risk_level TEXT NOT NULL,
+            month TEXT NOT NULL,
+            clients INTEGER NOT NULL DEFAULT 0,
+            portfolio_value REAL NOT NULL DEFAULT 0,
+            annual_revenue REAL NOT NULL DEFAULT 0,
+            risk_flags INTEGER NOT NULL DEFAULT 0,
+            opportunities INTEGER NOT NULL DEFAULT 0,
+            opportunity_value REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (metro, industry, risk_level, month)
+        ) WITHOUT ROWID
+    """)
+    
+    # Review-due worklist (review_worklist.py), read top-N per hierarchy scope by priority
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS review_worklist (
+            client_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            rm_id TEXT,
+            region_id TEXT,
+            market_id TEXT,
+            metro_id TEXT,
+            next_review TEXT NOT NULL,
+            risk_score REAL NOT NULL DEFAULT 0,
+            critical_flags INTEGER NOT NULL DEFAULT 0,
+            open_utrs INTEGER NOT NULL DEFAULT 0,
+            priority_key REAL NOT NULL
+        )
+    """)
+    for column in ("rm_id", "region_id", "market_id", "metro_id"):
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_review_worklist_{column}
+            ON review_worklist({column}, priority_key DESC, client_id)
+        """)
+    
+    # List indexes end with the keyset sort keys used by the paginated endpoints
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_relationships_rm_id ON relationships(rm_id, name, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clients_relationship_id ON clients(relationship_id, name, id)")
+    
     # Insert seed data
     
     # Metros
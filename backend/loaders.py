@@ -0,0 +1,196 @@
+"""
+Loaders behind the read-mostly GET routes of the Client 360 API.
+
+Each load_* function builds the payload one URL returns, from its own
+connection. app.py serves them through the response cache and
+export_static.py renders them to files; importing this module opens nothing
+and starts nothing, so export workers can use it without building the app.
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException
+
+from db import dict_from_row, get_db_connection
+from models import record_factory, to_camel_case
+
+# Cursors and keyset predicates are shared with database/queries.py
+sys.path.append(str(Path(__file__).resolve().parent.parent / "database"))
+from keyset import decode_cursor, finish_page, keyset_query  # noqa: E402
+
+# Page size limits for list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Client columns in API order; the JSON columns are decoded only when selected
+CLIENT_COLUMNS = (
+    "id", "name", "industry", "location", "relationship_id", "portfolio_value",
+    "annual_revenue", "relationship_years", "product_penetration", "risk_score",
+    "last_review", "next_review", "last_contact", "beneficial_owners",
+    "authorized_signers", "conductors", "related_entities", "risk_flags",
+    "product_summary", "product_holdings", "rankings", "key_insights"
+)
+CLIENT_JSON_COLUMNS = frozenset((
+    "beneficial_owners", "authorized_signers", "conductors", "related_entities",
+    "risk_flags", "product_summary", "product_holdings", "rankings", "key_insights"
+))
+CLIENT_FIELD_COLUMNS = {to_camel_case(column): column for column in CLIENT_COLUMNS}
+CLIENT_SUMMARY_FIELDS = ("name,industry,location,relationshipId,portfolioValue,"
+                         "annualRevenue,riskScore,lastReview,nextReview")
+
+
+def resolve_client_columns(fields=None, exclude=None):
+    """Turn ?fields= / ?exclude= API field lists into client columns (id is always kept)"""
+    def parse(value):
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in CLIENT_FIELD_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown client fields: {', '.join(unknown)}")
+        return {CLIENT_FIELD_COLUMNS[name] for name in names}
+    
+    selected = parse(fields) | {"id"} if fields else set(CLIENT_COLUMNS)
+    if exclude:
+        selected -= parse(exclude) - {"id"}
+    return tuple(column for column in CLIENT_COLUMNS if column in selected)
+
+
+def client_to_api(client):
+    """Decode the JSON columns present in a client row and camelCase its keys"""
+    result = {}
+    for key, value in client.items():
+        if value and key in CLIENT_JSON_COLUMNS:
+            value = json.loads(value)
+        result[to_camel_case(key)] = value
+    return result
+
+
+def relationship_client_columns(fields=None, exclude=None):
+    """Client columns of a relationship's client list: summary fields by default, name always (a sort key)"""
+    if fields is None and exclude is None:
+        fields = CLIENT_SUMMARY_FIELDS
+    # The sort keys must be selected for the next cursor
+    columns = set(resolve_client_columns(fields, exclude)) | {"name"}
+    return [column for column in CLIENT_COLUMNS if column in columns]
+
+
+def fetch_page(cursor, sql, params, sort_keys, limit, page_cursor, convert=None):
+    """Run a keyset-paginated query ordered by sort_keys (last key unique).
+
+    Seeks past the last row of the previous page instead of using OFFSET, so
+    with an index on (parent id, *sort_keys) every page costs the same.
+    """
+    try:
+        after = decode_cursor(page_cursor, len(sort_keys)) if page_cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    sql, params = keyset_query(sql, params, sort_keys, False, limit, after)
+
+    if convert is None:
+        # Rows stay records; serialize() writes them with camelCase keys
+        cursor.row_factory = record_factory
+    cursor.execute(sql, params)
+    names = [column[0] for column in cursor.description]
+    rows, next_cursor = finish_page(cursor.fetchall(), limit,
+                                    lambda last: [last[names.index(key)] for key in sort_keys])
+    return {
+        "items": rows if convert is None else [convert(dict_from_row(row)) for row in rows],
+        "nextCursor": next_cursor
+    }
+
+
+def load_client(client_id: str, columns=CLIENT_COLUMNS):
+    """Load the requested client columns and decode only those JSON columns"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(f"SELECT {', '.join(columns)} FROM clients WHERE id = ?", (client_id,))
+    client = dict_from_row(cursor.fetchone())
+    conn.close()
+    
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    
+    return client_to_api(client)
+
+
+def load_relationship_manager(rm_id: str):
+    """Load a relationship manager row"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT * FROM relationship_managers WHERE id = ?", (rm_id,))
+    rm = dict_from_row(cursor.fetchone())
+    conn.close()
+    
+    if not rm:
+        raise HTTPException(status_code=404, detail="Relationship Manager not found")
+    
+    return rm
+
+
+def load_rm_relationships(rm_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None):
+    """Load one page of an RM's relationships"""
+    conn = get_db_connection()
+    try:
+        return fetch_page(
+            conn.cursor(),
+            "SELECT * FROM relationships WHERE rm_id = ?", (rm_id,),
+            ("name", "id"), limit, cursor
+        )
+    finally:
+        conn.close()
+
+
+def load_relationship_clients(relationship_id: str, columns, limit: int = DEFAULT_PAGE_SIZE,
+                              cursor: Optional[str] = None):
+    """Load one page of a relationship's clients with the given columns"""
+    conn = get_db_connection()
+    try:
+        return fetch_page(
+            conn.cursor(),
+            f"SELECT {', '.join(columns)} FROM clients WHERE relationship_id = ?",
+            (relationship_id,), ("name", "id"), limit, cursor, convert=client_to_api
+        )
+    finally:
+        conn.close()
+
+
+def load_breadcrumb(metro_id, market_id, region_id, rm_id, relationship_id):
+    """Resolve the names along a hierarchy path"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Get metro
+    cursor.execute("SELECT name FROM metros WHERE id = ?", (metro_id,))
+    metro = dict_from_row(cursor.fetchone())
+    
+    # Get market
+    cursor.execute("SELECT name FROM markets WHERE id = ?", (market_id,))
+    market = dict_from_row(cursor.fetchone())
+    
+    # Get region
+    cursor.execute("SELECT name FROM regions WHERE id = ?", (region_id,))
+    region = dict_from_row(cursor.fetchone())
+    
+    # Get RM
+    cursor.execute("SELECT name FROM relationship_managers WHERE id = ?", (rm_id,))
+    rm = dict_from_row(cursor.fetchone())
+    
+    # Get relationship
+    cursor.execute("SELECT name FROM relationships WHERE id = ?", (relationship_id,))
+    relationship = dict_from_row(cursor.fetchone())
+    
+    conn.close()
+    
+    breadcrumb = {
+        "metro": metro["name"] if metro else "Metro",
+        "market": market["name"] if market else "Market",
+        "region": region["name"] if region else "Region",
+        "rm": rm["name"] if rm else "RM",
+        "relationship": relationship["name"] if relationship else "Relationship"
+    }
+    
+    return breadcrumb
@@ -0,0 +1,4 @@
+"""Record classes for query rows (see records.py) and the generated table records"""
+
+from .records import dumps, is_record, record_class, record_factory, register, to_camel_case
+from .tables import *  # noqa: F401,F403 - registers every table record
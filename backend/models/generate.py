@@ -0,0 +1,83 @@
+"""
+Generate models/tables.py - one record class per table - from the schema.
+
+    python -m models.generate [--db database.db]
+
+Column types map to str / int / float, and columns that allow NULL become
+Optional. Rows selected with exactly a table's columns (SELECT * FROM t)
+come back as that table's class; see records.py.
+"""
+
+import argparse
+import sqlite3
+from pathlib import Path
+
+from db import DB_PATH
+
+OUTPUT_PATH = Path(__file__).parent / "tables.py"
+
+PYTHON_TYPES = {"TEXT": "str", "INTEGER": "int", "REAL": "float"}
+
+HEADER = '''"""
+Record classes for the API database tables.
+
+Generated from the schema by models/generate.py - do not edit by hand; run
+python -m models.generate after changing init_database.py.
+"""
+
+from typing import NamedTuple, Optional
+
+from .records import register
+'''
+
+
+def class_name(table: str) -> str:
+    """accounts -> Account, opportunities -> Opportunity, review_worklist -> ReviewWorklist"""
+    words = table.split("_")
+    last = words[-1]
+    if last.endswith("ies"):
+        last = last[:-3] + "y"
+    elif last.endswith(("ches", "shes", "sses", "xes")):
+        last = last[:-2]
+    elif last.endswith("s") and not last.endswith("ss"):
+        last = last[:-1]
+    return "".join(word.capitalize() for word in words[:-1] + [last])
+
+
+def python_type(declared: str) -> str:
+    return PYTHON_TYPES.get(declared.upper(), "float" if "REAL" in declared.upper() else "str")
+
+
+def render(conn: sqlite3.Connection) -> str:
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+    blocks = [HEADER]
+    for table in tables:
+        lines = [f"@register\nclass {class_name(table)}(NamedTuple):", f'    """A row of {table}"""', ""]
+        for _, column, declared, notnull, _, pk in conn.execute(f"PRAGMA table_info({table})"):
+            annotation = python_type(declared)
+            if not notnull and not pk:
+                annotation = f"Optional[{annotation}]"
+            lines.append(f"    {column}: {annotation}")
+        blocks.append("\n" + "\n".join(lines) + "\n")
+    blocks.append("\nTABLE_RECORDS = {\n" + "".join(
+        f'    "{table}": {class_name(table)},\n' for table in tables
+    ) + "}\n")
+    blocks.append("__all__ = [\n" + "".join(
+        f'    "{class_name(table)}",\n' for table in tables
+    ) + '    "TABLE_RECORDS",\n]\n')
+    return "\n".join(blocks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate record classes from the database schema")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="Database to read the schema from")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        OUTPUT_PATH.write_text(render(conn))
+    finally:
+        conn.close()
+    print(f"Wrote {OUTPUT_PATH}")
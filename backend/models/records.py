@@ -0,0 +1,130 @@
+"""
+Compact records for query rows and a JSON encoder that writes them directly.
+
+A row copied into a dict carries its own hash table of keys; a record is a
+NamedTuple - the values plus a pointer to a class shared by every row of
+that shape, with no per-row __dict__. Table records are generated from the
+schema (tables.py, see generate.py); any other result shape gets a record
+class built from its column names on first use.
+
+    cursor = conn.cursor()
+    cursor.row_factory = record_factory
+    accounts = cursor.execute("SELECT * FROM accounts WHERE client_id = ?", (client_id,)).fetchall()
+
+dumps() writes payloads holding records straight to JSON: each record class
+gets a generated encoder that joins its camelCase keys with the encoded
+values, so no dict is ever built per row. Records are found as dict values
+and as list elements (anywhere in the list), at any depth of dicts;
+everything else is handed to json.dumps whole. Records are tuples, so
+json.dumps and FastAPI's own encoder would write them as arrays: responses
+holding records must go through response_cache.serialize, which uses
+dumps().
+"""
+
+import json
+from collections import namedtuple
+from json.encoder import encode_basestring
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+_classes: Dict[Tuple[str, ...], type] = {}          # column names -> record class
+_encoders: Dict[type, Callable[[tuple], str]] = {}  # record class -> JSON encoder
+
+# (cursor.description, record constructor) of the last result shape seen by record_factory
+_last_shape: Tuple[Any, Any] = (None, None)
+
+
+def to_camel_case(key: str) -> str:
+    """snake_case column name -> camelCase API key (already camelCase names pass through)"""
+    return "".join(word.capitalize() if i > 0 else word for i, word in enumerate(key.split("_")))
+
+
+def _encode_float(value: float) -> str:
+    if value != value or value in (float("inf"), float("-inf")):
+        raise ValueError(f"Out of range float values are not JSON compliant: {value!r}")
+    return float.__repr__(value)
+
+
+# Scalar encoders; output matches json.dumps(ensure_ascii=False, allow_nan=False)
+_SCALARS: Dict[type, Callable[[Any], str]] = {
+    str: encode_basestring,
+    int: int.__repr__,
+    float: _encode_float,
+    bool: lambda value: "true" if value else "false",
+    type(None): lambda value: "null",
+}
+
+
+def _compile_encoder(columns: Sequence[str]) -> Callable[[tuple], str]:
+    """Generate the encoder of one record class: unpack, encode each value, fill a template"""
+    if not columns:
+        return lambda record: "{}"
+    template = "".join(
+        ("{" if i == 0 else ",") + encode_basestring(to_camel_case(column)).replace("%", "%%") + ":%s"
+        for i, column in enumerate(columns)
+    ) + "}"
+    names = [f"v{i}" for i in range(len(columns))]
+    # Strings are the common case, so they skip the type dispatch
+    values = [f"_str({v}) if type({v}) is str else _get(type({v}), dumps)({v})" for v in names]
+    source = (f"def encode(record):\n"
+              f"    {', '.join(names)}, = record\n"
+              f"    return _template % ({', '.join(values)},)\n")
+    namespace = {"_template": template, "_str": encode_basestring, "_get": _SCALARS.get, "dumps": dumps}
+    exec(source, namespace)
+    return namespace["encode"]
+
+
+def register(cls: type, columns: Optional[Sequence[str]] = None) -> type:
+    """Use a record class for rows with exactly these columns (default: its fields)"""
+    columns = tuple(columns or cls._fields)
+    _classes.setdefault(columns, cls)
+    _encoders[cls] = _compile_encoder(columns)
+    return cls
+
+
+def record_class(columns: Sequence[str]) -> type:
+    """The record class for a result with these column names, created on first use"""
+    columns = tuple(columns)
+    cls = _classes.get(columns)
+    if cls is None:
+        # rename=True: expressions and duplicate names become _0, _1 ... as attributes;
+        # the JSON keys keep the selected names
+        register(namedtuple("Record", columns, rename=True), columns)
+        cls = _classes[columns]
+    return cls
+
+
+def record_factory(cursor, row: tuple):
+    """sqlite3 row factory building records (set on a connection or a cursor)"""
+    global _last_shape
+    description, make = _last_shape
+    # The description is one object per executed statement, so this is an identity check per row
+    if cursor.description is not description:
+        description = cursor.description
+        make = record_class([column[0] for column in description])._make
+        _last_shape = (description, make)
+    return make(row)
+
+
+def is_record(value: Any) -> bool:
+    return type(value) in _encoders
+
+
+def _encode_key(key: Any) -> str:
+    # Non-string keys are converted the way json.dumps converts them
+    return encode_basestring(key if type(key) is str else json.dumps(key))
+
+
+def dumps(value: Any) -> str:
+    """JSON text for a payload that may hold records"""
+    kind = type(value)
+    scalar = _SCALARS.get(kind)
+    if scalar is not None:
+        return scalar(value)
+    encoder = _encoders.get(kind)
+    if encoder is not None:
+        return encoder(value)
+    if kind is dict:
+        return "{" + ",".join(_encode_key(k) + ":" + dumps(v) for k, v in value.items()) + "}"
+    if kind is list and any(type(item) in _encoders for item in value):
+        return "[" + ",".join(map(dumps, value)) + "]"
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
@@ -0,0 +1,415 @@
+"""
+Record classes for the API database tables.
+
+Generated from the schema by models/generate.py - do not edit by hand; run
+python -m models.generate after changing init_database.py.
+"""
+
+from typing import NamedTuple, Optional
+
+from .records import register
+
+
+@register
+class Account(NamedTuple):
+    """A row of accounts"""
+
+    id: str
+    client_id: str
+    account_number: str
+    account_type: str
+    balance: Optional[float]
+    available_balance: Optional[float]
+    monthly_volume: Optional[float]
+    monthly_inflows: Optional[float]
+    monthly_outflows: Optional[float]
+    inflow_count: Optional[int]
+    outflow_count: Optional[int]
+    last_transaction: Optional[str]
+    risk_level: Optional[str]
+    risk_score: Optional[float]
+    status: Optional[str]
+
+
+@register
+class AnalyticsCube(NamedTuple):
+    """A row of analytics_cube"""
+
+    metro: str
+    industry: str
+    risk_level: str
+    month: str
+    clients: int
+    portfolio_value: float
+    annual_revenue: float
+    risk_flags: int
+    opportunities: int
+    opportunity_value: float
+
+
+@register
+class CashDay(NamedTuple):
+    """A row of cash_days"""
+
+    client_id: str
+    conductor: str
+    day: str
+    amount: float
+    txn_count: int
+    under_amount: float
+    cum_amount: float
+    cum_count: int
+    cum_under: float
+
+
+@register
+class ChangeLog(NamedTuple):
+    """A row of change_log"""
+
+    seq: int
+    client_id: str
+    table_name: str
+    row_id: str
+    op: str
+    changed_at: Optional[str]
+
+
+@register
+class ClientHistory(NamedTuple):
+    """A row of client_history"""
+
+    seq: int
+    client_id: str
+    table_name: str
+    row_id: str
+    op: str
+    delta: Optional[str]
+    changed_at: str
+
+
+@register
+class ClientHistoryCheckpoint(NamedTuple):
+    """A row of client_history_checkpoints"""
+
+    client_id: str
+    seq: int
+    changed_at: str
+    state: str
+
+
+@register
+class Client(NamedTuple):
+    """A row of clients"""
+
+    id: str
+    name: str
+    industry: Optional[str]
+    location: Optional[str]
+    relationship_id: Optional[str]
+    portfolio_value: Optional[float]
+    annual_revenue: Optional[float]
+    relationship_years: Optional[int]
+    product_penetration: Optional[float]
+    risk_score: Optional[float]
+    last_review: Optional[str]
+    next_review: Optional[str]
+    beneficial_owners: Optional[str]
+    authorized_signers: Optional[str]
+    conductors: Optional[str]
+    related_entities: Optional[str]
+    risk_flags: Optional[str]
+    product_summary: Optional[str]
+    product_holdings: Optional[str]
+    rankings: Optional[str]
+    key_insights: Optional[str]
+    last_contact: Optional[str]
+
+
+@register
+class Counterparty(NamedTuple):
+    """A row of counterparties"""
+
+    id: int
+    norm_name: str
+    display_name: str
+    client_count: int
+    amount_in: float
+    amount_out: float
+    txn_count: int
+    first_seen: Optional[str]
+    last_seen: Optional[str]
+
+
+@register
+class CounterpartyEdge(NamedTuple):
+    """A row of counterparty_edges"""
+
+    client_id: str
+    counterparty_id: int
+    direction: str
+    amount: float
+    txn_count: int
+    first_seen: str
+    last_seen: str
+
+
+@register
+class CubeContribution(NamedTuple):
+    """A row of cube_contributions"""
+
+    client_id: str
+    month: str
+    metro: str
+    industry: str
+    risk_level: str
+    clients: int
+    portfolio_value: float
+    annual_revenue: float
+    risk_flags: int
+    opportunities: int
+    opportunity_value: float
+
+
+@register
+class IngestBatch(NamedTuple):
+    """A row of ingest_batches"""
+
+    idempotency_key: str
+    payload_hash: str
+    received: int
+    inserted: int
+    duplicates: int
+    committed_at: Optional[str]
+
+
+@register
+class KriMetric(NamedTuple):
+    """A row of kri_metrics"""
+
+    id: str
+    client_id: str
+    metric_name: str
+    metric_value: float
+    metric_date: str
+    threshold_value: Optional[float]
+    status: Optional[str]
+
+
+@register
+class Market(NamedTuple):
+    """A row of markets"""
+
+    id: str
+    metro_id: str
+    name: str
+
+
+@register
+class Metro(NamedTuple):
+    """A row of metros"""
+
+    id: str
+    name: str
+    region: str
+
+
+@register
+class Opportunity(NamedTuple):
+    """A row of opportunities"""
+
+    id: str
+    client_id: str
+    type: str
+    description: str
+    value: Optional[float]
+    probability: Optional[float]
+    priority: Optional[str]
+    status: Optional[str]
+    target_date: Optional[str]
+    created_at: Optional[str]
+
+
+@register
+class Party(NamedTuple):
+    """A row of parties"""
+
+    id: int
+    norm_name: str
+    display_name: str
+    client_id: Optional[str]
+
+
+@register
+class PartyEdge(NamedTuple):
+    """A row of party_edges"""
+
+    client_id: str
+    party_id: int
+    role: str
+    relation: Optional[str]
+    ownership: Optional[float]
+
+
+@register
+class PipelineOffset(NamedTuple):
+    """A row of pipeline_offsets"""
+
+    pipeline: str
+    last_seq: int
+    updated_at: Optional[str]
+
+
+@register
+class Region(NamedTuple):
+    """A row of regions"""
+
+    id: str
+    market_id: str
+    name: str
+
+
+@register
+class RelationshipManager(NamedTuple):
+    """A row of relationship_managers"""
+
+    id: str
+    name: str
+    region_id: str
+    portfolio_value: Optional[float]
+    client_count: Optional[int]
+    revenue: Optional[float]
+    risk_score: Optional[str]
+
+
+@register
+class Relationship(NamedTuple):
+    """A row of relationships"""
+
+    id: str
+    rm_id: str
+    name: str
+    industry: Optional[str]
+    portfolio_value: Optional[float]
+    risk_level: Optional[str]
+
+
+@register
+class ReviewWorklist(NamedTuple):
+    """A row of review_worklist"""
+
+    client_id: str
+    name: str
+    rm_id: Optional[str]
+    region_id: Optional[str]
+    market_id: Optional[str]
+    metro_id: Optional[str]
+    next_review: str
+    risk_score: float
+    critical_flags: int
+    open_utrs: int
+    priority_key: float
+
+
+@register
+class RiskFlag(NamedTuple):
+    """A row of risk_flags"""
+
+    id: str
+    client_id: str
+    category: str
+    subcategory: Optional[str]
+    severity: str
+    status: Optional[str]
+    description: Optional[str]
+    flagged_date: Optional[str]
+    resolved_date: Optional[str]
+    created_by: Optional[str]
+
+
+@register
+class Transaction(NamedTuple):
+    """A row of transactions"""
+
+    id: str
+    account_id: str
+    transaction_date: str
+    amount: float
+    transaction_type: str
+    description: Optional[str]
+    counterparty: Optional[str]
+    channel: Optional[str]
+    location: Optional[str]
+    reference_number: Optional[str]
+    status: Optional[str]
+
+
+@register
+class UtrEvent(NamedTuple):
+    """A row of utr_events"""
+
+    id: str
+    client_id: str
+    event_date: str
+    amount: Optional[float]
+    description: str
+    officer_name: Optional[str]
+    notes: Optional[str]
+    status: Optional[str]
+
+
+TABLE_RECORDS = {
+    "accounts": Account,
+    "analytics_cube": AnalyticsCube,
+    "cash_days": CashDay,
+    "change_log": ChangeLog,
+    "client_history": ClientHistory,
+    "client_history_checkpoints": ClientHistoryCheckpoint,
+    "clients": Client,
+    "counterparties": Counterparty,
+    "counterparty_edges": CounterpartyEdge,
+    "cube_contributions": CubeContribution,
+    "ingest_batches": IngestBatch,
+    "kri_metrics": KriMetric,
+    "markets": Market,
+    "metros": Metro,
+    "opportunities": Opportunity,
+    "parties": Party,
+    "party_edges": PartyEdge,
+    "pipeline_offsets": PipelineOffset,
+    "regions": Region,
+    "relationship_managers": RelationshipManager,
+    "relationships": Relationship,
+    "review_worklist": ReviewWorklist,
+    "risk_flags": RiskFlag,
+    "transactions": Transaction,
+    "utr_events": UtrEvent,
+}
+
+__all__ = [
+    "Account",
+    "AnalyticsCube",
+    "CashDay",
+    "ChangeLog",
+    "ClientHistory",
+    "ClientHistoryCheckpoint",
+    "Client",
+    "Counterparty",
+    "CounterpartyEdge",
+    "CubeContribution",
+    "IngestBatch",
+    "KriMetric",
+    "Market",
+    "Metro",
+    "Opportunity",
+    "Party",
+    "PartyEdge",
+    "PipelineOffset",
+    "Region",
+    "RelationshipManager",
+    "Relationship",
+    "ReviewWorklist",
+    "RiskFlag",
+    "Transaction",
+    "UtrEvent",
+    "TABLE_RECORDS",
+]
@@ -0,0 +1,301 @@
+"""
+Ownership and related-party graph for the Client 360 API.
+
+The owners, signers, conductors and related entities stored as JSON on each
+client are normalized into parties (one row per normalized name) and
+client-party edges. A party whose name matches one of our clients points at
+that client, which is what lets ownership chains cross client boundaries.
+
+The index follows change_log: sync() re-indexes only the clients written
+since it last ran, so it stays current without rescanning the book.
+"""
+
+import json
+import re
+import sqlite3
+import unicodedata
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import pipeline
+
+PIPELINE_NAME = "ownership_graph"
+
+# JSON column -> (edge role, key holding the relation text)
+PARTY_COLUMNS = {
+    "beneficial_owners": ("owner", "role"),
+    "authorized_signers": ("signer", "title"),
+    "conductors": ("conductor", "role"),
+    "related_entities": ("related", "relationship"),
+}
+
+# Related-entity relations meaning "this party owns the client" / "the client owns this party"
+PARENT_RELATIONS = {"parent company", "parent", "holding company"}
+SUBSIDIARY_RELATIONS = {"subsidiary", "wholly owned subsidiary"}
+
+# Legal-form words dropped during normalization ("Acme Corp." == "ACME Corporation")
+_LEGAL_SUFFIXES = {
+    "llc", "inc", "incorporated", "corp", "corporation", "co", "company",
+    "ltd", "limited", "lp", "llp", "plc", "the"
+}
+
+MAX_NETWORK_NODES = 500
+
+
+def normalize_name(name: str) -> str:
+    """Case, accent, punctuation, legal-suffix and word-order insensitive key"""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    tokens = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    kept = [token for token in tokens if token not in _LEGAL_SUFFIXES] or tokens
+    # Sorted so "Johnson, Robert" and "Robert Johnson" meet
+    return " ".join(sorted(kept))
+
+
+def parse_percentage(value) -> Optional[float]:
+    """'65%' / 65 / '65.0' -> 65.0"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except ValueError:
+        return None
+
+
+def _party_id(conn: sqlite3.Connection, name: str) -> int:
+    norm = normalize_name(name)
+    conn.execute(
+        "INSERT INTO parties (norm_name, display_name) VALUES (?, ?) ON CONFLICT(norm_name) DO NOTHING",
+        (norm, name)
+    )
+    return conn.execute("SELECT id FROM parties WHERE norm_name = ?", (norm,)).fetchone()[0]
+
+
+def index_client(conn: sqlite3.Connection, client_id: str):
+    """Rebuild the edges of one client and link its own name to a party"""
+    conn.execute("DELETE FROM party_edges WHERE client_id = ?", (client_id,))
+    conn.execute("UPDATE parties SET client_id = NULL WHERE client_id = ?", (client_id,))
+
+    row = conn.execute(
+        f"SELECT name, {', '.join(PARTY_COLUMNS)} FROM clients WHERE id = ?", (client_id,)
+    ).fetchone()
+    if row is None:
+        return  # Deleted client: its edges are gone
+
+    own_party = _party_id(conn, row[0])
+    conn.execute("UPDATE parties SET client_id = ? WHERE id = ?", (client_id, own_party))
+
+    edges = []
+    for index, (column, (role, relation_key)) in enumerate(PARTY_COLUMNS.items(), start=1):
+        for entry in json.loads(row[index] or "[]"):
+            if not entry.get("name"):
+                continue
+            edges.append((
+                client_id, _party_id(conn, entry["name"]), role,
+                entry.get(relation_key), parse_percentage(entry.get("ownership"))
+            ))
+    conn.executemany("""
+        INSERT INTO party_edges (client_id, party_id, role, relation, ownership)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(client_id, party_id, role) DO UPDATE SET
+            relation = excluded.relation,
+            ownership = COALESCE(party_edges.ownership, 0) + COALESCE(excluded.ownership, 0)
+    """, edges)
+
+
+def _apply(conn: sqlite3.Connection, last_seq: int, max_seq: int) -> int:
+    client_ids = [row[0] for row in conn.execute(
+        "SELECT DISTINCT client_id FROM change_log WHERE seq > ? AND seq <= ? AND table_name = 'clients'",
+        (last_seq, max_seq)
+    )]
+    for client_id in client_ids:
+        index_client(conn, client_id)
+    return len(client_ids)
+
+
+def _rebuild(conn: sqlite3.Connection, max_seq: int) -> int:
+    conn.execute("DELETE FROM party_edges")
+    conn.execute("DELETE FROM parties")
+    client_ids = [row[0] for row in conn.execute("SELECT id FROM clients")]
+    for client_id in client_ids:
+        index_client(conn, client_id)
+    return len(client_ids)
+
+
+def sync(db_path) -> int:
+    """Apply client changes logged since the last sync; returns clients re-indexed"""
+    return pipeline.sync(db_path, PIPELINE_NAME, pipeline.CHANGE_LOG, _apply)
+
+
+def rebuild(db_path) -> int:
+    """Re-index every client from scratch"""
+    return pipeline.rebuild(db_path, PIPELINE_NAME, pipeline.CHANGE_LOG, _rebuild)
+
+
+def find_party(conn: sqlite3.Connection, name: str) -> Optional[Dict[str, Any]]:
+    """A party by (normalized) name with every client it is attached to"""
+    party = conn.execute(
+        "SELECT id, display_name, client_id FROM parties WHERE norm_name = ?", (normalize_name(name),)
+    ).fetchone()
+    if party is None:
+        return None
+    edges = conn.execute("""
+        SELECT e.client_id, c.name, e.role, e.relation, e.ownership
+        FROM party_edges e JOIN clients c ON c.id = e.client_id
+        WHERE e.party_id = ?
+        ORDER BY c.name
+    """, (party[0],)).fetchall()
+    return {
+        "partyId": party[0],
+        "name": party[1],
+        "clientId": party[2],
+        "clients": [{"clientId": e[0], "clientName": e[1], "role": e[2], "relation": e[3], "ownership": e[4]}
+                    for e in edges]
+    }
+
+
+def shared_parties(conn: sqlite3.Connection, client_id: str, role: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Parties of this client that also appear on other clients"""
+    sql = """
+        SELECT p.id, p.display_name, mine.role, other.client_id, c.name, other.role, other.relation, other.ownership
+        FROM party_edges mine
+        JOIN parties p ON p.id = mine.party_id
+        JOIN party_edges other ON other.party_id = mine.party_id AND other.client_id != mine.client_id
+        JOIN clients c ON c.id = other.client_id
+        WHERE mine.client_id = ?
+    """
+    params = [client_id]
+    if role:
+        sql += " AND mine.role = ? AND other.role = ?"
+        params += [role, role]
+    sql += " ORDER BY p.display_name, c.name"
+
+    shared: Dict[int, Dict[str, Any]] = {}
+    for party_id, party_name, my_role, other_id, other_name, other_role, relation, ownership in conn.execute(sql, params):
+        entry = shared.setdefault(party_id, {"partyId": party_id, "name": party_name, "roles": set(), "clients": []})
+        entry["roles"].add(my_role)
+        entry["clients"].append({"clientId": other_id, "clientName": other_name, "role": other_role,
+                                 "relation": relation, "ownership": ownership})
+    for entry in shared.values():
+        entry["roles"] = sorted(entry["roles"])
+    return list(shared.values())
+
+
+def _holders(conn: sqlite3.Connection, client_id: str) -> List[tuple]:
+    """Direct holders of a client: (party_id, name, holder client_id or None, percent)
+
+    Declared beneficial owners win; parent relations (a parent company on this
+    client, or another client listing it as a subsidiary) are only used when
+    none are declared, since owners usually hold through that parent and
+    counting both doubles the total. Holders without a stated percentage are
+    left out rather than assumed to own 100%.
+    """
+    owners, parents = [], []
+    for party_id, name, holder_client, relation, role, ownership in conn.execute("""
+        SELECT p.id, p.display_name, p.client_id, e.relation, e.role, e.ownership
+        FROM party_edges e JOIN parties p ON p.id = e.party_id
+        WHERE e.client_id = ? AND e.role IN ('owner', 'related') AND e.ownership IS NOT NULL
+    """, (client_id,)):
+        if role == "owner":
+            owners.append((party_id, name, holder_client, ownership))
+        elif (relation or "").lower() in PARENT_RELATIONS:
+            parents.append((party_id, name, holder_client, ownership))
+    if owners:
+        return owners
+
+    # Other clients listing this client as their subsidiary
+    for parent_party, parent_name, parent_client, relation, ownership in conn.execute("""
+        SELECT parent.id, parent.display_name, e.client_id, e.relation, e.ownership
+        FROM parties p
+        JOIN party_edges e ON e.party_id = p.id AND e.role = 'related'
+        JOIN parties parent ON parent.client_id = e.client_id
+        WHERE p.client_id = ? AND e.ownership IS NOT NULL
+    """, (client_id,)):
+        if (relation or "").lower() in SUBSIDIARY_RELATIONS:
+            parents.append((parent_party, parent_name, parent_client, ownership))
+    return parents
+
+
+def _add_owner(ultimate: Dict[int, Dict[str, Any]], party_id: int, name: str, effective: float, path: List[str]):
+    entry = ultimate.setdefault(party_id, {"partyId": party_id, "name": name, "effectiveOwnership": 0.0, "paths": []})
+    entry["effectiveOwnership"] += effective
+    entry["paths"].append(path)
+
+
+def ownership_chain(conn: sqlite3.Connection, client_id: str, max_hops: int = 5) -> Dict[str, Any]:
+    """Ultimate beneficial owners with effective ownership multiplied along each path"""
+    ultimate: Dict[int, Dict[str, Any]] = {}
+    # (client, share of the root it stands for, path, its own party when reached as a holder)
+    stack = [(client_id, 100.0, [client_id], None)]
+    while stack:
+        current, share, path, party = stack.pop()
+        holders = _holders(conn, current)
+        if party is not None and not holders:
+            # A holding client with no recorded holders of its own is where the chain ends
+            _add_owner(ultimate, party[0], party[1], share, path)
+            continue
+        for party_id, name, holder_client, percent in holders:
+            effective = share * percent / 100.0
+            step = path + [holder_client or name]
+            if holder_client and holder_client not in path and len(path) <= max_hops:
+                stack.append((holder_client, effective, step, (party_id, name)))
+            else:
+                _add_owner(ultimate, party_id, name, effective, step)
+
+    owners = sorted(ultimate.values(), key=lambda owner: -owner["effectiveOwnership"])
+    for owner in owners:
+        owner["effectiveOwnership"] = round(owner["effectiveOwnership"], 4)
+    return {"clientId": client_id, "ultimateOwners": owners}
+
+
+def network(conn: sqlite3.Connection, client_id: str, hops: int = 2) -> Dict[str, Any]:
+    """Clients and parties reachable within `hops` client-party-client steps"""
+    nodes = {("client", client_id): 0}
+    edges = set()
+    frontier = deque([(client_id, 0)])
+    while frontier and len(nodes) < MAX_NETWORK_NODES:
+        current, depth = frontier.popleft()
+        if depth >= hops:
+            continue
+        for party_id, linked_client in conn.execute(
+            "SELECT e.party_id, p.client_id FROM party_edges e JOIN parties p ON p.id = e.party_id WHERE e.client_id = ?",
+            (current,)
+        ).fetchall():
+            nodes.setdefault(("party", party_id), depth + 1)
+            edges.add((current, party_id))
+            neighbours = [row[0] for row in conn.execute(
+                "SELECT client_id FROM party_edges WHERE party_id = ? AND client_id != ?", (party_id, current)
+            )]
+            if linked_client and linked_client != current:
+                neighbours.append(linked_client)
+            for neighbour in neighbours:
+                edges.add((neighbour, party_id))
+                if ("client", neighbour) not in nodes:
+                    nodes[("client", neighbour)] = depth + 1
+                    frontier.append((neighbour, depth + 1))
+
+    client_ids = [key for kind, key in nodes if kind == "client"]
+    party_ids = [key for kind, key in nodes if kind == "party"]
+    names = {}
+    if client_ids:
+        names.update({("client", r[0]): r[1] for r in conn.execute(
+            f"SELECT id, name FROM clients WHERE id IN ({', '.join('?' for _ in client_ids)})", client_ids)})
+    if party_ids:
+        names.update({("party", r[0]): r[1] for r in conn.execute(
+            f"SELECT id, display_name FROM parties WHERE id IN ({', '.join('?' for _ in party_ids)})", party_ids)})
+
+    return {
+        "clientId": client_id,
+        "hops": hops,
+        "nodes": [{"type": kind, "id": key, "name": names.get((kind, key)), "distance": distance}
+                  for (kind, key), distance in nodes.items()],
+        "edges": [{"clientId": c, "partyId": p} for c, p in sorted(edges, key=str)],
+        "truncated": len(nodes) >= MAX_NETWORK_NODES
+    }
+
+
+if __name__ == "__main__":
+    from db import DB_PATH
+
+    print(f"Indexed {rebuild(DB_PATH)} clients into the ownership graph")
@@ -0,0 +1,315 @@
+"""
+Peer index for client benchmarking.
+
+Every client is a row of one float32 NumPy matrix built from industry
+(one-hot), portfolio value, annual revenue, risk score, product holdings
+(one column per product) and its accounts' transaction profile: monthly
+volume, inflow share and transaction count. Amounts are log-scaled and
+every numeric column is standardized, so no single measure dominates; the
+industry and product blocks are weighted so that sharing an industry
+counts for about as much as the whole product mix.
+
+A peer query is one matrix-vector product over all clients (squared
+Euclidean distance via |x|^2 - 2 x.q + |q|^2) followed by argpartition,
+which stays in the low milliseconds at 50k+ clients on a single core.
+
+The index follows change_log: the background pipeline syncer refreshes it
+every round, and clients whose clients or accounts rows changed are re-read
+and their rows overwritten in place. A new industry or
+product, too many deleted rows, or change_log pruned past the last refresh
+(pipeline.prune_change_log), triggers a full rebuild instead.
+"""
+
+import json
+import math
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from models import to_camel_case
+
+# change_log tables the features are read from
+SOURCE_TABLES = ("clients", "accounts")
+
+NUMERIC_FEATURES = (
+    "log_portfolio_value", "log_annual_revenue", "risk_score",
+    "log_monthly_volume", "inflow_share", "log_transaction_count", "product_count"
+)
+INDUSTRY_WEIGHT = 2.0   # Distance between two different industries
+PRODUCT_WEIGHT = 2.0    # Distance between two clients with disjoint product sets (at most)
+MAX_TOMBSTONE_RATIO = 0.1
+CHUNK_SIZE = 500
+
+_FEATURE_SQL = """
+    SELECT c.id, c.name, c.industry, c.portfolio_value, c.annual_revenue, c.risk_score, c.product_holdings,
+           a.monthly_volume, a.monthly_inflows, a.monthly_outflows, a.transaction_count
+    FROM clients c
+    LEFT JOIN (
+        SELECT client_id, SUM(monthly_volume) AS monthly_volume, SUM(monthly_inflows) AS monthly_inflows,
+               SUM(monthly_outflows) AS monthly_outflows, SUM(inflow_count + outflow_count) AS transaction_count
+        FROM accounts {where}
+        GROUP BY client_id
+    ) a ON a.client_id = c.id
+    {client_where}
+"""
+
+
+def held_products(product_holdings: Optional[str]) -> List[str]:
+    """Products a client has, from the product_holdings JSON column"""
+    if not product_holdings:
+        return []
+    try:
+        holdings = json.loads(product_holdings)
+    except ValueError:
+        return []
+    return [key for key, value in holdings.items() if isinstance(value, dict) and value.get("hasProduct")]
+
+
+class ClientProfile:
+    """Raw (unscaled) features of one client"""
+
+    __slots__ = ("id", "name", "industry", "products", "portfolio_value", "annual_revenue", "risk_score",
+                 "monthly_volume", "inflow_share", "transaction_count")
+
+    def __init__(self, row: sqlite3.Row):
+        self.id = row[0]
+        self.name = row[1]
+        self.industry = row[2] or ""
+        self.portfolio_value = row[3] or 0.0
+        self.annual_revenue = row[4] or 0.0
+        self.risk_score = row[5] or 0.0
+        self.products = held_products(row[6])
+        self.monthly_volume = row[7] or 0.0
+        flows = (row[8] or 0.0) + (row[9] or 0.0)
+        self.inflow_share = (row[8] or 0.0) / flows if flows else 0.5
+        self.transaction_count = row[10] or 0
+
+    def numeric(self) -> List[float]:
+        return [
+            math.log1p(max(self.portfolio_value, 0.0)), math.log1p(max(self.annual_revenue, 0.0)), self.risk_score,
+            math.log1p(max(self.monthly_volume, 0.0)), self.inflow_share,
+            math.log1p(max(self.transaction_count, 0)), len(self.products)
+        ]
+
+    def to_api(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "industry": self.industry or None,
+            "portfolioValue": self.portfolio_value,
+            "annualRevenue": self.annual_revenue,
+            "riskScore": self.risk_score,
+            "productCount": len(self.products),
+            "monthlyVolume": self.monthly_volume
+        }
+
+
+def load_profiles(conn: sqlite3.Connection, client_ids: Optional[Sequence[str]] = None) -> List[ClientProfile]:
+    if client_ids is None:
+        return [ClientProfile(row) for row in conn.execute(_FEATURE_SQL.format(where="", client_where=""))]
+    profiles = []
+    for start in range(0, len(client_ids), CHUNK_SIZE):
+        chunk = list(client_ids[start:start + CHUNK_SIZE])
+        placeholders = ", ".join("?" for _ in chunk)
+        sql = _FEATURE_SQL.format(where=f"WHERE client_id IN ({placeholders})",
+                                  client_where=f"WHERE c.id IN ({placeholders})")
+        profiles.extend(ClientProfile(row) for row in conn.execute(sql, chunk + chunk))
+    return profiles
+
+
+class PeerIndex:
+    """Feature matrix of every client, kept current from change_log"""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._last_seq = -1
+        self._profiles: List[Optional[ClientProfile]] = []
+        self._positions: Dict[str, int] = {}
+        self._industries: Dict[str, int] = {}
+        self._products: Dict[str, int] = {}
+        self._numeric = np.zeros((0, len(NUMERIC_FEATURES)), dtype=np.float64)
+        self._categorical = np.zeros((0, 0), dtype=np.float32)
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self.stats = {"rebuilds": 0, "updates": 0}
+
+    def __len__(self):
+        return len(self._positions)
+
+    @property
+    def last_seq(self) -> int:
+        """change_log position applied so far; -1 until the first refresh"""
+        return self._last_seq
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def refresh(self) -> int:
+        """Apply client and account changes since the last refresh; returns clients re-read"""
+        conn = self._connect()
+        try:
+            max_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+            if max_seq == self._last_seq:
+                return 0
+            with self._lock:
+                if max_seq == self._last_seq:
+                    return 0
+                oldest = conn.execute("SELECT COALESCE(MIN(seq), 0) FROM change_log").fetchone()[0]
+                if self._last_seq < 0 or oldest > self._last_seq + 1:
+                    # First refresh, or the rows since the last one were pruned
+                    self._rebuild(conn)
+                    self._last_seq = max_seq
+                    return len(self._positions)
+                client_ids = [row[0] for row in conn.execute(f"""
+                    SELECT DISTINCT client_id FROM change_log
+                    WHERE seq > ? AND seq <= ? AND table_name IN ({", ".join("?" for _ in SOURCE_TABLES)})
+                """, (self._last_seq, max_seq, *SOURCE_TABLES))]
+                if len(client_ids) > MAX_TOMBSTONE_RATIO * max(len(self._positions), 1):
+                    self._rebuild(conn)  # Cheaper than re-reading most clients one chunk at a time
+                elif client_ids:
+                    self._update(conn, client_ids)
+                self._last_seq = max_seq
+                return len(client_ids)
+        finally:
+            conn.close()
+
+    def _rebuild(self, conn: sqlite3.Connection):
+        profiles = load_profiles(conn)
+        self._industries = {name: i for i, name in enumerate(sorted({p.industry for p in profiles}))}
+        self._products = {name: i for i, name in enumerate(sorted({k for p in profiles for k in p.products}))}
+        self._profiles = list(profiles)
+        self._positions = {p.id: i for i, p in enumerate(profiles)}
+        self._numeric = np.array([p.numeric() for p in profiles], dtype=np.float64).reshape(
+            len(profiles), len(NUMERIC_FEATURES))
+        self._alive = np.ones(len(profiles), dtype=bool)
+        self._categorical = np.zeros((len(profiles), len(self._industries) + len(self._products)), dtype=np.float32)
+        for position, profile in enumerate(profiles):
+            self._set_categorical(position, profile)
+        self._rescale()
+        self.stats["rebuilds"] += 1
+
+    def _set_categorical(self, position: int, profile: ClientProfile):
+        row = self._categorical[position]
+        row[:] = 0
+        row[self._industries[profile.industry]] = 1
+        offset = len(self._industries)
+        for product in profile.products:
+            row[offset + self._products[product]] = 1
+
+    def _update(self, conn: sqlite3.Connection, client_ids: List[str]):
+        profiles = {p.id: p for p in load_profiles(conn, client_ids)}
+        new_values = any(p.industry not in self._industries or any(k not in self._products for k in p.products)
+                         for p in profiles.values())
+        tombstones = (~self._alive).sum() + sum(1 for c in client_ids if c not in profiles and c in self._positions)
+        if new_values or tombstones > MAX_TOMBSTONE_RATIO * max(len(self._profiles), 1):
+            self._rebuild(conn)
+            return
+
+        # Queries hold on to alive and _profiles outside the lock, so those are replaced, not mutated
+        appended = [p for p in profiles.values() if p.id not in self._positions]
+        alive = np.concatenate([self._alive, np.zeros(len(appended), dtype=bool)])
+        self._profiles = self._profiles + [None] * len(appended)
+        if appended:
+            self._numeric = np.vstack([self._numeric, np.zeros((len(appended), self._numeric.shape[1]))])
+            self._categorical = np.vstack([self._categorical,
+                                           np.zeros((len(appended), self._categorical.shape[1]), dtype=np.float32)])
+        for offset, profile in enumerate(appended):
+            self._positions[profile.id] = len(alive) - len(appended) + offset
+
+        for client_id in client_ids:
+            position = self._positions.get(client_id)
+            if position is None:
+                continue
+            profile = profiles.get(client_id)
+            if profile is None:
+                # Deleted: its row stays as a tombstone until the next rebuild
+                del self._positions[client_id]
+                self._profiles[position] = None
+                alive[position] = False
+                continue
+            self._profiles[position] = profile
+            self._numeric[position] = profile.numeric()
+            self._set_categorical(position, profile)
+            alive[position] = True
+        self._alive = alive
+        self._rescale()
+        self.stats["updates"] += 1
+
+    def _rescale(self):
+        """Standardize the numeric block and weight the categorical blocks into the query matrix"""
+        live = self._numeric[self._alive]
+        mean = live.mean(axis=0) if len(live) else np.zeros(self._numeric.shape[1])
+        std = live.std(axis=0) if len(live) else np.ones(self._numeric.shape[1])
+        std[std == 0] = 1.0
+        scaled = ((self._numeric - mean) / std).astype(np.float32)
+
+        industries = len(self._industries)
+        weights = np.empty(self._categorical.shape[1], dtype=np.float32)
+        # Two different one-hot industries are sqrt(2) apart, two disjoint product sets up to sqrt(held products)
+        weights[:industries] = INDUSTRY_WEIGHT / math.sqrt(2)
+        weights[industries:] = PRODUCT_WEIGHT / math.sqrt(max(len(self._products), 1))
+        matrix = np.hstack([scaled, self._categorical * weights])
+        matrix[~self._alive] = 0
+        # Swapped in together so concurrent queries see one consistent version
+        self._matrix, self._sq_norms = matrix, np.einsum("ij,ij->i", matrix, matrix)
+
+    def profile(self, client_id: str) -> Optional[ClientProfile]:
+        position = self._positions.get(client_id)
+        return None if position is None else self._profiles[position]
+
+    def peers(self, client_id: str, k: int, same_industry: bool = False) -> Optional[List[tuple]]:
+        """The k nearest clients as (profile, distance), closest first; None for an unknown client"""
+        with self._lock:
+            position = self._positions.get(client_id)
+            if position is None:
+                return None
+            matrix, sq_norms, alive, profiles = self._matrix, self._sq_norms, self._alive, self._profiles
+            industry_column = len(NUMERIC_FEATURES) + self._industries[profiles[position].industry]
+        query = matrix[position]
+        distances = sq_norms - 2.0 * (matrix @ query) + sq_norms[position]
+        excluded = ~alive
+        excluded[position] = True
+        if same_industry:
+            excluded |= matrix[:, industry_column] == 0
+        distances[excluded] = np.inf
+        candidates = int(len(distances) - excluded.sum())
+        k = min(k, candidates)
+        if k <= 0:
+            return []
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return [(profiles[i], float(math.sqrt(max(distances[i], 0.0)))) for i in nearest]
+
+
+PEER_STAT_FIELDS = ("portfolio_value", "annual_revenue", "risk_score", "monthly_volume", "transaction_count")
+
+
+def peer_group_stats(client: ClientProfile, peers: List[ClientProfile]) -> Dict[str, Dict[str, Any]]:
+    """Peer median/mean/quartiles per measure and where the client falls among its peers"""
+    stats = {}
+    fields = PEER_STAT_FIELDS + ("product_count",)
+    for field in fields:
+        client_value = len(client.products) if field == "product_count" else getattr(client, field)
+        values = np.array([len(p.products) if field == "product_count" else getattr(p, field) for p in peers],
+                          dtype=np.float64)
+        key = to_camel_case(field)
+        if not len(values):
+            stats[key] = {"client": client_value, "median": None, "mean": None, "p25": None, "p75": None,
+                          "percentile": None}
+            continue
+        p25, median, p75 = np.percentile(values, [25, 50, 75])
+        stats[key] = {
+            "client": client_value,
+            "median": float(median),
+            "mean": float(values.mean()),
+            "p25": float(p25),
+            "p75": float(p75),
+            # Share of peers at or below the client (ties count half)
+            "percentile": round(100.0 * ((values < client_value).sum() + 0.5 * (values == client_value).sum())
+                                / len(values), 1)
+        }
+    return stats
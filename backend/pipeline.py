@@ -0,0 +1,187 @@
+"""
+Incremental pipelines over the Client 360 database.
+
+Derived tables (ownership graph, analytics cube, history checkpoints, review
+worklist, counterparty graph, cash windows, transaction monitor hits) follow
+an append-only source - change_log.seq, client_history.seq or
+transactions.rowid - and keep the last position they applied in
+pipeline_offsets. sync() is the one driver they all
+share: a cheap unlocked check, then the new range is applied and the offset
+moved in a single BEGIN IMMEDIATE transaction, so a crash replays the range
+instead of applying it twice. Once every reader of change_log is past a row,
+prune_change_log() drops it.
+
+Reads never sync. PipelineSyncer runs every pipeline on one background
+thread, after each ingest commit and every SYNC_INTERVAL otherwise (writes
+that bypass the ingest writer only show up in change_log), and the routes
+serve whatever has been materialized so far.
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL = 1.0  # Seconds between rounds when nothing signals
+
+# Append-only sources: the current end of each
+CHANGE_LOG = "SELECT COALESCE(MAX(seq), 0) FROM change_log"
+CLIENT_HISTORY = "SELECT COALESCE(MAX(seq), 0) FROM client_history"
+TRANSACTIONS = "SELECT COALESCE(MAX(rowid), 0) FROM transactions"
+
+
+def connect(db_path) -> sqlite3.Connection:
+    return sqlite3.connect(db_path, isolation_level=None)
+
+
+def get_offset(conn: sqlite3.Connection, pipeline: str) -> int:
+    row = conn.execute("SELECT last_seq FROM pipeline_offsets WHERE pipeline = ?", (pipeline,)).fetchone()
+    return row[0] if row else 0
+
+
+def set_offset(conn: sqlite3.Connection, pipeline: str, seq: int):
+    conn.execute("""
+        INSERT INTO pipeline_offsets (pipeline, last_seq, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(pipeline) DO UPDATE SET last_seq = excluded.last_seq, updated_at = excluded.updated_at
+    """, (pipeline, seq))
+
+
+def sync(db_path, pipeline: str, source: str, apply: Callable[[sqlite3.Connection, int, int], int],
+         connect: Callable[..., sqlite3.Connection] = connect,
+         due: Optional[Callable[[sqlite3.Connection], bool]] = None) -> int:
+    """Run apply(conn, last_seq, max_seq) over what the source gained since the offset; returns its result
+
+    due(conn), when given, forces a run even though the source has not moved
+    (a new period to snapshot, say).
+    """
+    conn = connect(db_path)
+    try:
+        # Cheap unlocked check first: most calls find nothing new
+        if get_offset(conn, pipeline) >= conn.execute(source).fetchone()[0] and not (due and due(conn)):
+            return 0
+
+        conn.execute("BEGIN IMMEDIATE")
+        last_seq = get_offset(conn, pipeline)
+        max_seq = max(conn.execute(source).fetchone()[0], last_seq)
+        result = apply(conn, last_seq, max_seq)
+        set_offset(conn, pipeline, max_seq)
+        conn.execute("COMMIT")
+        return result
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def rebuild(db_path, pipeline: str, source: str, apply: Callable[[sqlite3.Connection, int], int],
+            connect: Callable[..., sqlite3.Connection] = connect) -> int:
+    """Recompute a pipeline from scratch with apply(conn, max_seq) and move its offset to the source's end"""
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        max_seq = conn.execute(source).fetchone()[0]
+        result = apply(conn, max_seq)
+        set_offset(conn, pipeline, max_seq)
+        conn.execute("COMMIT")
+        return result
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def prune_change_log(db_path, pipelines: Iterable[str], keep_after: int,
+                     connect: Callable[..., sqlite3.Connection] = connect) -> int:
+    """Delete change_log rows before every pipeline's offset and keep_after; returns rows deleted
+
+    keep_after covers readers outside pipeline_offsets (the change feed, the
+    peer index). The row at the cutoff stays, so MAX(seq) - the data version -
+    never goes back.
+    """
+    conn = connect(db_path)
+    try:
+        offsets = [get_offset(conn, name) for name in pipelines]
+        cutoff = min(offsets + [keep_after])
+        oldest = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+        if oldest is None or oldest >= cutoff:
+            return 0
+        return conn.execute("DELETE FROM change_log WHERE seq < ?", (cutoff,)).rowcount
+    finally:
+        conn.close()
+
+
+class PipelineSyncer:
+    """One background thread that brings every registered pipeline up to date"""
+
+    def __init__(self, interval: float = SYNC_INTERVAL):
+        self.interval = interval
+        self._pipelines: List[Tuple[str, Callable[[], Any]]] = []
+        self._changed = threading.Condition()
+        self._requested = 0  # Rounds asked for by signal() and flush()
+        self._completed = 0  # Requests covered by the last finished round
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"rounds": 0, "errors": 0}
+
+    def add(self, name: str, sync: Callable[[], Any]):
+        """Register a pipeline; sync() is called with no arguments on the syncer thread"""
+        self._pipelines.append((name, sync))
+
+    def signal(self, *_):
+        """Ask for a round soon; usable as an IngestWriter.on_commit listener"""
+        with self._changed:
+            self._requested += 1
+            self._changed.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a round that starts after this call; False on timeout"""
+        with self._changed:
+            self._requested += 1
+            target = self._requested
+            self._changed.notify_all()
+            return self._changed.wait_for(lambda: self._completed >= target, timeout)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="pipeline-syncer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        self._thread.join()
+        self._thread = None
+
+    def run_once(self):
+        """Sync every pipeline in registration order; a failing one is logged and retried next round"""
+        for name, sync in self._pipelines:
+            try:
+                sync()
+            except Exception:
+                self.stats["errors"] += 1
+                logger.exception("Pipeline sync failed: %s", name)
+        self.stats["rounds"] += 1
+
+    def _run(self):
+        while True:
+            with self._changed:
+                if self._requested == self._completed and not self._stopping:
+                    self._changed.wait(self.interval)
+                if self._stopping:
+                    return
+                target = self._requested
+            self.run_once()
+            with self._changed:
+                self._completed = target
+                self._changed.notify_all()
@@ -0,0 +1,302 @@
+"""
+On-demand request profiling for the Client 360 API.
+
+A request carrying the profiling token (X-Profile-Token header or ?profile=
+query flag), or picked at random at PROFILE_SAMPLE_RATE, is profiled on its
+own: a sampler thread snapshots the stacks of the threads working on that
+request every millisecond. The event loop thread is followed from the
+middleware's frame, and the worker thread running a sync handler from the
+handler's frame once it asks for a database connection. While a profile is
+active, get_db_connection() hands out connections whose execute/fetch calls
+are Python methods, so time spent inside SQLite shows up as its own frames.
+
+Each profile is written to PROFILE_DIR as a speedscope file; the admin
+routes serve it as-is or as collapsed stacks for flamegraph.pl. Without a
+PROFILING_TOKEN the middleware is not installed and requests pay nothing.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from admin_tokens import token_matches
+
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN") or None
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR") or Path(__file__).parent / "profiles")
+
+TOKEN_HEADER = b"x-profile-token"
+SAMPLE_INTERVAL = 0.001
+MAX_PROFILE_SECONDS = 30     # The sampler stops on its own after this long
+MAX_STORED_PROFILES = 100    # Oldest files are removed beyond this many
+
+BACKEND_DIR = str(Path(__file__).parent)
+
+_active_profile: ContextVar = ContextVar("active_profile", default=None)
+
+
+def current_profile() -> Optional["RequestProfile"]:
+    return _active_profile.get()
+
+
+class RequestProfile:
+    """Stack samples of the threads working on one request"""
+
+    def __init__(self, name: str, trigger: str):
+        self.id = f"{datetime.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+        self.name = name
+        self.trigger = trigger
+        self.started_at = datetime.now()
+        self.duration = 0.0
+        self._started = time.perf_counter()
+        # thread id -> (label, anchor frame); only samples with the anchor on the stack count
+        self._anchors: Dict[int, Tuple[str, Any]] = {}
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        self._samples: Dict[str, List[Tuple[List[int], float]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, frame, label: str):
+        self._anchors.setdefault(threading.get_ident(), (label, frame))
+
+    def track_thread(self):
+        """Follow the calling worker thread from its outermost backend frame (the handler)"""
+        if threading.get_ident() in self._anchors:
+            return
+        anchor, frame = None, sys._getframe(1)
+        while frame is not None:
+            if frame.f_code.co_filename.startswith(BACKEND_DIR):
+                anchor = frame
+            frame = frame.f_back
+        if anchor is not None:
+            self.track(anchor, "handler")
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.perf_counter() - self._started
+        self._anchors.clear()  # Releases the frames
+
+    def _run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        deadline = last + MAX_PROFILE_SECONDS
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            now = time.perf_counter()
+            self._sample(own, now - last)
+            last = now
+            if now > deadline:
+                break
+
+    def _sample(self, own: int, weight: float):
+        frames = sys._current_frames()
+        for thread_id, (label, anchor) in list(self._anchors.items()):
+            frame = frames.get(thread_id) if thread_id != own else None
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_index(frame.f_code))
+                if frame is anchor:
+                    break
+                frame = frame.f_back
+            else:
+                continue  # The thread is not working on this request right now
+            stack.reverse()
+            self._samples.setdefault(label, []).append((stack, weight))
+
+    def _frame_index(self, code) -> int:
+        key = (code.co_qualname, code.co_filename, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """The samples in speedscope's file format, one sampled profile per thread"""
+        profiles = []
+        for label, samples in self._samples.items():
+            weights = [round(weight * 1000, 3) for _, weight in samples]
+            profiles.append({
+                "type": "sampled",
+                "name": label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": [stack for stack, _ in samples],
+                "weights": weights
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "client360-profiling",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": name, "file": file, "line": line}
+                                  for name, file, line in self._frames]},
+            "profiles": profiles,
+            "metadata": {
+                "id": self.id,
+                "trigger": self.trigger,
+                "startedAt": self.started_at.isoformat(),
+                "durationMs": round(self.duration * 1000, 3),
+                "samples": sum(len(samples) for samples in self._samples.values())
+            }
+        }
+
+
+def to_collapsed(document: Dict[str, Any]) -> str:
+    """Collapsed stacks ("thread;outer;inner microseconds" per line) from a speedscope document"""
+    frames = [f"{frame['name']} ({Path(frame['file']).name}:{frame['line']})"
+              for frame in document["shared"]["frames"]]
+    totals: Counter = Counter()
+    for profile in document["profiles"]:
+        for stack, weight in zip(profile["samples"], profile["weights"]):
+            totals[";".join([profile["name"]] + [frames[i] for i in stack])] += weight * 1000
+    return "".join(f"{stack} {round(micros)}\n" for stack, micros in totals.items())
+
+
+class ProfileStore:
+    """Speedscope files of recent profiles in one directory"""
+
+    def __init__(self, directory: Path = PROFILE_DIR, max_profiles: int = MAX_STORED_PROFILES):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str) -> Path:
+        return self.directory / f"{profile_id}.speedscope.json"
+
+    def save(self, profile: RequestProfile):
+        document = profile.to_speedscope()
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._path(profile.id).write_text(json.dumps(document, separators=(",", ":")))
+            for stale in self._files()[self.max_profiles:]:
+                stale.unlink(missing_ok=True)
+
+    def _files(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob("*.speedscope.json"), key=lambda p: p.name, reverse=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Newest first: id, request, trigger, start, duration and sample count"""
+        summaries = []
+        for path in self._files():
+            try:
+                document = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            summaries.append({**document["metadata"], "name": document["name"]})
+        return summaries
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        # Ids are generated here; anything else (e.g. a path) is simply not found
+        if not profile_id.replace("-", "").isalnum():
+            return None
+        try:
+            return json.loads(self._path(profile_id).read_text())
+        except (OSError, ValueError):
+            return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests asking for it with the token, plus a random sample"""
+
+    def __init__(self, app, store: ProfileStore, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+
+    def _trigger(self, scope) -> Optional[str]:
+        if scope["type"] != "http" or current_profile() is not None or scope["path"].startswith("/api/admin/"):
+            return None  # Batch sub-requests belong to the outer request's profile
+        for name, value in scope["headers"]:
+            if name == TOKEN_HEADER:
+                return "header" if token_matches(value.decode("latin-1"), PROFILING_TOKEN) else None
+        query = scope.get("query_string", b"")
+        if b"profile=" in query:
+            values = parse_qs(query.decode("latin-1")).get("profile", [])
+            if values and token_matches(values[0], PROFILING_TOKEN):
+                return "query"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        # The token stays out of the stored request name
+        query = "&".join(part for part in scope.get("query_string", b"").decode("latin-1").split("&")
+                         if part and not part.startswith("profile="))
+        profile = RequestProfile(f"{scope['method']} {scope['path']}{'?' + query if query else ''}", trigger)
+        profile_id = profile.id.encode()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id)]
+            await send(message)
+
+        token = _active_profile.set(profile)
+        profile.track(sys._getframe(), "event-loop")
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            _active_profile.reset(token)
+            self.store.save(profile)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor whose SQLite calls are Python frames, so samples can see them"""
+
+    def execute(self, sql, parameters=()):
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return super().executemany(sql, seq_of_parameters)
+
+    def fetchone(self):
+        return super().fetchone()
+
+    def fetchmany(self, size=None):
+        return super().fetchmany(self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return super().fetchall()
+
+    def __next__(self):
+        return super().__next__()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection handed out while a profile is active"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
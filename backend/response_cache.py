@@ -0,0 +1,216 @@
+"""
+Compressed response cache for the Client 360 API.
+
+Cached routes keep the serialized JSON body together with the compressed
+bytes for each content-coding a client has asked for, so a repeat hit skips
+both serialization and compression. Encodings are negotiated from the
+Accept-Encoding header; gzip is always available, br and zstd when the
+optional brotli / zstandard packages are installed. Every entry records the
+data version it was built at and only serves requests made at that same
+version, so a write makes every older body a miss. Concurrent misses for
+the same URL and data version share one build (see single_flight.py).
+"""
+
+import gzip
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+import models
+from single_flight import SingleFlight
+
+try:
+    import brotli
+except ImportError:  # Optional: enables "br"
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: enables "zstd"
+    zstandard = None
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+MIN_COMPRESS_SIZE = 1024
+
+# Server preference when the client accepts several encodings with equal weight
+ENCODING_PREFERENCE = ["zstd", "br", "gzip"]
+
+
+def _gzip(body: bytes, cached: bool) -> bytes:
+    # mtime=0 keeps the output stable for identical bodies
+    return gzip.compress(body, compresslevel=9 if cached else 6, mtime=0)
+
+
+def _brotli(body: bytes, cached: bool) -> bytes:
+    return brotli.compress(body, quality=11 if cached else 5)
+
+
+def _zstd(body: bytes, cached: bool) -> bytes:
+    return zstandard.ZstdCompressor(level=19 if cached else 3).compress(body)
+
+
+# Cached bodies are compressed once and reused, so they get the slow, dense levels
+COMPRESSORS: Dict[str, Callable[[bytes, bool], bytes]] = {"gzip": _gzip}
+if brotli is not None:
+    COMPRESSORS["br"] = _brotli
+if zstandard is not None:
+    COMPRESSORS["zstd"] = _zstd
+
+
+def serialize(payload: Any) -> bytes:
+    """Serialize a payload the same way FastAPI's JSONResponse does (records as objects)"""
+    return models.dumps(payload).encode("utf-8")
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported content-coding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[token] = weight
+
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in COMPRESSORS:
+            continue
+        weight = weights.get(encoding, wildcard)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def _json_response(body: bytes, encoding: Optional[str]) -> Response:
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def compressed_json_response(request: Request, payload: Any) -> Response:
+    """Serialize and compress an uncached payload for this request"""
+    body = serialize(payload)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return _json_response(body, None)
+    return _json_response(COMPRESSORS[encoding](body, False), encoding)
+
+
+class CachedBody:
+    """A serialized JSON body plus its compressed variants, filled in on demand"""
+
+    __slots__ = ("body", "encoded", "expires_at", "version")
+
+    def __init__(self, body: bytes, expires_at: float, version: Any = None):
+        self.body = body
+        self.encoded: Dict[str, bytes] = {}
+        self.expires_at = expires_at
+        self.version = version
+
+    def fresh(self, version: Any) -> bool:
+        return self.version == version and self.expires_at > time.monotonic()
+
+    def response(self, request: Request) -> Response:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding is None or len(self.body) < MIN_COMPRESS_SIZE:
+            return _json_response(self.body, None)
+        data = self.encoded.get(encoding)
+        if data is None:
+            # Two threads may race to fill this in; both produce the same bytes
+            data = self.encoded[encoding] = COMPRESSORS[encoding](self.body, True)
+        return _json_response(data, encoding)
+
+
+class ResponseCache:
+    """LRU cache of serialized (and compressed) JSON responses keyed by URL"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300.0,
+                 data_version: Optional[Callable[[], Any]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.data_version = data_version or (lambda: None)
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._entries), "inFlight": self._flights.in_flight,
+                **{f"singleFlight{k.capitalize()}": v for k, v in self._flights.stats.items()}}
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    def respond(self, request: Request, build: Callable[[], Any]) -> Response:
+        """Serve the cached body for this URL, building it with build() on a miss"""
+        if request.scope.get("snapshot_read"):
+            # Batch items must reflect the batch's snapshot, not an older cached body
+            return CachedBody(serialize(build()), 0).response(request)
+
+        key = self.key_for(request)
+        # Read before building, so a body is never older than the version it is stored under
+        version = self.data_version()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.fresh(version):
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+
+        if entry is None:
+            self.stats["misses"] += 1
+            try:
+                entry = self._flights.do((key, version), lambda: self._fill(key, build, version))
+            except TimeoutError:
+                raise HTTPException(status_code=503, detail="Timed out waiting for a shared response",
+                                    headers={"Retry-After": "1"})
+        else:
+            self.stats["hits"] += 1
+
+        return entry.response(request)
+
+    def prefill(self, path: str, build: Callable[[], Any]) -> CachedBody:
+        """Build and cache the body of a query-less GET of path ahead of its first request"""
+        return self._fill(f"{path}?", build, self.data_version())
+
+    def _fill(self, key: str, build: Callable[[], Any], version: Any) -> CachedBody:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry.fresh(version):
+            return entry  # Filled by a flight for this version that finished just before this one started
+        # Errors raised by build() (e.g. 404s) reach every waiter and are never cached
+        entry = CachedBody(serialize(build()), time.monotonic() + self.ttl_seconds, version)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, path_prefix: str = "") -> int:
+        """Drop cached responses whose path starts with path_prefix"""
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith(path_prefix)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
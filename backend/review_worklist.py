@@ -0,0 +1,152 @@
+"""
+Review-due worklist across the whole book.
+
+review_worklist keeps one row per client with a next_review: its place in
+the hierarchy (rm, region, market, metro), the review date, and the weight
+of its risk signals - risk_score, active critical/high risk flags and open
+UTRs - expressed in days:
+
+    weight_days = risk_score * RISK_SCORE_DAYS
+                + critical_flags * CRITICAL_FLAG_DAYS
+                + open_utrs * OPEN_UTR_DAYS
+
+A client's priority on a given day is days overdue plus its weight. Since
+"today" is the same for every row, ordering by priority is ordering by
+priority_key = weight_days - julianday(next_review), which never changes
+with the date. Each scope has an index on (scope id, priority_key), so the
+top-N of an RM, region, market or metro is one index range read.
+
+sync() follows change_log for clients, risk_flags and utr_events, plus the
+rows init_database's reassignment triggers log for every client under a
+relationship, RM, region or market that moved up the hierarchy, so the
+scope columns follow reassignments too.
+"""
+
+import sqlite3
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import pipeline
+
+PIPELINE_NAME = "review_worklist"
+
+SOURCE_TABLES = ("clients", "risk_flags", "utr_events",
+                 "relationships", "relationship_managers", "regions", "markets")
+
+RISK_SCORE_DAYS = 3.0      # Each risk score point (0-10) counts like 3 days overdue
+CRITICAL_FLAG_DAYS = 14.0  # Each active Critical/High risk flag like two weeks
+OPEN_UTR_DAYS = 10.0       # Each UTR that is not closed
+
+CRITICAL_SEVERITIES = ("Critical", "High")
+CLOSED_UTR_STATUSES = ("Closed", "Resolved", "Dismissed")
+
+SCOPES = {"rm": "rm_id", "region": "region_id", "market": "market_id", "metro": "metro_id"}
+
+CHUNK_SIZE = 500
+
+_ROWS_SQL = f"""
+    SELECT c.id, c.name, rm.id, g.id, mk.id, mk.metro_id, c.next_review, COALESCE(c.risk_score, 0),
+           (SELECT COUNT(*) FROM risk_flags f
+            WHERE f.client_id = c.id AND f.status = 'Active'
+              AND f.severity IN ({", ".join(f"'{s}'" for s in CRITICAL_SEVERITIES)})),
+           (SELECT COUNT(*) FROM utr_events u
+            WHERE u.client_id = c.id AND COALESCE(u.status, '') NOT IN ({", ".join(f"'{s}'" for s in CLOSED_UTR_STATUSES)}))
+    FROM clients c
+    LEFT JOIN relationships r ON r.id = c.relationship_id
+    LEFT JOIN relationship_managers rm ON rm.id = r.rm_id
+    LEFT JOIN regions g ON g.id = rm.region_id
+    LEFT JOIN markets mk ON mk.id = g.market_id
+    WHERE c.next_review IS NOT NULL AND {{where}}
+"""
+
+_UPSERT_SQL = """
+    INSERT INTO review_worklist
+    (client_id, name, rm_id, region_id, market_id, metro_id, next_review, risk_score, critical_flags, open_utrs,
+     priority_key)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? - julianday(?))
+    ON CONFLICT(client_id) DO UPDATE SET
+        name = excluded.name, rm_id = excluded.rm_id, region_id = excluded.region_id,
+        market_id = excluded.market_id, metro_id = excluded.metro_id, next_review = excluded.next_review,
+        risk_score = excluded.risk_score, critical_flags = excluded.critical_flags,
+        open_utrs = excluded.open_utrs, priority_key = excluded.priority_key
+"""
+
+
+def weight_days(risk_score: float, critical_flags: int, open_utrs: int) -> float:
+    return risk_score * RISK_SCORE_DAYS + critical_flags * CRITICAL_FLAG_DAYS + open_utrs * OPEN_UTR_DAYS
+
+
+def _upsert(conn: sqlite3.Connection, rows: Sequence[tuple]):
+    conn.executemany(_UPSERT_SQL, [
+        (*row, weight_days(row[7], row[8], row[9]), row[6]) for row in rows
+    ])
+
+
+def refresh_clients(conn: sqlite3.Connection, client_ids: Sequence[str]):
+    """Recompute the worklist rows of these clients (inside the caller's transaction)"""
+    client_ids = list(client_ids)
+    for start in range(0, len(client_ids), CHUNK_SIZE):
+        chunk = client_ids[start:start + CHUNK_SIZE]
+        placeholders = ", ".join("?" for _ in chunk)
+        # Deleted clients and cleared review dates leave the worklist
+        conn.execute(f"DELETE FROM review_worklist WHERE client_id IN ({placeholders})", chunk)
+        _upsert(conn, conn.execute(_ROWS_SQL.format(where=f"c.id IN ({placeholders})"), chunk).fetchall())
+
+
+def _apply(conn: sqlite3.Connection, last_seq: int, max_seq: int) -> int:
+    client_ids = [row[0] for row in conn.execute(f"""
+        SELECT DISTINCT client_id FROM change_log
+        WHERE seq > ? AND seq <= ? AND table_name IN ({", ".join("?" for _ in SOURCE_TABLES)})
+    """, (last_seq, max_seq, *SOURCE_TABLES))]
+    refresh_clients(conn, client_ids)
+    return len(client_ids)
+
+
+def _rebuild(conn: sqlite3.Connection, max_seq: int) -> int:
+    conn.execute("DELETE FROM review_worklist")
+    _upsert(conn, conn.execute(_ROWS_SQL.format(where="1")).fetchall())
+    return conn.execute("SELECT COUNT(*) FROM review_worklist").fetchone()[0]
+
+
+def rebuild(db_path) -> int:
+    """Recompute the whole worklist; returns the number of rows"""
+    return pipeline.rebuild(db_path, PIPELINE_NAME, pipeline.CHANGE_LOG, _rebuild)
+
+
+def sync(db_path) -> int:
+    """Apply logged changes since the last sync; returns clients refreshed"""
+    return pipeline.sync(db_path, PIPELINE_NAME, pipeline.CHANGE_LOG, _apply)
+
+
+def top_due(conn: sqlite3.Connection, scope: str, scope_id: str, limit: int,
+            within_days: int = 0, today: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Highest-priority clients in a scope whose review is due within within_days of today"""
+    today = today or date.today()
+    column = SCOPES[scope]
+    rows = conn.execute(f"""
+        SELECT client_id, name, rm_id, next_review, risk_score, critical_flags, open_utrs,
+               priority_key + julianday(:today) AS priority,
+               julianday(:today) - julianday(next_review) AS days_overdue
+        FROM review_worklist
+        WHERE {column} = :scope_id AND next_review <= date(:today, :within)
+        ORDER BY priority_key DESC, client_id
+        LIMIT :limit
+    """, {"today": today.isoformat(), "scope_id": scope_id, "within": f"+{within_days} days",
+          "limit": limit}).fetchall()
+    return [{
+        "clientId": row[0],
+        "name": row[1],
+        "rmId": row[2],
+        "nextReview": row[3],
+        "daysOverdue": int(row[8]),
+        "riskScore": row[4],
+        "criticalFlags": row[5],
+        "openUtrs": row[6],
+        "priority": round(row[7], 2)
+    } for row in rows]
+
+
+if __name__ == "__main__":
+    from db import DB_PATH
+
+    print(f"Rebuilt review worklist: {rebuild(DB_PATH)} clients")
@@ -0,0 +1,43 @@
+"""
+GET /api/analytics/cube: dashboard breakdowns rolled up from the analytics cube.
+
+    /api/analytics/cube?dims=metro,month&measures=portfolio_value,risk_flags
+                       &filter=industry:Manufacturing|Retail,month:2024-01..2024-06
+
+dims and measures are comma-separated names; filter clauses are
+dimension:value|value, with a..b for inclusive ranges.
+"""
+
+from fastapi import APIRouter, HTTPException
+
+import analytics_cube
+from db import get_db_connection
+from models import to_camel_case
+
+router = APIRouter()
+
+DEFAULT_MEASURES = ("clients", "portfolio_value")
+
+
+@router.get("/api/analytics/cube")
+def get_cube(dims: str = "", measures: str = "", filter: str = ""):
+    """Aggregate the cube by the requested dimensions"""
+    try:
+        dimensions = analytics_cube.parse_list(dims, analytics_cube.DIMENSIONS, "dimension")
+        measure_names = analytics_cube.parse_list(measures, analytics_cube.MEASURES, "measure") or list(DEFAULT_MEASURES)
+        filters = analytics_cube.parse_filter(filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    conn = get_db_connection()
+    try:
+        result = analytics_cube.query(conn, dimensions, measure_names, filters)
+    finally:
+        conn.close()
+
+    return {
+        "dims": [to_camel_case(d) for d in dimensions],
+        "measures": [to_camel_case(m) for m in measure_names],
+        "asOf": result["as_of"],
+        "rows": [{to_camel_case(k): v for k, v in row.items()} for row in result["rows"]]
+    }
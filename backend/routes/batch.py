@@ -0,0 +1,94 @@
+"""
+POST /api/batch: run many read-only API calls in one HTTP round trip.
+
+Sub-requests are dispatched in-process through the app itself, so they get
+the same routing, validation and error responses as direct calls. They all
+read through one connection inside one read transaction, which gives the
+whole batch a consistent snapshot; identical sub-requests run only once.
+"""
+
+import json
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Request
+
+from db import snapshot_connection
+from schemas.batch import BatchRequest, BatchResponse, BatchItemResult
+
+router = APIRouter()
+
+# Headers describing the outer request body or encoding don't apply to sub-requests
+_DROPPED_HEADERS = {b"accept-encoding", b"content-length", b"content-type", b"transfer-encoding"}
+
+
+def _rejection(item):
+    if item.method.upper() != "GET":
+        return 405, {"detail": "Only GET sub-requests are supported"}
+    path = urlsplit(item.path).path
+    if not path.startswith("/api/") or path == "/api/batch":
+        return 400, {"detail": "Sub-request path must be an /api route other than /api/batch"}
+    if path.endswith("/events"):
+        return 400, {"detail": "Event streams cannot be batched"}
+    return None
+
+
+async def _dispatch(request: Request, path: str):
+    """Run one GET through the ASGI app and capture its status and JSON body"""
+    url = urlsplit(path)
+    outer = request.scope
+    scope = {
+        "type": "http",
+        "asgi": outer.get("asgi", {"version": "3.0"}),
+        "http_version": outer.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": outer.get("scheme", "http"),
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "root_path": outer.get("root_path", ""),
+        "headers": [(k, v) for k, v in outer.get("headers", []) if k not in _DROPPED_HEADERS],
+        "client": outer.get("client"),
+        "server": outer.get("server"),
+        # Tells the response cache to read through to the snapshot
+        "snapshot_read": True,
+    }
+    status = 500
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        return 500, {"detail": "Internal Server Error"}
+
+    body = b"".join(chunks)
+    try:
+        return status, json.loads(body) if body else None
+    except ValueError:
+        return status, body.decode("utf-8", "replace")
+
+
+@router.post("/api/batch", response_model=BatchResponse)
+async def run_batch(batch: BatchRequest, request: Request):
+    """Execute up to 50 GET sub-requests against one consistent snapshot"""
+    results = {}
+    responses = []
+    # SQLite cannot share one snapshot between connections, so the items run
+    # back to back on the single snapshot connection rather than concurrently.
+    with snapshot_connection():
+        for item in batch.requests:
+            rejection = _rejection(item)
+            if rejection is None and item.path not in results:
+                results[item.path] = await _dispatch(request, item.path)
+            status, body = rejection or results[item.path]
+            responses.append(BatchItemResult(id=item.id, path=item.path, status=status, body=body))
+    return BatchResponse(responses=responses)
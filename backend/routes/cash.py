@@ -0,0 +1,36 @@
+"""
+GET /api/clients/{client_id}/cash-windows: rolling 1/3/10/30-day cash totals
+of a client and each of its conductors (see cash_windows.py).
+
+The background pipeline syncer folds newly ingested transactions into the
+buckets; every window total is two prefix-sum lookups.
+"""
+
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Query
+
+import cash_windows
+from db import get_db_connection
+
+router = APIRouter()
+
+
+@router.get("/api/clients/{client_id}/cash-windows")
+def get_client_cash_windows(
+    client_id: str,
+    as_of: str = Query(None, description="Last day of every window, YYYY-MM-DD (default: last cash day)")
+):
+    """Rolling cash totals, with the part below the reporting threshold"""
+    if as_of is not None:
+        try:
+            as_of = date.fromisoformat(as_of).isoformat()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="as_of must be a date (YYYY-MM-DD)")
+    conn = get_db_connection()
+    try:
+        if conn.execute("SELECT 1 FROM clients WHERE id = ?", (client_id,)).fetchone() is None:
+            raise HTTPException(status_code=404, detail="Client not found")
+        return cash_windows.client_windows(conn, client_id, as_of)
+    finally:
+        conn.close()
@@ -0,0 +1,70 @@
+"""
+Counterparty flow routes.
+
+The queries only read the aggregated edges, which the background pipeline
+syncer (pipeline.PipelineSyncer) folds newly ingested transactions into
+after each ingest commit.
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+
+import counterparty_graph
+from db import get_db_connection
+
+router = APIRouter()
+
+
+def _require_client(conn, client_id: str):
+    if conn.execute("SELECT 1 FROM clients WHERE id = ?", (client_id,)).fetchone() is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+
+@router.get("/api/clients/{client_id}/counterparties")
+def get_client_counterparties(
+    client_id: str,
+    direction: str = Query(None, description="in or out (default: both)"),
+    k: int = Query(10, ge=1, le=100)
+):
+    """Top counterparties of a client by amount, with its fan-in and fan-out"""
+    if direction is not None and direction not in counterparty_graph.DIRECTIONS:
+        raise HTTPException(status_code=400, detail="direction must be one of: in, out")
+    conn = get_db_connection()
+    try:
+        _require_client(conn, client_id)
+        return counterparty_graph.client_flows(conn, client_id, k, direction)
+    finally:
+        conn.close()
+
+
+@router.get("/api/clients/{client_id}/shared-counterparties")
+def get_shared_counterparties(client_id: str, limit: int = Query(20, ge=1, le=100)):
+    """Clients that deal with the same counterparties as this client"""
+    conn = get_db_connection()
+    try:
+        _require_client(conn, client_id)
+        return {"clientId": client_id, "clients": counterparty_graph.shared_counterparties(conn, client_id, limit)}
+    finally:
+        conn.close()
+
+
+@router.get("/api/counterparties/fan-in")
+def get_fan_in_counterparties(min_clients: int = Query(2, ge=1), limit: int = Query(20, ge=1, le=100)):
+    """Counterparties dealing with the most of our clients"""
+    conn = get_db_connection()
+    try:
+        return {"counterparties": counterparty_graph.fan_in_hubs(conn, min_clients, limit)}
+    finally:
+        conn.close()
+
+
+@router.get("/api/counterparties/{counterparty_id}")
+def get_counterparty(counterparty_id: int, limit: int = Query(20, ge=1, le=100)):
+    """A counterparty's totals and its largest flows with our clients"""
+    conn = get_db_connection()
+    try:
+        counterparty = counterparty_graph.counterparty_detail(conn, counterparty_id, limit)
+    finally:
+        conn.close()
+    if counterparty is None:
+        raise HTTPException(status_code=404, detail="Counterparty not found")
+    return counterparty
@@ -0,0 +1,137 @@
+"""
+POST /api/transactions:ingest: bulk-load transactions as NDJSON.
+
+The body is validated in full before anything is queued - every line against
+the schema, then every accountId against accounts; a batch is either written
+completely or rejected with the failing line numbers. The response is
+sent only after the writer thread has committed the batch (see ingest.py).
+Send an Idempotency-Key header to make retries safe: a repeated key returns
+the original ack instead of writing again. Transaction ids are primary keys,
+so rows already present are counted as duplicates rather than overwritten.
+A batch the writer has not committed within ACK_TIMEOUT_SECONDS is answered
+with 503; it may still commit, so retry it with the same Idempotency-Key. A
+commit the writer reports as failed is answered with 503 as well.
+"""
+
+import asyncio
+import os
+import sqlite3
+from datetime import timezone
+from operator import attrgetter
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from ingest import IdempotencyConflict, QueueFull, TRANSACTION_COLUMNS, payload_hash
+from schemas.ingest import MAX_INGEST_ROWS, IngestAck, TransactionIn
+
+router = APIRouter()
+
+# Validation errors reported back per request; the rest are counted only
+MAX_REPORTED_ERRORS = 20
+
+RETRY_AFTER_SECONDS = 1
+
+# Seconds a request waits for the writer to commit its batch before answering 503
+ACK_TIMEOUT_SECONDS = float(os.environ.get("INGEST_ACK_TIMEOUT_SECONDS", "30"))
+
+
+_row_values = attrgetter(*TRANSACTION_COLUMNS)
+_DATE_INDEX = TRANSACTION_COLUMNS.index("transaction_date")
+_ACCOUNT_INDEX = TRANSACTION_COLUMNS.index("account_id")
+
+
+def _to_row(txn: TransactionIn) -> tuple:
+    """Insert parameters in TRANSACTION_COLUMNS order, dates as UTC 'YYYY-MM-DD HH:MM:SS'"""
+    row = list(_row_values(txn))
+    moment = row[_DATE_INDEX]
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    row[_DATE_INDEX] = moment.isoformat(sep=" ", timespec="seconds")
+    return row
+
+
+def parse_ndjson(body: bytes):
+    """Validate every line; returns (rows, their line numbers, errors, error_count)"""
+    rows, lines, errors, error_count = [], [], [], 0
+    for line_number, line in enumerate(body.split(b"\n"), start=1):
+        if not line.strip():
+            continue
+        try:
+            rows.append(_to_row(TransactionIn.model_validate_json(line)))
+            lines.append(line_number)
+        except ValidationError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_number, "errors": e.errors(include_url=False, include_input=False)})
+        if len(rows) + error_count > MAX_INGEST_ROWS:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_INGEST_ROWS} rows per request")
+    return rows, lines, errors, error_count
+
+
+def unknown_account_errors(rows, lines, unknown):
+    """Per-line errors for rows whose accountId is in unknown; returns (errors, error_count)"""
+    failing = [line for row, line in zip(rows, lines) if row[_ACCOUNT_INDEX] in unknown]
+    errors = [{"line": line, "errors": [{"type": "unknown_account", "loc": ["accountId"],
+                                         "msg": "No account with this id"}]}
+              for line in failing[:MAX_REPORTED_ERRORS]]
+    return errors, len(failing)
+
+
+def _ack_response(ack: dict) -> JSONResponse:
+    headers = {"Idempotent-Replayed": "true"} if ack["replayed"] else None
+    return JSONResponse(IngestAck(**ack).model_dump(by_alias=True), headers=headers)
+
+
+@router.post("/api/transactions:ingest", response_model=IngestAck)
+async def ingest_transactions(request: Request):
+    """Validate an NDJSON batch and return once it is durably committed"""
+    writer = request.app.state.ingest_writer
+    idempotency_key = request.headers.get("idempotency-key")
+    body = await request.body()
+    body_hash = payload_hash(body)
+
+    if idempotency_key is not None:
+        # Retries of committed batches are answered without parsing or queueing
+        stored = await run_in_threadpool(writer.lookup, idempotency_key)
+        if stored is not None:
+            if stored.pop("payload_hash") != body_hash:
+                raise HTTPException(status_code=409, detail="Idempotency-Key was used with a different payload")
+            return _ack_response({"idempotency_key": idempotency_key, "replayed": True, **stored})
+
+    rows, lines, errors, error_count = await run_in_threadpool(parse_ndjson, body)
+    if error_count:
+        raise HTTPException(status_code=422, detail={"invalidLines": error_count, "errors": errors})
+    if not rows:
+        raise HTTPException(status_code=400, detail="No transactions in request body")
+
+    unknown = await run_in_threadpool(writer.unknown_accounts, {row[_ACCOUNT_INDEX] for row in rows})
+    if unknown:
+        errors, error_count = unknown_account_errors(rows, lines, unknown)
+        raise HTTPException(status_code=422, detail={"invalidLines": error_count, "errors": errors})
+
+    try:
+        future = writer.submit(rows, idempotency_key, body_hash)
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Ingest queue is full, retry later",
+                            headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    except RuntimeError:
+        raise HTTPException(status_code=503, detail="Ingest writer is not running",
+                            headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+    try:
+        # shield: a timed-out request must not cancel the batch under the writer, which may still commit it
+        ack = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), ACK_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Ingest writer did not acknowledge the batch in time; "
+                                                    "retry with the same Idempotency-Key",
+                            headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    except IdempotencyConflict:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was used with a different payload")
+    except sqlite3.DatabaseError:
+        # The writer rolled the batch back (and logged why); nothing of it was written
+        raise HTTPException(status_code=503, detail="Ingest commit failed; retry the batch",
+                            headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    return _ack_response(ack)
@@ -0,0 +1,69 @@
+"""
+Ownership and related-party routes.
+
+Reads serve the party index as materialized by the background pipeline
+syncer (pipeline.PipelineSyncer), which applies client changes from
+change_log.
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+
+import ownership_graph
+from db import get_db_connection
+
+router = APIRouter()
+
+PARTY_ROLES = ("owner", "signer", "conductor", "related")
+
+
+def _require_client(conn, client_id: str):
+    if conn.execute("SELECT 1 FROM clients WHERE id = ?", (client_id,)).fetchone() is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+
+@router.get("/api/clients/{client_id}/shared-parties")
+def get_shared_parties(client_id: str, role: str = Query(None, description="owner, signer, conductor or related")):
+    """Parties this client shares with other clients"""
+    if role is not None and role not in PARTY_ROLES:
+        raise HTTPException(status_code=400, detail=f"role must be one of: {', '.join(PARTY_ROLES)}")
+    conn = get_db_connection()
+    try:
+        _require_client(conn, client_id)
+        return {"clientId": client_id, "parties": ownership_graph.shared_parties(conn, client_id, role)}
+    finally:
+        conn.close()
+
+
+@router.get("/api/parties")
+def get_party(name: str = Query(..., min_length=1)):
+    """Look up a party by name and list every client it appears on"""
+    conn = get_db_connection()
+    try:
+        party = ownership_graph.find_party(conn, name)
+    finally:
+        conn.close()
+    if party is None:
+        raise HTTPException(status_code=404, detail="Party not found")
+    return party
+
+
+@router.get("/api/clients/{client_id}/ownership-chain")
+def get_ownership_chain(client_id: str, max_hops: int = Query(5, ge=1, le=10)):
+    """Ultimate beneficial owners with effective ownership through holding clients"""
+    conn = get_db_connection()
+    try:
+        _require_client(conn, client_id)
+        return ownership_graph.ownership_chain(conn, client_id, max_hops)
+    finally:
+        conn.close()
+
+
+@router.get("/api/clients/{client_id}/network")
+def get_network(client_id: str, hops: int = Query(2, ge=1, le=4)):
+    """Clients and parties within N hops of this client"""
+    conn = get_db_connection()
+    try:
+        _require_client(conn, client_id)
+        return ownership_graph.network(conn, client_id, hops)
+    finally:
+        conn.close()
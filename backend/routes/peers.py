@@ -0,0 +1,33 @@
+"""
+GET /api/clients/{client_id}/peers: the most comparable clients and how the
+client measures up against them (see peer_index.py).
+
+The index is kept current by the background pipeline syncer; requests only
+read it.
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+
+from db import DB_PATH
+from peer_index import PeerIndex, peer_group_stats
+
+router = APIRouter()
+
+peer_index = PeerIndex(DB_PATH)
+
+
+@router.get("/api/clients/{client_id}/peers")
+def get_client_peers(client_id: str, k: int = Query(10, ge=1, le=100), same_industry: bool = False):
+    """Nearest clients by industry, size, risk, products and transaction profile"""
+    if peer_index.last_seq < 0:
+        peer_index.refresh()  # Asked for before the syncer's first round
+    peers = peer_index.peers(client_id, k, same_industry)
+    if peers is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    client = peer_index.profile(client_id)
+    return {
+        "clientId": client_id,
+        "k": k,
+        "peers": [{**profile.to_api(), "distance": round(distance, 4)} for profile, distance in peers],
+        "peerGroup": peer_group_stats(client, [profile for profile, _ in peers])
+    }
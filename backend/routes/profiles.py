@@ -0,0 +1,50 @@
+"""
+Admin access to request profiles (see profiling.py).
+
+    GET /api/admin/profiles                          recent profiles, newest first
+    GET /api/admin/profiles/{id}?format=speedscope   open in https://www.speedscope.app
+    GET /api/admin/profiles/{id}?format=collapsed    input for flamegraph.pl / inferno
+
+Every call needs the X-Profile-Token header; without a configured
+PROFILING_TOKEN the routes report 404.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+import profiling
+from admin_tokens import token_matches
+
+router = APIRouter()
+
+profile_store = profiling.ProfileStore()
+
+
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)):
+    if profiling.PROFILING_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled")
+    if not token_matches(x_profile_token, profiling.PROFILING_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get("/api/admin/profiles", dependencies=[Depends(require_profiling_token)])
+def list_profiles():
+    """Recent request profiles"""
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_profiling_token)])
+def get_profile(profile_id: str, format: str = Query("speedscope", pattern="^(speedscope|collapsed)$")):
+    """One profile as a speedscope document or collapsed stacks"""
+    document = profile_store.load(profile_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(profiling.to_collapsed(document), headers={
+            "Content-Disposition": f'attachment; filename="{profile_id}.collapsed.txt"'
+        })
+    return JSONResponse(document, headers={
+        "Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'
+    })
@@ -0,0 +1,67 @@
+"""
+Admin access to database snapshots (see snapshots.py).
+
+    POST /api/admin/snapshots?rate=50&vacuum=false   take a snapshot in the background (202)
+    GET  /api/admin/snapshots                        progress of the last run and published snapshots
+    GET  /api/admin/snapshots/latest                 manifest of the newest snapshot
+    GET  /api/admin/snapshots/{id}                   compressed snapshot file, for replicas to pull
+
+Every call needs the X-Snapshot-Token header; without a configured
+SNAPSHOT_TOKEN the routes report 404.
+"""
+
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse
+
+import snapshots
+from admin_tokens import token_matches
+from db import DB_PATH
+
+router = APIRouter()
+
+snapshot_runner = snapshots.SnapshotRunner(DB_PATH)
+
+
+def require_snapshot_token(x_snapshot_token: Optional[str] = Header(None)):
+    if snapshots.SNAPSHOT_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Snapshots are not enabled")
+    if not token_matches(x_snapshot_token, snapshots.SNAPSHOT_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid snapshot token")
+
+
+@router.post("/api/admin/snapshots", dependencies=[Depends(require_snapshot_token)])
+def create_snapshot(rate: float = Query(snapshots.DEFAULT_RATE_MB, ge=0),
+                    vacuum: bool = Query(False)):
+    """Start a throttled online snapshot; one runs at a time"""
+    if not snapshot_runner.start(rate or None, vacuum):
+        raise HTTPException(status_code=409, detail="A snapshot is already running")
+    return JSONResponse(snapshot_runner.status, status_code=202)
+
+
+@router.get("/api/admin/snapshots", dependencies=[Depends(require_snapshot_token)])
+def list_snapshots():
+    """Last run status and published snapshots, newest first"""
+    return {"current": snapshot_runner.status, "snapshots": snapshots.list_snapshots()}
+
+
+@router.get("/api/admin/snapshots/latest", dependencies=[Depends(require_snapshot_token)])
+def latest_snapshot():
+    """Manifest of the newest published snapshot"""
+    path = snapshots.SNAPSHOT_DIR / snapshots.LATEST_NAME
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="No snapshot published yet")
+    return json.loads(path.read_text())
+
+
+@router.get("/api/admin/snapshots/{snapshot_id}", dependencies=[Depends(require_snapshot_token)])
+def download_snapshot(snapshot_id: str):
+    """Compressed snapshot file; the manifest's sha256 comes along as a header"""
+    manifest = next((m for m in snapshots.list_snapshots() if m["id"] == snapshot_id), None)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return FileResponse(snapshots.SNAPSHOT_DIR / manifest["file"], filename=manifest["file"],
+                        media_type="application/octet-stream",
+                        headers={"X-Snapshot-Sha256": manifest["sha256"]})
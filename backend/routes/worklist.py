@@ -0,0 +1,42 @@
+"""
+GET /api/relationship-managers/{rm_id}/worklist: clients due or overdue for
+review, highest priority first (see review_worklist.py).
+
+?scope=region|market|metro widens the list from the RM's own book to the
+region, market or metro the RM belongs to.
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+
+import review_worklist
+from db import get_db_connection
+
+router = APIRouter()
+
+
+@router.get("/api/relationship-managers/{rm_id}/worklist")
+def get_rm_worklist(
+    rm_id: str,
+    scope: str = Query("rm", pattern="^(rm|region|market|metro)$"),
+    limit: int = Query(25, ge=1, le=200),
+    within_days: int = Query(0, ge=0, le=365)
+):
+    """Top-N review-due clients for an RM or one of its parent scopes"""
+    conn = get_db_connection()
+    try:
+        rm = conn.execute("""
+            SELECT rm.id, rm.region_id, g.market_id, mk.metro_id
+            FROM relationship_managers rm
+            LEFT JOIN regions g ON g.id = rm.region_id
+            LEFT JOIN markets mk ON mk.id = g.market_id
+            WHERE rm.id = ?
+        """, (rm_id,)).fetchone()
+        if rm is None:
+            raise HTTPException(status_code=404, detail="Relationship Manager not found")
+        scope_id = rm[list(review_worklist.SCOPES).index(scope)]
+        if scope_id is None:
+            raise HTTPException(status_code=404, detail=f"Relationship Manager has no {scope}")
+        items = review_worklist.top_due(conn, scope, scope_id, limit, within_days)
+    finally:
+        conn.close()
+    return {"scope": scope, "scopeId": scope_id, "withinDays": within_days, "items": items}
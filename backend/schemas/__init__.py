@@ -0,0 +1,3 @@
+"""Record shapes of API list items (encoded by models.dumps)"""
+
+from .transactions import TransactionItem
@@ -0,0 +1,28 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# Most sub-requests a single batch may carry
+MAX_BATCH_SIZE = 50
+
+
+class BatchItem(BaseModel):
+    """One sub-request: a GET of an /api path, query string included"""
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class BatchItemResult(BaseModel):
+    id: Optional[str] = None
+    path: str
+    status: int
+    body: object = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchItemResult]
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+# Rows one ingest request may carry; larger loads are split by the client
+MAX_INGEST_ROWS = 100_000
+
+
+class TransactionIn(BaseModel):
+    """One NDJSON line of POST /api/transactions:ingest"""
+    model_config = ConfigDict(extra="forbid", populate_by_name=True)
+
+    id: str = Field(..., min_length=1, max_length=64)
+    account_id: str = Field(..., alias="accountId", min_length=1)
+    transaction_date: datetime = Field(..., alias="transactionDate")
+    amount: float = Field(..., allow_inf_nan=False)
+    transaction_type: str = Field(..., alias="transactionType", min_length=1)
+    description: Optional[str] = None
+    counterparty: Optional[str] = None
+    channel: Optional[str] = None
+    location: Optional[str] = None
+    reference_number: Optional[str] = Field(None, alias="referenceNumber")
+    status: str = "Completed"
+
+
+class IngestAck(BaseModel):
+    """Returned once the batch is committed (durably) to the database"""
+    idempotency_key: Optional[str] = Field(None, serialization_alias="idempotencyKey")
+    received: int
+    inserted: int
+    duplicates: int
+    replayed: bool = False
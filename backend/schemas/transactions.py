@@ -0,0 +1,20 @@
+"""Transaction list items"""
+
+from typing import NamedTuple, Optional
+
+from models import register
+
+
+@register
+class TransactionItem(NamedTuple):
+    """One row of GET /api/clients/{id}/transactions"""
+
+    id: str
+    date: str
+    type: str
+    description: Optional[str]
+    account: str
+    accountId: str
+    amount: float
+    status: Optional[str]
+    riskFlag: Optional[str]
@@ -0,0 +1,64 @@
+"""
+Single-flight call coalescing.
+
+While a call for some key is running, identical calls wait for it and
+share its result (or its exception) instead of running again, so a burst
+of requests for one cold, expensive response costs one computation. Keys
+include the data version, so a call that starts after a write never
+shares a result computed before it.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+DEFAULT_TIMEOUT = 10.0  # Seconds a waiter gives the leader before giving up
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share it"""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "coalesced": 0, "errors": 0, "timeouts": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """fn()'s result, computed here or by the call already running for key
+
+        Waiters re-raise the leader's exception, and raise TimeoutError after
+        timeout seconds; the leader keeps running either way.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            try:
+                return call.result(timeout=self.timeout)
+            except TimeoutError:
+                self.stats["timeouts"] += 1
+                raise
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.stats["errors"] += 1
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
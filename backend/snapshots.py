@@ -0,0 +1,311 @@
+"""
+Online snapshots of the API database for backups and read replicas.
+
+create_snapshot() copies the live database with SQLite's online backup API,
+a few hundred pages per step, while the API keeps serving. The source
+connection holds one read transaction for the whole copy: in WAL mode that
+pins a consistent snapshot, so ingest commits neither wait for the copy nor
+restart it (without the transaction every commit elsewhere restarts the
+backup from page 1). Steps are paced to a byte rate so the copy only ever
+takes short slices of disk and CPU from request reads. VACUUM INTO is the
+alternative: one unthrottled statement that also compacts the copy.
+
+Each copy is checked (PRAGMA quick_check), switched out of WAL so it is one
+self-contained file, compressed (zstd when zstandard is installed, else
+gzip) and published as <id>.db.gz|.zst plus <id>.json with its SHA-256,
+sizes and the change_log position it includes; latest.json always names the
+newest snapshot. A replica runs install_snapshot() on a manifest: the file
+is verified against its checksum, decompressed and swapped in atomically.
+
+    python snapshots.py create [--rate 50] [--vacuum]
+    python snapshots.py list
+    python snapshots.py install <manifest.json> <target.db>
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd snapshots (gzip is always available)
+    zstandard = None
+
+SNAPSHOT_DIR = Path(os.environ.get("SNAPSHOT_DIR") or Path(__file__).parent / "snapshots")
+
+# Admin token for the snapshot routes; unset disables them
+SNAPSHOT_TOKEN = os.environ.get("SNAPSHOT_TOKEN") or None
+
+PAGES_PER_STEP = 256          # 1 MiB per backup step at the default 4 KiB page size
+DEFAULT_RATE_MB = 50.0        # Copy and compression throughput cap, MiB/s
+CHUNK_SIZE = 1024 * 1024
+KEEP_SNAPSHOTS = 5
+
+LATEST_NAME = "latest.json"
+
+EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+
+class SnapshotError(Exception):
+    """A snapshot failed its integrity check or does not match its manifest"""
+
+
+class _Throttle:
+    """Sleeps just enough to keep a running byte count under a rate"""
+
+    def __init__(self, rate_mb: Optional[float]):
+        self.rate = rate_mb * 1024 * 1024 if rate_mb else None
+        self.started = time.perf_counter()
+        self.done = 0
+
+    def wait(self, nbytes: int):
+        self.done += nbytes
+        if self.rate is None:
+            return
+        ahead = self.done / self.rate - (time.perf_counter() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def default_compression() -> str:
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def _open_compressed(path: Path, compression: str, mode: str):
+    if compression == "zstd":
+        if zstandard is None:
+            raise SnapshotError("zstandard is not installed")
+        raw = open(path, mode + "b")
+        if mode == "w":
+            return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return gzip.open(path, mode + "b", compresslevel=6)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path: Path, document: Dict[str, Any]):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(document, indent=2))
+    os.replace(tmp, path)
+
+
+def _backup(db_path: Path, target: Path, rate_mb: Optional[float], pages_per_step: int) -> int:
+    """Paced online backup of db_path into target; returns the change_log seq it includes"""
+    source = sqlite3.connect(db_path, isolation_level=None)
+    dest = sqlite3.connect(target)
+    try:
+        # One read transaction for the whole copy: a consistent snapshot that writers can't restart
+        source.execute("BEGIN")
+        seq = source.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+        page_size = source.execute("PRAGMA page_size").fetchone()[0]
+        throttle = _Throttle(rate_mb)
+        source.backup(dest, pages=pages_per_step,
+                      progress=lambda status, remaining, total: throttle.wait(pages_per_step * page_size))
+        source.execute("COMMIT")
+        return seq
+    finally:
+        dest.close()
+        source.close()
+
+
+def _vacuum_into(db_path: Path, target: Path) -> int:
+    """Compacted copy with VACUUM INTO (one statement, not throttled)"""
+    source = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        source.execute("BEGIN")
+        seq = source.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+        source.execute("COMMIT")
+        # VACUUM INTO runs in its own read transaction; commits in between are included, never torn
+        source.execute("VACUUM INTO ?", (str(target),))
+        return seq
+    finally:
+        source.close()
+
+
+def create_snapshot(db_path, out_dir: Path = SNAPSHOT_DIR, rate_mb: Optional[float] = DEFAULT_RATE_MB,
+                    vacuum: bool = False, compression: Optional[str] = None,
+                    pages_per_step: int = PAGES_PER_STEP, keep: int = KEEP_SNAPSHOTS) -> Dict[str, Any]:
+    """Copy, check, compress and publish a snapshot; returns its manifest"""
+    started = time.perf_counter()
+    compression = compression or default_compression()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    snapshot_id = "snapshot-" + datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    raw = out_dir / f"{snapshot_id}.db.partial"
+    packed = out_dir / f"{snapshot_id}.db.{EXTENSIONS[compression]}"
+    try:
+        if vacuum:
+            seq = _vacuum_into(Path(db_path), raw)
+        else:
+            seq = _backup(Path(db_path), raw, rate_mb, pages_per_step)
+        copied = time.perf_counter()
+
+        conn = sqlite3.connect(raw, isolation_level=None)
+        try:
+            result = conn.execute("PRAGMA quick_check").fetchone()[0]
+            if result != "ok":
+                raise SnapshotError(f"quick_check failed: {result}")
+            conn.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            conn.close()
+
+        raw_sha256 = _sha256(raw)
+        throttle = _Throttle(rate_mb)
+        with open(raw, "rb") as src, _open_compressed(packed.with_name(packed.name + ".partial"),
+                                                       compression, "w") as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                dst.write(chunk)
+                throttle.wait(len(chunk))
+        os.replace(packed.with_name(packed.name + ".partial"), packed)
+
+        manifest = {
+            "id": snapshot_id,
+            "file": packed.name,
+            "compression": compression,
+            "sha256": _sha256(packed),
+            "bytes": packed.stat().st_size,
+            "databaseSha256": raw_sha256,
+            "databaseBytes": raw.stat().st_size,
+            "changeLogSeq": seq,
+            "method": "vacuum" if vacuum else "backup",
+            "createdAt": datetime.now().isoformat(),
+            "copySeconds": round(copied - started, 3),
+            "totalSeconds": round(time.perf_counter() - started, 3)
+        }
+    finally:
+        raw.unlink(missing_ok=True)
+        packed.with_name(packed.name + ".partial").unlink(missing_ok=True)
+
+    _write_json_atomic(out_dir / f"{snapshot_id}.json", manifest)
+    # Written last: a replica following latest.json never sees a half-published snapshot
+    _write_json_atomic(out_dir / LATEST_NAME, manifest)
+    _prune(out_dir, keep)
+    return manifest
+
+
+def list_snapshots(out_dir: Path = SNAPSHOT_DIR) -> List[Dict[str, Any]]:
+    """Published snapshot manifests, newest first"""
+    manifests = []
+    for path in sorted(Path(out_dir).glob("snapshot-*.json"), reverse=True):
+        try:
+            manifests.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return manifests
+
+
+def _prune(out_dir: Path, keep: int):
+    for manifest in list_snapshots(out_dir)[keep:]:
+        (out_dir / manifest["file"]).unlink(missing_ok=True)
+        (out_dir / f"{manifest['id']}.json").unlink(missing_ok=True)
+
+
+def verify_snapshot(manifest: Dict[str, Any], path: Path):
+    """Raise SnapshotError unless the compressed file matches the manifest"""
+    if not path.exists():
+        raise SnapshotError(f"{path} is missing")
+    if path.stat().st_size != manifest["bytes"] or _sha256(path) != manifest["sha256"]:
+        raise SnapshotError(f"{path} does not match its manifest checksum")
+
+
+def install_snapshot(manifest_path, target) -> Dict[str, Any]:
+    """Verify a snapshot next to its manifest and atomically replace target with it"""
+    manifest_path = Path(manifest_path)
+    manifest = json.loads(manifest_path.read_text())
+    packed = manifest_path.parent / manifest["file"]
+    verify_snapshot(manifest, packed)
+
+    target = Path(target)
+    tmp = target.with_name(target.name + ".installing")
+    try:
+        with _open_compressed(packed, manifest["compression"], "r") as src, open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        if _sha256(tmp) != manifest["databaseSha256"]:
+            raise SnapshotError("Decompressed database does not match its manifest checksum")
+        # Stale WAL files of the old database must not be replayed onto the new one
+        for suffix in ("-wal", "-shm"):
+            Path(str(target) + suffix).unlink(missing_ok=True)
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return manifest
+
+
+class SnapshotRunner:
+    """Runs at most one snapshot at a time in a background thread (for the admin route)"""
+
+    def __init__(self, db_path, out_dir: Path = SNAPSHOT_DIR):
+        self.db_path = db_path
+        self.out_dir = out_dir
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.status: Dict[str, Any] = {"state": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, rate_mb: Optional[float], vacuum: bool) -> bool:
+        """Start a snapshot unless one is already running; returns whether it started"""
+        with self._lock:
+            if self.running:
+                return False
+            self.status = {"state": "running", "startedAt": datetime.now().isoformat(),
+                           "method": "vacuum" if vacuum else "backup", "rateMb": rate_mb}
+            self._thread = threading.Thread(target=self._run, args=(rate_mb, vacuum),
+                                            name="snapshot", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, rate_mb: Optional[float], vacuum: bool):
+        try:
+            manifest = create_snapshot(self.db_path, self.out_dir, rate_mb, vacuum)
+            self.status = {**self.status, "state": "done", "snapshot": manifest}
+        except Exception as e:
+            self.status = {**self.status, "state": "failed", "error": str(e)}
+
+
+if __name__ == "__main__":
+    from db import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Online snapshots of the API database")
+    parser.add_argument("--dir", type=Path, default=SNAPSHOT_DIR, help="Snapshot directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create_parser = commands.add_parser("create", help="Take a snapshot while the API keeps serving")
+    create_parser.add_argument("--rate", type=float, default=DEFAULT_RATE_MB,
+                               help="Throughput cap in MiB/s (0 = unthrottled)")
+    create_parser.add_argument("--vacuum", action="store_true", help="Use VACUUM INTO (compacts, not throttled)")
+    commands.add_parser("list", help="Show published snapshots")
+    install_parser = commands.add_parser("install", help="Verify a snapshot and install it as a database")
+    install_parser.add_argument("manifest", type=Path)
+    install_parser.add_argument("target", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "create":
+        manifest = create_snapshot(DB_PATH, args.dir, args.rate or None, args.vacuum)
+        print(f"Snapshot {manifest['file']}: {manifest['databaseBytes'] / 1024:.0f} KiB -> "
+              f"{manifest['bytes'] / 1024:.0f} KiB in {manifest['totalSeconds']}s (change_log seq "
+              f"{manifest['changeLogSeq']})")
+    elif args.command == "list":
+        for manifest in list_snapshots(args.dir):
+            print(f"{manifest['id']}  {manifest['bytes'] / 1024:.0f} KiB  seq {manifest['changeLogSeq']}  "
+                  f"{manifest['sha256'][:16]}")
+    else:
+        manifest = install_snapshot(args.manifest, args.target)
+        print(f"Installed {manifest['id']} into {args.target}")
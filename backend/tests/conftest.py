@@ -0,0 +1,115 @@
+"""
+Shared fixtures for the API tests.
+
+The app runs against a database built by init_database.py in a temporary
+directory (set through DATABASE_PATH before any backend module is imported),
+so tests can write freely. It is shared by the whole session: tests create their
+own clients and accounts with unique ids instead of relying on a clean
+database.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+_TMP_DIR = Path(tempfile.mkdtemp(prefix="client360-tests-"))
+TEST_DB_PATH = _TMP_DIR / "database.db"
+os.environ["DATABASE_PATH"] = str(TEST_DB_PATH)
+os.environ["HOT_SET_PATH"] = str(_TMP_DIR / "hot_set.json")
+os.environ["SNAPSHOT_DIR"] = str(_TMP_DIR / "snapshots")
+os.environ["WARMUP_BUDGET_SECONDS"] = "2"
+
+from init_database import init_database  # noqa: E402 - backend modules read DATABASE_PATH on import
+
+init_database(TEST_DB_PATH)
+
+SEED_CLIENT_ID = "client-001"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def app():
+    import app as app_module
+    return app_module
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+    with TestClient(app.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    """A write connection to the test database (autocommit)"""
+    conn = sqlite3.connect(TEST_DB_PATH, isolation_level=None, timeout=10)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+def unique_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:8]}"
+
+
+@pytest.fixture
+def make_client(db):
+    """Insert a copy of the seed client with a new id; keyword arguments override columns"""
+    def make(**columns) -> str:
+        row = dict(db.execute("SELECT * FROM clients WHERE id = ?", (SEED_CLIENT_ID,)).fetchone())
+        row["id"] = columns.pop("id", None) or unique_id("client")
+        for key, value in columns.items():
+            row[key] = json.dumps(value) if isinstance(value, (list, dict)) else value
+        db.execute(f"INSERT INTO clients ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+                   list(row.values()))
+        return row["id"]
+    return make
+
+
+@pytest.fixture
+def make_account(db):
+    """Insert an account for a client; returns its id"""
+    def make(client_id: str, **columns) -> str:
+        row = {"id": unique_id("acct"), "client_id": client_id, "account_number": uuid.uuid4().hex[:10],
+               "account_type": "Business Checking", "balance": 1000.0, "status": "Active", **columns}
+        db.execute(f"INSERT INTO accounts ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+                   list(row.values()))
+        return row["id"]
+    return make
+
+
+@pytest.fixture
+def sync_pipelines(app, client):
+    """Wait until the background syncer has folded in everything written so far"""
+    def sync():
+        assert app.pipeline_syncer.flush(timeout=10)
+    return sync
+
+
+def ndjson(rows) -> bytes:
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+
+@pytest.fixture
+def ingest(client):
+    """POST transactions to the ingest route; returns the response"""
+    def post(rows, idempotency_key=None):
+        headers = {"Content-Type": "application/x-ndjson"}
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        return client.post("/api/transactions:ingest", content=ndjson(rows), headers=headers)
+    return post
@@ -0,0 +1,18 @@
+def test_stored_accounts_are_returned(client, make_client, make_account):
+    client_id = make_client(name="Acme Holdings")
+    checking = make_account(client_id, balance=2500.0, available_balance=2000.0)
+    savings = make_account(client_id, account_type="Business Savings", account_number="SAV0001234")
+
+    accounts = client.get(f"/api/clients/{client_id}/accounts").json()
+    assert [a["id"] for a in accounts] == [checking, savings]
+    assert accounts[0]["name"] == "Business Checking - Acme Holdings"
+    assert (accounts[0]["balance"], accounts[0]["availableBalance"]) == (2500.0, 2000.0)
+    assert (accounts[1]["type"], accounts[1]["number"]) == ("Business Savings", "SAV0001234")
+
+
+def test_client_without_accounts_gets_generated_ones(client, make_client):
+    client_id = make_client(portfolio_value=5000000)
+
+    accounts = client.get(f"/api/clients/{client_id}/accounts").json()
+    assert 2 <= len(accounts) <= 4
+    assert client.get("/api/clients/missing/accounts").status_code == 404
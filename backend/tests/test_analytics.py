@@ -0,0 +1,81 @@
+import pytest
+
+from analytics_cube import current_month
+from conftest import unique_id
+
+
+def _cube(client, **params):
+    response = client.get("/api/analytics/cube", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _flag(db, client_id, flagged_date):
+    db.execute("INSERT INTO risk_flags (id, client_id, category, severity, flagged_date) VALUES (?, ?, ?, ?, ?)",
+               (unique_id("flag"), client_id, "Credit", "Medium", flagged_date))
+
+
+def test_current_month_matches_the_clients_table(client, db, make_client, sync_pipelines):
+    make_client(industry=unique_id("Industry"), portfolio_value=2.5e6, annual_revenue=4e6)
+    sync_pipelines()
+
+    body = _cube(client, dims="industry", measures="clients,portfolio_value,annual_revenue",
+                 filter=f"month:{current_month()}")
+    expected = {row[0]: row[1:] for row in db.execute("""
+        SELECT COALESCE(industry, '(none)'), COUNT(*), SUM(COALESCE(portfolio_value, 0)),
+               SUM(COALESCE(annual_revenue, 0))
+        FROM clients GROUP BY 1
+    """)}
+    assert body["dims"] == ["industry"]
+    assert body["measures"] == ["clients", "portfolioValue", "annualRevenue"]
+    assert {row["industry"]: (row["clients"], pytest.approx(row["portfolioValue"]), pytest.approx(row["annualRevenue"]))
+            for row in body["rows"]} == expected
+
+
+def test_updates_move_between_cells(client, db, make_client, sync_pipelines):
+    industry, other = unique_id("Industry"), unique_id("Industry")
+    ids = [make_client(industry=industry, portfolio_value=1e6) for _ in range(3)]
+    sync_pipelines()
+
+    db.execute("UPDATE clients SET industry = ?, portfolio_value = ? WHERE id = ?", (other, 5e6, ids[0]))
+    sync_pipelines()
+
+    body = _cube(client, dims="industry", measures="clients,portfolio_value", filter=f"industry:{industry}|{other}")
+    assert {row["industry"]: (row["clients"], row["portfolioValue"]) for row in body["rows"]} == {
+        industry: (2, 2e6), other: (1, 5e6)}
+
+
+def test_stock_measures_report_the_latest_month_and_flows_sum(client, db, make_client, sync_pipelines):
+    industry = unique_id("Industry")
+    ids = [make_client(industry=industry, portfolio_value=1e6) for _ in range(3)]
+    _flag(db, ids[0], "2024-01-15")
+    _flag(db, ids[0], "2024-02-03")
+    _flag(db, ids[1], "2024-02-20")
+    sync_pipelines()
+
+    by_month = _cube(client, dims="month", measures="clients,risk_flags", filter=f"industry:{industry}")
+    assert [(row["month"], row["clients"], row["riskFlags"]) for row in by_month["rows"]] == [
+        ("2024-01", 0, 1), ("2024-02", 0, 2), (current_month(), 3, 0)]
+
+    # Across months the client count is the latest month's, not a sum; risk flags add up
+    total = _cube(client, measures="clients,portfolio_value,risk_flags", filter=f"industry:{industry}")
+    assert total["asOf"] == current_month()
+    assert total["rows"] == [{"clients": 3, "portfolioValue": 3e6, "riskFlags": 3}]
+    assert total["rows"][0]["riskFlags"] == db.execute(
+        "SELECT COUNT(*) FROM risk_flags WHERE client_id IN (?, ?, ?)", ids).fetchone()[0]
+
+    ranged = _cube(client, measures="risk_flags", filter=f"industry:{industry},month:2024-02..")
+    assert ranged["rows"] == [{"riskFlags": 2}] and ranged["asOf"] is None
+
+
+@pytest.mark.parametrize("params", [
+    {"filter": "industry"},
+    {"filter": "industry:"},
+    {"filter": "sector:Retail"},
+    {"dims": "sector"},
+    {"measures": "revenue"},
+])
+def test_invalid_parameters_are_400(client, params):
+    response = client.get("/api/analytics/cube", params=params)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(("Invalid filter clause", "Unknown"))
@@ -0,0 +1,61 @@
+import sqlite3
+
+from conftest import TEST_DB_PATH
+from routes import batch
+
+
+def test_items_answer_like_direct_calls(client, make_client):
+    client_id = make_client(name="Batch Test Co")
+    response = client.post("/api/batch", json={"requests": [
+        {"id": "full", "path": f"/api/clients/{client_id}"},
+        {"id": "name", "path": f"/api/clients/{client_id}?fields=name"},
+        {"id": "missing", "path": "/api/clients/no-such-client"},
+        {"id": "post", "method": "POST", "path": f"/api/clients/{client_id}"},
+    ]})
+    assert response.status_code == 200
+    results = {item["id"]: item for item in response.json()["responses"]}
+    assert results["full"]["status"] == 200
+    assert results["full"]["body"] == client.get(f"/api/clients/{client_id}").json()
+    assert results["name"]["body"] == {"id": client_id, "name": "Batch Test Co"}
+    assert results["missing"]["status"] == 404
+    assert results["post"]["status"] == 405
+
+
+def test_items_read_one_snapshot_not_the_cache(client, db, make_client):
+    client_id = make_client(name="Before")
+    assert client.get(f"/api/clients/{client_id}?fields=name").json()["name"] == "Before"
+    db.execute("UPDATE clients SET name = 'After' WHERE id = ?", (client_id,))
+    response = client.post("/api/batch", json={"requests": [
+        {"path": f"/api/clients/{client_id}?fields=name"},
+        {"path": f"/api/clients?ids={client_id}&fields=name"},
+    ]})
+    first, second = response.json()["responses"]
+    assert first["body"]["name"] == "After"
+    assert second["body"]["items"] == [{"id": client_id, "name": "After"}]
+
+
+def test_a_write_during_the_batch_is_not_seen_by_later_items(client, make_client, monkeypatch):
+    client_id = make_client(name="Before")
+    dispatch = batch._dispatch
+
+    async def dispatch_then_write(request, path):
+        result = await dispatch(request, path)
+        # Commits on another connection after every item, the first one included
+        writer = sqlite3.connect(TEST_DB_PATH, isolation_level=None)
+        try:
+            writer.execute("UPDATE clients SET name = 'During' WHERE id = ?", (client_id,))
+        finally:
+            writer.close()
+        return result
+
+    monkeypatch.setattr(batch, "_dispatch", dispatch_then_write)
+    response = client.post("/api/batch", json={"requests": [
+        {"path": f"/api/clients/{client_id}?fields=name"},
+        {"path": f"/api/clients?ids={client_id}&fields=name"},
+        {"path": f"/api/clients/{client_id}?fields=id,name"},
+    ]})
+    first, second, third = response.json()["responses"]
+    assert first["body"]["name"] == "Before"
+    assert second["body"]["items"] == [{"id": client_id, "name": "Before"}]
+    assert third["body"] == {"id": client_id, "name": "Before"}
+    assert client.get(f"/api/clients/{client_id}?fields=name").json()["name"] == "During"
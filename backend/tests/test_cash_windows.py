@@ -0,0 +1,31 @@
+from conftest import unique_id
+
+
+def _cash(account_id, day, amount):
+    return {"id": unique_id("txn"), "accountId": account_id, "transactionDate": f"{day}T10:00:00",
+            "amount": amount, "transactionType": "Cash Deposit", "channel": "Branch"}
+
+
+def test_windows_and_candidate_event_follow_ingest(client, db, ingest, make_client, make_account, sync_pipelines):
+    client_id = make_client(conductors=[])
+    account_id = make_account(client_id)
+    # Each deposit stays under the threshold; together they cross it within three days
+    ack = ingest([_cash(account_id, "2024-03-01", 4000.0), _cash(account_id, "2024-03-02", 4000.0),
+                  _cash(account_id, "2024-03-03", 3000.0), _cash(account_id, "2024-03-10", 12000.0)])
+    assert ack.status_code == 200
+    sync_pipelines()
+
+    windows = client.get(f"/api/clients/{client_id}/cash-windows", params={"as_of": "2024-03-03"}).json()
+    by_days = {w["days"]: w for w in windows["windows"]}
+    assert (by_days[1]["amount"], by_days[3]["amount"], by_days[3]["transactions"]) == (3000.0, 11000.0, 3)
+    assert by_days[3]["underThresholdAmount"] == 11000.0
+
+    # The single reportable deposit counts towards the total but not the under-threshold amount
+    latest = client.get(f"/api/clients/{client_id}/cash-windows").json()
+    assert latest["asOf"] == "2024-03-10"
+    by_days = {w["days"]: w for w in latest["windows"]}
+    assert (by_days[3]["amount"], by_days[3]["underThresholdAmount"]) == (12000.0, 0.0)
+    assert (by_days[10]["amount"], by_days[10]["underThresholdAmount"]) == (23000.0, 11000.0)
+
+    events = db.execute("SELECT event_date, amount, status FROM utr_events WHERE client_id = ?", (client_id,)).fetchall()
+    assert [tuple(event) for event in events] == [("2024-03-03", 11000.0, "Candidate")]
@@ -0,0 +1,23 @@
+from conftest import unique_id
+
+
+def _payment(account_id, counterparty, amount):
+    return {"id": unique_id("txn"), "accountId": account_id, "transactionDate": "2024-03-01T10:00:00",
+            "amount": amount, "transactionType": "Wire Transfer", "counterparty": counterparty}
+
+
+def test_shared_counterparty_amount_counts_each_edge_once(client, ingest, make_client, make_account, sync_pipelines):
+    counterparty = unique_id("Acme Supply")
+    mine, other = make_client(), make_client()
+    mine_account, other_account = make_account(mine), make_account(other)
+    # This client both receives from and pays the counterparty; the other client only pays it
+    ingest([_payment(mine_account, counterparty, 100.0), _payment(mine_account, counterparty, -30.0),
+            _payment(other_account, counterparty, -50.0)])
+    sync_pipelines()
+
+    shared = client.get(f"/api/clients/{mine}/shared-counterparties").json()["clients"]
+    entry = next(e for e in shared if e["clientId"] == other)
+    assert entry["amount"] == 50.0
+    assert entry["sharedCount"] == 1
+    assert entry["counterparties"][0]["directions"] == ["in", "out"]
+    assert entry["counterparties"][0]["otherDirections"] == ["out"]
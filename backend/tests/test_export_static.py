@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import export_static
+from conftest import BACKEND_DIR, SEED_CLIENT_ID, TEST_DB_PATH
+
+
+@pytest.fixture
+def exported(tmp_path):
+    stats = export_static.export(tmp_path, workers=1)
+    return tmp_path / "api", stats
+
+
+def _seed_path(db):
+    return db.execute("""
+        SELECT mk.metro_id, g.market_id, rm.region_id, r.rm_id, r.id
+        FROM clients c
+        JOIN relationships r ON r.id = c.relationship_id
+        JOIN relationship_managers rm ON rm.id = r.rm_id
+        JOIN regions g ON g.id = rm.region_id
+        JOIN markets mk ON mk.id = g.market_id
+        WHERE c.id = ?
+    """, (SEED_CLIENT_ID,)).fetchone()
+
+
+def test_exported_files_are_the_api_bodies(client, db, exported):
+    api_dir, stats = exported
+    assert stats["changed"] == stats["entities"] > 0
+    path = _seed_path(db)
+    for url in (f"clients/{SEED_CLIENT_ID}",
+                f"relationship-managers/{path[3]}",
+                f"relationship-managers/{path[3]}/relationships",
+                f"relationships/{path[4]}/clients",
+                f"breadcrumb/{'/'.join(path)}"):
+        response = client.get(f"/api/{url}")
+        assert response.status_code == 200
+        assert (api_dir / url / "index.json").read_bytes() == response.content, url
+
+
+def test_second_run_only_renders_what_changed(tmp_path, db, exported, make_client):
+    api_dir, first = exported
+    client_file = api_dir / "clients" / SEED_CLIENT_ID / "index.json"
+    mtime = client_file.stat().st_mtime_ns
+
+    assert export_static.export(tmp_path, workers=1)["changed"] == 0
+
+    new_id = make_client()
+    again = export_static.export(tmp_path, workers=1)
+    # The new client plus its relationship's client list
+    assert (again["changed"], again["removed"]) == (2, 0)
+    assert (api_dir / "clients" / new_id / "index.json").exists()
+    assert client_file.stat().st_mtime_ns == mtime
+
+    db.execute("DELETE FROM clients WHERE id = ?", (new_id,))
+    last = export_static.export(tmp_path, workers=1)
+    assert (last["changed"], last["removed"]) == (1, 1)
+    assert not (api_dir / "clients" / new_id).exists()
+
+
+def test_rendering_does_not_build_the_app():
+    script = ("import sys, export_static; export_static._render('client/" + SEED_CLIENT_ID + "'); "
+              "print('app' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, capture_output=True, text=True,
+                            env={**os.environ, "DATABASE_PATH": str(TEST_DB_PATH)}, check=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,41 @@
+import time
+from datetime import datetime
+
+
+def _utc_now() -> str:
+    return datetime.utcnow().isoformat(timespec="milliseconds")
+
+
+def test_client_as_of_before_an_update(client, db, make_client):
+    client_id = make_client(name="Old Name")
+    time.sleep(0.01)
+    as_of = _utc_now()
+    time.sleep(0.01)
+    db.execute("UPDATE clients SET name = 'New Name', risk_score = 9 WHERE id = ?", (client_id,))
+
+    past = client.get(f"/api/clients/{client_id}", params={"as_of": as_of, "fields": "name"})
+    assert past.status_code == 200
+    assert past.json() == {"id": client_id, "name": "Old Name"}
+    assert client.get(f"/api/clients/{client_id}", params={"fields": "name"}).json()["name"] == "New Name"
+
+
+def test_history_lists_changes_after_as_of(client, db, make_client, make_account):
+    client_id = make_client(name="History Co")
+    time.sleep(0.01)
+    as_of = _utc_now()
+    time.sleep(0.01)
+    account_id = make_account(client_id)
+    db.execute("UPDATE clients SET name = 'History Co 2' WHERE id = ?", (client_id,))
+
+    history = client.get(f"/api/clients/{client_id}/history", params={"as_of": as_of}).json()
+    assert history["client"]["name"] == "History Co"
+    assert history["accounts"] == []
+    assert [(c["table"], c["op"]) for c in history["changes"]] == [("accounts", "INSERT"), ("clients", "UPDATE")]
+    assert history["changes"][0]["rowId"] == account_id
+    assert history["changes"][1]["fields"] == {"name": "History Co 2"}
+
+
+def test_client_not_yet_created_at_as_of(client, make_client):
+    client_id = make_client()
+    assert client.get(f"/api/clients/{client_id}", params={"as_of": "2000-01-01"}).status_code == 404
+    assert client.get(f"/api/clients/{client_id}", params={"as_of": "yesterday"}).status_code == 400
@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+from conftest import unique_id
+
+
+def _rows(account_id, count=3, prefix=None):
+    prefix = prefix or unique_id("txn")
+    return [{"id": f"{prefix}-{i}", "accountId": account_id, "transactionDate": "2024-03-01T10:00:00",
+             "amount": 100.0 + i, "transactionType": "Deposit"} for i in range(count)]
+
+
+def test_ack_after_commit(client, db, ingest, make_client, make_account):
+    account_id = make_account(make_client())
+    response = ingest(_rows(account_id))
+    assert response.status_code == 200
+    assert response.json() == {"idempotencyKey": None, "received": 3, "inserted": 3, "duplicates": 0,
+                               "replayed": False}
+    # Acknowledged means committed: another connection sees the rows
+    assert db.execute("SELECT COUNT(*) FROM transactions WHERE account_id = ?", (account_id,)).fetchone()[0] == 3
+
+
+def test_duplicate_ids_are_counted_not_overwritten(ingest, make_client, make_account):
+    rows = _rows(make_account(make_client()))
+    ingest(rows)
+    ack = ingest(rows + _rows(rows[0]["accountId"], 1)).json()
+    assert (ack["inserted"], ack["duplicates"]) == (1, 3)
+
+
+def test_idempotency_key_replays_the_original_ack(ingest, make_client, make_account):
+    rows = _rows(make_account(make_client()))
+    key = unique_id("key")
+    first = ingest(rows, key)
+    again = ingest(rows, key)
+    assert again.status_code == 200
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json() == {**first.json(), "replayed": True}
+
+
+def test_idempotency_key_with_other_payload_conflicts(ingest, make_client, make_account):
+    account_id = make_account(make_client())
+    key = unique_id("key")
+    ingest(_rows(account_id), key)
+    assert ingest(_rows(account_id), key).status_code == 409
+
+
+def test_invalid_lines_reject_the_whole_batch(db, ingest, make_client, make_account):
+    account_id = make_account(make_client())
+    rows = _rows(account_id) + [{"id": "bad", "accountId": account_id}]
+    response = ingest(rows)
+    assert response.status_code == 422
+    assert response.json()["detail"]["invalidLines"] == 1
+    assert db.execute("SELECT COUNT(*) FROM transactions WHERE account_id = ?", (account_id,)).fetchone()[0] == 0
+
+
+def test_unknown_accounts_are_reported_per_line(db, ingest, make_client, make_account):
+    account_id = make_account(make_client())
+    missing = unique_id("account")
+    rows = _rows(account_id, 2) + _rows(missing, 2)
+    response = ingest(rows)
+    assert response.status_code == 422
+    detail = response.json()["detail"]
+    assert detail["invalidLines"] == 2
+    assert [error["line"] for error in detail["errors"]] == [3, 4]
+    assert detail["errors"][0]["errors"][0]["loc"] == ["accountId"]
+    assert db.execute("SELECT COUNT(*) FROM transactions WHERE account_id IN (?, ?)",
+                      (account_id, missing)).fetchone()[0] == 0
+
+
+def test_failed_commit_is_a_503_json_error(app, ingest, make_client, make_account, monkeypatch):
+    writer = app.app.state.ingest_writer
+    failed = Future()
+    failed.set_exception(sqlite3.DatabaseError("Ingest commit failed"))
+    monkeypatch.setattr(writer, "submit", lambda *args: failed)
+    response = ingest(_rows(make_account(make_client())))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert "commit failed" in response.json()["detail"]
+
+
+def test_unacknowledged_batch_times_out_with_503(app, ingest, make_client, make_account, monkeypatch):
+    from routes import ingest as ingest_routes
+    writer = app.app.state.ingest_writer
+    monkeypatch.setattr(ingest_routes, "ACK_TIMEOUT_SECONDS", 0.1)
+    monkeypatch.setattr(writer, "submit", lambda *args: Future())  # A writer that never answers
+    response = ingest(_rows(make_account(make_client())))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_ack_does_not_wait_for_commit_listeners(app, ingest, make_client, make_account, monkeypatch):
+    from routes import ingest as ingest_routes
+    writer = app.app.state.ingest_writer
+    release = threading.Event()
+    monkeypatch.setattr(ingest_routes, "ACK_TIMEOUT_SECONDS", 5)
+    monkeypatch.setattr(writer, "on_commit", [lambda account_ids: release.wait(10)])
+    try:
+        assert ingest(_rows(make_account(make_client()))).status_code == 200
+    finally:
+        release.set()
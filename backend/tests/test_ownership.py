@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import unique_id
+
+NO_PARTIES = {"beneficial_owners": [], "authorized_signers": [], "conductors": [], "related_entities": []}
+
+
+@pytest.fixture
+def chain(client, sync_pipelines):
+    """Ultimate owners of a client as (name, effective ownership, paths), once the party index caught up"""
+    def get(client_id):
+        sync_pipelines()
+        owners = client.get(f"/api/clients/{client_id}/ownership-chain").json()["ultimateOwners"]
+        return [(owner["name"], owner["effectiveOwnership"], owner["paths"]) for owner in owners]
+    return get
+
+
+def test_holding_client_without_holders_is_the_ultimate_owner(chain, make_client):
+    parent_name = unique_id("Holdco")
+    parent = make_client(name=parent_name, **NO_PARTIES)
+    child = make_client(**{**NO_PARTIES, "related_entities": [
+        {"name": parent_name, "relationship": "Parent Company", "ownership": "100%"}]})
+
+    assert chain(child) == [(parent_name, 100.0, [[child, parent]])]
+
+
+def test_ownership_is_traced_through_a_holding_client(chain, make_client):
+    person = unique_id("Person")
+    parent_name = unique_id("Holdco")
+    parent = make_client(name=parent_name, **{**NO_PARTIES, "beneficial_owners": [
+        {"name": person, "role": "Owner", "ownership": "80%"}]})
+    child = make_client(**{**NO_PARTIES, "related_entities": [
+        {"name": parent_name, "relationship": "Parent Company", "ownership": "50%"}]})
+
+    assert chain(child) == [(person, 40.0, [[child, parent, person]])]
+
+
+def test_parent_is_not_counted_on_top_of_declared_owners(chain, make_client):
+    owners = [unique_id("Owner"), unique_id("Owner")]
+    parties = {
+        "beneficial_owners": [{"name": owners[0], "role": "CEO", "ownership": "60%"},
+                              {"name": owners[1], "role": "Trust", "ownership": "40%"}],
+        "related_entities": [{"name": unique_id("Parent"), "relationship": "Parent Company", "ownership": "100%"}]
+    }
+    child = make_client(**{**NO_PARTIES, **parties})
+
+    chain = chain(child)
+    assert [name for name, _, _ in chain] == owners
+    assert sum(share for _, share, _ in chain) == 100.0
+
+
+def test_parent_without_a_percentage_is_not_assumed_to_own_everything(chain, make_client):
+    child = make_client(**{**NO_PARTIES, "related_entities": [
+        {"name": unique_id("Parent"), "relationship": "Parent Company"}]})
+
+    assert chain(child) == []
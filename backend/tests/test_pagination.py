@@ -0,0 +1,44 @@
+from conftest import unique_id
+
+
+def _walk(client, url, limit):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["items"]) <= limit
+        ids.extend(item["id"] for item in body["items"])
+        cursor = body["nextCursor"]
+        if cursor is None:
+            return ids
+
+
+def test_pages_follow_the_name_order_to_the_end(client, db, make_client):
+    rm_id, relationship_id = unique_id("rm"), unique_id("rel")
+    db.execute("INSERT INTO relationship_managers (id, name, region_id) VALUES (?, 'Paged RM', 'none')", (rm_id,))
+    # Duplicate names: the id breaks the tie, so no row is skipped or repeated at a page boundary
+    names = ["Delta", "Alpha", "Charlie", "Alpha", "Bravo"]
+    relationship_ids = []
+    for i, name in enumerate(names):
+        rel = relationship_id if i == 0 else unique_id("rel")
+        db.execute("INSERT INTO relationships (id, rm_id, name) VALUES (?, ?, ?)", (rel, rm_id, name))
+        relationship_ids.append(rel)
+    client_ids = [make_client(relationship_id=relationship_id, name=name) for name in names]
+
+    expected = [row[0] for row in db.execute(
+        "SELECT id FROM relationships WHERE rm_id = ? ORDER BY name, id", (rm_id,))]
+    assert sorted(expected) == sorted(relationship_ids)
+    assert _walk(client, f"/api/relationship-managers/{rm_id}/relationships", 2) == expected
+
+    expected = [row[0] for row in db.execute(
+        "SELECT id FROM clients WHERE relationship_id = ? ORDER BY name, id", (relationship_id,))]
+    assert sorted(expected) == sorted(client_ids)
+    assert _walk(client, f"/api/relationships/{relationship_id}/clients", 2) == expected
+
+
+def test_a_cursor_we_did_not_issue_is_400(client):
+    response = client.get(f"/api/relationships/{unique_id('rel')}/clients", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
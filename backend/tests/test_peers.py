@@ -0,0 +1,45 @@
+import pytest
+
+from conftest import unique_id
+
+
+@pytest.fixture
+def industry(make_client, sync_pipelines):
+    """Twelve clients alone in a new industry, portfolios 1M..12M, once the syncer indexed them"""
+    name = unique_id("Industry")
+    ids = [make_client(industry=name, portfolio_value=1e6 * n) for n in range(1, 13)]
+    sync_pipelines()
+    return ids
+
+
+def _peer_ids(client, client_id, k=3):
+    response = client.get(f"/api/clients/{client_id}/peers", params={"k": k, "same_industry": True})
+    assert response.status_code == 200
+    return [peer["id"] for peer in response.json()["peers"]]
+
+
+def test_nearest_peers_are_the_closest_portfolios(client, industry):
+    assert _peer_ids(client, industry[0]) == industry[1:4]
+    # The middle client's nearest are its neighbours on either side, nearer first
+    assert set(_peer_ids(client, industry[5], k=2)) == {industry[4], industry[6]}
+
+    body = client.get(f"/api/clients/{industry[0]}/peers", params={"k": 3, "same_industry": True}).json()
+    assert body["peerGroup"]["portfolioValue"]["median"] == 3e6
+    assert body["peerGroup"]["portfolioValue"]["percentile"] == 0.0
+
+
+def test_a_client_write_is_applied_incrementally(app, client, db, industry, sync_pipelines):
+    from routes.peers import peer_index
+    rebuilds, updates = peer_index.stats["rebuilds"], peer_index.stats["updates"]
+
+    db.execute("UPDATE clients SET portfolio_value = ? WHERE id = ?", (1.05e6, industry[-1]))
+    sync_pipelines()
+
+    # The syncer re-read the one client; the request neither refreshes nor rebuilds
+    assert peer_index.stats["updates"] == updates + 1
+    assert _peer_ids(client, industry[0], k=1) == [industry[-1]]
+    assert peer_index.stats["rebuilds"] == rebuilds
+
+
+def test_unknown_client_is_404(client):
+    assert client.get("/api/clients/no-such-client/peers").status_code == 404
@@ -0,0 +1,31 @@
+import time
+
+
+def _max_seq(db):
+    return db.execute("SELECT MAX(seq) FROM change_log").fetchone()[0]
+
+
+def test_change_log_is_pruned_once_every_reader_is_past_it(app, db, make_client, sync_pipelines):
+    make_client()
+    make_client()
+    newest = _max_seq(db)
+
+    deadline = time.monotonic() + 10
+    while app.change_notifier.last_seq < newest:
+        assert time.monotonic() < deadline, "change feed did not catch up"
+        time.sleep(0.05)
+    sync_pipelines()
+    sync_pipelines()  # The pipelines may have been mid-round when the notifier caught up
+
+    assert db.execute("SELECT MIN(seq) FROM change_log").fetchone()[0] == newest
+    assert _max_seq(db) == newest
+
+
+def test_change_log_is_kept_until_the_change_feed_has_read_it(app, db, make_client):
+    from pipeline import prune_change_log
+
+    make_client()
+    before = db.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+    # A reader at seq 0 holds back everything
+    assert prune_change_log(app.DB_PATH, app.CHANGE_LOG_PIPELINES, keep_after=0) == 0
+    assert db.execute("SELECT COUNT(*) FROM change_log").fetchone()[0] == before
@@ -0,0 +1,71 @@
+import time
+from urllib.parse import quote
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+TOKEN = "profile-secret"
+
+
+def test_middleware_is_not_installed_without_a_token(app, client):
+    from profiling import ProfilingMiddleware
+    assert app.PROFILING_TOKEN is None
+    assert all(middleware.cls is not ProfilingMiddleware for middleware in app.app.user_middleware)
+    assert client.get("/api/admin/profiles").status_code == 404
+
+
+@pytest.fixture
+def profiled(monkeypatch, tmp_path):
+    """A small app behind ProfilingMiddleware with the admin routes, storing profiles in tmp_path"""
+    import profiling
+    from routes import profiles
+
+    store = profiling.ProfileStore(tmp_path)
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", TOKEN)
+    monkeypatch.setattr(profiles, "profile_store", store)
+
+    api = FastAPI()
+    api.include_router(profiles.router)
+
+    @api.get("/busy")
+    async def busy():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return {"ok": True}
+
+    api.add_middleware(profiling.ProfilingMiddleware, store=store)
+    with TestClient(api) as test_client:
+        yield test_client
+
+
+def test_non_ascii_tokens_are_rejected_not_errors(profiled):
+    response = profiled.get("/busy", headers={"X-Profile-Token": "sécret".encode("utf-8")})
+    assert response.status_code == 200 and "x-profile-id" not in response.headers
+    response = profiled.get(f"/busy?profile={quote('sécret')}")
+    assert response.status_code == 200 and "x-profile-id" not in response.headers
+    response = profiled.get("/api/admin/profiles", headers={"X-Profile-Token": "sécret".encode("utf-8")})
+    assert response.status_code == 403
+
+
+def test_token_request_is_stored_as_speedscope(profiled):
+    response = profiled.get(f"/busy?x=1&profile={TOKEN}", headers={"X-Profile-Token": TOKEN})
+    profile_id = response.headers["x-profile-id"]
+    admin = {"X-Profile-Token": TOKEN}
+
+    listed = profiled.get("/api/admin/profiles", headers=admin).json()["profiles"]
+    assert [(p["id"], p["name"], p["trigger"]) for p in listed] == [(profile_id, "GET /busy?x=1", "header")]
+
+    document = profiled.get(f"/api/admin/profiles/{profile_id}", headers=admin).json()
+    assert document["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+    frames = document["shared"]["frames"]
+    sampled = document["profiles"][0]
+    assert sampled["name"] == "event-loop" and sampled["samples"]
+    assert len(sampled["samples"]) == len(sampled["weights"])
+    assert all(0 <= i < len(frames) for stack in sampled["samples"] for i in stack)
+    assert any(frame["name"].endswith(".busy") for frame in frames)
+
+    collapsed = profiled.get(f"/api/admin/profiles/{profile_id}", params={"format": "collapsed"}, headers=admin).text
+    assert all(line.startswith("event-loop;") for line in collapsed.splitlines())
+    assert ".busy (test_profiling.py:" in collapsed
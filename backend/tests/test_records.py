@@ -0,0 +1,35 @@
+import json
+
+from models import dumps, record_class, to_camel_case
+
+
+def _as_dict(record):
+    return {to_camel_case(name): value for name, value in zip(type(record)._fields, record)}
+
+
+def test_dumps_matches_json_dumps_of_the_same_dicts():
+    Row = record_class(["id", "display_name", "balance", "is_active", "closed_at"])
+    rows = [Row("a-1", "Ünïcode \"quoted\"", 12.5, True, None), Row("a-2", "Plain", -3, False, "2024-01-01")]
+    payload = {
+        "items": rows,
+        "first": rows[0],
+        "mixed": [None, "text", 1.5, rows[1]],
+        "nested": {"page": {"rows": rows, "cursor": None}},
+        "plain": [1, {"a": [2, 3]}],
+        7: "numeric key",
+    }
+    as_dicts = {
+        "items": [_as_dict(row) for row in rows],
+        "first": _as_dict(rows[0]),
+        "mixed": [None, "text", 1.5, _as_dict(rows[1])],
+        "nested": {"page": {"rows": [_as_dict(row) for row in rows], "cursor": None}},
+        "plain": [1, {"a": [2, 3]}],
+        7: "numeric key",
+    }
+    assert dumps(payload) == json.dumps(as_dicts, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def test_a_record_after_the_first_element_is_an_object():
+    Row = record_class(["id", "amount"])
+    assert json.loads(dumps([{"id": "x"}, Row("y", 2.0)])) == [{"id": "x"}, {"id": "y", "amount": 2.0}]
+    assert json.loads(dumps([])) == []
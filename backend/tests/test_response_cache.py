@@ -0,0 +1,62 @@
+import threading
+import time
+
+from starlette.requests import Request
+
+from response_cache import ResponseCache
+
+
+def test_write_between_two_gets(app, client, db, make_client):
+    client_id = make_client(name="Cached Name")
+    assert client.get(f"/api/clients/{client_id}").json()["name"] == "Cached Name"
+    hits = app.response_cache.stats["hits"]
+    assert client.get(f"/api/clients/{client_id}").json()["name"] == "Cached Name"
+    assert app.response_cache.stats["hits"] == hits + 1
+
+    db.execute("UPDATE clients SET name = 'Renamed' WHERE id = ?", (client_id,))
+    assert client.get(f"/api/clients/{client_id}").json()["name"] == "Renamed"
+
+
+def test_write_invalidates_prefilled_entry(app, client, db, make_client):
+    client_id = make_client(name="Prefilled")
+    app.warm_client(client_id)
+    assert client.get(f"/api/clients/{client_id}").json()["name"] == "Prefilled"
+
+    db.execute("UPDATE clients SET name = 'Prefilled 2' WHERE id = ?", (client_id,))
+    assert client.get(f"/api/clients/{client_id}").json()["name"] == "Prefilled 2"
+
+
+def test_as_of_today_sees_later_writes(app, client, db, make_client):
+    client_id = make_client(name="Morning")
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    assert client.get(f"/api/clients/{client_id}", params={"as_of": today}).json()["name"] == "Morning"
+
+    db.execute("UPDATE clients SET name = 'Afternoon' WHERE id = ?", (client_id,))
+    assert client.get(f"/api/clients/{client_id}", params={"as_of": today}).json()["name"] == "Afternoon"
+
+
+def _request(path: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []})
+
+
+def test_concurrent_misses_share_one_build_per_version():
+    version = [1]
+    builds = []
+    cache = ResponseCache(data_version=lambda: version[0])
+
+    def build():
+        builds.append(version[0])
+        time.sleep(0.05)
+        return {"version": version[0]}
+
+    threads = [threading.Thread(target=cache.respond, args=(_request("/x"), build)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert builds == [1]
+
+    version[0] = 2
+    assert cache.respond(_request("/x"), build).body == b'{"version":2}'
+    assert cache.respond(_request("/x"), build).body == b'{"version":2}'
+    assert builds == [1, 2]
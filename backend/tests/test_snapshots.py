@@ -0,0 +1,120 @@
+import gzip
+import sqlite3
+import time
+
+import pytest
+
+import snapshots
+from conftest import TEST_DB_PATH, unique_id
+
+TOKEN = "snapshot-secret"
+
+
+def _client_names(path):
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT id, name FROM clients"))
+    finally:
+        conn.close()
+
+
+def test_snapshot_installs_as_an_identical_database(tmp_path, make_client):
+    client_id = make_client(name="Snapshot Co")
+    manifest = snapshots.create_snapshot(TEST_DB_PATH, tmp_path, rate_mb=None, compression="gzip")
+
+    assert manifest["file"].endswith(".db.gz") and manifest["method"] == "backup"
+    assert snapshots.list_snapshots(tmp_path) == [manifest]
+    assert (tmp_path / snapshots.LATEST_NAME).read_text() == (tmp_path / f"{manifest['id']}.json").read_text()
+
+    target = tmp_path / "replica.db"
+    snapshots.install_snapshot(tmp_path / f"{manifest['id']}.json", target)
+    installed = _client_names(target)
+    assert installed[client_id] == "Snapshot Co"
+    assert installed == _client_names(TEST_DB_PATH)
+    conn = sqlite3.connect(target)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    conn.close()
+
+
+def test_checksum_mismatch_leaves_the_target_alone(tmp_path):
+    manifest = snapshots.create_snapshot(TEST_DB_PATH, tmp_path, rate_mb=None, compression="gzip")
+    packed = tmp_path / manifest["file"]
+    target = tmp_path / "replica.db"
+    target.write_bytes(b"current database")
+
+    # Same size, different bytes
+    data = bytearray(packed.read_bytes())
+    data[-1] ^= 0xFF
+    packed.write_bytes(bytes(data))
+    with pytest.raises(snapshots.SnapshotError, match="checksum"):
+        snapshots.install_snapshot(tmp_path / f"{manifest['id']}.json", target)
+
+    # A valid archive of the wrong database
+    packed.write_bytes(gzip.compress(b"not the snapshot"))
+    manifest_path = tmp_path / f"{manifest['id']}.json"
+    snapshots._write_json_atomic(manifest_path, {**manifest, "bytes": packed.stat().st_size,
+                                                 "sha256": snapshots._sha256(packed)})
+    with pytest.raises(snapshots.SnapshotError, match="Decompressed"):
+        snapshots.install_snapshot(manifest_path, target)
+
+    assert target.read_bytes() == b"current database"
+    assert not target.with_name("replica.db.installing").exists()
+
+
+def test_install_drops_the_old_databases_wal(tmp_path):
+    manifest = snapshots.create_snapshot(TEST_DB_PATH, tmp_path, rate_mb=None, compression="gzip")
+
+    # A replica in WAL mode with a commit still only in its -wal file
+    target = tmp_path / "replica.db"
+    snapshots.install_snapshot(tmp_path / f"{manifest['id']}.json", target)
+    writer = sqlite3.connect(target, isolation_level=None)
+    writer.execute("PRAGMA journal_mode = WAL")
+    writer.execute("PRAGMA wal_autocheckpoint = 0")
+    writer.execute("UPDATE clients SET name = 'Stale' WHERE id = 'client-001'")
+    assert target.with_name("replica.db-wal").stat().st_size > 0
+
+    snapshots.install_snapshot(tmp_path / f"{manifest['id']}.json", target)
+    writer.close()
+    assert not target.with_name("replica.db-wal").exists()
+    assert _client_names(target)["client-001"] != "Stale"
+
+
+@pytest.fixture
+def admin(monkeypatch, client):
+    monkeypatch.setattr(snapshots, "SNAPSHOT_TOKEN", TOKEN)
+    return client
+
+
+def test_routes_are_404_without_a_token(client):
+    assert snapshots.SNAPSHOT_TOKEN is None
+    assert client.get("/api/admin/snapshots", headers={"X-Snapshot-Token": TOKEN}).status_code == 404
+
+
+def test_routes_reject_wrong_and_non_ascii_tokens(admin):
+    assert admin.get("/api/admin/snapshots").status_code == 403
+    assert admin.get("/api/admin/snapshots", headers={"X-Snapshot-Token": "wrong"}).status_code == 403
+    headers = {"X-Snapshot-Token": "sécret".encode("utf-8")}
+    assert admin.get("/api/admin/snapshots", headers=headers).status_code == 403
+
+
+def test_admin_snapshot_round_trip(admin):
+    from routes.snapshots import snapshot_runner
+    headers = {"X-Snapshot-Token": TOKEN}
+
+    response = admin.post("/api/admin/snapshots", params={"rate": 0}, headers=headers)
+    assert response.status_code == 202 and response.json()["state"] == "running"
+    deadline = time.monotonic() + 10
+    while snapshot_runner.running and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert snapshot_runner.status["state"] == "done"
+    manifest = snapshot_runner.status["snapshot"]
+
+    listed = admin.get("/api/admin/snapshots", headers=headers).json()
+    assert listed["snapshots"][0] == manifest
+    assert admin.get("/api/admin/snapshots/latest", headers=headers).json() == manifest
+
+    download = admin.get(f"/api/admin/snapshots/{manifest['id']}", headers=headers)
+    assert download.status_code == 200
+    assert download.headers["x-snapshot-sha256"] == manifest["sha256"]
+    assert len(download.content) == manifest["bytes"]
+    assert admin.get(f"/api/admin/snapshots/{unique_id('snapshot')}", headers=headers).status_code == 404
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from conftest import unique_id
+
+
+def _txn(account_id, day, amount, **columns):
+    return {"id": unique_id("txn"), "accountId": account_id, "transactionDate": f"{day}T10:00:00",
+            "amount": amount, "transactionType": "Wire Transfer", **columns}
+
+
+def _risk_flags(client, client_id):
+    page = client.get(f"/api/clients/{client_id}/transactions").json()
+    return {t["id"]: t["riskFlag"] for t in page["transactions"]}
+
+
+def test_structuring_hit_is_the_transactions_risk_flag(client, db, ingest, make_client, make_account,
+                                                       sync_pipelines):
+    client_id = make_client()
+    account_id = make_account(client_id)
+    day = (date.today() - timedelta(days=2)).isoformat()
+    # Two cash deposits just under the reporting threshold on the same day; the second one is the hit
+    first, second = (_txn(account_id, day, 9500.0, transactionType="Cash Deposit", channel="Branch")
+                     for _ in range(2))
+    other = _txn(account_id, day, 250.0)
+    assert ingest([first, other, second]).status_code == 200
+    sync_pipelines()
+
+    assert _risk_flags(client, client_id) == {first["id"]: None, other["id"]: None, second["id"]: "Structuring"}
+    flag = db.execute("SELECT category, severity, created_by FROM risk_flags WHERE id = ?",
+                      (f"rf_auto_{client_id}_STR",)).fetchone()
+    assert tuple(flag) == ("Structuring", "High", "Anomaly Detector")
+
+
+def test_state_carries_across_syncs(client, db, ingest, make_client, make_account, sync_pipelines):
+    client_id = make_client()
+    account_id = make_account(client_id)
+    start = date.today() - timedelta(days=30)
+    history = [_txn(account_id, (start + timedelta(days=i)).isoformat(), 1000.0 + i, counterparty="Acme Supply")
+               for i in range(20)]
+    assert ingest(history).status_code == 200
+    sync_pipelines()
+    assert db.execute("SELECT txn_count FROM account_detector_state WHERE account_id = ?",
+                      (account_id,)).fetchone()[0] == 20
+
+    # Established by the earlier batch: a large payment to someone new hits two rules at once
+    outlier = _txn(account_id, date.today().isoformat(), 250000.0, counterparty="Unknown Holdings")
+    assert ingest([outlier]).status_code == 200
+    sync_pipelines()
+
+    flags = _risk_flags(client, client_id)
+    assert flags[outlier["id"]] == "Unusual Amount, New Counterparty"
+    assert all(flags[txn["id"]] is None for txn in history)
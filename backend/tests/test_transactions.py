@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from conftest import unique_id
+
+
+def _txn(account_id, day):
+    return {"id": unique_id("txn"), "accountId": account_id, "transactionDate": f"{day}T10:00:00",
+            "amount": 100.0, "transactionType": "Wire Transfer"}
+
+
+def test_default_range_is_the_hot_window_and_reports_older_rows(client, ingest, make_client, make_account):
+    client_id = make_client()
+    account_id = make_account(client_id)
+    recent = (date.today() - timedelta(days=1)).isoformat()
+    ingest([_txn(account_id, recent), _txn(account_id, "2020-01-15")])
+
+    page = client.get(f"/api/clients/{client_id}/transactions").json()
+    assert (page["total"], page["hasOlder"]) == (1, True)
+    assert [t["date"] for t in page["transactions"]] == [recent]
+    assert page["windowStart"] > "2020-01-15"
+
+    # Older history is paged into with start_date
+    page = client.get(f"/api/clients/{client_id}/transactions", params={"start_date": "2020-01-01"}).json()
+    assert (page["total"], page["hasOlder"]) == (2, False)
+    assert [t["date"] for t in page["transactions"]] == [recent, "2020-01-15"]
+
+
+def test_client_with_only_old_transactions_gets_no_mocks(client, ingest, make_client, make_account):
+    client_id = make_client()
+    account_id = make_account(client_id)
+    txn = _txn(account_id, "2019-06-01")
+    ingest([txn])
+
+    page = client.get(f"/api/clients/{client_id}/transactions").json()
+    assert (page["transactions"], page["hasOlder"]) == ([], True)
+    page = client.get(f"/api/clients/{client_id}/transactions", params={"start_date": "2019-01-01"}).json()
+    assert [t["id"] for t in page["transactions"]] == [txn["id"]]
+
+
+def test_default_range_is_served_from_the_cache(app, client, ingest, make_client, make_account):
+    client_id = make_client()
+    account_id = make_account(client_id)
+    ingest([_txn(account_id, "2018-03-01")])
+
+    client.get(f"/api/clients/{client_id}/transactions")
+    hits = app.hot_windows.stats["hits"]
+    client.get(f"/api/clients/{client_id}/transactions")
+    assert app.hot_windows.stats["hits"] == hits + 1
+
+
+def test_client_without_transactions_gets_mocks(client, make_client):
+    page = client.get(f"/api/clients/{make_client()}/transactions").json()
+    assert page["total"] > 0 and page["hasOlder"] is False
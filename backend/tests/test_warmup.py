@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import time
+from collections import Counter
+
+import warmup
+from conftest import SEED_CLIENT_ID, TEST_DB_PATH, unique_id
+
+# Counts to a hundred million: far longer than any warm-up budget here
+SLOW_QUERY = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) "
+              "SELECT COUNT(*) FROM n WHERE ? IS NOT NULL")
+
+
+def test_ready_after_the_startup_warmup(app, client):
+    assert app.warmup.wait(10)
+    response = client.get("/api/ready")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["state"] == "ready" and not report["timedOut"]
+    assert report["warmed"]["clientBundles"] > 0 and report["warmed"]["rmPages"] > 0
+    assert client.get("/api/health").status_code == 200
+
+
+def test_not_ready_while_warming(app, client, monkeypatch):
+    pending = warmup.Warmup(TEST_DB_PATH)
+    monkeypatch.setattr(app, "warmup", pending)
+    response = client.get("/api/ready")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json() == {"state": "pending"}
+
+
+def test_budget_interrupts_a_running_statement(monkeypatch):
+    monkeypatch.setattr(warmup, "TOUCH_QUERIES", (SLOW_QUERY,))
+    calls = []
+    run = warmup.Warmup(TEST_DB_PATH, budget_seconds=0.3, size=3)
+    run.add_step("later", "clients", calls.append)
+
+    started = time.monotonic()
+    report = run.run()
+    assert time.monotonic() - started < 5
+    assert run.ready and report["state"] == "ready" and report["timedOut"]
+    assert report["warmed"]["indexPages"] == 0
+    # Past the deadline the remaining steps are skipped, not run
+    assert report["warmed"]["later"] == 0 and calls == []
+    assert "error" not in report
+
+
+def test_failing_steps_are_counted_not_fatal():
+    def broken(ident):
+        raise KeyError(ident)
+
+    run = warmup.Warmup(TEST_DB_PATH, budget_seconds=5, size=2)
+    run.add_step("broken", "rms", broken)
+    report = run.run()
+    assert not report["timedOut"]
+    assert report["warmed"] == {"indexPages": report["hotSet"]["clients"], "broken": 0}
+    assert report["errors"] == report["hotSet"]["rms"] > 0
+
+
+def test_saved_hot_set_merges_with_the_previous_one(tmp_path):
+    path = tmp_path / "hot_set.json"
+    warmup.save_hot_set({"clients": Counter(a=4, b=3), "rms": Counter(r=1)}, path, size=2)
+    document = warmup.save_hot_set({"clients": Counter(c=2, b=1)}, path, size=2)
+
+    # Previous counts are halved: b = 1.5 + 1, c = 2, a = 2.0 loses the tie on insertion order
+    assert document["counts"]["clients"] == {"b": 2.5, "a": 2.0}
+    assert document["counts"]["rms"] == {"r": 0.5}
+    assert json.loads(path.read_text()) == document
+
+
+def test_hot_set_is_configured_then_recorded_then_largest(tmp_path, monkeypatch):
+    path = tmp_path / "hot_set.json"
+    path.write_text(json.dumps({"counts": {"clients": {"recorded-1": 1, "recorded-2": 5}}}))
+    monkeypatch.setitem(warmup.CONFIGURED, "clients", ["configured"])
+    conn = sqlite3.connect(TEST_DB_PATH)
+    try:
+        largest = {kind: [row[0] for row in conn.execute(sql, (5,))]
+                   for kind, sql in warmup.DEFAULT_HOT_SET_SQL.items()}
+        hot_set = warmup.resolve_hot_set(conn, size=5, path=path)
+    finally:
+        conn.close()
+    assert hot_set["clients"] == ["configured", "recorded-2", "recorded-1"] + largest["clients"][:2]
+    assert hot_set["rms"] == largest["rms"]
+
+
+class _Worker:
+    """Stands in for a background worker: start and stop do nothing"""
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class _AsyncWorker:
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+def test_shutdown_saves_counted_accesses(app, monkeypatch, tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    path = tmp_path / "hot_set.json"
+    monkeypatch.setattr(app, "save_hot_set", lambda counts: warmup.save_hot_set(counts, path))
+    monkeypatch.setattr(app, "access_counter", warmup.AccessCounter())
+    for name in ("pipeline_syncer", "warmup"):
+        monkeypatch.setattr(app, name, _Worker())
+    monkeypatch.setattr(app, "change_notifier", _AsyncWorker())
+    # The same lifespan on a second app, so the session's app and its workers keep running
+    other = FastAPI(lifespan=app.lifespan)
+    other.state.ingest_writer = _Worker()
+
+    other_id = unique_id("client")
+    with TestClient(other):
+        for client_id in (SEED_CLIENT_ID, other_id, SEED_CLIENT_ID):
+            app.access_counter.record("clients", client_id)
+        assert not path.exists()
+    assert json.loads(path.read_text())["counts"]["clients"] == {SEED_CLIENT_ID: 2, other_id: 1}
@@ -0,0 +1,97 @@
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import unique_id
+
+
+def _days(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def book(db, make_client, sync_pipelines):
+    """A new metro with two markets; RMs a and b share a region, RM c sits in the other market"""
+    ids = {name: unique_id(name) for name in ("metro", "market", "market2", "region", "region2",
+                                              "rm_a", "rm_b", "rm_c", "rel_a", "rel_b", "rel_c")}
+    db.execute("INSERT INTO metros (id, name, region) VALUES (?, 'Test Metro', 'Test')", (ids["metro"],))
+    for market in ("market", "market2"):
+        db.execute("INSERT INTO markets (id, metro_id, name) VALUES (?, ?, ?)", (ids[market], ids["metro"], market))
+    for region, market in (("region", "market"), ("region2", "market2")):
+        db.execute("INSERT INTO regions (id, market_id, name) VALUES (?, ?, ?)", (ids[region], ids[market], region))
+    for rm, region in (("rm_a", "region"), ("rm_b", "region"), ("rm_c", "region2")):
+        db.execute("INSERT INTO relationship_managers (id, name, region_id) VALUES (?, ?, ?)",
+                   (ids[rm], rm, ids[region]))
+        db.execute("INSERT INTO relationships (id, rm_id, name) VALUES (?, ?, ?)",
+                   (ids["rel" + rm[2:]], ids[rm], rm))
+
+    def client(relationship, next_review, risk_score=0):
+        return make_client(relationship_id=ids[relationship], next_review=next_review, risk_score=risk_score)
+
+    ids.update({
+        "overdue": client("rel_a", _days(-10)),              # priority 10
+        "risky": client("rel_a", _days(-2), risk_score=5),   # priority 2 + 15 = 17
+        "upcoming": client("rel_a", _days(5)),               # priority -5, due in five days
+        "b_due": client("rel_b", _days(-1)),                 # priority 1
+        "c_due": client("rel_c", _days(-3)),                 # priority 3
+    })
+    sync_pipelines()
+    return ids
+
+
+def _worklist(client, rm_id, **params):
+    response = client.get(f"/api/relationship-managers/{rm_id}/worklist", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _ids(client, rm_id, **params):
+    return [item["clientId"] for item in _worklist(client, rm_id, **params)["items"]]
+
+
+def test_rm_worklist_is_ordered_by_priority(client, book):
+    body = _worklist(client, book["rm_a"])
+    assert [item["clientId"] for item in body["items"]] == [book["risky"], book["overdue"]]
+    assert [(item["daysOverdue"], item["priority"]) for item in body["items"]] == [(2, 17.0), (10, 10.0)]
+    assert (body["scope"], body["scopeId"], body["withinDays"]) == ("rm", book["rm_a"], 0)
+
+
+def test_within_days_adds_upcoming_reviews(client, book):
+    assert _ids(client, book["rm_a"], within_days=4) == [book["risky"], book["overdue"]]
+    assert _ids(client, book["rm_a"], within_days=5) == [book["risky"], book["overdue"], book["upcoming"]]
+    assert _ids(client, book["rm_a"], within_days=5, limit=1) == [book["risky"]]
+
+
+def test_parent_scopes_widen_the_list(client, book):
+    assert _worklist(client, book["rm_b"], scope="region")["scopeId"] == book["region"]
+    assert _ids(client, book["rm_b"], scope="region") == [book["risky"], book["overdue"], book["b_due"]]
+    assert _ids(client, book["rm_b"], scope="market") == [book["risky"], book["overdue"], book["b_due"]]
+    assert _ids(client, book["rm_b"], scope="metro") == [book["risky"], book["overdue"], book["c_due"],
+                                                         book["b_due"]]
+    assert _ids(client, book["rm_c"], scope="market") == [book["c_due"]]
+
+
+def test_a_new_critical_flag_raises_priority(client, db, book, sync_pipelines):
+    db.execute("INSERT INTO risk_flags (id, client_id, category, severity, status) VALUES (?, ?, ?, ?, ?)",
+               (unique_id("flag"), book["overdue"], "Compliance", "Critical", "Active"))
+    sync_pipelines()
+    items = _worklist(client, book["rm_a"])["items"]
+    assert [item["clientId"] for item in items] == [book["overdue"], book["risky"]]
+    assert (items[0]["criticalFlags"], items[0]["priority"]) == (1, 24.0)
+
+
+def test_reassignments_move_clients_between_scopes(client, db, book, sync_pipelines):
+    db.execute("UPDATE relationships SET rm_id = ? WHERE id = ?", (book["rm_b"], book["rel_a"]))
+    sync_pipelines()
+    assert _ids(client, book["rm_a"]) == []
+    assert _ids(client, book["rm_b"]) == [book["risky"], book["overdue"], book["b_due"]]
+
+    db.execute("UPDATE relationship_managers SET region_id = ? WHERE id = ?", (book["region2"], book["rm_b"]))
+    sync_pipelines()
+    assert _ids(client, book["rm_c"], scope="region") == [book["risky"], book["overdue"], book["c_due"],
+                                                          book["b_due"]]
+    assert _ids(client, book["rm_a"], scope="region") == []
+
+
+def test_unknown_rm_is_404(client):
+    assert client.get(f"/api/relationship-managers/{unique_id('rm')}/worklist").status_code == 404
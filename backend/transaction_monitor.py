@@ -0,0 +1,268 @@
+"""
+Transaction monitoring: anomaly detection over ingested transactions.
+
+The rules, thresholds and per-account state are those of
+database/anomaly_detector.py: rolling (EWMA) z-scores on amounts, velocity
+within an hour, cash just under the reporting threshold repeated within a
+few days, and first-seen counterparties or locations on established
+accounts. Each hit is a risk_transactions row that names the transaction it
+came from (transaction_id), so the transaction list can show its riskFlag;
+every (client, rule) pair also keeps one aggregated 'Anomaly Detector'
+entry in risk_flags.
+
+Transactions are insert-only, so sync() follows their rowid like
+cash_windows. Account state lives in account_detector_state and
+account_seen_parties and is read back at the start of every step, so it
+commits (or rolls back) together with the hits and the offset. rebuild()
+(python transaction_monitor.py) replays every transaction; hits and flags
+already written are kept.
+"""
+
+import json
+import math
+import sqlite3
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pipeline
+
+PIPELINE_NAME = "transaction_monitor"
+
+ROWS_PER_STEP = 5000
+ACCOUNT_CHUNK_SIZE = 500
+
+# Same rules and thresholds as database/anomaly_detector.py
+EWMA_ALPHA = 0.05
+MIN_HISTORY = 20            # Transactions seen before amount/newness rules fire
+Z_SCORE_THRESHOLD = 4.0
+
+VELOCITY_WINDOW = 3600
+VELOCITY_LIMIT = 20
+
+REPORTING_THRESHOLD = 10000.00
+STRUCTURING_BAND = 0.10     # Within 10% below the threshold
+STRUCTURING_WINDOW = 3 * 86400
+STRUCTURING_MIN_COUNT = 2
+CASH_TRANSACTION_TYPES = ("Deposit", "Cash Deposit", "Withdrawal", "Cash Withdrawal")
+CASH_CHANNELS = ("Branch", "ATM", "Cash")
+
+NEW_PARTY_MIN_AMOUNT = 5000.00
+
+# Rule code -> (risk_transactions.transaction_type / risk_flags.category, base severity)
+RULES = {
+    "AMT": ("Unusual Amount", "Medium"),
+    "VEL": ("High Velocity", "Medium"),
+    "STR": ("Structuring", "High"),
+    "NCP": ("New Counterparty", "Low"),
+    "NLOC": ("New Location", "Low"),
+}
+
+
+def _timestamp(value: str) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AccountState:
+    """Rolling detection state for one account"""
+
+    __slots__ = ("account_id", "txn_count", "mean", "var", "recent", "near_threshold",
+                 "counterparties", "locations", "new_parties")
+
+    def __init__(self, account_id: str, txn_count: int = 0, mean: float = 0.0, var: float = 0.0,
+                 recent: Optional[List[float]] = None, near_threshold: Optional[List[float]] = None):
+        self.account_id = account_id
+        self.txn_count = txn_count
+        self.mean = mean
+        self.var = var
+        self.recent = deque(recent or ())
+        self.near_threshold = deque(near_threshold or ())
+        self.counterparties = set()
+        self.locations = set()
+        self.new_parties = []  # (kind, value, first_seen) not yet written
+
+    def observe_amount(self, amount: float) -> Optional[float]:
+        """Update the EWMA mean/variance; returns the z-score against the prior state"""
+        z_score = None
+        if self.txn_count >= MIN_HISTORY and self.var > 0:
+            z_score = abs(amount - self.mean) / math.sqrt(self.var)
+        if self.txn_count == 0:
+            self.mean = amount
+        else:
+            delta = amount - self.mean
+            self.mean += EWMA_ALPHA * delta
+            self.var = (1 - EWMA_ALPHA) * (self.var + EWMA_ALPHA * delta * delta)
+        self.txn_count += 1
+        return z_score
+
+    @staticmethod
+    def observe_time(window: deque, ts: float, span: float) -> int:
+        """Append ts to a sliding window; returns how many entries remain in it"""
+        window.append(ts)
+        while window and window[0] <= ts - span:
+            window.popleft()
+        return len(window)
+
+    def first_seen(self, kind: str, value: Optional[str], ts: str) -> bool:
+        """Record a counterparty/location; True if the account has not used it before"""
+        if not value:
+            return False
+        seen = self.counterparties if kind == "counterparty" else self.locations
+        if value in seen:
+            return False
+        seen.add(value)
+        self.new_parties.append((kind, value, ts))
+        return True
+
+
+def evaluate(txn: sqlite3.Row, state: AccountState) -> List[str]:
+    """Run every rule against one transaction, updating state; returns the rule codes hit"""
+    hits = []
+    amount = abs(float(txn["amount"]))
+    ts = _timestamp(txn["transaction_date"])
+    established = state.txn_count >= MIN_HISTORY
+
+    z_score = state.observe_amount(amount)
+    if z_score is not None and z_score > Z_SCORE_THRESHOLD:
+        hits.append("AMT")
+
+    if state.observe_time(state.recent, ts, VELOCITY_WINDOW) > VELOCITY_LIMIT:
+        hits.append("VEL")
+
+    is_cash = txn["transaction_type"] in CASH_TRANSACTION_TYPES or txn["channel"] in CASH_CHANNELS
+    if is_cash and REPORTING_THRESHOLD * (1 - STRUCTURING_BAND) <= amount < REPORTING_THRESHOLD:
+        if state.observe_time(state.near_threshold, ts, STRUCTURING_WINDOW) >= STRUCTURING_MIN_COUNT:
+            hits.append("STR")
+
+    new_counterparty = state.first_seen("counterparty", txn["counterparty"], txn["transaction_date"])
+    new_location = state.first_seen("location", txn["location"], txn["transaction_date"])
+    if established and amount >= NEW_PARTY_MIN_AMOUNT:
+        if new_counterparty:
+            hits.append("NCP")
+        if new_location:
+            hits.append("NLOC")
+    return hits
+
+
+def _load_states(conn: sqlite3.Connection, account_ids: List[str]) -> Dict[str, AccountState]:
+    states = {account_id: AccountState(account_id) for account_id in account_ids}
+    for start in range(0, len(account_ids), ACCOUNT_CHUNK_SIZE):
+        chunk = account_ids[start:start + ACCOUNT_CHUNK_SIZE]
+        placeholders = ", ".join("?" for _ in chunk)
+        for row in conn.execute(f"""
+            SELECT account_id, txn_count, ewma_mean, ewma_var, recent_times, near_threshold_times
+            FROM account_detector_state WHERE account_id IN ({placeholders})
+        """, chunk):
+            states[row[0]] = AccountState(row[0], row[1], row[2], row[3], json.loads(row[4]), json.loads(row[5]))
+        for account_id, kind, value in conn.execute(
+            f"SELECT account_id, kind, value FROM account_seen_parties WHERE account_id IN ({placeholders})", chunk
+        ):
+            state = states[account_id]
+            (state.counterparties if kind == "counterparty" else state.locations).add(value)
+    return states
+
+
+def _apply_range(conn: sqlite3.Connection, after: int, up_to: int) -> int:
+    """Run the rules over transactions with after < rowid <= up_to; returns hits written"""
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    rows = cursor.execute("""
+        SELECT t.id, t.account_id, t.transaction_date, t.amount, t.transaction_type, t.description,
+               t.counterparty, t.channel, t.location, t.status, a.client_id
+        FROM transactions t JOIN accounts a ON a.id = t.account_id
+        WHERE t.rowid > ? AND t.rowid <= ?
+        ORDER BY t.rowid
+    """, (after, up_to)).fetchall()
+    if not rows:
+        return 0
+    states = _load_states(conn, list(dict.fromkeys(row["account_id"] for row in rows)))
+
+    hits = []
+    flag_hits: Dict[tuple, str] = {}  # (client_id, rule) -> latest transaction date
+    for txn in rows:
+        for rule in evaluate(txn, states[txn["account_id"]]):
+            label = RULES[rule][0]
+            hits.append((
+                f"rt_{txn['id']}_{rule}", txn["client_id"], txn["id"], txn["transaction_date"][:10],
+                txn["amount"], label, f"{label}: {txn['description'] or txn['transaction_type']}",
+                txn["location"], txn["counterparty"], txn["transaction_type"], txn["channel"], txn["status"]
+            ))
+            key = (txn["client_id"], rule)
+            flag_hits[key] = max(flag_hits.get(key, ""), txn["transaction_date"])
+
+    # rowcount, not total_changes: the change_log triggers on risk_flags write rows too
+    written = conn.executemany("""
+        INSERT INTO risk_transactions
+        (id, client_id, transaction_id, transaction_date, amount, transaction_type, description,
+         location, merchant, category, terminal, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO NOTHING
+    """, hits).rowcount if hits else 0
+    _upsert_flags(conn, flag_hits)
+    conn.executemany("""
+        INSERT OR REPLACE INTO account_detector_state
+        (account_id, txn_count, ewma_mean, ewma_var, recent_times, near_threshold_times)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(s.account_id, s.txn_count, s.mean, s.var, json.dumps(list(s.recent)), json.dumps(list(s.near_threshold)))
+          for s in states.values()])
+    conn.executemany(
+        "INSERT OR IGNORE INTO account_seen_parties (account_id, kind, value, first_seen) VALUES (?, ?, ?, ?)",
+        [(s.account_id, kind, value, ts) for s in states.values() for kind, value, ts in s.new_parties]
+    )
+    return written
+
+
+def _upsert_flags(conn: sqlite3.Connection, flag_hits: Dict[tuple, str]):
+    """Create or refresh one aggregated detector flag per client and rule"""
+    for (client_id, rule), latest in flag_hits.items():
+        label, severity = RULES[rule]
+        count = conn.execute(
+            "SELECT COUNT(*) FROM risk_transactions WHERE client_id = ? AND transaction_type = ?", (client_id, label)
+        ).fetchone()[0]
+        if count >= 10:
+            severity = "High"
+        conn.execute("""
+            INSERT INTO risk_flags (id, client_id, category, subcategory, severity, status, description,
+                                    flagged_date, created_by)
+            VALUES (?, ?, ?, 'Transaction Monitoring', ?, 'Active', ?, ?, 'Anomaly Detector')
+            ON CONFLICT(id) DO UPDATE SET
+                severity = excluded.severity,
+                status = 'Active',
+                description = excluded.description,
+                flagged_date = excluded.flagged_date,
+                resolved_date = NULL
+        """, (f"rf_auto_{client_id}_{rule}", client_id, label, severity,
+              f"{count} {label.lower()} detection(s) from transaction monitoring", latest))
+
+
+def _apply(conn: sqlite3.Connection, last_rowid: int, max_rowid: int) -> int:
+    written = 0
+    for after in range(last_rowid, max_rowid, ROWS_PER_STEP):
+        written += _apply_range(conn, after, min(after + ROWS_PER_STEP, max_rowid))
+    return written
+
+
+def _rebuild(conn: sqlite3.Connection, max_rowid: int) -> int:
+    conn.execute("DELETE FROM account_detector_state")
+    conn.execute("DELETE FROM account_seen_parties")
+    return _apply(conn, 0, max_rowid)
+
+
+def sync(db_path) -> int:
+    """Run the rules over transactions ingested since the last sync; returns hits written"""
+    return pipeline.sync(db_path, PIPELINE_NAME, pipeline.TRANSACTIONS, _apply)
+
+
+def rebuild(db_path) -> int:
+    """Reset the account state and run the rules over every transaction again; returns new hits"""
+    return pipeline.rebuild(db_path, PIPELINE_NAME, pipeline.TRANSACTIONS, _rebuild)
+
+
+if __name__ == "__main__":
+    from db import DB_PATH
+
+    written = rebuild(DB_PATH)
+    print(f"Rebuilt transaction monitor state, {written} new risk transactions written")
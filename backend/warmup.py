@@ -0,0 +1,259 @@
+"""
+Startup warm-up: planner statistics, a precomputed hot set and readiness.
+
+After a deploy or rebuild the first users to open the busiest clients and
+RMs would pay for cold page caches, empty response caches and missing
+planner statistics. Warmup runs once at startup in a background thread:
+
+  1. ANALYZE (row-limited) when the database has no statistics yet,
+     otherwise PRAGMA optimize
+  2. the hot set: client and RM ids from WARMUP_CLIENTS / WARMUP_RMS,
+     then the hot_set.json written at the last shutdown from counted
+     accesses (or by `python warmup.py hot-set --log ...` from access
+     logs), topped up with the largest portfolios
+  3. per hot client, the queries that read its index ranges
+  4. the steps the app registers (response cache entries, transaction
+     windows) for each hot client and RM
+
+The whole run is bounded by WARMUP_BUDGET_SECONDS; SQLite statements are
+interrupted at the deadline and the remaining work is skipped. /api/ready
+answers 503 until the run has finished or given up, /api/health stays a
+plain liveness check.
+
+    python warmup.py run                          # statistics + index pages, then report
+    python warmup.py hot-set --log access.log     # rebuild hot_set.json from uvicorn access logs
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WARMUP_BUDGET_SECONDS = float(os.environ.get("WARMUP_BUDGET_SECONDS", "15"))
+HOT_SET_PATH = Path(os.environ.get("HOT_SET_PATH") or Path(__file__).parent / "hot_set.json")
+HOT_SET_SIZE = int(os.environ.get("HOT_SET_SIZE", "50"))
+
+# Configured ids are always warmed first (comma-separated)
+CONFIGURED = {
+    "clients": [i for i in os.environ.get("WARMUP_CLIENTS", "").split(",") if i],
+    "rms": [i for i in os.environ.get("WARMUP_RMS", "").split(",") if i],
+}
+
+ANALYSIS_LIMIT = 1000         # Rows sampled per index by the first ANALYZE
+HISTORY_WEIGHT = 0.5          # Weight of the previous hot set's counts when saving a new one
+PROGRESS_STEPS = 10_000       # VM steps between deadline checks inside a statement
+
+# Index ranges a client page reads; running them pulls those pages into the cache
+TOUCH_QUERIES = (
+    "SELECT COUNT(*) FROM accounts WHERE client_id = ?",
+    "SELECT COUNT(*), MAX(t.transaction_date) FROM accounts a JOIN transactions t ON t.account_id = a.id "
+    "WHERE a.client_id = ?",
+    "SELECT COUNT(*) FROM risk_flags WHERE client_id = ?",
+    "SELECT COUNT(*) FROM utr_events WHERE client_id = ?",
+    "SELECT COUNT(*) FROM kri_metrics WHERE client_id = ?",
+    "SELECT COUNT(*) FROM opportunities WHERE client_id = ?",
+    "SELECT COUNT(*) FROM counterparty_edges WHERE client_id = ?",
+)
+
+DEFAULT_HOT_SET_SQL = {
+    "clients": "SELECT id FROM clients ORDER BY portfolio_value DESC LIMIT ?",
+    "rms": "SELECT id FROM relationship_managers ORDER BY portfolio_value DESC LIMIT ?",
+}
+
+# Request lines of uvicorn / common access logs
+_ACCESS_PATTERNS = {
+    "clients": re.compile(r'"GET /api/clients/([^/?\s"]+)[?\s"]'),
+    "rms": re.compile(r'"GET /api/relationship-managers/([^/?\s"]+)[/?\s"]'),
+}
+
+
+class AccessCounter:
+    """Counts client and RM page requests for the next hot set"""
+
+    def __init__(self):
+        self._counts = {kind: Counter() for kind in CONFIGURED}
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, ident: str):
+        with self._lock:
+            self._counts[kind][ident] += 1
+
+    def snapshot(self) -> Dict[str, Counter]:
+        with self._lock:
+            return {kind: Counter(counts) for kind, counts in self._counts.items()}
+
+
+def parse_access_log(lines: Iterable[str]) -> Dict[str, Counter]:
+    """Client and RM request counts from access log lines"""
+    counts = {kind: Counter() for kind in _ACCESS_PATTERNS}
+    for line in lines:
+        for kind, pattern in _ACCESS_PATTERNS.items():
+            match = pattern.search(line)
+            if match:
+                counts[kind][match.group(1)] += 1
+    return counts
+
+
+def load_hot_set(path: Path = HOT_SET_PATH) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_hot_set(counts: Dict[str, Counter], path: Path = HOT_SET_PATH, size: int = HOT_SET_SIZE) -> Dict[str, Any]:
+    """Merge new counts with the previous hot set (down-weighted) and keep the top ids"""
+    previous = load_hot_set(path).get("counts", {})
+    merged = {}
+    for kind in CONFIGURED:
+        total = Counter({ident: count * HISTORY_WEIGHT for ident, count in previous.get(kind, {}).items()})
+        total.update(counts.get(kind, {}))
+        merged[kind] = dict(total.most_common(size))
+    document = {"updatedAt": datetime.now().isoformat(), "counts": merged}
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(document, indent=2))
+    os.replace(tmp, path)
+    return document
+
+
+def resolve_hot_set(conn: sqlite3.Connection, size: int = HOT_SET_SIZE,
+                    path: Path = HOT_SET_PATH) -> Dict[str, List[str]]:
+    """Configured ids, then recorded ones, then the largest portfolios, up to size per kind"""
+    recorded = load_hot_set(path).get("counts", {})
+    hot_set = {}
+    for kind, configured in CONFIGURED.items():
+        ids = list(dict.fromkeys(configured))
+        counts = recorded.get(kind, {})
+        for ident in sorted(counts, key=counts.get, reverse=True):
+            if len(ids) >= size:
+                break
+            if ident not in ids:
+                ids.append(ident)
+        if len(ids) < size:
+            ids += [row[0] for row in conn.execute(DEFAULT_HOT_SET_SQL[kind], (size,)) if row[0] not in ids]
+        hot_set[kind] = ids[:max(size, len(configured))]
+    return hot_set
+
+
+def refresh_statistics(conn: sqlite3.Connection) -> str:
+    """ANALYZE a database without statistics, PRAGMA optimize otherwise; returns what ran"""
+    has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    if has_stats:
+        conn.execute("PRAGMA optimize")
+        return "optimize"
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+    return "analyze"
+
+
+def touch_client(conn: sqlite3.Connection, client_id: str):
+    for sql in TOUCH_QUERIES:
+        conn.execute(sql, (client_id,)).fetchall()
+
+
+class Warmup:
+    """One bounded warm-up run in a background thread, plus its readiness state"""
+
+    def __init__(self, db_path, budget_seconds: float = WARMUP_BUDGET_SECONDS, size: int = HOT_SET_SIZE):
+        self.db_path = db_path
+        self.budget_seconds = budget_seconds
+        self.size = size
+        # (name, kind, fn(ident)) run for every hot id of that kind, in registration order
+        self.steps: List[tuple] = []
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.report: Dict[str, Any] = {"state": "pending"}
+
+    def add_step(self, name: str, kind: str, fn: Callable[[str], Any]):
+        self.steps.append((name, kind, fn))
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def start(self):
+        self.report = {"state": "warming", "startedAt": datetime.now().isoformat()}
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def run(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        deadline = started + self.budget_seconds
+        report = {**self.report, "state": "warming", "budgetSeconds": self.budget_seconds, "timedOut": False,
+                  "warmed": {}, "errors": 0}
+        conn = sqlite3.connect(self.db_path, timeout=max(self.budget_seconds, 0.1))
+        # Non-zero aborts the running statement once the budget is spent
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_STEPS)
+        try:
+            report["statistics"] = refresh_statistics(conn)
+            hot_set = resolve_hot_set(conn, self.size)
+            report["hotSet"] = {kind: len(ids) for kind, ids in hot_set.items()}
+            steps = [("indexPages", "clients", lambda ident: touch_client(conn, ident))] + self.steps
+            for name, kind, fn in steps:
+                done = 0
+                for ident in hot_set.get(kind, ()):
+                    if time.monotonic() > deadline:
+                        break
+                    try:
+                        fn(ident)
+                        done += 1
+                    except sqlite3.OperationalError:
+                        if time.monotonic() > deadline:
+                            break
+                        report["errors"] += 1
+                    except Exception as e:  # A missing or broken id must not stop the warm-up
+                        logger.debug("Warm-up step %s failed for %s: %s", name, ident, e)
+                        report["errors"] += 1
+                report["warmed"][name] = done
+        except Exception as e:
+            # Interrupted at the deadline, or broken: either way the API must still become ready
+            if time.monotonic() <= deadline:
+                logger.warning("Warm-up stopped: %s", e)
+                report["error"] = str(e)
+        finally:
+            conn.close()
+            report["timedOut"] = time.monotonic() > deadline
+            report["seconds"] = round(time.monotonic() - started, 3)
+            report["state"] = "ready"
+            self.report = report
+            self._done.set()
+        return report
+
+
+if __name__ == "__main__":
+    from db import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Startup warm-up and hot set")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Refresh statistics and read the hot clients' index pages")
+    run_parser.add_argument("--budget", type=float, default=WARMUP_BUDGET_SECONDS, help="Seconds")
+    hot_parser = commands.add_parser("hot-set", help="Write hot_set.json from access logs")
+    hot_parser.add_argument("--log", type=Path, nargs="+", required=True, help="Access log files")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = Warmup(DB_PATH, args.budget).run()
+        print(f"Warm-up {'timed out' if report['timedOut'] else 'finished'} in {report['seconds']}s: "
+              f"{report.get('statistics')}, {report['warmed']}")
+    else:
+        counts = {kind: Counter() for kind in _ACCESS_PATTERNS}
+        for log in args.log:
+            with open(log, errors="replace") as f:
+                for kind, found in parse_access_log(f).items():
+                    counts[kind].update(found)
+        document = save_hot_set(counts)
+        print(f"Hot set: {len(document['counts']['clients'])} clients, {len(document['counts']['rms'])} RMs "
+              f"-> {HOT_SET_PATH}")
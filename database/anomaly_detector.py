@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Banking 360 Streaming Transaction Anomaly Detector
+Consumes new rows from the transactions table, keeps rolling per-account state and
+records hits in risk_transactions, with aggregated risk_flags per client and rule.
+"""
+
+import sqlite3
+import json
+import math
+import sys
+import time
+import argparse
+from collections import OrderedDict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+PIPELINE_NAME = 'anomaly_detector'
+
+# Rolling amount statistics (exponentially weighted, so state stays O(1) per account)
+EWMA_ALPHA = 0.05
+MIN_HISTORY = 20            # Transactions seen before amount/newness rules fire
+Z_SCORE_THRESHOLD = 4.0
+
+# Velocity: more than VELOCITY_LIMIT transactions within VELOCITY_WINDOW seconds
+VELOCITY_WINDOW = 3600
+VELOCITY_LIMIT = 20
+
+# Structuring: repeated cash amounts just under the reporting threshold
+REPORTING_THRESHOLD = 10000.00
+STRUCTURING_BAND = 0.10     # Within 10% below the threshold
+STRUCTURING_WINDOW = 3 * 86400
+STRUCTURING_MIN_COUNT = 2
+CASH_TRANSACTION_TYPES = {'Deposit', 'Cash Deposit', 'Withdrawal', 'Cash Withdrawal'}
+CASH_CHANNELS = {'Branch', 'ATM', 'Cash'}
+
+# First-seen counterparties/locations only matter above this amount
+NEW_PARTY_MIN_AMOUNT = 5000.00
+
+# Rule code -> (risk_transactions.transaction_type / risk_flags.category, base severity)
+RULES = {
+    'AMT': ('Unusual Amount', 'Medium'),
+    'VEL': ('High Velocity', 'Medium'),
+    'STR': ('Structuring', 'High'),
+    'NCP': ('New Counterparty', 'Low'),
+    'NLOC': ('New Location', 'Low'),
+}
+
+DEFAULT_BATCH_SIZE = 5000
+STATE_CACHE_SIZE = 50000    # Accounts whose state is kept in memory between batches
+
+
+def _timestamp(value: str) -> float:
+    """Parse a transaction_date into epoch seconds."""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AccountState:
+    """Rolling detection state for one account."""
+
+    __slots__ = ('account_id', 'txn_count', 'mean', 'var', 'recent', 'near_threshold',
+                 'counterparties', 'locations', 'new_parties')
+
+    def __init__(self, account_id: str, txn_count: int = 0, mean: float = 0.0, var: float = 0.0,
+                 recent: Optional[List[float]] = None, near_threshold: Optional[List[float]] = None):
+        self.account_id = account_id
+        self.txn_count = txn_count
+        self.mean = mean
+        self.var = var
+        self.recent = deque(recent or ())
+        self.near_threshold = deque(near_threshold or ())
+        self.counterparties = set()
+        self.locations = set()
+        self.new_parties = []  # (kind, value, first_seen) not yet persisted
+
+    def observe_amount(self, amount: float) -> Optional[float]:
+        """Update the EWMA mean/variance; return the z-score against the prior state."""
+        z_score = None
+        if self.txn_count >= MIN_HISTORY and self.var > 0:
+            z_score = abs(amount - self.mean) / math.sqrt(self.var)
+
+        if self.txn_count == 0:
+            self.mean = amount
+        else:
+            delta = amount - self.mean
+            self.mean += EWMA_ALPHA * delta
+            self.var = (1 - EWMA_ALPHA) * (self.var + EWMA_ALPHA * delta * delta)
+        self.txn_count += 1
+        return z_score
+
+    def observe_time(self, window: deque, ts: float, span: float) -> int:
+        """Append ts to a sliding window and return how many entries remain in it."""
+        window.append(ts)
+        while window and window[0] <= ts - span:
+            window.popleft()
+        return len(window)
+
+    def first_seen(self, kind: str, value: Optional[str], ts: str) -> bool:
+        """Record a counterparty/location; True if the account has not used it before."""
+        if not value:
+            return False
+        seen = self.counterparties if kind == 'counterparty' else self.locations
+        if value in seen:
+            return False
+        seen.add(value)
+        self.new_parties.append((kind, value, ts))
+        return True
+
+
+class AnomalyDetector:
+    """Incremental detector driven by a high-water mark on transactions.rowid."""
+
+    def __init__(self, db_path: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        if db_path is None:
+            db_path = Path(__file__).parent / 'banking_360.db'
+        self.db_path = str(db_path)
+        self.batch_size = batch_size
+        self._connection = None
+        self._states: 'OrderedDict[str, AccountState]' = OrderedDict()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # Autocommit mode; each batch runs in an explicit transaction
+            self._connection = sqlite3.connect(self.db_path, isolation_level=None)
+            self._connection.row_factory = sqlite3.Row
+        return self._connection
+
+    def high_water_mark(self) -> int:
+        row = self._get_connection().execute(
+            'SELECT last_rowid FROM pipeline_offsets WHERE pipeline = ?', (PIPELINE_NAME,)
+        ).fetchone()
+        return row['last_rowid'] if row else 0
+
+    def _load_states(self, conn: sqlite3.Connection, account_ids: List[str]):
+        """Fetch persisted state for accounts not already cached."""
+        missing = [a for a in account_ids if a not in self._states]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            placeholders = ','.join('?' for _ in chunk)
+            for account_id in chunk:
+                self._states[account_id] = AccountState(account_id)
+            for row in conn.execute(f'SELECT * FROM account_detector_state WHERE account_id IN ({placeholders})', chunk):
+                self._states[row['account_id']] = AccountState(
+                    row['account_id'], row['txn_count'], row['ewma_mean'], row['ewma_var'],
+                    json.loads(row['recent_times']), json.loads(row['near_threshold_times'])
+                )
+            for row in conn.execute(f'SELECT account_id, kind, value FROM account_seen_parties WHERE account_id IN ({placeholders})', chunk):
+                state = self._states[row['account_id']]
+                (state.counterparties if row['kind'] == 'counterparty' else state.locations).add(row['value'])
+
+        for account_id in account_ids:
+            self._states.move_to_end(account_id)
+        while len(self._states) > STATE_CACHE_SIZE:
+            self._states.popitem(last=False)
+
+    def _evaluate(self, txn: sqlite3.Row, state: AccountState) -> List[str]:
+        """Run every rule against one transaction, updating state; return rule codes hit."""
+        hits = []
+        amount = abs(float(txn['amount']))
+        ts = _timestamp(txn['transaction_date'])
+        established = state.txn_count >= MIN_HISTORY
+
+        z_score = state.observe_amount(amount)
+        if z_score is not None and z_score > Z_SCORE_THRESHOLD:
+            hits.append('AMT')
+
+        if state.observe_time(state.recent, ts, VELOCITY_WINDOW) > VELOCITY_LIMIT:
+            hits.append('VEL')
+
+        is_cash = txn['transaction_type'] in CASH_TRANSACTION_TYPES or txn['channel'] in CASH_CHANNELS
+        if is_cash and REPORTING_THRESHOLD * (1 - STRUCTURING_BAND) <= amount < REPORTING_THRESHOLD:
+            if state.observe_time(state.near_threshold, ts, STRUCTURING_WINDOW) >= STRUCTURING_MIN_COUNT:
+                hits.append('STR')
+
+        new_counterparty = state.first_seen('counterparty', txn['counterparty'], txn['transaction_date'])
+        new_location = state.first_seen('location', txn['location'], txn['transaction_date'])
+        if established and amount >= NEW_PARTY_MIN_AMOUNT:
+            if new_counterparty:
+                hits.append('NCP')
+            if new_location:
+                hits.append('NLOC')
+
+        return hits
+
+    def process_batch(self) -> int:
+        """Process up to batch_size new transactions; return how many were consumed."""
+        conn = self._get_connection()
+        last_rowid = self.high_water_mark()
+        rows = conn.execute("""
+            SELECT t.rowid AS rid, t.*, a.client_id
+            FROM transactions t
+            JOIN accounts a ON a.id = t.account_id
+            WHERE t.rowid > ?
+            ORDER BY t.rowid
+            LIMIT ?
+        """, (last_rowid, self.batch_size)).fetchall()
+        if not rows:
+            return 0
+
+        self._load_states(conn, list(dict.fromkeys(row['account_id'] for row in rows)))
+
+        risk_rows = []
+        flag_hits: Dict[tuple, str] = {}  # (client_id, rule) -> latest transaction date
+        touched = {}
+        for txn in rows:
+            state = self._states[txn['account_id']]
+            touched[state.account_id] = state
+            for rule in self._evaluate(txn, state):
+                label = RULES[rule][0]
+                risk_rows.append((
+                    f"rt_{txn['id']}_{rule}", txn['client_id'], txn['transaction_date'][:10], txn['amount'],
+                    label, f"{label}: {txn['description'] or txn['transaction_type']}", txn['location'],
+                    txn['counterparty'], txn['transaction_type'], None, txn['channel'], txn['status']
+                ))
+                key = (txn['client_id'], rule)
+                flag_hits[key] = max(flag_hits.get(key, ''), txn['transaction_date'])
+
+        # Outputs, state and the high-water mark commit together, so a crash
+        # mid-batch replays the batch instead of skipping or duplicating it.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany("""
+                INSERT OR IGNORE INTO risk_transactions
+                (id, client_id, transaction_date, amount, transaction_type, description,
+                 location, merchant, category, bank, terminal, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, risk_rows)
+            self._upsert_flags(conn, flag_hits)
+            conn.executemany("""
+                INSERT OR REPLACE INTO account_detector_state
+                (account_id, txn_count, ewma_mean, ewma_var, recent_times, near_threshold_times)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(s.account_id, s.txn_count, s.mean, s.var, json.dumps(list(s.recent)),
+                   json.dumps(list(s.near_threshold))) for s in touched.values()])
+            conn.executemany(
+                'INSERT OR IGNORE INTO account_seen_parties (account_id, kind, value, first_seen) VALUES (?, ?, ?, ?)',
+                [(s.account_id, kind, value, ts) for s in touched.values() for kind, value, ts in s.new_parties]
+            )
+            conn.execute("""
+                INSERT INTO pipeline_offsets (pipeline, last_rowid, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(pipeline) DO UPDATE SET last_rowid = excluded.last_rowid, updated_at = excluded.updated_at
+            """, (PIPELINE_NAME, rows[-1]['rid']))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            self._states.clear()  # In-memory state is ahead of the database now
+            raise
+
+        for state in touched.values():
+            state.new_parties = []
+        return len(rows)
+
+    def _upsert_flags(self, conn: sqlite3.Connection, flag_hits: Dict[tuple, str]):
+        """Create or refresh one aggregated detector flag per client and rule."""
+        for (client_id, rule), latest in flag_hits.items():
+            label, severity = RULES[rule]
+            count = conn.execute(
+                'SELECT COUNT(*) FROM risk_transactions WHERE client_id = ? AND transaction_type = ?',
+                (client_id, label)
+            ).fetchone()[0]
+            if count >= 10:
+                severity = 'High'
+            conn.execute("""
+                INSERT INTO risk_flags (id, client_id, category, subcategory, severity, status, description, flagged_date, created_by)
+                VALUES (?, ?, ?, 'Transaction Monitoring', ?, 'Active', ?, ?, 'Anomaly Detector')
+                ON CONFLICT(id) DO UPDATE SET
+                    severity = excluded.severity,
+                    status = 'Active',
+                    description = excluded.description,
+                    flagged_date = excluded.flagged_date,
+                    resolved_date = NULL
+            """, (f'rf_auto_{client_id}_{rule}', client_id, label, severity,
+                  f'{count} {label.lower()} detection(s) from transaction monitoring', latest))
+
+    def run(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """Drain the backlog of unprocessed transactions."""
+        started = time.perf_counter()
+        processed = batches = 0
+        while max_batches is None or batches < max_batches:
+            count = self.process_batch()
+            if not count:
+                break
+            processed += count
+            batches += 1
+        elapsed = time.perf_counter() - started
+        return {
+            'processed': processed,
+            'batches': batches,
+            'seconds': elapsed,
+            'rows_per_second': processed / elapsed if elapsed > 0 else 0.0,
+            'high_water_mark': self.high_water_mark()
+        }
+
+    def follow(self, poll_interval: float = 2.0):
+        """Keep consuming new transactions until interrupted."""
+        while True:
+            if not self.run()['processed']:
+                time.sleep(poll_interval)
+
+    def close(self):
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the transaction anomaly detector.')
+    parser.add_argument('--db', help='Database path (defaults to banking_360.db)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--follow', action='store_true', help='Keep polling for new transactions')
+    args = parser.parse_args()
+
+    with AnomalyDetector(args.db, args.batch_size) as detector:
+        if args.follow:
+            try:
+                detector.follow()
+            except KeyboardInterrupt:
+                sys.exit(0)
+        stats = detector.run()
+        print(f"✅ Processed {stats['processed']:,} transactions in {stats['batches']} batch(es) "
+              f"({stats['rows_per_second']:,.0f} rows/s), high-water mark {stats['high_water_mark']}")
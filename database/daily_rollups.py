@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Banking 360 Account Daily Rollups
+Keeps account_daily_stats (one row per account and day) current from new transactions and
+derives the accounts activity columns (monthly_volume, monthly_inflows, monthly_outflows,
+inflow_count, outflow_count, last_transaction) from at most ACTIVITY_WINDOW_DAYS rows.
+"""
+
+import sqlite3
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Any
+
+from partitions import readonly_uri, default_partition_dir
+
+PIPELINE_NAME = 'daily_rollups'
+
+# Trailing window behind the accounts "monthly" columns
+ACTIVITY_WINDOW_DAYS = 30
+
+DEFAULT_BATCH_SIZE = 50000
+
+# Positive amounts are inflows, negative amounts outflows (see seed_data.sql)
+_ROLLUP_SELECT = """
+    SELECT account_id, date(transaction_date),
+           SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END),
+           SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END),
+           SUM(amount > 0), SUM(amount < 0), MAX(transaction_date)
+    FROM {source}
+    WHERE {where}
+    GROUP BY account_id, date(transaction_date)
+"""
+
+_ROLLUP_UPSERT = """
+    INSERT INTO account_daily_stats
+    (account_id, day, inflows, outflows, inflow_count, outflow_count, last_transaction)
+    {select}
+    ON CONFLICT(account_id, day) DO UPDATE SET
+        inflows = inflows + excluded.inflows,
+        outflows = outflows + excluded.outflows,
+        inflow_count = inflow_count + excluded.inflow_count,
+        outflow_count = outflow_count + excluded.outflow_count,
+        last_transaction = MAX(last_transaction, excluded.last_transaction)
+"""
+
+
+class DailyRollups:
+    """Apply job folding new transactions into account_daily_stats."""
+
+    def __init__(self, db_path: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        if db_path is None:
+            db_path = Path(__file__).parent / 'banking_360.db'
+        self.db_path = str(db_path)
+        self.batch_size = batch_size
+        self._connection = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # Autocommit mode; each batch runs in an explicit transaction
+            self._connection = sqlite3.connect(self.db_path, isolation_level=None, uri=True)
+            self._connection.row_factory = sqlite3.Row
+        return self._connection
+
+    def high_water_mark(self) -> int:
+        row = self._get_connection().execute(
+            'SELECT last_rowid FROM pipeline_offsets WHERE pipeline = ?', (PIPELINE_NAME,)
+        ).fetchone()
+        return row['last_rowid'] if row else 0
+
+    def _set_high_water_mark(self, conn: sqlite3.Connection, rowid: int):
+        conn.execute("""
+            INSERT INTO pipeline_offsets (pipeline, last_rowid, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(pipeline) DO UPDATE SET last_rowid = excluded.last_rowid, updated_at = excluded.updated_at
+        """, (PIPELINE_NAME, rowid))
+
+    def process_batch(self, as_of: Optional[datetime] = None) -> int:
+        """Fold up to batch_size new transactions into the daily rows; return how many were consumed."""
+        conn = self._get_connection()
+        last_rowid = self.high_water_mark()
+        bounds = conn.execute("""
+            SELECT MAX(rowid), COUNT(*) FROM (
+                SELECT rowid FROM transactions WHERE rowid > ? ORDER BY rowid LIMIT ?
+            )
+        """, (last_rowid, self.batch_size)).fetchone()
+        if not bounds[1]:
+            return 0
+
+        # Rollups, account columns and the high-water mark commit together, so a
+        # crash mid-batch replays the batch instead of double counting it.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            where = 'rowid > ? AND rowid <= ?'
+            conn.execute(_ROLLUP_UPSERT.format(select=_ROLLUP_SELECT.format(source='transactions', where=where)),
+                         (last_rowid, bounds[0]))
+            touched = [row[0] for row in conn.execute(
+                f'SELECT DISTINCT account_id FROM transactions WHERE {where}', (last_rowid, bounds[0])
+            )]
+            self._refresh_accounts(conn, touched, as_of)
+            self._set_high_water_mark(conn, bounds[0])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return bounds[1]
+
+    def _refresh_accounts(self, conn: sqlite3.Connection, account_ids: Iterable[str],
+                          as_of: Optional[datetime] = None):
+        """Recompute the accounts activity columns from the trailing daily rows."""
+        as_of = as_of or datetime.now()
+        window_start = (as_of - timedelta(days=ACTIVITY_WINDOW_DAYS - 1)).strftime('%Y-%m-%d')
+        window_end = as_of.strftime('%Y-%m-%d')
+        conn.executemany("""
+            UPDATE accounts SET
+                monthly_inflows = w.inflows,
+                monthly_outflows = w.outflows,
+                monthly_volume = w.inflows + w.outflows,
+                inflow_count = w.inflow_count,
+                outflow_count = w.outflow_count,
+                last_transaction = COALESCE(
+                    (SELECT last_transaction FROM account_daily_stats
+                     WHERE account_id = accounts.id ORDER BY day DESC LIMIT 1),
+                    accounts.last_transaction
+                )
+            FROM (
+                SELECT COALESCE(SUM(inflows), 0) AS inflows, COALESCE(SUM(outflows), 0) AS outflows,
+                       COALESCE(SUM(inflow_count), 0) AS inflow_count, COALESCE(SUM(outflow_count), 0) AS outflow_count
+                FROM account_daily_stats
+                WHERE account_id = ? AND day BETWEEN ? AND ?
+            ) AS w
+            WHERE accounts.id = ?
+        """, [(account_id, window_start, window_end, account_id) for account_id in account_ids])
+
+    def refresh(self, as_of: Optional[datetime] = None) -> int:
+        """Slide the window for every account with rollups (run daily, even without new transactions)."""
+        conn = self._get_connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            account_ids = [row[0] for row in conn.execute('SELECT DISTINCT account_id FROM account_daily_stats')]
+            self._refresh_accounts(conn, account_ids, as_of)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return len(account_ids)
+
+    def run(self, max_batches: Optional[int] = None, as_of: Optional[datetime] = None) -> Dict[str, Any]:
+        """Drain the backlog of unprocessed transactions."""
+        started = time.perf_counter()
+        processed = batches = 0
+        while max_batches is None or batches < max_batches:
+            count = self.process_batch(as_of)
+            if not count:
+                break
+            processed += count
+            batches += 1
+        elapsed = time.perf_counter() - started
+        return {
+            'processed': processed,
+            'batches': batches,
+            'seconds': elapsed,
+            'rows_per_second': processed / elapsed if elapsed > 0 else 0.0,
+            'high_water_mark': self.high_water_mark()
+        }
+
+    def backfill(self, partition_dir: Optional[str] = None, as_of: Optional[datetime] = None) -> Dict[str, Any]:
+        """Rebuild account_daily_stats from all history: the hot table plus every cold partition.
+
+        SQLite caps attached databases (see queries.MAX_ATTACHED_PARTITIONS) and cannot
+        detach one inside a transaction, so each partition is attached, aggregated into
+        a temp staging table and detached on its own first. The rebuild then folds the
+        hot table and the staged days in one transaction. If a compaction moved rows in
+        the meantime, the partitions are staged again.
+        """
+        started = time.perf_counter()
+        partition_dir = Path(partition_dir) if partition_dir else default_partition_dir(self.db_path)
+        conn = self._get_connection()
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS backfill_days
+            (account_id TEXT, day DATE, inflows REAL, outflows REAL, inflow_count INTEGER,
+             outflow_count INTEGER, last_transaction DATETIME)
+        """)
+        partitions_sql = 'SELECT file_name, row_count, compacted_at FROM transaction_partitions ORDER BY month'
+        try:
+            while True:
+                partitions = [tuple(row) for row in conn.execute(partitions_sql)]
+                conn.execute('DELETE FROM temp.backfill_days')
+                for file_name, _, _ in partitions:
+                    conn.execute('ATTACH DATABASE ? AS backfill_partition', (readonly_uri(partition_dir / file_name),))
+                    try:
+                        conn.execute('INSERT INTO temp.backfill_days ' + _ROLLUP_SELECT.format(
+                            source='backfill_partition.transactions', where='1'))
+                    finally:
+                        conn.execute('DETACH DATABASE backfill_partition')
+
+                conn.execute('BEGIN IMMEDIATE')
+                if [tuple(row) for row in conn.execute(partitions_sql)] == partitions:
+                    break
+                conn.execute('ROLLBACK')  # Rows moved between the hot table and a partition; stage again
+
+            try:
+                conn.execute('DELETE FROM account_daily_stats')
+                high_water_mark = conn.execute('SELECT COALESCE(MAX(rowid), 0) FROM transactions').fetchone()[0]
+                conn.execute(_ROLLUP_UPSERT.format(select=_ROLLUP_SELECT.format(source='main.transactions', where='1')))
+                # WHERE lets SQLite parse the upsert after a SELECT
+                conn.execute(_ROLLUP_UPSERT.format(select='SELECT * FROM temp.backfill_days WHERE 1'))
+                account_ids = [row[0] for row in conn.execute('SELECT DISTINCT account_id FROM account_daily_stats')]
+                self._refresh_accounts(conn, account_ids, as_of)
+                self._set_high_water_mark(conn, high_water_mark)
+                days = conn.execute('SELECT COUNT(*) FROM account_daily_stats').fetchone()[0]
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.execute('DROP TABLE IF EXISTS temp.backfill_days')
+
+        return {
+            'sources': 1 + len(partitions),
+            'accounts': len(account_ids),
+            'days': days,
+            'seconds': time.perf_counter() - started,
+            'high_water_mark': high_water_mark
+        }
+
+    def close(self):
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Maintain per-account daily activity rollups.')
+    parser.add_argument('--db', help='Database path (defaults to banking_360.db)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--backfill', action='store_true', help='Rebuild the rollups from all historical transactions')
+    parser.add_argument('--refresh', action='store_true', help='Recompute the trailing window for every account')
+    parser.add_argument('--as-of', type=datetime.fromisoformat, help='End of the activity window (defaults to now)')
+    args = parser.parse_args()
+
+    with DailyRollups(args.db, args.batch_size) as rollups:
+        if args.backfill:
+            stats = rollups.backfill(as_of=args.as_of)
+            print(f"✅ Backfilled {stats['days']:,} account-days for {stats['accounts']:,} accounts from "
+                  f"{stats['sources']} source(s) in {stats['seconds']:.2f}s, high-water mark {stats['high_water_mark']}")
+            sys.exit(0)
+        stats = rollups.run(as_of=args.as_of)
+        print(f"✅ Rolled up {stats['processed']:,} transactions in {stats['batches']} batch(es) "
+              f"({stats['rows_per_second']:,.0f} rows/s), high-water mark {stats['high_water_mark']}")
+        if args.refresh:
+            print(f"✅ Refreshed activity window for {rollups.refresh(args.as_of):,} accounts")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Banking 360 Keyset Pagination
+Opaque cursors and keyset (seek) predicates shared by DatabaseQueries and the
+backend API, so both page the same way. Standard library only.
+"""
+
+import base64
+import json
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort-key values of the last row as an opaque cursor."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, key_count: int) -> List[Any]:
+    """Decode an opaque cursor back into sort-key values."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != key_count:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def keyset_predicate(sort_keys: Sequence[str], descending: bool,
+                     after: Sequence[Any]) -> Tuple[str, List[Any]]:
+    """NULL-aware form of ``(keys) > (values)``, following SQLite's NULLS-lowest order.
+
+    A row value comparison is never true when either side holds NULL, so rows
+    with a NULL key would be dropped from every page after the first. Expanded
+    per key instead: equal on the keys before it (IS matches NULL to NULL) and
+    strictly after on this one, where NULL sorts before any value.
+    """
+    clauses, params = [], []
+    for i, (key, value) in enumerate(zip(sort_keys, after)):
+        terms = [f'{k} IS ?' for k in sort_keys[:i]]
+        terms_params = list(after[:i])
+        if value is None and descending:
+            continue  # Nothing sorts below NULL
+        elif value is None:
+            terms.append(f'{key} IS NOT NULL')
+        elif descending:
+            terms.append(f'({key} < ? OR {key} IS NULL)')
+            terms_params.append(value)
+        else:
+            terms.append(f'{key} > ?')
+            terms_params.append(value)
+        clauses.append('(' + ' AND '.join(terms) + ')')
+        params.extend(terms_params)
+    return '(' + (' OR '.join(clauses) or '0') + ')', params
+
+
+def keyset_query(sql: str, params: Sequence[Any], sort_keys: Sequence[str], descending: bool,
+                 page_size: int, after: Optional[Sequence[Any]] = None,
+                 nullable: bool = False) -> Tuple[str, List[Any]]:
+    """Append the keyset predicate, ORDER BY and LIMIT to ``sql``, which must end with a WHERE clause.
+
+    The last entry of ``sort_keys`` is unique, so every row has a stable
+    position. The query seeks past the ``after`` values instead of skipping
+    OFFSET rows, and asks for one row more than ``page_size`` so the caller
+    knows whether another page exists (see finish_page). Pass ``nullable``
+    when the leading keys may hold NULL (see keyset_predicate); otherwise the
+    plain row value comparison is used.
+    """
+    params = list(params)
+    if after and nullable:
+        predicate, predicate_params = keyset_predicate(sort_keys, descending, after)
+        sql += f' AND {predicate}'
+        params.extend(predicate_params)
+    elif after:
+        columns = ', '.join(sort_keys)
+        placeholders = ', '.join('?' for _ in sort_keys)
+        sql += f" AND ({columns}) {'<' if descending else '>'} ({placeholders})"
+        params.extend(after)
+
+    direction = ' DESC' if descending else ''
+    sql += ' ORDER BY ' + ', '.join(key + direction for key in sort_keys)
+    sql += ' LIMIT ?'
+    params.append(page_size + 1)
+    return sql, params
+
+
+def finish_page(rows: List[Any], page_size: int,
+                key_values: Callable[[Any], Sequence[Any]]) -> Tuple[List[Any], Optional[str]]:
+    """Trim the look-ahead row; return the page and the cursor built from its last row."""
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(key_values(rows[-1]))
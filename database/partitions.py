@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Banking 360 Transaction Partitions
+Moves closed months out of the hot transactions table into one SQLite file per month.
+Cold partitions are compacted (VACUUM) and made read-only; dropping or archiving a month
+is a file operation. DatabaseQueries.get_transactions_by_account routes reads across the
+hot table and whichever partitions overlap the requested dates.
+"""
+
+import os
+import shutil
+import sqlite3
+import stat
+import sys
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+# Months that end more than this many days ago are moved out of the hot table
+HOT_WINDOW_DAYS = 90
+
+# Column order shared by the hot table and every partition
+TRANSACTION_COLUMNS = (
+    'id', 'account_id', 'transaction_date', 'amount', 'transaction_type', 'description',
+    'counterparty', 'channel', 'location', 'reference_number', 'status', 'created_at'
+)
+
+PARTITION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {alias}.transactions (
+    id TEXT PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    transaction_date DATETIME NOT NULL,
+    amount DECIMAL(15,2) NOT NULL,
+    transaction_type TEXT NOT NULL,
+    description TEXT,
+    counterparty TEXT,
+    channel TEXT,
+    location TEXT,
+    reference_number TEXT,
+    status TEXT DEFAULT 'Completed',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS {alias}.idx_transactions_account_id ON transactions(account_id, transaction_date, id);
+"""
+
+
+def default_partition_dir(db_path) -> Path:
+    """Partitions live next to the main database unless told otherwise."""
+    return Path(db_path).parent / 'partitions'
+
+
+def partition_file_name(month: str) -> str:
+    """'2024-01' -> 'transactions_2024_01.db'"""
+    return f"transactions_{month.replace('-', '_')}.db"
+
+
+def month_bounds(month: str) -> tuple:
+    """Inclusive start and exclusive end timestamps of a 'YYYY-MM' month."""
+    start = datetime.strptime(month, '%Y-%m')
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.strftime('%Y-%m-%d 00:00:00'), end.strftime('%Y-%m-%d 00:00:00')
+
+
+def readonly_uri(path) -> str:
+    """URI for attaching a partition so no connection can write to it."""
+    return Path(path).resolve().as_uri() + '?mode=ro'
+
+
+class TransactionPartitions:
+    """Maintenance operations for the monthly transaction partitions."""
+
+    def __init__(self, db_path: Optional[str] = None, partition_dir: Optional[str] = None):
+        if db_path is None:
+            db_path = Path(__file__).parent / 'banking_360.db'
+        self.db_path = str(db_path)
+        self.partition_dir = Path(partition_dir) if partition_dir else default_partition_dir(self.db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """Registered partitions, newest month first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT * FROM transaction_partitions ORDER BY month DESC').fetchall()
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def cold_months(self, hot_window_days: int = HOT_WINDOW_DAYS, now: Optional[datetime] = None) -> List[str]:
+        """Months with rows in the hot table that ended before the hot window."""
+        cutoff = (now or datetime.now()) - timedelta(days=hot_window_days)
+        first_hot_month = cutoff.strftime('%Y-%m-01 00:00:00')
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT DISTINCT substr(transaction_date, 1, 7) FROM transactions
+                WHERE transaction_date < ? ORDER BY 1
+            """, (first_hot_month,)).fetchall()
+            return [row[0] for row in rows]
+        finally:
+            conn.close()
+
+    def compact_month(self, month: str) -> Dict[str, Any]:
+        """Move one month from the hot table into its partition file.
+
+        Rows are copied and deleted in a single transaction across both files, so a
+        crash leaves them in exactly one place. Rows that an incremental pipeline
+        (pipeline_offsets) has not consumed yet stay hot until it catches up. A month
+        that is already partitioned is reopened, so late-arriving rows are merged in.
+
+        The row holding the highest rowid is never moved: SQLite assigns new rows
+        MAX(rowid) + 1, so deleting it would hand its rowid (and those below it) to
+        the next insert, which pipelines at that offset would then skip.
+        """
+        start, end = month_bounds(month)
+        self.partition_dir.mkdir(parents=True, exist_ok=True)
+        path = self.partition_dir / partition_file_name(month)
+        if path.exists():
+            os.chmod(path, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+
+        columns = ', '.join(TRANSACTION_COLUMNS)
+        where = """transaction_date >= ? AND transaction_date < ?
+                   AND rowid <= COALESCE((SELECT MIN(last_rowid) FROM pipeline_offsets), rowid)
+                   AND rowid < (SELECT MAX(rowid) FROM main.transactions)"""
+        conn = self._connect()
+        try:
+            conn.execute('ATTACH DATABASE ? AS part', (str(path),))
+            conn.executescript(PARTITION_SCHEMA.format(alias='part'))
+            conn.execute('BEGIN IMMEDIATE')
+            moved = conn.execute(f"""
+                INSERT INTO part.transactions ({columns})
+                SELECT {columns} FROM main.transactions WHERE {where}
+            """, (start, end)).rowcount
+            conn.execute(f'DELETE FROM main.transactions WHERE {where}', (start, end))
+            conn.execute("""
+                INSERT INTO transaction_partitions (month, file_name, row_count, min_date, max_date)
+                SELECT ?, ?, COUNT(*), MIN(transaction_date), MAX(transaction_date)
+                FROM part.transactions WHERE 1  -- WHERE lets SQLite parse the upsert after a SELECT
+                ON CONFLICT(month) DO UPDATE SET
+                    row_count = excluded.row_count,
+                    min_date = excluded.min_date,
+                    max_date = excluded.max_date,
+                    compacted_at = CURRENT_TIMESTAMP
+            """, (month, path.name))
+            conn.execute('COMMIT')
+            conn.execute('DETACH DATABASE part')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        # Compact the cold file and hand it over read-only
+        part = sqlite3.connect(path, isolation_level=None)
+        try:
+            part.execute('PRAGMA journal_mode = DELETE')
+            part.execute('VACUUM')
+        finally:
+            part.close()
+        os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+        return {'month': month, 'moved': moved, 'file': str(path), 'bytes': path.stat().st_size}
+
+    def compact(self, hot_window_days: int = HOT_WINDOW_DAYS, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Partition every month that has aged out of the hot window."""
+        return [self.compact_month(month) for month in self.cold_months(hot_window_days, now)]
+
+    def _unregister(self, month: str) -> Path:
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT file_name FROM transaction_partitions WHERE month = ?', (month,)).fetchone()
+            if row is None:
+                raise ValueError(f'No partition for {month}')
+            conn.execute('DELETE FROM transaction_partitions WHERE month = ?', (month,))
+            return self.partition_dir / row['file_name']
+        finally:
+            conn.close()
+
+    def drop_month(self, month: str) -> Path:
+        """Forget a month: unregister it and delete its file."""
+        path = self._unregister(month)
+        path.unlink(missing_ok=True)
+        return path
+
+    def archive_month(self, month: str, destination: str) -> Path:
+        """Unregister a month and move its file to another directory."""
+        target_dir = Path(destination)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        path = self._unregister(month)
+        return Path(shutil.move(str(path), str(target_dir / path.name)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Manage monthly transaction partitions.')
+    parser.add_argument('--db', help='Database path (defaults to banking_360.db)')
+    parser.add_argument('--partition-dir', help='Partition directory (defaults to partitions/ next to the database)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    compact_parser = commands.add_parser('compact', help='Move months older than the hot window into partitions')
+    compact_parser.add_argument('--hot-window-days', type=int, default=HOT_WINDOW_DAYS)
+    commands.add_parser('list', help='Show registered partitions')
+    drop_parser = commands.add_parser('drop', help='Delete a month')
+    drop_parser.add_argument('month', help='YYYY-MM')
+    archive_parser = commands.add_parser('archive', help='Move a month to an archive directory')
+    archive_parser.add_argument('month', help='YYYY-MM')
+    archive_parser.add_argument('--to', required=True, help='Archive directory')
+    args = parser.parse_args()
+
+    partitions = TransactionPartitions(args.db, args.partition_dir)
+    try:
+        if args.command == 'compact':
+            results = partitions.compact(args.hot_window_days)
+            for result in results:
+                print(f"✅ {result['month']}: moved {result['moved']:,} rows into {result['file']} "
+                      f"({result['bytes'] / 1024:.1f} KB)")
+            if not results:
+                print("✅ Nothing older than the hot window")
+        elif args.command == 'list':
+            for p in partitions.list_partitions():
+                print(f"📦 {p['month']}: {p['row_count']:,} rows, {p['min_date']} .. {p['max_date']} ({p['file_name']})")
+        elif args.command == 'drop':
+            print(f"🗑️  Dropped {partitions.drop_month(args.month)}")
+        elif args.command == 'archive':
+            print(f"📁 Archived {args.month} to {partitions.archive_month(args.month, args.to)}")
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
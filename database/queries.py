@@ -5,30 +5,108 @@ Python module for querying the SQLite database with methods that match the curre
 """
 
 import sqlite3
-import json
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Optional, Any
-from datetime import datetime
+from typing import List, Dict, Optional, Any, Sequence, Callable
+from datetime import datetime, timedelta
+
+from keyset import decode_cursor, finish_page, keyset_query
+from partitions import default_partition_dir, readonly_uri
+
+# Page size limits for list methods (server-enforced)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# SQLite allows 10 attached databases by default; least recently used partitions are detached
+MAX_ATTACHED_PARTITIONS = 8
+
+# get_portfolio_rollup groupings and the column each one groups on
+ROLLUP_GROUPS = {
+    'metro': 'mk.metro_id',
+    'market': 'g.market_id',
+    'region': 'rm.region_id',
+    'rm': 'r.rm_id',
+    'industry': 'c.industry',
+}
+
+
+class Page(list):
+    """List of rows for one page, carrying the opaque cursor for the next page."""
+    
+    def __init__(self, rows: List[Dict[str, Any]], next_cursor: Optional[str] = None):
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """Apply the default and maximum page size."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def finish_rollup(partials: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge partial rollup rows per group and turn the sums into averages."""
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for row in partials:
+        group = merged.get(row['group_id'])
+        if group is None:
+            merged[row['group_id']] = dict(row)
+        else:
+            for key, value in row.items():
+                if key != 'group_id':
+                    group[key] += value
+
+    rollup = []
+    for group in merged.values():
+        count = group.pop('risk_score_count')
+        group['avg_risk_score'] = group.pop('risk_score_sum') / count if count else 0
+        group['active_risk_flags'] = int(group['active_risk_flags'])
+        rollup.append(group)
+    rollup.sort(key=lambda g: (-g['total_portfolio_value'], str(g['group_id'])))
+    return rollup
+
 
 class DatabaseQueries:
     """Database query helper class for Banking 360 Mockup."""
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, partition_dir: Optional[str] = None):
         """Initialize database connection."""
         if db_path is None:
             script_dir = Path(__file__).parent
             db_path = script_dir / 'banking_360.db'
         
         self.db_path = str(db_path)
+        self.partition_dir = Path(partition_dir) if partition_dir else default_partition_dir(self.db_path)
         self._connection = None
+        self._attached = OrderedDict()  # partition file name -> schema alias
     
     def _get_connection(self) -> sqlite3.Connection:
         """Get database connection with row factory."""
         if self._connection is None:
-            self._connection = sqlite3.connect(self.db_path)
+            # uri=True only changes how "file:" names are read; it lets partitions attach read-only
+            self._connection = sqlite3.connect(self.db_path, uri=True)
             self._connection.row_factory = sqlite3.Row  # Enable dict-like access
         return self._connection
     
+    def _attach_partition(self, file_name: str) -> str:
+        """Attach a cold partition read-only (once) and return its schema alias."""
+        alias = self._attached.get(file_name)
+        if alias is not None:
+            self._attached.move_to_end(file_name)
+            return alias
+        
+        conn = self._get_connection()
+        if len(self._attached) >= MAX_ATTACHED_PARTITIONS:
+            _, stale = self._attached.popitem(last=False)
+            conn.execute(f'DETACH DATABASE {stale}')
+        alias = 'p_' + file_name.rsplit('.', 1)[0]
+        conn.execute('ATTACH DATABASE ? AS ' + alias, (readonly_uri(self.partition_dir / file_name),))
+        self._attached[file_name] = alias
+        return alias
+    
     def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Execute query and return results as list of dictionaries."""
         conn = self._get_connection()
@@ -42,6 +120,42 @@ class DatabaseQueries:
         results = self._query(sql, params)
         return results[0] if results else None
     
+    def _query_page(self, sql: str, params: tuple, sort_keys: Sequence[str], descending: bool = False,
+                    limit: Optional[int] = None, cursor: Optional[str] = None, nullable: bool = False) -> Page:
+        """Execute a keyset-paginated query (see keyset.keyset_query for ``sql``, ``sort_keys`` and ``nullable``).
+        
+        Only the key values of the last row are carried in the cursor, which lets
+        the index seek straight to the next page instead of skipping OFFSET rows.
+        """
+        page_size = clamp_page_size(limit)
+        values = decode_cursor(cursor, len(sort_keys)) if cursor else None
+        rows = self._query_keyset(sql, params, sort_keys, descending, page_size, values, nullable)
+        return self._make_page(rows, page_size, sort_keys)
+    
+    def _query_keyset(self, sql: str, params: tuple, sort_keys: Sequence[str], descending: bool,
+                      page_size: int, after: Optional[Sequence[Any]] = None,
+                      nullable: bool = False) -> List[Dict[str, Any]]:
+        """Fetch up to page_size + 1 rows positioned after the given sort-key values."""
+        sql, params = keyset_query(sql, params, sort_keys, descending, page_size, after, nullable)
+        return self._query(sql, tuple(params))
+    
+    @staticmethod
+    def _all_pages(fetch: Callable[..., Page], *args: Any) -> List[Dict[str, Any]]:
+        """Follow a paginated method's cursors until the last page, at MAX_PAGE_SIZE per query."""
+        page = fetch(*args, limit=MAX_PAGE_SIZE)
+        rows = list(page)
+        while page.next_cursor:
+            page = fetch(*args, limit=MAX_PAGE_SIZE, cursor=page.next_cursor)
+            rows.extend(page)
+        return rows
+    
+    @staticmethod
+    def _make_page(rows: List[Dict[str, Any]], page_size: int, sort_keys: Sequence[str]) -> Page:
+        """Trim the look-ahead row and build the cursor from the last row kept."""
+        rows, next_cursor = finish_page(rows, page_size,
+                                        lambda last: [last[key.split('.')[-1]] for key in sort_keys])
+        return Page(rows, next_cursor)
+    
     # Organizational Structure Methods
     
     def get_metros(self) -> List[Dict[str, Any]]:
@@ -66,54 +180,60 @@ class DatabaseQueries:
     
     # Relationship Management Methods
     
-    def get_relationships_by_rm(self, rm_id: str) -> List[Dict[str, Any]]:
-        """Get relationships by RM."""
-        return self._query('SELECT * FROM relationships WHERE rm_id = ? ORDER BY name', (rm_id,))
+    def get_relationships_by_rm(self, rm_id: str, limit: Optional[int] = None,
+                                cursor: Optional[str] = None) -> Page:
+        """Get relationships by RM (one page, ordered by name)."""
+        return self._query_page('SELECT * FROM relationships WHERE rm_id = ?', (rm_id,),
+                                ('name', 'id'), limit=limit, cursor=cursor)
     
     def get_relationship_by_id(self, relationship_id: str) -> Optional[Dict[str, Any]]:
         """Get relationship by ID."""
         return self._query_one('SELECT * FROM relationships WHERE id = ?', (relationship_id,))
     
-    def get_clients_by_relationship(self, relationship_id: str) -> List[Dict[str, Any]]:
-        """Get clients by relationship."""
+    def get_clients_by_relationship(self, relationship_id: str, limit: Optional[int] = None,
+                                    cursor: Optional[str] = None) -> Page:
+        """Get clients by relationship (one page, ordered by name)."""
+        # Per-client subqueries instead of JOIN + GROUP BY, so the page is read
+        # in index order and only the clients on this page touch accounts.
         sql = """
         SELECT c.*, 
-               COUNT(a.id) as account_count,
-               COALESCE(SUM(a.balance), 0) as total_balance
+               (SELECT COUNT(*) FROM accounts a WHERE a.client_id = c.id) as account_count,
+               (SELECT COALESCE(SUM(a.balance), 0) FROM accounts a WHERE a.client_id = c.id) as total_balance
         FROM clients c
-        LEFT JOIN accounts a ON c.id = a.client_id
         WHERE c.relationship_id = ?
-        GROUP BY c.id
-        ORDER BY c.name
         """
-        return self._query(sql, (relationship_id,))
+        return self._query_page(sql, (relationship_id,), ('c.name', 'c.id'), limit=limit, cursor=cursor)
     
     # Client Data Methods
     
     def get_client_by_id(self, client_id: str) -> Optional[Dict[str, Any]]:
-        """Get client by ID with full details."""
+        """Get client by ID with full details (every account, risk flag and opportunity, not one page)."""
         client = self._query_one('SELECT * FROM clients WHERE id = ?', (client_id,))
         if not client:
             return None
         
         # Get related data
-        client['accounts'] = self._query('SELECT * FROM accounts WHERE client_id = ?', (client_id,))
+        client['accounts'] = self._all_pages(self.get_accounts_by_client, client_id)
         client['beneficialOwners'] = self._query('SELECT * FROM beneficial_owners WHERE client_id = ?', (client_id,))
         client['authorizedSigners'] = self._query('SELECT * FROM authorized_signers WHERE client_id = ?', (client_id,))
         client['conductors'] = self._query('SELECT * FROM business_conductors WHERE client_id = ?', (client_id,))
         client['relatedEntities'] = self._query('SELECT * FROM related_entities WHERE client_id = ?', (client_id,))
-        client['riskFlags'] = self._query('SELECT * FROM risk_flags WHERE client_id = ? AND status = "Active"', (client_id,))
-        client['opportunities'] = self._query('SELECT * FROM opportunities WHERE client_id = ? AND status = "Open"', (client_id,))
+        client['riskFlags'] = self._all_pages(self.get_risk_flags_by_client, client_id)
+        client['opportunities'] = self._all_pages(self.get_opportunities_by_client, client_id)
         
         return client
     
-    def get_accounts_by_client(self, client_id: str) -> List[Dict[str, Any]]:
-        """Get accounts by client."""
-        return self._query('SELECT * FROM accounts WHERE client_id = ? ORDER BY account_type', (client_id,))
+    def get_accounts_by_client(self, client_id: str, limit: Optional[int] = None,
+                               cursor: Optional[str] = None) -> Page:
+        """Get accounts by client (one page, ordered by account type)."""
+        return self._query_page('SELECT * FROM accounts WHERE client_id = ?', (client_id,),
+                                ('account_type', 'id'), limit=limit, cursor=cursor)
     
-    def get_opportunities_by_client(self, client_id: str) -> List[Dict[str, Any]]:
-        """Get opportunities by client."""
-        return self._query('SELECT * FROM opportunities WHERE client_id = ? AND status = "Open" ORDER BY value DESC', (client_id,))
+    def get_opportunities_by_client(self, client_id: str, limit: Optional[int] = None,
+                                    cursor: Optional[str] = None) -> Page:
+        """Get open opportunities by client (one page, highest value first)."""
+        return self._query_page('SELECT * FROM opportunities WHERE client_id = ? AND status = "Open"', (client_id,),
+                                ('value', 'id'), descending=True, limit=limit, cursor=cursor, nullable=True)
     
     def get_product_penetration_by_client(self, client_id: str) -> List[Dict[str, Any]]:
         """Get product penetration by client."""
@@ -121,16 +241,21 @@ class DatabaseQueries:
     
     # Risk Management Methods
     
-    def get_risk_flags_by_client(self, client_id: str) -> List[Dict[str, Any]]:
-        """Get risk flags by client."""
-        return self._query('SELECT * FROM risk_flags WHERE client_id = ? AND status = "Active" ORDER BY flagged_date DESC', (client_id,))
-    
-    def get_utr_events_by_client(self, client_id: str) -> List[Dict[str, Any]]:
-        """Get UTR events by client."""
-        return self._query('SELECT * FROM utr_events WHERE client_id = ? ORDER BY event_date DESC', (client_id,))
-    
-    def get_risk_transactions_by_client(self, client_id: str, transaction_types: List[str] = None) -> List[Dict[str, Any]]:
-        """Get risk transactions by client."""
+    def get_risk_flags_by_client(self, client_id: str, limit: Optional[int] = None,
+                                 cursor: Optional[str] = None) -> Page:
+        """Get active risk flags by client (one page, newest first)."""
+        return self._query_page('SELECT * FROM risk_flags WHERE client_id = ? AND status = "Active"', (client_id,),
+                                ('flagged_date', 'id'), descending=True, limit=limit, cursor=cursor, nullable=True)
+    
+    def get_utr_events_by_client(self, client_id: str, limit: Optional[int] = None,
+                                 cursor: Optional[str] = None) -> Page:
+        """Get UTR events by client (one page, newest first)."""
+        return self._query_page('SELECT * FROM utr_events WHERE client_id = ?', (client_id,),
+                                ('event_date', 'id'), descending=True, limit=limit, cursor=cursor)
+    
+    def get_risk_transactions_by_client(self, client_id: str, transaction_types: List[str] = None,
+                                        limit: Optional[int] = None, cursor: Optional[str] = None) -> Page:
+        """Get risk transactions by client (one page, newest first)."""
         sql = 'SELECT * FROM risk_transactions WHERE client_id = ?'
         params = [client_id]
         
@@ -139,8 +264,8 @@ class DatabaseQueries:
             sql += f' AND transaction_type IN ({placeholders})'
             params.extend(transaction_types)
         
-        sql += ' ORDER BY transaction_date DESC'
-        return self._query(sql, tuple(params))
+        return self._query_page(sql, tuple(params), ('transaction_date', 'id'), descending=True,
+                                limit=limit, cursor=cursor)
     
     def get_client_risk_analytics(self, client_id: str, timeframe: str = '6M') -> Dict[str, Any]:
         """Get comprehensive risk analytics for client."""
@@ -149,16 +274,22 @@ class DatabaseQueries:
         utr_events = self.get_utr_events_by_client(client_id)
         kri_metrics = self.get_kri_metrics_by_client(client_id)
         
-        total_risk_amount = sum(float(t.get('amount', 0)) for t in risk_transactions)
+        # Totals are aggregated in SQL so they cover every row, not just the first page
+        totals = self._query_one("""
+        SELECT 
+            (SELECT COALESCE(SUM(amount), 0) FROM risk_transactions WHERE client_id = ?) as total_risk_amount,
+            (SELECT COUNT(*) FROM risk_transactions WHERE client_id = ?) as total_risk_count,
+            (SELECT COUNT(*) FROM utr_events WHERE client_id = ?) as total_utr_filed
+        """, (client_id, client_id, client_id))
         
         return {
             'riskFlags': risk_flags,
             'riskTransactions': risk_transactions,
             'utrEvents': utr_events,
             'kriMetrics': kri_metrics,
-            'totalRiskAmount': total_risk_amount,
-            'totalRiskCount': len(risk_transactions),
-            'totalUTRFiled': len(utr_events)
+            'totalRiskAmount': float(totals['total_risk_amount']),
+            'totalRiskCount': totals['total_risk_count'],
+            'totalUTRFiled': totals['total_utr_filed']
         }
     
     # Portfolio Analysis Methods
@@ -184,13 +315,106 @@ class DatabaseQueries:
         result = self._query_one(sql, (relationship_id,))
         return result if result else {}
     
-    def get_kri_metrics_by_client(self, client_id: str) -> List[Dict[str, Any]]:
-        """Get KRI metrics by client."""
-        return self._query('SELECT * FROM kri_metrics WHERE client_id = ? ORDER BY metric_date DESC', (client_id,))
+    def get_kri_metrics_by_client(self, client_id: str, limit: Optional[int] = None,
+                                  cursor: Optional[str] = None) -> Page:
+        """Get KRI metrics by client (one page, newest first)."""
+        return self._query_page('SELECT * FROM kri_metrics WHERE client_id = ?', (client_id,),
+                                ('metric_date', 'id'), descending=True, limit=limit, cursor=cursor)
     
-    def get_transactions_by_account(self, account_id: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get transactions by account."""
-        return self._query('SELECT * FROM transactions WHERE account_id = ? ORDER BY transaction_date DESC LIMIT ?', (account_id, limit))
+    def get_transactions_by_account(self, account_id: str, limit: int = 100,
+                                    cursor: Optional[str] = None, start_date: Optional[str] = None,
+                                    end_date: Optional[str] = None) -> Page:
+        """Get transactions by account (one page, newest first, start_date <= date < end_date).
+        
+        Reads the hot transactions table plus only those monthly partitions whose
+        date range overlaps the request (and lies before the cursor). Partitions are
+        visited newest first and the walk stops once the page is full of rows newer
+        than anything an older partition could hold.
+        """
+        sort_keys = ('transaction_date', 'id')
+        page_size = clamp_page_size(limit)
+        after = decode_cursor(cursor, len(sort_keys)) if cursor else None
+        
+        where, params = 'account_id = ?', [account_id]
+        if start_date:
+            where += ' AND transaction_date >= ?'
+            params.append(start_date)
+        if end_date:
+            where += ' AND transaction_date < ?'
+            params.append(end_date)
+        
+        partition_sql = 'SELECT file_name, max_date FROM transaction_partitions WHERE 1 = 1'
+        partition_params = []
+        if start_date:
+            partition_sql += ' AND max_date >= ?'
+            partition_params.append(start_date)
+        if end_date or after:
+            partition_sql += ' AND min_date <= ?'
+            partition_params.append(min(d for d in (end_date, after[0] if after else None) if d))
+        partitions = self._query(partition_sql + ' ORDER BY month DESC', tuple(partition_params))
+        
+        rows = self._query_keyset(f'SELECT * FROM transactions WHERE {where}', tuple(params),
+                                  sort_keys, True, page_size, after)
+        for partition in partitions:
+            if len(rows) > page_size and rows[page_size]['transaction_date'] > partition['max_date']:
+                break  # This and every older partition sort after the rows we already have
+            alias = self._attach_partition(partition['file_name'])
+            rows += self._query_keyset(f'SELECT * FROM {alias}.transactions WHERE {where}', tuple(params),
+                                       sort_keys, True, page_size, after)
+            rows.sort(key=lambda row: (row['transaction_date'], row['id']), reverse=True)
+            del rows[page_size + 1:]
+        return self._make_page(rows, page_size, sort_keys)
+    
+    def get_account_activity(self, account_id: str, days: int = 30,
+                             as_of: Optional[str] = None) -> Dict[str, Any]:
+        """Get inflow/outflow totals for a trailing window from account_daily_stats."""
+        end = datetime.fromisoformat(as_of) if as_of else datetime.now()
+        start = end - timedelta(days=days - 1)
+        activity = self._query_one("""
+            SELECT COALESCE(SUM(inflows), 0) AS inflows,
+                   COALESCE(SUM(outflows), 0) AS outflows,
+                   COALESCE(SUM(inflow_count), 0) AS inflow_count,
+                   COALESCE(SUM(outflow_count), 0) AS outflow_count,
+                   MAX(last_transaction) AS last_transaction
+            FROM account_daily_stats
+            WHERE account_id = ? AND day BETWEEN ? AND ?
+        """, (account_id, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        activity['volume'] = activity['inflows'] + activity['outflows']
+        activity['days'] = days
+        return activity
+    
+    # Book-wide Methods (scatter-gathered across shards by ShardedQueries)
+    
+    def search_clients(self, text: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Find clients whose name contains text (ordered by name)."""
+        pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return self._query("SELECT * FROM clients WHERE name LIKE ? ESCAPE '\\' ORDER BY name, id LIMIT ?",
+                           (pattern, clamp_page_size(limit)))
+    
+    def get_portfolio_rollup(self, group_by: str = 'metro') -> List[Dict[str, Any]]:
+        """Client portfolio totals per metro, market, region, rm or industry (largest first)."""
+        return finish_rollup(self._portfolio_rollup_partials(group_by))
+    
+    def _portfolio_rollup_partials(self, group_by: str) -> List[Dict[str, Any]]:
+        """Mergeable sums and counts behind get_portfolio_rollup."""
+        if group_by not in ROLLUP_GROUPS:
+            raise ValueError(f"group_by must be one of: {', '.join(ROLLUP_GROUPS)}")
+        return self._query(f"""
+        SELECT {ROLLUP_GROUPS[group_by]} AS group_id,
+               COUNT(*) AS client_count,
+               TOTAL(c.portfolio_value) AS total_portfolio_value,
+               TOTAL((SELECT TOTAL(a.balance) FROM accounts a WHERE a.client_id = c.id)) AS total_deposits,
+               TOTAL((SELECT COUNT(*) FROM risk_flags rf WHERE rf.client_id = c.id AND rf.status = 'Active'))
+                   AS active_risk_flags,
+               TOTAL(c.risk_score) AS risk_score_sum,
+               COUNT(c.risk_score) AS risk_score_count
+        FROM clients c
+        JOIN relationships r ON r.id = c.relationship_id
+        JOIN relationship_managers rm ON rm.id = r.rm_id
+        JOIN regions g ON g.id = rm.region_id
+        JOIN markets mk ON mk.id = g.market_id
+        GROUP BY 1
+        """)
     
     # Utility Methods
     
@@ -213,6 +437,7 @@ class DatabaseQueries:
         if self._connection:
             self._connection.close()
             self._connection = None
+            self._attached.clear()
     
     def __enter__(self):
         """Context manager entry."""
@@ -223,29 +448,29 @@ class DatabaseQueries:
         self.close()
 
 # Convenience functions for common operations
-def get_client_data(client_id: str) -> Optional[Dict[str, Any]]:
+def get_client_data(client_id: str, db_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """Get complete client data (convenience function)."""
-    with DatabaseQueries() as db:
+    with DatabaseQueries(db_path) as db:
         return db.get_client_by_id(client_id)
 
-def get_relationship_data(relationship_id: str) -> Optional[Dict[str, Any]]:
-    """Get complete relationship data (convenience function)."""
-    with DatabaseQueries() as db:
+def get_relationship_data(relationship_id: str, db_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Get complete relationship data with every client, not one page (convenience function)."""
+    with DatabaseQueries(db_path) as db:
         relationship = db.get_relationship_by_id(relationship_id)
         if relationship:
-            relationship['clients'] = db.get_clients_by_relationship(relationship_id)
+            relationship['clients'] = db._all_pages(db.get_clients_by_relationship, relationship_id)
             relationship['summary'] = db.get_relationship_portfolio_summary(relationship_id)
         return relationship
 
-def get_rm_data(rm_id: str) -> Optional[Dict[str, Any]]:
-    """Get complete RM data (convenience function)."""
-    with DatabaseQueries() as db:
+def get_rm_data(rm_id: str, db_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Get complete RM data with every relationship, not one page (convenience function)."""
+    with DatabaseQueries(db_path) as db:
         rms = db._query('SELECT * FROM relationship_managers WHERE id = ?', (rm_id,))
         if not rms:
             return None
         
         rm = rms[0]
-        rm['relationships'] = db.get_relationships_by_rm(rm_id)
+        rm['relationships'] = db._all_pages(db.get_relationships_by_rm, rm_id)
         return rm
 
 if __name__ == "__main__":
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Banking 360 Query Plan Regression Checks
+Runs every DatabaseQueries method against a scaled copy of the database,
+captures the SQL each one issues and checks its EXPLAIN QUERY PLAN: no full
+scans of large tables and no temp B-tree sorts over them. Each method is also
+timed (median of several runs) against a per-method budget, so an index that
+stops being used shows up before deploy rather than in production latency.
+
+Usage:
+    python query_plans.py                  # scale x200, exit status 1 on any failure
+    python query_plans.py --scale 1000 --verbose
+"""
+
+import argparse
+import inspect
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+
+from queries import DatabaseQueries
+
+DEFAULT_SCALE = 200
+DEFAULT_REPEAT = 5
+DEFAULT_BUDGET_MS = 5.0
+
+# Tables small enough that scanning or sorting them is fine at any book size
+SMALL_TABLES = {'metros', 'markets', 'regions', 'relationship_managers',
+                'transaction_partitions', 'pipeline_offsets'}
+
+# Tables copied scale times by build_fixture; these columns get a per-copy suffix
+SCALED_TABLES = ['relationships', 'clients', 'accounts', 'beneficial_owners', 'authorized_signers',
+                 'business_conductors', 'related_entities', 'risk_flags', 'utr_events', 'risk_transactions',
+                 'opportunities', 'product_penetration', 'transactions', 'kri_metrics']
+SCALED_KEYS = {'id', 'relationship_id', 'client_id', 'account_id'}
+
+TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')
+TABLE_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+(\w+(?:\.\w+)?)(?:\s+(?:AS\s+)?(?!WHERE|JOIN|LEFT|ON|ORDER|GROUP|LIMIT)(\w+))?',
+                         re.IGNORECASE)
+
+
+class PlanCase(NamedTuple):
+    """One query method call, its time budget and the plan steps it may use."""
+    method: str
+    call: Callable[[DatabaseQueries, Dict[str, str]], Any]
+    budget_ms: float = DEFAULT_BUDGET_MS
+    allow_scans: frozenset = frozenset()  # Large tables this method must read in full
+    allow_temp_sort: bool = False
+
+
+# Book-wide methods read every client by design; they are bounded by their budgets instead
+PLAN_CASES = [
+    PlanCase('get_metros', lambda db, ids: db.get_metros()),
+    PlanCase('get_markets_by_metro', lambda db, ids: db.get_markets_by_metro(ids['metro'])),
+    PlanCase('get_regions_by_market', lambda db, ids: db.get_regions_by_market(ids['market'])),
+    PlanCase('get_relationship_managers_by_region', lambda db, ids: db.get_relationship_managers_by_region(ids['region'])),
+    PlanCase('get_all_relationship_managers', lambda db, ids: db.get_all_relationship_managers()),
+    PlanCase('get_relationships_by_rm', lambda db, ids: db.get_relationships_by_rm(ids['rm'])),
+    PlanCase('get_relationship_by_id', lambda db, ids: db.get_relationship_by_id(ids['relationship'])),
+    PlanCase('get_clients_by_relationship', lambda db, ids: db.get_clients_by_relationship(ids['relationship'])),
+    PlanCase('get_client_by_id', lambda db, ids: db.get_client_by_id(ids['client'])),
+    PlanCase('get_accounts_by_client', lambda db, ids: db.get_accounts_by_client(ids['client'])),
+    PlanCase('get_opportunities_by_client', lambda db, ids: db.get_opportunities_by_client(ids['client'])),
+    PlanCase('get_product_penetration_by_client', lambda db, ids: db.get_product_penetration_by_client(ids['client'])),
+    PlanCase('get_risk_flags_by_client', lambda db, ids: db.get_risk_flags_by_client(ids['client'])),
+    PlanCase('get_utr_events_by_client', lambda db, ids: db.get_utr_events_by_client(ids['client'])),
+    PlanCase('get_risk_transactions_by_client',
+             lambda db, ids: db.get_risk_transactions_by_client(ids['client'], ['Structuring', 'Cash Deposit'])),
+    PlanCase('get_client_risk_analytics', lambda db, ids: db.get_client_risk_analytics(ids['client'])),
+    PlanCase('get_relationship_portfolio_summary', lambda db, ids: db.get_relationship_portfolio_summary(ids['relationship'])),
+    PlanCase('get_kri_metrics_by_client', lambda db, ids: db.get_kri_metrics_by_client(ids['client'])),
+    PlanCase('get_transactions_by_account',
+             lambda db, ids: db.get_transactions_by_account(ids['account'], start_date='2020-01-01')),
+    PlanCase('get_account_activity', lambda db, ids: db.get_account_activity(ids['account'], as_of='2024-02-20')),
+    PlanCase('search_clients', lambda db, ids: db.search_clients('Manufacturing'), budget_ms=50.0,
+             allow_scans=frozenset({'clients'})),  # Substring match: no index can serve LIKE '%text%'
+    PlanCase('get_portfolio_rollup', lambda db, ids: db.get_portfolio_rollup('market'), budget_ms=100.0,
+             allow_scans=frozenset({'clients'}), allow_temp_sort=True),
+    PlanCase('get_database_stats', lambda db, ids: db.get_database_stats(), budget_ms=50.0,
+             allow_scans=frozenset(SCALED_TABLES)),  # COUNT(*) walks the smallest index of each table
+]
+
+# Methods that issue no SQL of their own
+NOT_QUERIES = {'close'}
+
+
+def build_fixture(source: Path, target: Path, scale: int = DEFAULT_SCALE) -> Path:
+    """Copy the database and repeat its book scale times (ids suffixed per copy), then ANALYZE."""
+    shutil.copy(source, target)
+    with sqlite3.connect(target) as conn:
+        conn.execute('CREATE TEMP TABLE copies (n INTEGER PRIMARY KEY)')
+        conn.executemany('INSERT INTO copies VALUES (?)', [(n,) for n in range(1, scale)])
+        for table in SCALED_TABLES:
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+            values = ', '.join(f"{c} || '_' || copies.n" if c in SCALED_KEYS else f't.{c}' for c in columns)
+            conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) SELECT {values} FROM {table} t, copies")
+        conn.execute('ANALYZE')
+    return target
+
+
+def sample_ids(db: DatabaseQueries) -> Dict[str, str]:
+    """One existing id per entity, picked from the busiest parents."""
+    def busiest(sql):
+        row = db._query_one(sql)
+        return row['id'] if row else None
+    return {
+        'metro': busiest('SELECT metro_id AS id FROM markets GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1'),
+        'market': busiest('SELECT market_id AS id FROM regions GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1'),
+        'region': busiest('SELECT region_id AS id FROM relationship_managers GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1'),
+        'rm': busiest('SELECT rm_id AS id FROM relationships GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1'),
+        'relationship': busiest('SELECT relationship_id AS id FROM clients GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1'),
+        'client': busiest('SELECT client_id AS id FROM risk_flags GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1'),
+        'account': busiest('SELECT account_id AS id FROM transactions GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1'),
+    }
+
+
+def capture_statements(db: DatabaseQueries, call: Callable[[], Any]) -> List[tuple]:
+    """Run call and return the distinct (sql, params) it sent through DatabaseQueries._query."""
+    statements = []
+    query = db._query
+
+    def recording_query(sql, params=()):
+        if (sql, tuple(params)) not in statements:
+            statements.append((sql, tuple(params)))
+        return query(sql, params)
+
+    db._query = recording_query
+    try:
+        call()
+    finally:
+        del db._query
+    return statements
+
+
+def explain(db: DatabaseQueries, sql: str, params: Sequence[Any]) -> List[str]:
+    """EXPLAIN QUERY PLAN detail lines for one statement."""
+    return [row[3] for row in db._get_connection().execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def plan_violations(sql: str, plan: Sequence[str], allow_scans=frozenset(), allow_temp_sort=False) -> List[str]:
+    """Full scans and temp sorts over large tables in one statement's plan."""
+    aliases = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        table = table.split('.')[-1]  # Attached partitions: p_2023_12.transactions
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    tables = set(aliases.values())
+
+    violations = []
+    for step in plan:
+        if step.startswith('SCAN '):
+            name = step.split()[1]
+            if name == 'CONSTANT' or name.startswith('('):
+                continue  # SCAN CONSTANT ROW, SCAN (subquery-1)
+            table = aliases.get(name, name)
+            if table not in SMALL_TABLES and table not in allow_scans:
+                violations.append(f'full scan of {table}: {step}')
+        elif TEMP_SORT.search(step) and not allow_temp_sort and tables - SMALL_TABLES:
+            violations.append(f"temp sort over {', '.join(sorted(tables - SMALL_TABLES))}: {step}")
+    return violations
+
+
+def uncovered_methods(cases: Sequence[PlanCase] = PLAN_CASES) -> List[str]:
+    """Public DatabaseQueries methods without a plan case."""
+    covered = {case.method for case in cases}
+    return sorted(name for name, _ in inspect.getmembers(DatabaseQueries, inspect.isfunction)
+                  if not name.startswith('_') and name not in NOT_QUERIES and name not in covered)
+
+
+def check_query_plans(db_path, cases: Sequence[PlanCase] = PLAN_CASES,
+                      repeat: int = DEFAULT_REPEAT) -> List[Dict[str, Any]]:
+    """Plan and timing results per case; a case passes with no violations and a median within budget."""
+    results = []
+    with DatabaseQueries(db_path) as db:
+        ids = sample_ids(db)
+        for case in cases:
+            statements = capture_statements(db, lambda: case.call(db, ids))
+            plans = [(sql, explain(db, sql, params)) for sql, params in statements]
+            violations = [v for sql, plan in plans
+                          for v in plan_violations(sql, plan, case.allow_scans, case.allow_temp_sort)]
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                case.call(db, ids)
+                timings.append((time.perf_counter() - start) * 1000)
+            median_ms = statistics.median(timings)
+            results.append({
+                'method': case.method,
+                'statements': len(statements),
+                'plans': plans,
+                'violations': violations,
+                'median_ms': median_ms,
+                'budget_ms': case.budget_ms,
+                'ok': not violations and median_ms <= case.budget_ms
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check query plans and timings of every DatabaseQueries method')
+    parser.add_argument('--db', default=Path(__file__).parent / 'banking_360.db', type=Path,
+                        help='Database to scale up (not modified)')
+    parser.add_argument('--scale', type=int, default=DEFAULT_SCALE, help='Copies of the book in the fixture')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Timed runs per method')
+    parser.add_argument('--keep', type=Path, help='Write the fixture here instead of a temp file')
+    parser.add_argument('--verbose', action='store_true', help='Print every statement and its plan')
+    args = parser.parse_args()
+
+    fixture = args.keep or Path(tempfile.mkdtemp(prefix='banking360_plans_')) / 'fixture.db'
+    print(f"🏗️  Building x{args.scale} fixture at {fixture}")
+    build_fixture(args.db, fixture, args.scale)
+
+    missing = uncovered_methods()
+    results = check_query_plans(fixture, repeat=args.repeat)
+    for result in results:
+        mark = '✅' if result['ok'] else '❌'
+        print(f"{mark} {result['method']:<38} {result['median_ms']:7.2f} ms "
+              f"(budget {result['budget_ms']:.0f} ms, {result['statements']} statements)")
+        for violation in result['violations']:
+            print(f"     ⚠️  {violation}")
+        if args.verbose:
+            for sql, plan in result['plans']:
+                print(f"     {' '.join(sql.split())}")
+                for step in plan:
+                    print(f"       └ {step}")
+    for method in missing:
+        print(f"❌ {method:<38} no plan case in query_plans.PLAN_CASES")
+
+    failed = [r['method'] for r in results if not r['ok']] + missing
+    if failed:
+        print(f"\n❌ {len(failed)} of {len(results) + len(missing)} query methods failed")
+        sys.exit(1)
+    print(f"\n✅ All {len(results)} query methods use indexed plans within budget")
+
+
+if __name__ == '__main__':
+    main()
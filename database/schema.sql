@@ -229,13 +229,72 @@ CREATE TABLE kri_metrics (
     FOREIGN KEY (client_id) REFERENCES clients(id)
 );
 
+-- Incremental pipelines: last transactions.rowid each consumer has processed
+CREATE TABLE pipeline_offsets (
+    pipeline TEXT PRIMARY KEY,
+    last_rowid INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Cold transaction partitions: one compacted, read-only file per closed month (see partitions.py)
+CREATE TABLE transaction_partitions (
+    month TEXT PRIMARY KEY, -- 'YYYY-MM'
+    file_name TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    min_date DATETIME,
+    max_date DATETIME,
+    compacted_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-account daily activity, maintained incrementally (see daily_rollups.py)
+CREATE TABLE account_daily_stats (
+    account_id TEXT NOT NULL,
+    day DATE NOT NULL,
+    inflows DECIMAL(15,2) NOT NULL DEFAULT 0,
+    outflows DECIMAL(15,2) NOT NULL DEFAULT 0,
+    inflow_count INTEGER NOT NULL DEFAULT 0,
+    outflow_count INTEGER NOT NULL DEFAULT 0,
+    last_transaction DATETIME,
+    PRIMARY KEY (account_id, day),
+    FOREIGN KEY (account_id) REFERENCES accounts(id)
+) WITHOUT ROWID;
+
+-- Anomaly detector rolling state per account (see anomaly_detector.py)
+CREATE TABLE account_detector_state (
+    account_id TEXT PRIMARY KEY,
+    txn_count INTEGER NOT NULL DEFAULT 0,
+    ewma_mean REAL NOT NULL DEFAULT 0,
+    ewma_var REAL NOT NULL DEFAULT 0,
+    recent_times TEXT NOT NULL DEFAULT '[]', -- JSON epoch seconds inside the velocity window
+    near_threshold_times TEXT NOT NULL DEFAULT '[]', -- JSON epoch seconds of just-under-threshold cash
+    FOREIGN KEY (account_id) REFERENCES accounts(id)
+);
+
+CREATE TABLE account_seen_parties (
+    account_id TEXT NOT NULL,
+    kind TEXT NOT NULL, -- 'counterparty', 'location'
+    value TEXT NOT NULL,
+    first_seen DATETIME,
+    PRIMARY KEY (account_id, kind, value),
+    FOREIGN KEY (account_id) REFERENCES accounts(id)
+) WITHOUT ROWID;
+
 -- Create indexes for better performance
-CREATE INDEX idx_clients_relationship_id ON clients(relationship_id);
-CREATE INDEX idx_accounts_client_id ON accounts(client_id);
-CREATE INDEX idx_risk_flags_client_id ON risk_flags(client_id);
-CREATE INDEX idx_utr_events_client_id ON utr_events(client_id);
-CREATE INDEX idx_risk_transactions_client_id ON risk_transactions(client_id);
-CREATE INDEX idx_opportunities_client_id ON opportunities(client_id);
-CREATE INDEX idx_transactions_account_id ON transactions(account_id);
-CREATE INDEX idx_kri_metrics_client_id ON kri_metrics(client_id);
-CREATE INDEX idx_product_penetration_client_id ON product_penetration(client_id); 
\ No newline at end of file
+-- List indexes lead with the parent id and end with the keyset sort keys
+-- (see DatabaseQueries._query_page), so any page is a single index range scan.
+CREATE INDEX idx_relationships_rm_id ON relationships(rm_id, name, id);
+CREATE INDEX idx_clients_relationship_id ON clients(relationship_id, name, id);
+CREATE INDEX idx_accounts_client_id ON accounts(client_id, account_type, id);
+CREATE INDEX idx_risk_flags_client_id ON risk_flags(client_id, status, flagged_date, id);
+CREATE INDEX idx_utr_events_client_id ON utr_events(client_id, event_date, id);
+CREATE INDEX idx_risk_transactions_client_id ON risk_transactions(client_id, transaction_date, id);
+CREATE INDEX idx_opportunities_client_id ON opportunities(client_id, status, value, id);
+CREATE INDEX idx_transactions_account_id ON transactions(account_id, transaction_date, id);
+CREATE INDEX idx_kri_metrics_client_id ON kri_metrics(client_id, metric_date, id);
+CREATE INDEX idx_product_penetration_client_id ON product_penetration(client_id, product_category, product_name);
+CREATE INDEX idx_beneficial_owners_client_id ON beneficial_owners(client_id);
+CREATE INDEX idx_authorized_signers_client_id ON authorized_signers(client_id);
+CREATE INDEX idx_business_conductors_client_id ON business_conductors(client_id);
+CREATE INDEX idx_related_entities_client_id ON related_entities(client_id);
+-- search_clients walks this in name order and stops at its LIMIT instead of sorting every match
+CREATE INDEX idx_clients_name ON clients(name, id);
\ No newline at end of file
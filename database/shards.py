@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Banking 360 Metro Shards
+Splits the book into one SQLite file per metro plus a small global catalog. A shard holds a
+metro's org rows and every client-level row below them (accounts, risk, opportunities,
+transactions, rollups), so each file answers any single-client, relationship, RM or account
+query on its own. The catalog holds the org hierarchy and the client, relationship and
+account -> metro routes. ShardedQueries routes point lookups to one shard and runs book-wide
+searches and rollups on every shard in a process pool, merging the partial results.
+
+Each shard is built into a temporary file and swapped in atomically, so one metro can be
+rebuilt (or restored from a backup) without touching the others; the catalog is derived
+from the shard files and can itself be rebuilt from them at any time.
+"""
+
+import heapq
+import os
+import sqlite3
+import sys
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from partitions import default_partition_dir, readonly_uri
+from queries import DatabaseQueries, clamp_page_size, finish_rollup
+
+CATALOG_NAME = 'catalog.db'
+
+SCHEMA_FILE = Path(__file__).parent / 'schema.sql'
+
+# Org tables kept in the catalog (each shard also has its own metro's rows)
+ORG_TABLES = ('metros', 'markets', 'regions', 'relationship_managers')
+
+# Rows copied into a metro's shard, in foreign-key order, and how each table is filtered
+SHARD_TABLES = {
+    'metros': 'id = :metro_id',
+    'markets': 'metro_id = :metro_id',
+    'regions': 'market_id IN (SELECT id FROM temp.shard_markets)',
+    'relationship_managers': 'region_id IN (SELECT id FROM temp.shard_regions)',
+    'relationships': 'rm_id IN (SELECT id FROM temp.shard_rms)',
+    'clients': 'relationship_id IN (SELECT id FROM temp.shard_relationships)',
+    'accounts': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'beneficial_owners': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'authorized_signers': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'business_conductors': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'related_entities': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'risk_flags': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'utr_events': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'risk_transactions': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'opportunities': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'product_penetration': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'kri_metrics': 'client_id IN (SELECT id FROM temp.shard_clients)',
+    'transactions': 'account_id IN (SELECT id FROM temp.shard_accounts)',
+    'account_daily_stats': 'account_id IN (SELECT id FROM temp.shard_accounts)',
+    'account_detector_state': 'account_id IN (SELECT id FROM temp.shard_accounts)',
+    'account_seen_parties': 'account_id IN (SELECT id FROM temp.shard_accounts)',
+    # Monthly partitions stay shared; every shard reads them filtered by its own accounts
+    'transaction_partitions': '1',
+}
+
+# Temp key sets filled as their table is copied; later filters select from them
+_KEY_SETS = {
+    'markets': 'shard_markets',
+    'regions': 'shard_regions',
+    'relationship_managers': 'shard_rms',
+    'relationships': 'shard_relationships',
+    'clients': 'shard_clients',
+    'accounts': 'shard_accounts',
+}
+
+# Routes stored in the catalog: kind -> shard table holding the keys
+ROUTE_TABLES = {'client': 'clients', 'relationship': 'relationships', 'account': 'accounts'}
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    metro_id TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    client_count INTEGER NOT NULL DEFAULT 0,
+    account_count INTEGER NOT NULL DEFAULT 0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    built_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS shard_routes (
+    kind TEXT NOT NULL, -- 'client', 'relationship', 'account'
+    key TEXT NOT NULL,
+    metro_id TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_shard_routes_metro_id ON shard_routes(metro_id);
+"""
+
+
+def default_shard_dir(db_path) -> Path:
+    """Shards live next to the main database unless told otherwise."""
+    return Path(db_path).parent / 'shards'
+
+
+def shard_file_name(metro_id: str) -> str:
+    """'metro_001' -> 'shard_metro_001.db'"""
+    return 'shard_' + ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in metro_id) + '.db'
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info({table})')]
+
+
+class MetroShards:
+    """Builds metro shards from a single database and keeps the catalog in step with them."""
+
+    def __init__(self, db_path: Optional[str] = None, shard_dir: Optional[str] = None):
+        if db_path is None:
+            db_path = Path(__file__).parent / 'banking_360.db'
+        self.db_path = str(db_path)
+        self.shard_dir = Path(shard_dir) if shard_dir else default_shard_dir(self.db_path)
+        self.catalog_path = self.shard_dir / CATALOG_NAME
+
+    def _connect_catalog(self) -> sqlite3.Connection:
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        new = not self.catalog_path.exists()
+        conn = sqlite3.connect(self.catalog_path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if new:
+            conn.executescript(SCHEMA_FILE.read_text())
+        conn.executescript(CATALOG_SCHEMA)
+        return conn
+
+    def metro_ids(self) -> List[str]:
+        """Metros in the source database."""
+        conn = sqlite3.connect(readonly_uri(self.db_path), uri=True)
+        try:
+            return [row[0] for row in conn.execute('SELECT id FROM metros ORDER BY id')]
+        finally:
+            conn.close()
+
+    def build_shard(self, metro_id: str) -> Dict[str, Any]:
+        """Copy one metro out of the source database into a fresh shard file and register it."""
+        self.build_shard_file(metro_id)
+        return self.register_shard(metro_id)
+
+    def build_shard_file(self, metro_id: str) -> Path:
+        """Copy one metro out of the source database into a fresh shard file (catalog untouched)."""
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        path = self.shard_dir / shard_file_name(metro_id)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.unlink(missing_ok=True)
+
+        conn = sqlite3.connect(tmp, isolation_level=None)
+        try:
+            conn.executescript(SCHEMA_FILE.read_text())
+            conn.execute('ATTACH DATABASE ? AS src', (readonly_uri(self.db_path),))
+            conn.execute('BEGIN')
+            for table, where in SHARD_TABLES.items():
+                columns = ', '.join(c for c in _columns(conn, 'src', table) if c in _columns(conn, 'main', table))
+                # Transactions keep their ingest (rowid) order so pipeline offsets map across, below
+                order = ' ORDER BY rowid' if table == 'transactions' else ''
+                conn.execute(f'INSERT INTO main.{table} ({columns}) SELECT {columns} FROM src.{table} WHERE {where}{order}',
+                             {'metro_id': metro_id})
+                if table in _KEY_SETS:
+                    conn.execute(f'CREATE TEMP TABLE {_KEY_SETS[table]} (id TEXT PRIMARY KEY) WITHOUT ROWID')
+                    conn.execute(f'INSERT INTO temp.{_KEY_SETS[table]} SELECT id FROM main.{table}')
+
+            # Pipelines resume where they were: a source offset covers the same rows in the shard
+            conn.execute("""
+                INSERT INTO main.pipeline_offsets (pipeline, last_rowid, updated_at)
+                SELECT o.pipeline,
+                       (SELECT COUNT(*) FROM src.transactions t
+                        WHERE t.rowid <= o.last_rowid AND t.account_id IN (SELECT id FROM temp.shard_accounts)),
+                       o.updated_at
+                FROM src.pipeline_offsets o
+            """)
+            conn.execute('COMMIT')
+            conn.execute('DETACH DATABASE src')
+            conn.execute('ANALYZE')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        os.replace(tmp, path)
+        return path
+
+    def register_shard(self, metro_id: str) -> Dict[str, Any]:
+        """Point the catalog's org rows and routes for a metro at its shard file."""
+        path = self.shard_dir / shard_file_name(metro_id)
+        conn = self._connect_catalog()
+        try:
+            conn.execute('ATTACH DATABASE ? AS shard', (readonly_uri(path),))
+            conn.execute('BEGIN IMMEDIATE')
+            self._drop_metro(conn, metro_id)
+            for table in ORG_TABLES:
+                columns = ', '.join(_columns(conn, 'shard', table))
+                conn.execute(f'INSERT INTO main.{table} ({columns}) SELECT {columns} FROM shard.{table}')
+            for kind, table in ROUTE_TABLES.items():
+                conn.execute(f"""
+                    INSERT OR REPLACE INTO shard_routes (kind, key, metro_id)
+                    SELECT ?, id, ? FROM shard.{table}
+                """, (kind, metro_id))
+            counts = conn.execute("""
+                SELECT (SELECT COUNT(*) FROM shard.clients), (SELECT COUNT(*) FROM shard.accounts),
+                       (SELECT COUNT(*) FROM shard.transactions)
+            """).fetchone()
+            conn.execute("""
+                INSERT OR REPLACE INTO shards
+                (metro_id, file_name, client_count, account_count, transaction_count, bytes, built_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, (metro_id, path.name, counts[0], counts[1], counts[2], path.stat().st_size))
+            conn.execute('COMMIT')
+            conn.execute('DETACH DATABASE shard')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return {'metro_id': metro_id, 'file': str(path), 'clients': counts[0], 'accounts': counts[1],
+                'transactions': counts[2], 'bytes': path.stat().st_size}
+
+    @staticmethod
+    def _drop_metro(conn: sqlite3.Connection, metro_id: str):
+        """Remove a metro's org rows, routes and shard entry from the catalog."""
+        conn.execute("""
+            DELETE FROM relationship_managers WHERE region_id IN (
+                SELECT g.id FROM regions g JOIN markets mk ON mk.id = g.market_id WHERE mk.metro_id = ?)
+        """, (metro_id,))
+        conn.execute('DELETE FROM regions WHERE market_id IN (SELECT id FROM markets WHERE metro_id = ?)',
+                     (metro_id,))
+        conn.execute('DELETE FROM markets WHERE metro_id = ?', (metro_id,))
+        conn.execute('DELETE FROM metros WHERE id = ?', (metro_id,))
+        conn.execute('DELETE FROM shard_routes WHERE metro_id = ?', (metro_id,))
+        conn.execute('DELETE FROM shards WHERE metro_id = ?', (metro_id,))
+
+    def split(self, metro_ids: Optional[List[str]] = None, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Build the shards of the given (default: all) metros, in parallel processes."""
+        metro_ids = metro_ids or self.metro_ids()
+        workers = min(workers or os.cpu_count() or 1, len(metro_ids) or 1)
+        if workers == 1:
+            return [self.build_shard(metro_id) for metro_id in metro_ids]
+        # Shard files are independent and built in parallel; the catalog is created up front and
+        # only ever written from this process, one shard at a time, once every file is in place
+        self._connect_catalog().close()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_build_shard_file, [self.db_path] * len(metro_ids),
+                          [str(self.shard_dir)] * len(metro_ids), metro_ids))
+        return [self.register_shard(metro_id) for metro_id in metro_ids]
+
+    def list_shards(self) -> List[Dict[str, Any]]:
+        """Registered shards with their sizes."""
+        conn = self._connect_catalog()
+        try:
+            return [dict(row) for row in conn.execute('SELECT * FROM shards ORDER BY metro_id')]
+        finally:
+            conn.close()
+
+    def rebuild_catalog(self) -> List[Dict[str, Any]]:
+        """Recreate the catalog from the shard files alone."""
+        self.catalog_path.unlink(missing_ok=True)
+        registered = []
+        for path in sorted(self.shard_dir.glob('shard_*.db')):
+            conn = sqlite3.connect(readonly_uri(path), uri=True)
+            try:
+                row = conn.execute('SELECT id FROM metros').fetchone()
+            finally:
+                conn.close()
+            if row is not None:
+                registered.append(self.register_shard(row[0]))
+        return registered
+
+
+def _build_shard_file(db_path: str, shard_dir: str, metro_id: str) -> Path:
+    """Process-pool entry point for MetroShards.split."""
+    return MetroShards(db_path, shard_dir).build_shard_file(metro_id)
+
+
+# DatabaseQueries per shard file, kept open for the life of a pool worker
+_worker_shards: Dict[str, DatabaseQueries] = {}
+
+
+def _call_shard(path: str, partition_dir: str, method: str, args: tuple) -> Any:
+    """Process-pool entry point for ShardedQueries scatter-gather: one method on one shard."""
+    db = _worker_shards.get(path)
+    if db is None:
+        db = _worker_shards[path] = DatabaseQueries(readonly_uri(path), partition_dir)
+    return getattr(db, method)(*args)
+
+
+def _routed(name: str, kind: str):
+    """A DatabaseQueries method forwarded to the shard owning its first argument."""
+    def method(self, key, *args, **kwargs):
+        return getattr(self._shard_for(kind, key), name)(key, *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = getattr(DatabaseQueries, name).__doc__
+    return method
+
+
+class ShardedQueries(DatabaseQueries):
+    """DatabaseQueries over metro shards: org reads hit the catalog, point lookups one shard,
+    book-wide searches and rollups every shard in parallel."""
+
+    def __init__(self, shard_dir: Optional[str] = None, partition_dir: Optional[str] = None,
+                 workers: Optional[int] = None):
+        """Open the catalog; shards are opened on first use."""
+        shard_dir = Path(shard_dir) if shard_dir else default_shard_dir(Path(__file__).parent / 'banking_360.db')
+        # Partitions are shared by all shards and live next to the database the shards came from
+        partition_dir = Path(partition_dir) if partition_dir else default_partition_dir(shard_dir)
+        super().__init__(readonly_uri(shard_dir / CATALOG_NAME), partition_dir)
+        self.shard_dir = shard_dir
+        self.workers = workers
+        self._shards: Dict[str, DatabaseQueries] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _shard_paths(self) -> Dict[str, str]:
+        """metro_id -> shard file of every registered shard."""
+        return {row['metro_id']: str(self.shard_dir / row['file_name'])
+                for row in self._query('SELECT metro_id, file_name FROM shards ORDER BY metro_id')}
+
+    def _shard(self, metro_id: str) -> DatabaseQueries:
+        db = self._shards.get(metro_id)
+        if db is None:
+            row = self._query_one('SELECT file_name FROM shards WHERE metro_id = ?', (metro_id,))
+            if row is None:
+                raise ValueError(f'No shard for {metro_id}')
+            db = self._shards[metro_id] = DatabaseQueries(readonly_uri(self.shard_dir / row['file_name']),
+                                                           self.partition_dir)
+        return db
+
+    def _metro_for(self, kind: str, key: str) -> Optional[str]:
+        """The metro whose shard holds a client, relationship, account or RM."""
+        if kind == 'rm':
+            row = self._query_one("""
+                SELECT mk.metro_id FROM relationship_managers rm
+                JOIN regions g ON g.id = rm.region_id
+                JOIN markets mk ON mk.id = g.market_id
+                WHERE rm.id = ?
+            """, (key,))
+        else:
+            row = self._query_one('SELECT metro_id FROM shard_routes WHERE kind = ? AND key = ?', (kind, key))
+        return row['metro_id'] if row else None
+
+    def _shard_for(self, kind: str, key: str) -> DatabaseQueries:
+        """Owning shard; unknown keys go to any shard so they get the usual empty result."""
+        metro_id = self._metro_for(kind, key)
+        if metro_id is None:
+            metro_id = next(iter(self._shard_paths()), None)
+            if metro_id is None:
+                raise ValueError('No shards registered')
+        return self._shard(metro_id)
+
+    def _scatter(self, method: str, *args) -> List[Any]:
+        """Run one method on every shard (in a process pool when there is more than one worker)."""
+        paths = self._shard_paths()
+        workers = min(self.workers or os.cpu_count() or 1, len(paths))
+        if workers <= 1:
+            return [getattr(self._shard(metro_id), method)(*args) for metro_id in paths]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=workers)
+        count = len(paths)
+        return list(self._pool.map(_call_shard, list(paths.values()), [str(self.partition_dir)] * count,
+                                   [method] * count, [args] * count))
+
+    # Point lookups, routed by client, relationship, account or RM id
+
+    get_client_by_id = _routed('get_client_by_id', 'client')
+    get_accounts_by_client = _routed('get_accounts_by_client', 'client')
+    get_opportunities_by_client = _routed('get_opportunities_by_client', 'client')
+    get_product_penetration_by_client = _routed('get_product_penetration_by_client', 'client')
+    get_risk_flags_by_client = _routed('get_risk_flags_by_client', 'client')
+    get_utr_events_by_client = _routed('get_utr_events_by_client', 'client')
+    get_risk_transactions_by_client = _routed('get_risk_transactions_by_client', 'client')
+    get_client_risk_analytics = _routed('get_client_risk_analytics', 'client')
+    get_kri_metrics_by_client = _routed('get_kri_metrics_by_client', 'client')
+    get_relationship_by_id = _routed('get_relationship_by_id', 'relationship')
+    get_clients_by_relationship = _routed('get_clients_by_relationship', 'relationship')
+    get_relationship_portfolio_summary = _routed('get_relationship_portfolio_summary', 'relationship')
+    get_relationships_by_rm = _routed('get_relationships_by_rm', 'rm')
+    get_transactions_by_account = _routed('get_transactions_by_account', 'account')
+    get_account_activity = _routed('get_account_activity', 'account')
+
+    # Book-wide reads, scatter-gathered
+
+    def search_clients(self, text: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Find clients whose name contains text (ordered by name), across every shard."""
+        parts = self._scatter('search_clients', text, limit)
+        merged = heapq.merge(*parts, key=lambda client: (client['name'], client['id']))
+        return list(merged)[:clamp_page_size(limit)]
+
+    def get_portfolio_rollup(self, group_by: str = 'metro') -> List[Dict[str, Any]]:
+        """Client portfolio totals per group, merged from every shard's partial sums."""
+        return finish_rollup([row for part in self._scatter('_portfolio_rollup_partials', group_by) for row in part])
+
+    def get_database_stats(self) -> Dict[str, Any]:
+        """Row counts summed over the shards; org tables counted once, from the catalog."""
+        stats: Dict[str, Any] = {}
+        for part in self._scatter('get_database_stats'):
+            for table, count in part.items():
+                stats[table] = stats.get(table, 0) + count
+        org = super().get_database_stats()
+        stats.update({table: org[table] for table in ORG_TABLES})
+        return stats
+
+    def close(self):
+        """Close the catalog, the shard connections and the worker pool."""
+        for db in self._shards.values():
+            db.close()
+        self._shards.clear()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        super().close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Split the database into metro shards.')
+    parser.add_argument('--db', help='Source database path (defaults to banking_360.db)')
+    parser.add_argument('--shard-dir', help='Shard directory (defaults to shards/ next to the database)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    split_parser = commands.add_parser('split', help='Build shards (all metros, or the ones given)')
+    split_parser.add_argument('metros', nargs='*', help='Metro ids to (re)build')
+    split_parser.add_argument('--workers', type=int, help='Parallel builds (default: CPU count)')
+    commands.add_parser('list', help='Show registered shards')
+    commands.add_parser('rebuild-catalog', help='Recreate the catalog from the shard files')
+    args = parser.parse_args()
+
+    shards = MetroShards(args.db, args.shard_dir)
+    try:
+        if args.command == 'split':
+            started = time.perf_counter()
+            for result in shards.split(args.metros or None, args.workers):
+                print(f"✅ {result['metro_id']}: {result['clients']:,} clients, {result['accounts']:,} accounts, "
+                      f"{result['transactions']:,} transactions ({result['bytes'] / 1024:.1f} KB)")
+            print(f"⏱️  Done in {time.perf_counter() - started:.2f}s")
+        elif args.command == 'list':
+            for s in shards.list_shards():
+                print(f"🗂️  {s['metro_id']}: {s['client_count']:,} clients, {s['transaction_count']:,} transactions "
+                      f"({s['file_name']}, built {s['built_at']})")
+        elif args.command == 'rebuild-catalog':
+            print(f"✅ Catalog rebuilt from {len(shards.rebuild_catalog())} shards")
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
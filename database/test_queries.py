@@ -142,6 +142,60 @@ def test_queries():
             rm_data = get_rm_data(first_rm['id'])
             print(f"   - get_rm_data(): {'✅ Success' if rm_data else '❌ Failed'}")
             
+            # Test 11: Keyset pagination
+            print(f"\n1️⃣1️⃣ Testing keyset pagination for relationship '{first_rel['id']}':")
+            paged_ids = []
+            page = db.get_clients_by_relationship(first_rel['id'], limit=1)
+            while True:
+                paged_ids.extend(c['id'] for c in page)
+                if not page.next_cursor:
+                    break
+                page = db.get_clients_by_relationship(first_rel['id'], limit=1, cursor=page.next_cursor)
+            assert paged_ids == [c['id'] for c in clients], "Paged clients differ from full listing"
+            print(f"   - Walked {len(paged_ids)} pages of size 1: ✅ Success")
+            
+            try:
+                db.get_utr_events_by_client(client['id'], cursor='not-a-cursor')
+                print("   - Invalid cursor rejected: ❌ Failed")
+                return False
+            except ValueError:
+                print("   - Invalid cursor rejected: ✅ Success")
+            
+        # Test 12: Anomaly detector (on a scratch copy, the seed database stays untouched)
+        print(f"\n1️⃣2️⃣ Testing anomaly detector:")
+        if not test_anomaly_detector():
+            return False
+        
+        # Test 13: Monthly transaction partitions (also on a scratch copy)
+        print(f"\n1️⃣3️⃣ Testing transaction partitions:")
+        if not test_transaction_partitions():
+            return False
+        
+        # Test 14: Daily activity rollups (also on a scratch copy)
+        print(f"\n1️⃣4️⃣ Testing daily activity rollups:")
+        if not test_daily_rollups():
+            return False
+        
+        # Test 15: Metro shards (split from a scratch copy)
+        print(f"\n1️⃣5️⃣ Testing metro shards:")
+        if not test_metro_shards():
+            return False
+        
+        # Test 16: Query plans and timing budgets (scaled scratch copy)
+        print(f"\n1️⃣6️⃣ Testing query plans:")
+        if not test_query_plans():
+            return False
+        
+        # Test 17: Keyset paging over NULL sort keys (scratch copy)
+        print(f"\n1️⃣7️⃣ Testing pages over NULL sort keys:")
+        if not test_nullable_sort_keys():
+            return False
+        
+        # Test 18: Convenience functions return every row, not the first page (scratch copy)
+        print(f"\n1️⃣8️⃣ Testing convenience functions past one page:")
+        if not test_convenience_functions_follow_pages():
+            return False
+        
         print(f"\n🎉 All tests completed successfully!")
         return True
         
@@ -151,6 +205,311 @@ def test_queries():
         traceback.print_exc()
         return False
 
+def copy_database():
+    """Build a scratch copy of the seed database from schema.sql and seed_data.sql for tests that write."""
+    import sqlite3
+    import tempfile
+    
+    script_dir = Path(__file__).parent
+    tmp_dir = tempfile.mkdtemp(prefix='banking360_test_')
+    db_path = Path(tmp_dir) / 'banking_360.db'
+    with sqlite3.connect(db_path) as conn:
+        for sql_file in ('schema.sql', 'seed_data.sql'):
+            conn.executescript((script_dir / sql_file).read_text(encoding='utf-8'))
+    return db_path
+
+def test_anomaly_detector():
+    """Feed just-under-threshold cash deposits through the detector."""
+    import sqlite3
+    from anomaly_detector import AnomalyDetector
+    
+    db_path = copy_database()
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("""
+            INSERT INTO transactions (id, account_id, transaction_date, amount, transaction_type, counterparty, channel, location)
+            VALUES (?, 'acc_008', ?, ?, 'Deposit', 'Branch Deposit', 'Branch', 'Houston, TX')
+        """, [('txn_str_1', '2024-03-01 09:00:00', 9600.00), ('txn_str_2', '2024-03-02 15:30:00', 9850.00)])
+    
+    with AnomalyDetector(db_path) as detector:
+        first = detector.run()
+        second = detector.run()
+    
+    with DatabaseQueries(db_path) as db:
+        hits = db.get_risk_transactions_by_client('client_004', ['Structuring'])
+        flags = [f for f in db.get_risk_flags_by_client('client_004') if f['category'] == 'Structuring']
+    
+    print(f"   - Processed {first['processed']} transactions, rerun processed {second['processed']}")
+    print(f"   - Structuring hits: {len(hits)}, aggregated flags: {len(flags)}")
+    ok = second['processed'] == 0 and [h['id'] for h in hits] == ['rt_txn_str_2_STR'] and len(flags) == 1
+    print(f"   - Detector results: {'✅ Success' if ok else '❌ Failed'}")
+    return ok
+
+def test_transaction_partitions():
+    """Move old months into partitions and read them back through the router."""
+    import sqlite3
+    from datetime import datetime
+    from partitions import TransactionPartitions
+    
+    db_path = copy_database()
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("""
+            INSERT INTO transactions (id, account_id, transaction_date, amount, transaction_type)
+            VALUES (?, 'acc_001', ?, ?, 'Wire Transfer')
+        """, [('txn_old_1', '2023-11-03 10:00:00', 1200.00), ('txn_old_2', '2023-12-20 11:00:00', 800.00),
+              ('txn_old_3', '2023-12-28 09:15:00', 450.00), ('txn_new_1', '2024-05-20 13:00:00', 300.00)])
+    
+    def walk(db, **kwargs):
+        ids, page = [], db.get_transactions_by_account('acc_001', limit=2, **kwargs)
+        while True:
+            ids.extend(t['id'] for t in page)
+            if not page.next_cursor:
+                return ids
+            page = db.get_transactions_by_account('acc_001', limit=2, cursor=page.next_cursor, **kwargs)
+    
+    with DatabaseQueries(db_path) as db:
+        before = walk(db)
+    
+    partitions = TransactionPartitions(db_path)
+    moved = partitions.compact(hot_window_days=90, now=datetime(2024, 6, 1))
+    months = [p['month'] for p in partitions.list_partitions()]
+    
+    with DatabaseQueries(db_path) as db:
+        after = walk(db)
+        december = walk(db, start_date='2023-12-01', end_date='2024-01-01')
+        hot_rows = db._query('SELECT COUNT(*) AS n FROM transactions')[0]['n']
+        try:
+            alias = db._attach_partition(partitions.list_partitions()[0]['file_name'])
+            db._get_connection().execute(f"DELETE FROM {alias}.transactions")
+            read_only = False
+        except sqlite3.OperationalError:
+            read_only = True
+    
+    # A late row that holds the highest rowid stays hot, so the next insert cannot reuse its rowid
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            INSERT INTO transactions (id, account_id, transaction_date, amount, transaction_type)
+            VALUES ('txn_late_1', 'acc_001', '2023-12-30 16:00:00', 75.00, 'Wire Transfer')
+        """)
+        late_rowid = conn.execute("SELECT rowid FROM transactions WHERE id = 'txn_late_1'").fetchone()[0]
+    partitions.compact_month('2023-12')
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            INSERT INTO transactions (id, account_id, transaction_date, amount, transaction_type)
+            VALUES ('txn_new_2', 'acc_001', '2024-05-21 13:00:00', 60.00, 'Wire Transfer')
+        """)
+        next_rowid = conn.execute("SELECT rowid FROM transactions WHERE id = 'txn_new_2'").fetchone()[0]
+    
+    dropped = partitions.drop_month('2023-11')
+    with DatabaseQueries(db_path) as db:
+        after_drop = walk(db)
+    
+    print(f"   - Partitioned months: {', '.join(months)} ({sum(m['moved'] for m in moved)} rows), hot rows left: {hot_rows}")
+    print(f"   - Router pages match unpartitioned listing: {'✅ Success' if after == before else '❌ Failed'}")
+    print(f"   - Date-bounded read (December only): {december}")
+    print(f"   - Partitions read-only: {'✅ Success' if read_only else '❌ Failed'}")
+    print(f"   - Rowids keep increasing after compaction: {'✅ Success' if next_rowid > late_rowid else '❌ Failed'}")
+    ok = (after == before and december == ['txn_old_3', 'txn_old_2'] and read_only and hot_rows == 1
+          and next_rowid > late_rowid and not dropped.exists()
+          and set(after_drop) == set(before) - {'txn_old_1'} | {'txn_late_1', 'txn_new_2'})
+    print(f"   - Partition results: {'✅ Success' if ok else '❌ Failed'}")
+    return ok
+
+def test_daily_rollups():
+    """Backfill the rollups, then fold in new transactions incrementally."""
+    import sqlite3
+    from datetime import datetime
+    from daily_rollups import DailyRollups
+    
+    db_path = copy_database()
+    as_of = datetime(2024, 2, 20)
+    with DailyRollups(db_path) as rollups:
+        backfill = rollups.backfill(as_of=as_of)
+        with sqlite3.connect(db_path) as conn:
+            conn.executemany("""
+                INSERT INTO transactions (id, account_id, transaction_date, amount, transaction_type)
+                VALUES (?, 'acc_001', ?, ?, 'Wire Transfer')
+            """, [('txn_roll_1', '2024-02-16 09:00:00', 5000.00), ('txn_roll_2', '2024-02-16 17:30:00', -1500.00)])
+        first = rollups.run(as_of=as_of)
+        second = rollups.run(as_of=as_of)
+    
+    with DatabaseQueries(db_path) as db:
+        account = db._query_one('SELECT * FROM accounts WHERE id = ?', ('acc_001',))
+        activity = db.get_account_activity('acc_001', days=30, as_of='2024-02-20')
+        raw = db._query_one("""
+            SELECT SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) AS inflows,
+                   SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END) AS outflows,
+                   SUM(amount > 0) AS inflow_count, SUM(amount < 0) AS outflow_count
+            FROM transactions WHERE account_id = ?
+        """, ('acc_001',))
+    
+    # Backfill across more partitions than SQLite can attach at once
+    from partitions import TransactionPartitions
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("""
+            INSERT INTO transactions (id, account_id, transaction_date, amount, transaction_type)
+            VALUES (?, 'acc_002', ?, 100.00, 'Wire Transfer')
+        """, [(f'txn_month_{m}', f'2022-{m:02d}-15 10:00:00') for m in range(1, 13)])
+        expected_totals = conn.execute('SELECT SUM(amount > 0), SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) '
+                                       'FROM transactions').fetchone()
+    TransactionPartitions(db_path).compact(hot_window_days=90, now=datetime(2024, 6, 1))
+    with DailyRollups(db_path) as rollups:
+        wide = rollups.backfill(as_of=as_of)
+    with sqlite3.connect(db_path) as conn:
+        wide_totals = conn.execute('SELECT SUM(inflow_count), SUM(inflows) FROM account_daily_stats').fetchone()
+    
+    print(f"   - Backfilled {backfill['days']} account-days, then rolled up {first['processed']} new "
+          f"transactions (rerun processed {second['processed']})")
+    print(f"   - acc_001 30-day inflows {format_currency(account['monthly_inflows'])}, "
+          f"outflows {format_currency(account['monthly_outflows'])}, last {account['last_transaction']}")
+    ok = (second['processed'] == 0 and first['processed'] == 2
+          and all(account[f'monthly_{k}'] == raw[k] == activity[k] for k in ('inflows', 'outflows'))
+          and account['inflow_count'] == raw['inflow_count'] == 3 and account['outflow_count'] == 2
+          and account['monthly_volume'] == activity['volume'] and account['last_transaction'] == '2024-02-16 17:30:00'
+          and wide['sources'] > 10 and wide_totals == expected_totals)
+    print(f"   - Backfill over {wide['sources']} sources matches a full scan: "
+          f"{'✅ Success' if wide['sources'] > 10 and wide_totals == expected_totals else '❌ Failed'}")
+    print(f"   - Rollups match a full scan: {'✅ Success' if ok else '❌ Failed'}")
+    return ok
+
+def test_metro_shards():
+    """Split a copy into metro shards and compare routed and merged reads with the single file."""
+    from shards import MetroShards, ShardedQueries
+    
+    db_path = copy_database()
+    shards = MetroShards(db_path)
+    built = shards.split(workers=1)
+    
+    with DatabaseQueries(db_path) as single, ShardedQueries(shards.shard_dir, workers=2) as sharded:
+        client_ids = [c['id'] for c in single._query('SELECT id FROM clients')]
+        routed = all(single.get_client_by_id(i) == sharded.get_client_by_id(i)
+                     and single.get_client_risk_analytics(i) == sharded.get_client_risk_analytics(i)
+                     for i in client_ids)
+        routed = routed and all(single.get_clients_by_relationship(r['id']) == sharded.get_clients_by_relationship(r['id'])
+                                for r in single._query('SELECT id FROM relationships'))
+        routed = routed and all(single.get_relationships_by_rm(rm['id']) == sharded.get_relationships_by_rm(rm['id'])
+                                for rm in single.get_all_relationship_managers())
+        routed = routed and sharded.get_client_by_id('client_missing') is None
+        merged = (single.search_clients('a') == sharded.search_clients('a')
+                  and single.get_database_stats() == sharded.get_database_stats()
+                  and [(g['group_id'], g['client_count'], round(g['total_deposits'], 2))
+                       for g in single.get_portfolio_rollup('market')]
+                  == [(g['group_id'], g['client_count'], round(g['total_deposits'], 2))
+                      for g in sharded.get_portfolio_rollup('market')])
+    
+    parallel = MetroShards(db_path, db_path.with_name('shards_parallel'))
+    parallel_built = parallel.split(workers=2)
+    with ShardedQueries(parallel.shard_dir) as sharded:
+        parallel_routed = all(sharded.get_client_by_id(i) is not None for i in client_ids)
+    
+    rebuilt = shards.build_shard(built[0]['metro_id'])
+    catalog = shards.rebuild_catalog()
+    with ShardedQueries(shards.shard_dir) as sharded:
+        after_rebuild = [sharded.get_client_by_id(i) for i in client_ids[:3]]
+    with DatabaseQueries(db_path) as single:
+        expected = [single.get_client_by_id(i) for i in client_ids[:3]]
+    
+    print(f"   - Split {sum(b['clients'] for b in built)} clients into {len(built)} metro shards")
+    print(f"   - Routed lookups match the single file: {'✅ Success' if routed else '❌ Failed'}")
+    print(f"   - Scatter-gather search, stats and rollups match: {'✅ Success' if merged else '❌ Failed'}")
+    print(f"   - Parallel split (2 workers) registers every shard: {'✅ Success' if parallel_routed else '❌ Failed'}")
+    ok = (routed and merged and rebuilt['clients'] == built[0]['clients'] and len(catalog) == len(built)
+          and parallel_routed and [(b['metro_id'], b['clients'], b['transactions']) for b in parallel_built]
+          == [(b['metro_id'], b['clients'], b['transactions']) for b in built] and len(parallel.list_shards()) == len(built)
+          and after_rebuild == expected)
+    print(f"   - Shard results: {'✅ Success' if ok else '❌ Failed'}")
+    return ok
+
+def test_query_plans():
+    """Check every query method's plan and timing on a scaled copy, and that a lost index is caught."""
+    import sqlite3
+    from query_plans import PLAN_CASES, build_fixture, check_query_plans, uncovered_methods
+    
+    source = copy_database()
+    fixture = build_fixture(source, source.with_name('fixture.db'), scale=50)
+    results = check_query_plans(fixture)
+    failed = [r['method'] for r in results if not r['ok']]
+    missing = uncovered_methods()
+    
+    with sqlite3.connect(fixture) as conn:
+        conn.execute('DROP INDEX idx_risk_flags_client_id')
+    flags_case = [case for case in PLAN_CASES if case.method == 'get_risk_flags_by_client']
+    regressed = check_query_plans(fixture, flags_case, repeat=1)[0]
+    
+    print(f"   - Checked {len(results)} query methods, slowest {max(r['median_ms'] for r in results):.2f} ms")
+    print(f"   - Failing plans or budgets: {', '.join(failed + missing) or 'none'}")
+    print(f"   - Dropped index detected: {regressed['violations'][:1]}")
+    ok = not failed and not missing and not regressed['ok']
+    print(f"   - Query plan results: {'✅ Success' if ok else '❌ Failed'}")
+    return ok
+
+def test_nullable_sort_keys():
+    """Page opportunities and risk flags whose sort key is NULL, one row at a time."""
+    import sqlite3
+    
+    db_path = copy_database()
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("""
+            INSERT INTO opportunities (id, client_id, type, description, value, status)
+            VALUES (?, 'client_001', 'Treasury', 'Unsized opportunity', ?, 'Open')
+        """, [('opp_null_1', None), ('opp_null_2', None), ('opp_sized_1', 5000.00)])
+        conn.executemany("""
+            INSERT INTO risk_flags (id, client_id, category, severity, status, flagged_date)
+            VALUES (?, 'client_001', 'Review', 'Low', 'Active', ?)
+        """, [('rf_null_1', None), ('rf_null_2', None)])
+    
+    def walk(fetch):
+        ids, page = [], fetch('client_001', limit=1)
+        while True:
+            ids.extend(row['id'] for row in page)
+            if not page.next_cursor:
+                return ids
+            page = fetch('client_001', limit=1, cursor=page.next_cursor)
+    
+    with DatabaseQueries(db_path) as db:
+        opportunities = walk(db.get_opportunities_by_client)
+        flags = walk(db.get_risk_flags_by_client)
+        all_opportunities = [o['id'] for o in db._query(
+            'SELECT id FROM opportunities WHERE client_id = ? AND status = "Open" ORDER BY value DESC, id DESC', ('client_001',))]
+        all_flags = [f['id'] for f in db._query(
+            'SELECT id FROM risk_flags WHERE client_id = ? AND status = "Active" ORDER BY flagged_date DESC, id DESC', ('client_001',))]
+        client = db.get_client_by_id('client_001')
+    
+    print(f"   - Opportunities paged: {len(opportunities)} of {len(all_opportunities)}, risk flags: {len(flags)} of {len(all_flags)}")
+    ok = (opportunities == all_opportunities and flags == all_flags
+          and [o['id'] for o in client['opportunities']] == all_opportunities
+          and [f['id'] for f in client['riskFlags']] == all_flags)
+    print(f"   - NULL sort key results: {'✅ Success' if ok else '❌ Failed'}")
+    return ok
+
+def test_convenience_functions_follow_pages():
+    """Give one RM and one relationship more rows than a default page and load them whole."""
+    import sqlite3
+    from queries import DEFAULT_PAGE_SIZE, get_relationship_data, get_rm_data
+    
+    db_path = copy_database()
+    count = DEFAULT_PAGE_SIZE + 20
+    with sqlite3.connect(db_path) as conn:
+        rm_id, relationship_id = conn.execute('SELECT rm_id, id FROM relationships ORDER BY id LIMIT 1').fetchone()
+        conn.executemany('INSERT INTO relationships (id, rm_id, name) VALUES (?, ?, ?)',
+                         [(f'rel_page_{i:03d}', rm_id, f'Paged Relationship {i:03d}') for i in range(count)])
+        conn.executemany('INSERT INTO clients (id, relationship_id, name) VALUES (?, ?, ?)',
+                         [(f'client_page_{i:03d}', relationship_id, f'Paged Client {i:03d}') for i in range(count)])
+        relationship_total = conn.execute('SELECT COUNT(*) FROM relationships WHERE rm_id = ?', (rm_id,)).fetchone()[0]
+        client_total = conn.execute('SELECT COUNT(*) FROM clients WHERE relationship_id = ?',
+                                    (relationship_id,)).fetchone()[0]
+    
+    rm = get_rm_data(rm_id, db_path)
+    relationship = get_relationship_data(relationship_id, db_path)
+    relationship_ids = [r['id'] for r in rm['relationships']]
+    client_ids = [c['id'] for c in relationship['clients']]
+    
+    print(f"   - get_rm_data(): {len(relationship_ids)} of {relationship_total} relationships")
+    print(f"   - get_relationship_data(): {len(client_ids)} of {client_total} clients")
+    ok = (len(set(relationship_ids)) == relationship_total > DEFAULT_PAGE_SIZE
+          and len(set(client_ids)) == client_total > DEFAULT_PAGE_SIZE)
+    print(f"   - Convenience functions past one page: {'✅ Success' if ok else '❌ Failed'}")
+    return ok
+
 def check_database_exists():
     """Check if database file exists."""
     script_dir = Path(__file__).parent